@@ -0,0 +1,27 @@
+"""util.aggregateByTimestep: 10-minute data aggregated to hourly. The former per-timestep implementation (aggregateValuesWithinTimestep) is timed on the first 10 timesteps and its total time extrapolated, since its cost grows linearly with the number of timesteps
+
+usage (from the repository root): python -m benchmarks.aggregate_by_timestep_benchmark [agg_func]
+"""
+import sys
+import time
+import numpy as np
+from pandas import DataFrame, date_range, Series
+from dateutil.relativedelta import relativedelta
+from pydrodelta.util import aggregateByTimestep, aggregateValuesWithinTimestep
+
+if __name__ == "__main__":
+    agg_func = sys.argv[1] if len(sys.argv) > 1 else "sum"
+    dt = relativedelta(hours=1)
+    for n in (10**4, 10**5, 10**6):
+        index_in = date_range("2000-01-01", periods=n, freq="10min", tz="America/Argentina/Buenos_Aires")
+        data = DataFrame({"valor": np.random.default_rng(0).gamma(0.5, 2, n)}, index=index_in)
+        index = date_range(index_in[0], index_in[-1], freq="h")
+        t0 = time.perf_counter()
+        aggregateByTimestep(data, index, dt, agg_func = agg_func)
+        t = time.perf_counter() - t0
+        line = "%8i rows, %7i timesteps: %8.3f s" % (n, len(index), t)
+        t0 = time.perf_counter()
+        Series([aggregateValuesWithinTimestep(data, i, dt, agg_func = agg_func) for i in index[:10]], index[:10])
+        t_legacy = (time.perf_counter() - t0) * len(index) / 10
+        line += " (per-timestep, estimated: %10.1f s, x%.0f)" % (t_legacy, t_legacy / t)
+        print(line, flush=True)
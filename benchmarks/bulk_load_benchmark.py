@@ -0,0 +1,27 @@
+"""Topology.loadData: per-series vs. bulk (multi-series) download against a local stub api with simulated network latency
+
+usage (from the repository root): python -m benchmarks.bulk_load_benchmark [n_nodes] [latency_seconds]
+"""
+import sys
+import time
+from pydrodelta.topology import Topology
+from tests.a5_stub_server import A5StubServer
+from benchmarks.load_data_benchmark import topologyConfig
+
+def bench(stub : A5StubServer, n_nodes : int, **kwargs) -> float:
+    topology = Topology(**topologyConfig(stub, n_nodes), no_metadata = True, **kwargs)
+    t0 = time.perf_counter()
+    topology.loadData()
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    with A5StubServer(latency=latency) as stub:
+        print("%i series, %.0f ms latency per request" % (2 * n_nodes, latency * 1000))
+        t_seq = bench(stub, n_nodes)
+        print("per-series:            %8.3f s" % t_seq)
+        t = bench(stub, n_nodes, bulk_load = True)
+        print("bulk:                  %8.3f s (x%.1f)" % (t, t_seq / t))
+        t = bench(stub, n_nodes, bulk_load = True, load_concurrency = {"max_workers": 4})
+        print("bulk, max_workers=4:   %8.3f s (x%.1f)" % (t, t_seq / t))
@@ -0,0 +1,45 @@
+"""Forecast upload to a local stub api: single createCorrida request vs chunked upload (chunked_upload.uploadCorrida) with growing numbers of workers. The stub sleeps latency seconds per request plus seconds_per_mb per megabyte of payload, to stand for server processing time
+
+usage (from the repository root): python -m benchmarks.chunked_upload_benchmark [n_series] [hours] [latency] [seconds_per_mb]
+"""
+import sys
+import time
+import logging
+from datetime import timedelta
+from pydrodelta.chunked_upload import uploadCorrida
+from a5client import Crud
+from a5client.util import tryParseAndLocalizeDate
+from tests.a5_stub_server import A5StubServer, stubObservaciones
+
+forecast_date = "2023-01-01T00:00:00-03:00"
+
+def makeCorrida(n_series : int, hours : int) -> dict:
+    """Forecast run of n_series series of hours hourly records from forecast_date, with the values of the stub server"""
+    timeend = (tryParseAndLocalizeDate(forecast_date) + timedelta(hours = hours - 1)).isoformat()
+    return {
+        "cal_id": 1,
+        "forecast_date": forecast_date,
+        "series": [{"series_id": series_id, "series_table": "series", "pronosticos": stubObservaciones(series_id, forecast_date, timeend)} for series_id in range(1, n_series + 1)],
+        "id": None
+    }
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n_series = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    hours = int(sys.argv[2]) if len(sys.argv) > 2 else 720
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    seconds_per_mb = float(sys.argv[4]) if len(sys.argv) > 4 else 1
+    corrida = makeCorrida(n_series, hours)
+    with A5StubServer() as stub:
+        stub.latency = latency
+        stub.upload_seconds_per_mb = seconds_per_mb
+        crud = Crud(**stub.api_config)
+        t0 = time.perf_counter()
+        crud.createCorrida(corrida)
+        single = time.perf_counter() - t0
+        print("%i series x %i steps, latency %.2f s + %.2f s/MB. single request: %7.3f s" % (n_series, hours, latency, seconds_per_mb, single))
+        for max_workers in (1, 4, 8):
+            t0 = time.perf_counter()
+            created, report = uploadCorrida(crud, corrida, max_workers = max_workers, max_series_per_chunk = 20)
+            elapsed = time.perf_counter() - t0
+            print("chunked (20 series per chunk), %i workers: %7.3f s (x%.1f), %i chunks, slowest chunk %.3f s" % (max_workers, elapsed, single / elapsed, len(report), max(r["time"] for r in report)))
@@ -0,0 +1,30 @@
+"""LinearChannel / LinearNet convolution: pulse matrix product (previous implementation) vs pydrology.convolve (np.convolve or FFT), on synthetic hourly inflows and Nash unit hydrographs
+
+usage (from the repository root): python -m benchmarks.convolution_benchmark [n_steps] [k]
+"""
+import sys
+import time
+import logging
+import numpy as np
+from pydrodelta.pydrology import convolve, convolveNet, getPulseMatrix, gammaDistribution
+
+def timeit(func):
+    t0 = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - t0
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    k = float(sys.argv[2]) if len(sys.argv) > 2 else 25
+    inflows = np.random.default_rng(0).gamma(0.5, 20, size = (3, n))
+    u = gammaDistribution(2, k, 1)
+    print("%i steps, %i unit hydrograph ordinates, pulse matrix size: %.0f MB" % (n, len(u), (n + len(u) - 1) * len(u) * 8 / 2**20))
+    expected, t_matrix = timeit(lambda: np.dot(getPulseMatrix(inflows[0], u), u))
+    for method in ("direct", "fft"):
+        outflow, t = timeit(lambda: convolve(inflows[0], u, method))
+        print("single  pulse matrix: %8.3f s, %-6s: %7.4f s (x%.0f), max abs diff: %.2e" % (t_matrix, method, t, t_matrix / t, np.abs(outflow - expected).max()), flush=True)
+    us = [u, gammaDistribution(3, k / 2, 1), gammaDistribution(1, k, 1)]
+    for method in ("direct", "fft"):
+        _, t = timeit(lambda: convolveNet(inflows, us, method))
+        print("net (3) %-6s: %7.4f s" % (method, t), flush=True)
@@ -0,0 +1,32 @@
+"""HIDROSAT.executeRun: class-based time loop (one RetentionReservoir, LinearReservoirCascade and HIDROSATPowerLawReservoir per step) vs fused kernel, on synthetic daily forcings. The kernel is compiled with numba when it is installed (compilation time is excluded by a warm-up run)
+
+usage (from the repository root): python -m benchmarks.hidrosat_kernel_benchmark [n_steps]
+"""
+import sys
+import time
+import logging
+from pydrodelta.pydrology import HIDROSAT
+from pydrodelta import hidrosat_kernel
+from tests.synthetic_data import dailyForcings
+
+pars = [178.395, 1, 3, 232.505, 12.69, 2.28, 0.09]
+initial_conditions = [0, 0, 0, 0]
+
+def makeBoundaries(n : int) -> list:
+    """pma (doubled, so that the floodplain fills up) and etp lists of n days of synthetic forcings"""
+    forcings = dailyForcings(n)
+    return [(forcings.pma * 2).tolist(), forcings.etp.tolist()]
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 7300
+    boundaries = makeBoundaries(n = n)
+    HIDROSAT(pars, makeBoundaries(n = 10), initial_conditions).executeRun()
+    print("numba: %s" % (hidrosat_kernel.njit is not None))
+    times = {}
+    for method in ("executeRunReference", "executeRun"):
+        model = HIDROSAT(pars, boundaries, initial_conditions)
+        t0 = time.perf_counter()
+        getattr(model, method)()
+        times[method] = time.perf_counter() - t0
+    print("%6i steps, classes: %8.3f s, fused: %8.3f s (x%.0f)" % (n, times["executeRunReference"], times["executeRun"], times["executeRunReference"] / times["executeRun"]))
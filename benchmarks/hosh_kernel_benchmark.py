@@ -0,0 +1,35 @@
+"""HOSH4P1L.executeRun and HOSH4P2L.executeRun: reference vs fast runoff engine, on synthetic daily forcings. The fast engine is compiled with numba when it is installed (compilation time is excluded by a warm-up run)
+
+usage (from the repository root): python -m benchmarks.hosh_kernel_benchmark [n_steps]
+"""
+import sys
+import time
+import logging
+from pydrodelta.pydrology import HOSH4P1L, HOSH4P2L
+from pydrodelta import hosh_kernel
+from tests.synthetic_data import dailyForcings
+
+def makeBoundaries(n : int) -> list:
+    """pma and etp lists of n days of synthetic forcings"""
+    forcings = dailyForcings(n)
+    return [(forcings.pma).tolist(), forcings.etp.tolist()]
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 7300
+    boundaries = makeBoundaries(n = n)
+    HOSH4P1L([50, 150, 2.0, 3], makeBoundaries(n = 10), [30, 120], engine = "fast").executeRun()
+    print("numba: %s" % (hosh_kernel.njit is not None))
+    for cls, pars in [(HOSH4P1L, [50, 150, 2.0, 3]), (HOSH4P2L, [50, 150, 0.7, 5.0, 2.0, 3])]:
+        times = {}
+        for engine in ("reference", "fast"):
+            model = cls(pars, boundaries, [30, 120], engine = engine)
+            t0 = time.perf_counter()
+            if engine == "fast":
+                model.computeRunoffFast()
+            else:
+                model.computeRunoff()
+            t1 = time.perf_counter()
+            model.computeOutFlow()
+            times[engine] = (t1 - t0, time.perf_counter() - t0)
+        print("%s, %6i steps, runoff: reference %8.3f s, fast %8.3f s (x%.0f); executeRun: reference %8.3f s, fast %8.3f s (x%.1f)" % (cls.__name__, n, times["reference"][0], times["fast"][0], times["reference"][0] / times["fast"][0], times["reference"][1], times["fast"][1], times["reference"][1] / times["fast"][1]))
@@ -0,0 +1,68 @@
+"""Plan.execute: full vs incremental cycle after revision of a single series, against a local stub api. The plan has n observed nodes (hourly, 30 days), each one feeding a polynomial procedure that writes into a simulated node
+
+usage (from the repository root): python -m benchmarks.incremental_benchmark [n_nodes]
+"""
+import sys
+import time
+import logging
+import tempfile
+from pydrodelta.plan import Plan
+from tests.a5_stub_server import A5StubServer
+
+def makePlan(api_config : dict, n_nodes : int, **kwargs) -> Plan:
+    return Plan(
+        name = "incremental",
+        id = 1,
+        forecast_date = "2023-04-25T00:00:00-03:00",
+        time_interval = {"hours": 1},
+        topology = {
+            "timestart": "2023-03-26T00:00:00-03:00",
+            "timeend": "2023-04-25T00:00:00-03:00",
+            "no_metadata": True,
+            "bulk_load": True,
+            "nodes": [
+                {
+                    "id": i,
+                    "name": "node %i" % i,
+                    "time_interval": {"hours": 1},
+                    "api_config": api_config,
+                    "variables": [
+                        {
+                            "id": 2,
+                            "series": [{"series_id": 1000 + i, "tipo": "puntual", "lim_outliers": [0, 1e6]}] if i <= n_nodes else [],
+                            "series_sim": [{"series_id": 2000 + i}]
+                        }
+                    ]
+                }
+                for i in range(1, 2 * n_nodes + 1)
+            ]
+        },
+        procedures = [
+            {
+                "id": i,
+                "type": "Polynomial",
+                "parameters": {"intercept": 1.0, "coefficients": [2.0]},
+                "boundaries": [{"name": "input", "node_variable": [i, 2]}],
+                "outputs": [{"name": "output", "node_variable": [n_nodes + i, 2]}]
+            }
+            for i in range(1, n_nodes + 1)
+        ],
+        input_api_config = api_config,
+        **kwargs)
+
+def timeit(plan : Plan) -> float:
+    t0 = time.perf_counter()
+    plan.execute(upload = False)
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with A5StubServer() as stub, tempfile.TemporaryDirectory() as path:
+        print("%i observed nodes, %i procedures, 1 revised series per cycle" % (n_nodes, n_nodes))
+        t_full = timeit(makePlan(stub.api_config, n_nodes))
+        print("full:         %8.3f s" % t_full)
+        timeit(makePlan(stub.api_config, n_nodes, incremental = {"path": path}))
+        stub.series_offset = {1001: 0.5}
+        t = timeit(makePlan(stub.api_config, n_nodes, incremental = {"path": path}))
+        print("incremental:  %8.3f s (x%.1f)" % (t, t_full / t))
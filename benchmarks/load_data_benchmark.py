@@ -0,0 +1,43 @@
+"""Topology.loadData: sequential vs. concurrent download against a local stub api with simulated network latency
+
+usage (from the repository root): python -m benchmarks.load_data_benchmark [n_nodes] [latency_seconds]
+"""
+import sys
+import time
+import copy
+from pathlib import Path
+from pydrodelta.topology import Topology
+from tests.a5_stub_server import A5StubServer
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def topologyConfig(stub : A5StubServer, n_nodes : int) -> dict:
+    """tests/data/topologies/stub_series.yml pointed at stub, with n_nodes copies of its first node (node i reads series 1000 + i and 2000 + i)"""
+    config = stub.loadConfig(data_dir / "topologies/stub_series.yml")
+    template = config["nodes"][0]
+    config["nodes"] = []
+    for i in range(1, n_nodes + 1):
+        node = copy.deepcopy(template)
+        node["id"] = i
+        node["name"] = "node %i" % i
+        node["variables"][0]["series"][0]["series_id"] = 1000 + i
+        node["variables"][0]["series"][1]["series_id"] = 2000 + i
+        config["nodes"].append(node)
+    return config
+
+def bench(stub : A5StubServer, n_nodes : int, load_concurrency = None) -> float:
+    topology = Topology(**topologyConfig(stub, n_nodes), load_concurrency = load_concurrency)
+    t0 = time.perf_counter()
+    topology.loadData()
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    with A5StubServer(latency=latency) as stub:
+        print("%i series, %.0f ms latency per request" % (2 * n_nodes, latency * 1000))
+        t_seq = bench(stub, n_nodes)
+        print("sequential: %8.3f s" % t_seq)
+        for max_workers in (2, 4, 8, 16):
+            t = bench(stub, n_nodes, {"max_workers": max_workers})
+            print("max_workers=%2i: %8.3f s (x%.1f)" % (max_workers, t, t_seq / t))
@@ -0,0 +1,24 @@
+"""MultiStartCalibration of a SacramentoSimplified procedure (10 parameters): chains run sequentially vs one worker process per chain. Speed-up is bounded by the number of available cores
+
+usage (from the repository root): python -m benchmarks.multi_start_calibration_benchmark [n_starts] [n_steps]
+"""
+import sys
+import os
+import time
+import logging
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from benchmarks.parallel_calibration_benchmark import procedureConfig
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n_starts = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    config = procedureConfig(n)
+    print("cpu count: %s" % os.cpu_count())
+    for workers in sorted({1, min(n_starts, os.cpu_count() or 1), n_starts}):
+        procedure = SacramentoSimplifiedProcedure(**config, calibration = {"method": "multi-start", "objective_function": "nse", "n_starts": n_starts, "seed": 0, "workers": workers, "max_iter": 50})
+        t0 = time.perf_counter()
+        procedure.calibrate()
+        t = time.perf_counter() - t0
+        assert procedure.calibration is not None and procedure.calibration.calibration_result is not None
+        print("%6i steps, %i starts, workers: %i %8.2f s, best chain: %s, score: %.6f" % (n, n_starts, workers, t, procedure.calibration.best_chain, procedure.calibration.calibration_result[1]), flush=True)
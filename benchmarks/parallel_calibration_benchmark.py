@@ -0,0 +1,35 @@
+"""DownhillSimplexCalibration of a SacramentoSimplified procedure (10 parameters) with sequential and process-pool scoring. Speed-up is bounded by the number of available cores
+
+usage (from the repository root): python -m benchmarks.parallel_calibration_benchmark [workers] [n_steps]
+"""
+import sys
+import os
+import time
+import logging
+from pathlib import Path
+import numpy as np
+import yaml
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def procedureConfig(n : int) -> dict:
+    """tests/data/procedures/sacramento_synthetic.yml with n days of synthetic forcings and noisy observations generated by the model itself"""
+    config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+    return withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(n)), 2)
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else min(4, os.cpu_count() or 1)
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    config = procedureConfig(n)
+    print("cpu count: %s" % os.cpu_count())
+    for calibration in ({"workers": 1}, {"workers": workers}, {"workers": workers, "speculative": True}):
+        procedure = SacramentoSimplifiedProcedure(**config, calibration = {"method": "downhill-simplex", "objective_function": "nse", "max_iter": 50, **calibration})
+        np.random.seed(0)
+        t0 = time.perf_counter()
+        procedure.calibrate()
+        t = time.perf_counter() - t0
+        assert procedure.calibration is not None and procedure.calibration.calibration_result is not None
+        print("%6i steps, %-36s %8.2f s, score: %.6f" % (n, str(calibration), t, procedure.calibration.calibration_result[1]), flush=True)
@@ -0,0 +1,53 @@
+"""Topology.plotProno rendering: sequential vs process pool (plot_rendering.renderFiles) with growing numbers of workers, and a second run with skip_unchanged. The plot of a stub plan node is replicated n_plots times
+
+usage (from the repository root): python -m benchmarks.plot_rendering_benchmark [n_plots] [output_dir]
+"""
+import sys
+import time
+import logging
+import tempfile
+import warnings
+from pathlib import Path
+from pydrodelta.plan import Plan
+from pydrodelta.plot_rendering import PlotSpec, renderFiles
+from pydrodelta.topology import Topology
+from tests.a5_stub_server import A5StubServer
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def makeTopology() -> Topology:
+    """Topology of tests/data/plans/stub_scheduler.yml after executing the plan against the stub server, with the data of node 1 copied into its series_sim"""
+    with A5StubServer() as stub:
+        plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+        plan.execute(upload = False)
+    assert plan.topology is not None
+    variable = plan.topology.nodes[0].variables[2]
+    assert variable.series_sim is not None and variable.data is not None
+    variable.series_sim[0].data = variable.data.copy()
+    return plan.topology
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    n_plots = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(tempfile.mkdtemp())
+    topology = makeTopology()
+    spec = topology.nodes[0].plotPronoSpecs(output_dir = str(output_dir), use_series_sim = True)[0]
+    def makeSpecs(name : str) -> list:
+        return [
+            PlotSpec(spec.render, "plot %i" % i, output = output_dir / name / ("%i.png" % i), **{**spec.kwargs, "output_file": str(output_dir / name / ("%i.png" % i))})
+            for i in range(n_plots)
+        ]
+    t0 = time.perf_counter()
+    renderFiles(makeSpecs("sequential"))
+    sequential = time.perf_counter() - t0
+    print("%i plots. sequential: %7.3f s" % (n_plots, sequential))
+    for max_workers in (2, 4, 8):
+        specs = makeSpecs("pool_%i" % max_workers)
+        t0 = time.perf_counter()
+        renderFiles(specs, max_workers = max_workers, skip_unchanged = True)
+        elapsed = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        rendered = renderFiles(specs, max_workers = max_workers, skip_unchanged = True)
+        unchanged = time.perf_counter() - t0
+        print("%i workers: %7.3f s (x%.1f). second run, skip_unchanged: %7.3f s, %i rendered" % (max_workers, elapsed, sequential / elapsed, unchanged, rendered))
@@ -0,0 +1,58 @@
+"""PQ forcings layer: DataFrame.iterrows + result rows (previous time loop) vs PQForcings.steps + output buffers, and GRP / SacramentoSimplified (reference engine) run times, on synthetic daily forcings
+
+usage (from the repository root): python -m benchmarks.pq_forcings_benchmark [n_steps]
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+import numpy as np
+import yaml
+from pandas import DataFrame
+from pydrodelta.procedures.pq import PQForcings
+from pydrodelta.procedures.grp import GRPProcedure
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from tests.synthetic_data import dailyForcings
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def iterrowsLoop(input : DataFrame) -> DataFrame:
+    result_rows = []
+    k = -1
+    for i, row in input.iterrows():
+        k = k + 1
+        pma = row["pma"]
+        etp = row["etp"]
+        if np.isnan(pma):
+            pma = 0
+        result_rows.append([i, pma, etp, row["q_obs"], row["smc_obs"], pma - etp, k])
+    results = DataFrame(result_rows, columns = ["timestart", "pma", "etp", "q_obs", "smc_obs", "q", "k"])
+    results.set_index("timestart", inplace=True)
+    return results
+
+def forcingsLoop(input : DataFrame) -> DataFrame:
+    forcings = PQForcings(input, fill_nulls = True, required = ("pma",))
+    outputs = forcings.outputs(["q", "k"])
+    outputs["k"] = np.arange(len(forcings))
+    for k, i, pma, etp, q_obs, smc_obs in forcings.steps():
+        outputs["q"][k] = pma - etp
+    return forcings.results(outputs)
+
+def timeit(func):
+    t0 = time.perf_counter()
+    func()
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    input = dailyForcings(n)
+    input["q_obs"] = np.random.default_rng(0).uniform(0, 100, n)
+    t_iterrows = timeit(lambda: iterrowsLoop(input))
+    t_forcings = timeit(lambda: forcingsLoop(input))
+    print("%i steps, forcing loop only. iterrows: %7.3f s, PQForcings: %7.3f s (x%.0f)" % (n, t_iterrows, t_forcings, t_iterrows / t_forcings), flush=True)
+    grp = GRPProcedure(parameters = {"X0": 300, "X1": 100, "X2": 0.8, "X3": 3.5}, initial_states = {"Sk": 100, "Rk": 30}, extra_pars = {"area": 1e9}, boundaries = input, outputs = [[], []])
+    print("GRP exec: %7.3f s" % timeit(lambda: grp.exec(input.copy())), flush=True)
+    config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+    sac = SacramentoSimplifiedProcedure(**config, boundaries = input, outputs = [[], []])
+    print("SacramentoSimplified exec (reference engine): %7.3f s" % timeit(lambda: sac.exec(input.copy())), flush=True)
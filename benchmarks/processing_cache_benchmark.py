@@ -0,0 +1,54 @@
+"""Topology.batchProcessInput: without vs. with a warm processing cache, against a local stub api (hourly series, 30 days)
+
+usage (from the repository root): python -m benchmarks.processing_cache_benchmark [n_nodes]
+"""
+import sys
+import time
+import logging
+import tempfile
+from pydrodelta.topology import Topology
+from tests.a5_stub_server import A5StubServer
+
+def makeTopology(api_config : dict, n_nodes : int, **kwargs) -> Topology:
+    return Topology(
+        timestart = "2023-03-26T00:00:00-03:00",
+        timeend = "2023-04-25T00:00:00-03:00",
+        no_metadata = True,
+        bulk_load = True,
+        input_api_config = api_config,
+        nodes = [
+            {
+                "id": i,
+                "name": "node %i" % i,
+                "time_interval": {"hours": 1},
+                "api_config": api_config,
+                "variables": [
+                    {
+                        "id": 2,
+                        "series": [
+                            {"series_id": 1000 + i, "tipo": "puntual", "lim_outliers": [0, 1e6], "lim_jump": 1e5},
+                            {"series_id": 2000 + i, "tipo": "puntual"}
+                        ]
+                    }
+                ]
+            }
+            for i in range(1, n_nodes + 1)
+        ],
+        **kwargs)
+
+def bench(api_config : dict, n_nodes : int, **kwargs) -> float:
+    topology = makeTopology(api_config, n_nodes, **kwargs)
+    t0 = time.perf_counter()
+    topology.batchProcessInput()
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with A5StubServer() as stub, tempfile.TemporaryDirectory() as path:
+        print("%i nodes, 2 series per node" % n_nodes)
+        t_uncached = bench(stub.api_config, n_nodes)
+        print("uncached:  %8.3f s" % t_uncached)
+        bench(stub.api_config, n_nodes, processing_cache = {"path": path})
+        t = bench(stub.api_config, n_nodes, processing_cache = {"path": path})
+        print("warm:      %8.3f s (x%.1f)" % (t, t_uncached / t))
@@ -0,0 +1,34 @@
+"""Topology.batchProcessInput: overhead of the profiling instrumentation, inactive vs. active, against a local stub api (hourly series, 30 days)
+
+usage (from the repository root): python -m benchmarks.profiling_benchmark [n_nodes]
+"""
+import sys
+import time
+import logging
+from pydrodelta import profiling
+from tests.a5_stub_server import A5StubServer
+from benchmarks.processing_cache_benchmark import makeTopology
+
+def bench(api_config : dict, n_nodes : int) -> float:
+    topology = makeTopology(api_config, n_nodes)
+    t0 = time.perf_counter()
+    topology.batchProcessInput()
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with A5StubServer() as stub:
+        print("%i nodes, 2 series per node" % n_nodes)
+        bench(stub.api_config, n_nodes)
+        t_inactive = min(bench(stub.api_config, n_nodes) for i in range(3))
+        print("inactive:  %8.3f s" % t_inactive)
+        times = []
+        for i in range(3):
+            with profiling.profile() as profiler:
+                times.append(bench(stub.api_config, n_nodes))
+        t = min(times)
+        print("active:    %8.3f s (%+.1f%%)" % (t, (t / t_inactive - 1) * 100))
+        batch = [child for child in profiler.toDict()["children"] if child["name"] == "batchProcessInput"][0]
+        for stage in batch.get("children", []):
+            print("  %-20s %8.3f s" % (stage["name"], stage["time"]))
@@ -0,0 +1,47 @@
+"""ResultStatistics.compute: array engine (all metrics and objective function only) against the former DataFrame + list comprehension implementation, on series with 10% missing observations
+
+usage (from the repository root): python -m benchmarks.result_statistics_benchmark [n_values] [repeat]
+"""
+import sys
+import time
+import logging
+import numpy as np
+from pandas import DataFrame
+from pydrodelta.result_statistics import ResultStatistics
+
+def legacyCompute(obs, sim):
+    df = DataFrame({"obs": obs, "sim": sim}).dropna()
+    errors = [sim[i] - obs[i] for i in range(0, len(sim))]
+    df["errors"] = df["sim"] - df["obs"]
+    errors = [v for v in df["errors"]]
+    n = len(errors)
+    mse = sum([e**2 for e in errors]) / n
+    mean_obs = sum(df["obs"]) / n
+    mean_sim = sum(df["sim"]) / n
+    stdev_obs = sum([(x - mean_obs)**2 for x in df["obs"]]) / n
+    stdev_sim = sum([(x - mean_sim)**2 for x in df["sim"]]) / n
+    obs = [v for v in df["obs"]]
+    sim = [v for v in df["sim"]]
+    cov = sum([(obs[i] - mean_obs) * (sim[i] - mean_sim) for i in range(len(obs))]) / n
+    r = cov / stdev_obs**0.5 / stdev_sim**0.5
+    return 1 - ((r - 1)**2 + (stdev_sim / stdev_obs - 1)**2 + (mean_sim / mean_obs - 1)**2)**0.5
+
+def timeit(f, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        f()
+    return (time.perf_counter() - t0) / repeat
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = np.random.default_rng(0)
+    obs = rng.gamma(2, 50, n)
+    sim = obs * rng.uniform(0.8, 1.2, n)
+    obs[rng.random(n) < 0.1] = np.nan
+    obs, sim = obs.tolist(), sim.tolist()
+    t_legacy = timeit(lambda: legacyCompute(obs, sim), repeat)
+    t_all = timeit(lambda: ResultStatistics(obs, sim, compute = True), repeat)
+    t_rmse = timeit(lambda: ResultStatistics(obs, sim, compute = True, metrics = ["rmse"]), repeat)
+    print("%8i values, former: %8.3f ms, all metrics: %8.3f ms (x%.0f), rmse only: %8.3f ms (x%.0f)" % (n, t_legacy * 1e3, t_all * 1e3, t_legacy / t_all, t_rmse * 1e3, t_legacy / t_rmse), flush=True)
@@ -0,0 +1,43 @@
+"""LinearReservoirCascade and MuskingumChannel: loop implementation vs routing kernel, for a single inflow series and a batch of series. The kernels are compiled with numba when it is installed (compilation time is excluded by a warm-up run)
+
+usage (from the repository root): python -m benchmarks.routing_kernel_benchmark [n_steps] [n_series]
+"""
+import sys
+import time
+import logging
+import numpy as np
+from tests.routing_kernel_test import legacyCascade, legacyMuskingum
+from pydrodelta.pydrology import LinearReservoirCascade, MuskingumChannel
+from pydrodelta import routing_kernel
+
+def timeit(func) -> float:
+    t0 = time.perf_counter()
+    func()
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_series = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    inflows = np.maximum(np.random.default_rng(0).gamma(0.5, 20, size = (n_series, n)) - 5, 0)
+    routing_kernel.linearReservoirCascadeBatch(inflows[:, :10], 2.0, 2)
+    routing_kernel.muskingumChannelBatch(inflows[:, :10], 2.0, 0.2)
+    LinearReservoirCascade([2.0, 2], inflows[0, :10]).computeOutFlow()
+    MuskingumChannel([2.0, 0.2], inflows[0, :10]).computeOutFlow()
+    print("numba: %s" % (routing_kernel.njit is not None))
+    for N in (1, 2, 5, 10, 20):
+        legacy = LinearReservoirCascade([3.0, N], inflows[0])
+        procedure = LinearReservoirCascade([3.0, N], inflows[0])
+        t_legacy = timeit(lambda: legacyCascade(legacy))
+        t_kernel = timeit(procedure.computeOutFlow)
+        t_batch = timeit(lambda: routing_kernel.linearReservoirCascadeBatch(inflows, 3.0, N))
+        assert np.array_equal(legacy.Outflow, procedure.Outflow)
+        print("cascade   N=%2i, %6i steps, loop: %8.3f s, kernel: %7.3f s (x%.0f), batch of %i: %7.3f s (%.3f s/series)" % (N, n, t_legacy, t_kernel, t_legacy / t_kernel, n_series, t_batch, t_batch / n_series), flush=True)
+    for K, X in ((2.0, 0.2), (10.0, 0.3), (20.0, 0.5)):
+        legacy = MuskingumChannel([K, X], inflows[0])
+        procedure = MuskingumChannel([K, X], inflows[0])
+        t_legacy = timeit(lambda: legacyMuskingum(legacy))
+        t_kernel = timeit(procedure.computeOutFlow)
+        t_batch = timeit(lambda: routing_kernel.muskingumChannelBatch(inflows, K, X))
+        assert np.array_equal(legacy.Outflow, procedure.Outflow)
+        print("muskingum N=%2i, %6i steps, loop: %8.3f s, kernel: %7.3f s (x%.0f), batch of %i: %7.3f s (%.3f s/series)" % (procedure.N, n, t_legacy, t_kernel, t_legacy / t_kernel, n_series, t_batch, t_batch / n_series), flush=True)
@@ -0,0 +1,44 @@
+"""Procedure.run_batch vs one Procedure.run per parameter set, for SacramentoSimplified, GR4J, LagAndRoute and LinearChannel on synthetic daily series
+
+usage (from the repository root): python -m benchmarks.run_batch_benchmark [n_sets]
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+import numpy as np
+import yaml
+from pandas import DataFrame
+from pydrodelta.procedures.gr4j import GR4JProcedure
+from pydrodelta.procedures.lag_and_route import LagAndRouteProcedure
+from pydrodelta.procedures.linear_channel import LinearChannelProcedure
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from pydrodelta.util import createDatetimeSequence
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def timeit(func):
+    t0 = time.perf_counter()
+    func()
+    return time.perf_counter() - t0
+
+def compare(name, procedure, parameter_matrix):
+    procedure.run_batch(parameter_matrix[0:1])
+    t_loop = timeit(lambda: [procedure.run(parameters = row.tolist()) for row in parameter_matrix])
+    t_batch = timeit(lambda: procedure.run_batch(parameter_matrix))
+    print("%-20s %4i sets. run loop: %7.3f s, run_batch: %7.3f s (x%.0f)" % (name, len(parameter_matrix), t_loop, t_batch, t_loop / t_batch), flush=True)
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(0)
+    sac_config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+    base = np.array(list(sac_config["parameters"].values()), dtype=float)
+    compare("SacramentoSimplified", SacramentoSimplifiedProcedure(**withSimulatedObs(SacramentoSimplifiedProcedure, dict(sac_config, boundaries = dailyForcings(365)), 2)), base * rng.uniform(0.7, 1.3, (k, len(base))))
+    index = createDatetimeSequence(timestart = "2000-01-01", timeend = "2000-04-09")
+    gr4j_config = yaml.load(open(data_dir / "procedures/gr4j_synthetic.yml"), yaml.CLoader)
+    compare("GR4J", GR4JProcedure(**withSimulatedObs(GR4JProcedure, dict(gr4j_config, boundaries = dailyForcings(len(index))), 2)), np.array([300, 100, 0.5, 2.5]) * rng.uniform(0.7, 1.3, (k, 4)))
+    hydrograph = [DataFrame({"valor": 10 + np.cumsum(rng.normal(0, 1, len(index))).clip(-9, None) + 5 * np.sin(np.arange(len(index)) / 7)}, index = index)]
+    compare("LagAndRoute", LagAndRouteProcedure(**withSimulatedObs(LagAndRouteProcedure, dict(parameters = {"lag": 1, "k": 2, "n": 3}, initial_states = [0], boundaries = hydrograph))), np.column_stack([rng.integers(0, 5, k), rng.uniform(0.5, 5, k), rng.integers(1, 6, k)]))
+    compare("LinearChannel", LinearChannelProcedure(**withSimulatedObs(LinearChannelProcedure, dict(parameters = {"k": 2, "n": 3}, boundaries = hydrograph))), np.column_stack([rng.uniform(0.5, 5, k), rng.uniform(1, 5, k)]))
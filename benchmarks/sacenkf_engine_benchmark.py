@@ -0,0 +1,35 @@
+"""SacEnkfProcedure.run: reference vs fast (ensemble array) engine on synthetic daily forcings, for increasing number of replicates
+
+usage (from the repository root): python -m benchmarks.sacenkf_engine_benchmark [n_steps] [replicates,...]
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+import numpy as np
+import yaml
+from pydrodelta.procedures.sac_enkf import SacEnkfProcedure
+from tests.synthetic_data import dailyForcings
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 90
+    replicates = [int(r) for r in sys.argv[2].split(",")] if len(sys.argv) > 2 else [35, 100, 500]
+    config = yaml.load(open(data_dir / "procedures/sac_enkf_synthetic.yml"), yaml.CLoader)
+    boundaries = dailyForcings(n, seed = 1)
+    boundaries["q_obs"] = np.linspace(0.2, 2, n)
+    boundaries["smc_obs"] = 0.2
+    for r in replicates:
+        times = {}
+        for engine in ("reference", "fast"):
+            procedure = SacEnkfProcedure(**dict(config,
+                extra_pars = {**config["extra_pars"], "engine": engine},
+                asim_pars = {**config["asim_pars"], "replicates": r, "seed": 0},
+                boundaries = boundaries,
+                outputs = [boundaries["q_obs"].tolist(), boundaries["smc_obs"].tolist()]))
+            t0 = time.perf_counter()
+            procedure.run()
+            times[engine] = time.perf_counter() - t0
+        print("%5i steps, %4i replicates, reference: %8.3f s, fast: %7.3f s (x%.0f)" % (n, r, times["reference"], times["fast"], times["reference"] / times["fast"]), flush=True)
@@ -0,0 +1,34 @@
+"""SacramentoSimplifiedProcedure.exec: reference vs fast engine on synthetic daily forcings. The fast engine is compiled with numba when it is installed (compilation time is excluded by a warm-up run)
+
+usage (from the repository root): python -m benchmarks.sacramento_engine_benchmark [n_steps]
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+import yaml
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from pydrodelta import sacramento_simplified_kernel
+from tests.synthetic_data import dailyForcings
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def makeProcedure(input, engine : str, **extra_pars) -> SacramentoSimplifiedProcedure:
+    config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+    return SacramentoSimplifiedProcedure(**dict(config, extra_pars = {**config["extra_pars"], "engine": engine, **extra_pars}, boundaries = input, outputs = [[], []]))
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    input = dailyForcings(n)
+    warm_up = dailyForcings(10)
+    makeProcedure(warm_up, "fast").exec(warm_up)
+    print("numba: %s" % (sacramento_simplified_kernel.njit is not None))
+    for extra_pars in ({}, {"rk2": True}, {"compute_mass_balance": True}):
+        times = {}
+        for engine in ("reference", "fast"):
+            procedure = makeProcedure(input, engine, **extra_pars)
+            t0 = time.perf_counter()
+            procedure.exec(input.copy())
+            times[engine] = time.perf_counter() - t0
+        print("%6i steps, %-32s reference: %8.3f s, fast: %8.3f s (x%.0f)" % (n, str(extra_pars), times["reference"], times["fast"], times["reference"] / times["fast"]), flush=True)
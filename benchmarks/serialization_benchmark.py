@@ -0,0 +1,38 @@
+"""NodeSerie.toList: per-record (previous) vs columnar serialization of an hourly forecast with quantile qualifiers, and json output with the standard json module vs serialization.dumps (orjson if installed)
+
+usage (from the repository root): python -m benchmarks.serialization_benchmark [n_steps] [n_qualifiers]
+"""
+import sys
+import time
+import json
+import logging
+import numpy as np
+from pandas import DatetimeIndex, DataFrame
+from tests.serialization_test import legacyToList
+from pydrodelta.serialization import toRecords, dumps, orjson
+from pydrodelta.util import localtz
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    n_qualifiers = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    index = DatetimeIndex(np.arange(0, n, dtype="int64") * 3600 * 10**9).tz_localize("UTC").tz_convert(localtz)
+    rng = np.random.default_rng(0)
+    qualifiers = ["p%02i" % i for i in range(n_qualifiers)]
+    data = DataFrame({"valor": rng.normal(size=n), **{q: rng.normal(size=n) for q in qualifiers}}, index=index)
+    data.iloc[::50, 0] = np.nan
+    print("orjson: %s" % (orjson is not None))
+    for strict in (True, False):
+        kwargs = {"remove_nulls": True, "qualifiers": qualifiers, "strict_properties": strict, "include_series_id": True, "series_id": 1}
+        t0 = time.perf_counter()
+        expected = legacyToList(data, **kwargs)
+        t1 = time.perf_counter()
+        records = toRecords(data, **kwargs)
+        t2 = time.perf_counter()
+        print("toList, %6i steps x %i qualifiers, strict_properties=%s: per-record %7.3f s, columnar %7.3f s (x%.1f), %i records" % (n, n_qualifiers, strict, t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1), len(records)))
+    t0 = time.perf_counter()
+    json.dumps(expected)
+    t1 = time.perf_counter()
+    dumps(records)
+    t2 = time.perf_counter()
+    print("json: json.dumps %7.3f s, serialization.dumps %7.3f s (x%.1f)" % (t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
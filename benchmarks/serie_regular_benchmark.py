@@ -0,0 +1,54 @@
+"""util.serieRegular: irregular ~10-minute data with 20% missing values regularized to 15 minutes with tag column. The former row-by-row tag assignment (f4, f5) and interpolate_or_copy_closest loop are timed on 1000 rows and their total time extrapolated, since their cost grows linearly with the number of rows
+
+usage (from the repository root): python -m benchmarks.serie_regular_benchmark [n_rows]
+"""
+import sys
+import time
+import numpy as np
+from pandas import DataFrame, date_range, to_timedelta
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from pydrodelta.util import serieRegular, interpolate_or_copy_closest, f4, f5
+
+def legacyInterpolateOrCopyClosest(data, td):
+    ffill = data.ffill()
+    bfill = data.bfill()
+    ffill_times = data.index.to_series().where(data.notna()).ffill()
+    bfill_times = data.index.to_series().where(data.notna()).bfill()
+    delta_fwd = data.index.to_series() - ffill_times
+    delta_bwd = bfill_times - data.index.to_series()
+    use_ffill = (delta_fwd <= td)
+    use_bfill = (delta_bwd <= td)
+    filled = data.copy()
+    for i in data[data.isna()].index:
+        if use_ffill[i] and use_bfill[i]:
+            filled[i] = (ffill[i] * delta_fwd[i] + bfill[i] * delta_bwd[i]) / (delta_fwd[i] + delta_bwd[i])
+        elif use_ffill[i]:
+            filled[i] = ffill[i]
+        elif use_bfill[i]:
+            filled[i] = bfill[i]
+    return filled
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    rng = np.random.default_rng(0)
+    index = date_range("2000-01-01", periods=n, freq="10min", tz="America/Argentina/Buenos_Aires") + to_timedelta(rng.integers(0, 300, n), unit="s")
+    valor = rng.gamma(0.5, 2, n)
+    valor[rng.random(n) < 0.2] = np.nan
+    data = DataFrame({"valor": valor, "tag": "obs"}, index=index.rename("timestart"))
+    dt = relativedelta(minutes=15)
+    for label, kwargs in (("interpolation_limit=1h", {"interpolation_limit": timedelta(hours=1)}), ("interpolate=False", {"interpolate": False}), ("interpolation_limit=2", {"interpolation_limit": 2})):
+        t0 = time.perf_counter()
+        result = serieRegular(data, dt, tag_column = "tag", **kwargs)
+        t = time.perf_counter() - t0
+        # row-by-row parts of the former implementation
+        sample = data.join(DataFrame(index=result.index), how="outer").iloc[:1000].copy()
+        t0 = time.perf_counter()
+        sample["interpolated"] = legacyInterpolateOrCopyClosest(sample["valor"], timedelta(hours=1))
+        if "interpolate" in kwargs:
+            sample["interpolated_final"] = sample["interpolated"]
+            sample.apply(lambda row: f4(row, "valor", "tag"), axis=1)
+        else:
+            sample.apply(lambda row: f5(row, "valor", "tag", sample.index.min(), sample.index.max()), axis=1)
+        t_legacy = (time.perf_counter() - t0) * (n + len(result)) / len(sample)
+        print("%8i rows, %-24s %8.3f s (row-by-row, estimated: %8.1f s, x%.0f)" % (n, label + ":", t, t_legacy, t_legacy / t), flush=True)
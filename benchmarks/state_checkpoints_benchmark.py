@@ -0,0 +1,41 @@
+"""Cold run (full warmup from the configured initial states) vs warm start from the latest state checkpoint, for SacramentoSimplified and GRP on a synthetic daily series with a 10-day forecast
+
+usage (from the repository root): python -m benchmarks.state_checkpoints_benchmark [n_days]
+"""
+import sys
+import time
+import logging
+import tempfile
+from pathlib import Path
+import yaml
+from pydrodelta.procedures.grp import GRPProcedure
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from tests.synthetic_data import dailyForcings
+
+data_dir = Path(__file__).parent.parent / "tests" / "data"
+
+def timeit(func, repeat : int = 5):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - t0) / repeat
+
+def compare(name, procedure_class, config_file, n):
+    config = yaml.load(open(data_dir / "procedures" / config_file), yaml.CLoader)
+    config = dict(config, boundaries = dailyForcings(n), outputs = [[], []])
+    with tempfile.TemporaryDirectory() as path:
+        checkpoints = {"path": path, "save_window": {"days": 30}}
+        cold = procedure_class(**config, checkpoints = checkpoints)
+        cold.run()
+        forecast_date = cold.output[0].index[n - 10]
+        cold = procedure_class(**config, checkpoints = checkpoints, forecast_date = forecast_date)
+        warm = procedure_class(**config, checkpoints = checkpoints, forecast_date = forecast_date)
+        t_cold = timeit(lambda: cold.run(use_checkpoints = False))
+        t_warm = timeit(lambda: warm.run())
+        print("%-20s %6i steps. cold: %7.3f s, warm start: %7.3f s (x%.1f)" % (name, n, t_cold, t_warm, t_cold / t_warm), flush=True)
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    compare("SacramentoSimplified", SacramentoSimplifiedProcedure, "sacramento_synthetic.yml", n)
+    compare("GRP", GRPProcedure, "grp_synthetic.yml", n)
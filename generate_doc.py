@@ -4,6 +4,7 @@ selected_files = [
     "calibration.calibration",
     "calibration.downhill_simplex_calibration",
     "calibration.linear_regression_calibration",
+    "calibration.multi_start_calibration",
     "descriptors.bool_descriptor",
     "descriptors.bool_or_none_descriptor",
     "descriptors.dataframe_descriptor",
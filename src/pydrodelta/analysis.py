@@ -4,6 +4,7 @@ import sys
 import click
 from .config import config
 from .util import ParseApiConfig
+from . import profiling
 
 logging.basicConfig(
     filename = os.path.join(
@@ -39,7 +40,11 @@ from pydrodelta.topology import Topology
 @click.option("--pretty", "-r", is_flag=True, help="json pretty print", default=False, show_default=True)
 @click.option("--input-api",help="Override config.input_api. sintax: token@url. Token and url of the service from where to load data", type=str)
 @click.option("--output-api",help="Override config.output_api. sintax: token@url. Token and url of the service where to upload analysis output", type=str)
-def run_analysis(self,config_file,csv,json,graph_file,pivot,upload,include_prono,verbose,upload_series_prono,upload_series_output_as_prono,plot_var,pretty,input_api,output_api):
+@click.option("--no-cache", is_flag=True, help="Don't use the local cache of input api data (download all data)", default=False, show_default=True)
+@click.option("--profile", help="Save a timing tree of the run (per stage, node, series and procedure, with call counts and uploaded bytes) into this file (json)", type=str, default=None)
+@click.option("--profile-dump", help="Also save the output of a profiler into this file (see --profiler)", type=str, default=None)
+@click.option("--profiler", help="Profiler used for --profile-dump: cprofile (pstats file) or pyinstrument (html report, requires pyinstrument)", type=click.Choice(["cprofile","pyinstrument"]), default="cprofile", show_default=True)
+def run_analysis(self,config_file,csv,json,graph_file,pivot,upload,include_prono,verbose,upload_series_prono,upload_series_output_as_prono,plot_var,pretty,input_api,output_api,no_cache,profile,profile_dump,profiler):
     """
     run analysis of border conditions from topology file
     
@@ -55,8 +60,13 @@ def run_analysis(self,config_file,csv,json,graph_file,pivot,upload,include_prono
         root.addHandler(handler)
     input_api_config = ParseApiConfig(input_api)
     output_api_config = ParseApiConfig(output_api)
+    if profile is not None or profile_dump is not None:
+        # profiling stops (and results are saved) when the command ends
+        self.with_resource(profiling.profile(output=profile, dump=profile_dump, profiler=profiler))
 
     topology = Topology.load(config_file)
+    if no_cache:
+        topology.cache = None
     topology.batchProcessInput(
         include_prono = include_prono, 
         input_api_config = input_api_config)
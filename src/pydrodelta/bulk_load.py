@@ -0,0 +1,175 @@
+import logging
+import threading
+import requests
+from datetime import datetime
+from typing import List, Dict, Tuple, Optional, Set, Union
+from a5client import Crud
+from a5client.util import tryParseAndLocalizeDate
+from .concurrent_load import LoadTask
+from .node_serie import NodeSerie
+from . import profiling
+
+class MultiSeriesReadNotSupported(Exception):
+    """The api does not accept multi-series observation queries"""
+
+unsupported_urls : Set[str] = set()
+"""Api urls where the multi-series query failed. Series from these apis are loaded one by one"""
+_unsupported_lock = threading.Lock()
+
+def readObservacionesMulti(
+    crud : Crud,
+    series_id : List[int],
+    timestart : datetime,
+    timeend : datetime,
+    tipo : str = "puntual",
+    use_proxy : bool = False
+    ) -> Dict[int, list]:
+    """Retrieve observations of many series of the same tipo in a single request
+
+    Args:
+        crud (Crud): api client
+        series_id (List[int]): Series identifiers
+        timestart (datetime): Begin timestamp
+        timeend (datetime): End timestamp
+        tipo (str, optional): Geometry type: puntual, areal, raster. Defaults to "puntual".
+        use_proxy (bool, optional): Perform request through proxy. Defaults to False.
+
+    Raises:
+        MultiSeriesReadNotSupported: if the api rejects the query (status 400, 404, 405 or 501)
+        Exception: Request failed for any other non-200 status code
+
+    Returns:
+        dict: observations list of each series_id. Every requested series_id is a key (with an empty list if no observations were found)
+    """
+    response = requests.get("%s/obs/%s/observaciones" % (crud.url, tipo),
+        params = {
+            "series_id": ",".join([str(i) for i in series_id]),
+            "timestart": timestart.isoformat(),
+            "timeend": timeend.isoformat()
+        },
+        headers = crud.request_headers,
+        proxies = crud.proxy_dict if use_proxy else None,
+        timeout = (crud.timeout_connect, crud.timeout_response)
+    )
+    if response.status_code in (400, 404, 405, 501):
+        raise MultiSeriesReadNotSupported("multi-series read not supported at %s: status %i" % (crud.url, response.status_code))
+    if response.status_code != 200:
+        raise Exception("request failed for observaciones tipo: %s, series_id: %s. message: %s" % (tipo, str(series_id), response.text))
+    observaciones = response.json()
+    if isinstance(observaciones, dict) and "rows" in observaciones:
+        observaciones = observaciones["rows"]
+    if not isinstance(observaciones, list):
+        raise MultiSeriesReadNotSupported("multi-series read at %s returned an unexpected payload" % crud.url)
+    by_series : Dict[int, list] = {int(i): [] for i in series_id}
+    for obs in observaciones:
+        if "series_id" not in obs:
+            raise MultiSeriesReadNotSupported("multi-series read at %s returned observations without series_id" % crud.url)
+        sid = int(obs["series_id"])
+        if sid in by_series:
+            by_series[sid].append(obs)
+    return by_series
+
+class BulkLoadTask:
+    """Download of many series that share api, tipo and time window with a single multi-series request. If the api does not support it, the series are loaded one by one"""
+
+    def __init__(
+        self,
+        tasks : List[LoadTask],
+        crud : Crud,
+        tipo : str,
+        timestart : datetime,
+        timeend : datetime
+        ):
+        self.tasks = tasks
+        self.crud = crud
+        self.tipo = tipo
+        self.timestart = timestart
+        self.timeend = timeend
+
+    @property
+    def host(self) -> Optional[str]:
+        return self.tasks[0].host
+
+    @property
+    def label(self) -> str:
+        return "%i %s series" % (len(self.tasks), self.tipo)
+
+    @profiling.timed(lambda self: "bulk %s" % self.label)
+    def fetch(self) -> None:
+        if self.crud.url not in unsupported_urls:
+            try:
+                by_series = readObservacionesMulti(
+                    self.crud,
+                    [t.serie.series_id for t in self.tasks],
+                    self.timestart,
+                    self.timeend,
+                    tipo = self.tipo)
+            except MultiSeriesReadNotSupported as e:
+                logging.warning("%s. Falling back to per-series requests" % str(e))
+                with _unsupported_lock:
+                    unsupported_urls.add(self.crud.url)
+            else:
+                for task in self.tasks:
+                    logging.debug("Load data for series_id: %i [%s to %s] from a5 api (bulk)" % (task.serie.series_id, self.timestart.isoformat(), self.timeend.isoformat()))
+                    task.serie.setApiData(
+                        {
+                            "id": task.serie.series_id,
+                            "tipo": self.tipo,
+                            "observaciones": by_series[task.serie.series_id]
+                        },
+                        tag = task.kwargs.get("tag", "obs"))
+                return
+        for task in self.tasks:
+            task.fetch()
+
+    def check(self) -> None:
+        for task in self.tasks:
+            task.check()
+
+    def run(self) -> None:
+        self.fetch()
+        self.check()
+
+def isBulkLoadable(task : LoadTask) -> bool:
+    """A task can be bulk loaded if it reads a plain observed series from the input api without metadata and without local cache"""
+    return type(task.serie) is NodeSerie and task.kwargs.get("no_metadata", False) and task.host is not None and task.serie.getCache() is None
+
+def groupLoadTasks(
+    tasks : List[LoadTask],
+    max_series_per_request : int = 100
+    ) -> List[Union[LoadTask,BulkLoadTask]]:
+    """Group bulk-loadable tasks by (api, tipo, time window) into BulkLoadTasks of up to max_series_per_request series. Other tasks are returned unchanged. Groups take the position of their first task
+
+    Parameters:
+    -----------
+    tasks : List[LoadTask]
+        Series downloads
+
+    max_series_per_request : int = 100
+        Maximum number of series per multi-series request
+
+    Returns:
+    --------
+    List[Union[LoadTask,BulkLoadTask]]
+    """
+    if max_series_per_request < 1:
+        raise ValueError("max_series_per_request must be greater than 0")
+    grouped : List[Union[LoadTask,BulkLoadTask]] = []
+    open_groups : Dict[Tuple[str,Optional[str],str,datetime,datetime], BulkLoadTask] = {}
+    for task in tasks:
+        if not isBulkLoadable(task):
+            grouped.append(task)
+            continue
+        crud = task.serie.getCrud(task.kwargs.get("input_api_config"))
+        assert crud is not None
+        timestart = tryParseAndLocalizeDate(task.kwargs["timestart"])
+        timeend = task.serie.getApiTimeend(tryParseAndLocalizeDate(task.kwargs["timeend"]))
+        key = (crud.url, crud.token, task.serie.type, timestart, timeend)
+        group = open_groups.get(key)
+        if group is None or len(group.tasks) >= max_series_per_request:
+            group = BulkLoadTask([], crud, task.serie.type, timestart, timeend)
+            open_groups[key] = group
+            grouped.append(group)
+        group.tasks.append(task)
+    # single-series groups gain nothing from the multi-series query
+    return [g.tasks[0] if isinstance(g, BulkLoadTask) and len(g.tasks) == 1 else g for g in grouped]
@@ -9,9 +9,14 @@ from ..descriptors.int_descriptor import IntDescriptor
 from ..descriptors.string_descriptor import StringDescriptor
 from ..descriptors.dataframe_descriptor import DataFrameDescriptor
 import yaml
+import hashlib
 from pathlib import Path
 from a5client.util_types import Dateable
 from numpy import nan
+from pandas import DataFrame
+from pandas.util import hash_pandas_object
+from .score_cache import ScoreCache
+from ..result_statistics import metric_dependencies
 
 if TYPE_CHECKING:
     from pydrodelta.procedure import Procedure
@@ -22,6 +27,8 @@ class Calibration:
     
     _valid_objective_function = ['rmse','mse','bias','stdev_dif','r','nse','cov',"oneminusr","kge"]
 
+    _maximize_objective_function = ["nse","r","cov","kge"]
+
     calibrate = BoolDescriptor()
     """Perform the calibration"""
 
@@ -55,11 +62,22 @@ class Calibration:
     scores = DataFrameDescriptor()
     """Calibration/Validation scores"""
 
+    @property
+    def maximize(self) -> bool:
+        """True if the objective function is to be maximized"""
+        return self.objective_function in self._maximize_objective_function
+
+    @property
+    def cache(self) -> Optional[ScoreCache]:
+        """Cache of objective function values (None if disabled)"""
+        return self._cache
+
     @property
     def result(self) -> dict:
         return {
             "parameters": self.calibration_result[0] if self.calibration_result is not None else None,
-            "scores": self.scores.to_dict(orient="records") if self.scores is not None else None
+            "scores": self.scores.to_dict(orient="records") if self.scores is not None else None,
+            "cache": self._cache.stats if self._cache is not None else None
         }
 
     base_path : Union[str,Path,None] = None
@@ -72,7 +90,10 @@ class Calibration:
             objective_function : Literal['rmse','mse','bias','stdev_dif','r','nse','cov',"oneminusr","kge"] = 'rmse',
             save_result : Optional[str] = None,
             calibration_period : Optional[List[datetime]] = None,
-            base_path : Union[str,Path,None] = None
+            base_path : Union[str,Path,None] = None,
+            cache_size : Optional[int] = None,
+            cache_decimals : int = 10,
+            cache_file : Optional[str] = None
             ):
         """
         Parameters:
@@ -99,6 +120,18 @@ class Calibration:
         calibration_period : list = None
 
             Calibration period (begin date, end date) 
+
+        cache_size : int = None
+
+            Maximum number of objective function values kept in memory, so that parameter sets visited more than once are not run again. If None or 0 (default), the cache is disabled
+
+        cache_decimals : int = 10
+
+            Parameter values are rounded to this number of decimals to look up the cache
+
+        cache_file : str = None
+
+            Also store the objective function values in this json lines file. Values found there are reused, i.e. to resume an interrupted calibration. Requires cache_size
         """
         self._procedure = procedure
         self.calibrate = calibrate
@@ -111,6 +144,12 @@ class Calibration:
         self.save_result = self.resolve_path(save_result)
         self.calibration_period = (calibration_period[0], calibration_period[1]) if calibration_period is not None else None
         self.scores = None
+        if cache_size is not None and cache_size < 0:
+            raise ValueError("cache_size must be 0 or greater")
+        if cache_file is not None and not cache_size:
+            raise ValueError("cache_file requires cache_size")
+        self._cache = ScoreCache(cache_size, cache_decimals, self.resolve_path(cache_file)) if cache_size else None
+        self._config_hash = None
 
     def resolve_path(self, path : Union[str,Path,None]) -> Optional[Path]:
         return resolve_path(path, self.base_path) if path is not None else None
@@ -122,7 +161,8 @@ class Calibration:
             "objective_function": self.objective_function,
             "save_result": self.save_result,
             "calibration_period": [self.calibration_period[0].isoformat(), self.calibration_period[1].isoformat()] if self.calibration_period is not None else None,
-            "calibration_result": self.calibration_result
+            "calibration_result": self.calibration_result,
+            "cache": self._cache.stats if self._cache is not None else None
         }
         for key in cal_dict:
             try:
@@ -162,11 +202,15 @@ class Calibration:
         objective_function : Optional[str] = None, 
         result_index : Optional[int] = None,
         save_results : Optional[Union[Path,str]] = None,
+        use_cache : bool = True,
+        all_metrics : bool = False
         ) -> float:
         """
         Runs procedure and returns objective function value
         procedure.input and procedure.output_obs must be already loaded
 
+        If the cache is enabled and the same parameters were already scored, the cached value is returned without running the procedure (procedure results are left as they are)
+
         Parameters:
         -----------
         parameters : Any
@@ -181,6 +225,18 @@ class Calibration:
 
             Index of the output to use to compute the objective function
 
+        save_results : str = None
+
+            Save the procedure results into this file. The cache is not used
+
+        use_cache : bool = True
+
+            Look up and store the value in the cache (if enabled)
+
+        all_metrics : bool = False
+
+            Compute all the statistics metrics. If False, only the objective function (and the metrics it is derived from) is computed
+
         Returns:
         --------
         the objective function value : float
@@ -189,11 +245,20 @@ class Calibration:
         result_index = result_index if result_index is not None else self.result_index
         if self._procedure is None:
             raise RuntimeError("procedure not set")
+        cache_key = None
+        if self._cache is not None and use_cache and not save_results:
+            if self._config_hash is None:
+                self._config_hash = self.configHash()
+            cache_key = self._cache.key(self._config_hash, objective_function, result_index, parameters.values() if isinstance(parameters, dict) else parameters)
+            cached_value = self._cache.get(cache_key)
+            if cached_value is not None:
+                return cached_value
         self._procedure.run(
             parameters=parameters, 
             save_results=save_results, 
             load_input=False, 
-            load_output_obs=False
+            load_output_obs=False,
+            metrics=[objective_function] if not all_metrics and objective_function in metric_dependencies else None
         )
         if self._procedure.procedure_function_results is None:
             raise RuntimeError("procedure function results not set")
@@ -203,8 +268,43 @@ class Calibration:
         if value is None:
             raise RuntimeError("Objective function resulted to None")
         # logging.debug((parameters, value))
+        if cache_key is not None:
+            self._cache.set(cache_key, value)
         return value
 
+    def configHash(self) -> str:
+        """Hash of the procedure configuration, the loaded input and the observed output. Part of the objective function cache key, so that values are not reused after any of them changes. procedure.input and procedure.output_obs must be already loaded"""
+        if self._procedure is None:
+            raise RuntimeError("procedure not set")
+        procedure = self._procedure
+        config = {
+            "type": type(procedure).__name__,
+            "id": procedure.id,
+            "initial_states": procedure.initial_states,
+            "extra_pars": procedure.extra_pars,
+            "fixed_parameters": getattr(procedure, "_fixed_parameters", None),
+            "parameters_for_calibration": [p.name for p in procedure.parameters_for_calibration],
+            "time_interval": str(procedure.time_interval),
+            "time_offset": str(procedure.time_offset),
+            "calibration_period": self.calibration_period
+        }
+        h = hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode())
+        for data in (procedure.input, procedure.output_obs):
+            for df in (data if isinstance(data, list) else [data]):
+                if isinstance(df, DataFrame):
+                    try:
+                        h.update(hash_pandas_object(df, index=True).to_numpy().tobytes())
+                    except TypeError:
+                        h.update(df.to_json(date_format="iso").encode())
+                    h.update(json.dumps(list(map(str, df.columns))).encode())
+                else:
+                    h.update(json.dumps(df, default=str).encode())
+        return h.hexdigest()
+
+    def resetConfigHash(self) -> None:
+        """Compute the configuration hash again on the next cached objective function call. To be called after (re)loading procedure.input and procedure.output_obs"""
+        self._config_hash = None
+
     def run(
         self, 
         inplace : bool = True, 
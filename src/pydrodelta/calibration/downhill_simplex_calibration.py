@@ -7,6 +7,7 @@ from ..descriptors.bool_descriptor import BoolDescriptor
 from ..descriptors.int_descriptor import IntDescriptor
 from ..descriptors.float_descriptor import FloatDescriptor
 from .calibration import Calibration
+from .score_pool import ScorePool
 from pathlib import Path
 import numpy as np
 from datetime import datetime
@@ -60,6 +61,12 @@ class DownhillSimplexCalibration(Calibration):
     save_simplex : Optional[Union[Path, str]]
     """save simplex at this file path as comma separated values. Each row is a point. Last column is score."""
 
+    workers = IntDescriptor()
+    """Number of worker processes used to compute the objective function. If greater than 1, the initial simplex, the reductions and (if speculative=True) the reflection, expansion and contraction points are scored in parallel"""
+
+    speculative = BoolDescriptor()
+    """If workers > 1, score the reflection, expansion and contraction points of each iteration together. The resulting path is the same"""
+
     @property
     def simplex(self) -> Optional[Union[np.typing.NDArray[np.float64],List[Tuple[List[float],float]]]]:
         return self._simplex
@@ -84,7 +91,12 @@ class DownhillSimplexCalibration(Calibration):
             save_result : Optional[str] = None,
             calibration_period : Optional[List[datetime]] = None,
             base_path : Union[str,Path,None] = None,
-            save_simplex : Optional[Union[str, Path]] = None
+            save_simplex : Optional[Union[str, Path]] = None,
+            workers : int = 1,
+            speculative : bool = False,
+            cache_size : Optional[int] = None,
+            cache_decimals : int = 10,
+            cache_file : Optional[str] = None
             ):
         """
         Parameters:
@@ -135,6 +147,30 @@ class DownhillSimplexCalibration(Calibration):
         calibration_period : list = None
 
             Calibration period (begin date, end date) 
+
+        save_simplex : str = None
+
+            save simplex at this file path as comma separated values. Each row is a point. Last column is score.
+
+        workers : int = 1
+
+            Number of worker processes used to compute the objective function. Each worker holds a copy of the procedure with the input and observed output already loaded. If 1, the objective function is computed sequentially in the current process
+        
+        speculative : bool = False
+
+            If workers > 1, score the reflection, expansion and contraction points of each iteration together (some of the scores are discarded). The resulting path is the same as with speculative=False
+
+        cache_size : int = None
+
+            Maximum number of objective function values kept in memory. Vertices clipped onto the parameter limits are often visited more than once. If None or 0 (default), the cache is disabled. With workers > 1, each worker process keeps its own cache
+
+        cache_decimals : int = 10
+
+            Parameter values are rounded to this number of decimals to look up the cache
+
+        cache_file : str = None
+
+            Also store the objective function values in this json lines file. Values found there are reused, i.e. to resume an interrupted calibration. Requires cache_size
     
         """
         super().__init__(
@@ -144,7 +180,10 @@ class DownhillSimplexCalibration(Calibration):
             calibration_period = calibration_period,
             objective_function = objective_function,
             result_index = result_index,
-            base_path = base_path)
+            base_path = base_path,
+            cache_size = cache_size,
+            cache_decimals = cache_decimals,
+            cache_file = cache_file)
         self.limit = limit
         self.sigma = sigma
         self.ranges = ranges
@@ -154,6 +193,10 @@ class DownhillSimplexCalibration(Calibration):
         self._downhill_simplex = None
         self._simplex = None
         self.save_simplex = self.resolve_path(save_simplex)
+        if workers < 1:
+            raise ValueError("workers must be greater than 0")
+        self.workers = workers
+        self.speculative = speculative
 
     def toDict(self) -> dict:
         cal_dict = {
@@ -166,13 +209,16 @@ class DownhillSimplexCalibration(Calibration):
             "no_improve_thr": self.no_improve_thr,
             "max_stagnations": self.max_stagnations,
             "max_iter": self.max_iter,
+            "workers": self.workers,
+            "speculative": self.speculative,
             "save_result": self.save_result,
             "calibration_period": [self.calibration_period[0].isoformat(), self.calibration_period[1].isoformat()] if self.calibration_period is not None else None,
             "calibration_result": self.calibration_result,
             "iters": self._downhill_simplex.iters if self._downhill_simplex is not None else None,
             "limits": self._downhill_simplex.limits if self._downhill_simplex is not None else None,
             "initial_simplex": self._downhill_simplex.initial_points_list if self._downhill_simplex is not None else None,
-            "final_simplex" : self._downhill_simplex.current_points_list if self._downhill_simplex is not None else None
+            "final_simplex" : self._downhill_simplex.current_points_list if self._downhill_simplex is not None else None,
+            "cache": self._cache.stats if self._cache is not None else None
         }
         for key in cal_dict:
             try:
@@ -197,10 +243,13 @@ class DownhillSimplexCalibration(Calibration):
             f"  no_improve_thr={self.no_improve_thr},",
             f"  max_stagnations={self.max_stagnations},",
             f"  max_iter={self.max_iter},",
+            f"  workers={self.workers},",
+            f"  speculative={self.speculative},",
             f"  iters={self._downhill_simplex.iters if self._downhill_simplex is not None else None},",
             f"  limits={self._downhill_simplex.limits if self._downhill_simplex is not None else None},",
             f"  initial_simplex={self._downhill_simplex.initial_points_list if self._downhill_simplex is not None else None},",
             f"  final_simplex={self._downhill_simplex.current_points_list if self._downhill_simplex is not None else None},",
+            f"  cache={self._cache.stats if self._cache is not None else None},",
             f")"
         ]
         return "\n".join(lines)
@@ -336,6 +385,7 @@ class DownhillSimplexCalibration(Calibration):
         save_simplex = save_simplex if save_simplex is not None else self.save_simplex
         self._procedure.loadInputDefault()
         self._procedure.loadOutputObs()
+        self.resetConfigHash()
         downhill_simplex = DownhillSimplex(
             self.runReturnScore, 
             np.array(points), 
@@ -344,7 +394,7 @@ class DownhillSimplexCalibration(Calibration):
             max_iter=max_iter,
             limit = limit,
             limits = ranges if ranges is not None else self._procedure.limits,
-            maximize = True if self.objective_function in ["nse","r","cov","kge"] else False,
+            maximize = self.maximize,
             save_simplex = save_simplex,
             minmax = self._procedure.limits
         )
@@ -363,6 +413,7 @@ class DownhillSimplexCalibration(Calibration):
         max_stagnations : Optional[int] = None, 
         max_iter : Optional[int] = None,
         save_simplex : Optional[Union[Path,str]] = None,
+        workers : Optional[int] = None,
         **kwargs
         ) -> Union[None,Tuple[List[float],float]]:
         """
@@ -398,6 +449,10 @@ class DownhillSimplexCalibration(Calibration):
 
             maximum iterations
 
+        workers : int = None
+
+            Number of worker processes used to compute the objective function
+
         save_results : str = None
 
             Save the calibration result into this file
@@ -419,11 +474,33 @@ class DownhillSimplexCalibration(Calibration):
             save_simplex=save_simplex)
         if self._downhill_simplex is None:
             raise RuntimeError("_downhill_simplex not set")
-        calibration_result = self._downhill_simplex.run()
-        parameters = [float(x) for x in calibration_result[0]]
-        score = float(calibration_result[1])
-        self._calibration_result = (list(parameters),score)
+        if self._procedure is None:
+            raise RuntimeError("_procedure not set")
+        workers = workers if workers is not None else self.workers
+        if workers > 1:
+            with ScorePool(self._procedure, workers, self.objective_function, self.result_index) as pool:
+                self._downhill_simplex.f_batch = pool.score
+                self._downhill_simplex.speculative = self.speculative
+                try:
+                    calibration_result = self._downhill_simplex.run()
+                finally:
+                    self._downhill_simplex.f_batch = None
+        else:
+            calibration_result = self._downhill_simplex.run()
         logging.debug("Downhill simplex finished at iteration %i" % self._downhill_simplex.iters)
+        return self.setCalibrationResult(calibration_result[0], calibration_result[1], inplace, save_result)
+
+    def setCalibrationResult(
+        self,
+        parameters : Sequence[float],
+        score : float,
+        inplace : bool = True,
+        save_result : Optional[Union[Path,str]] = None
+        ) -> Union[None,Tuple[List[float],float]]:
+        """Set calibration result, save it if save_result (or self.save_result) is set, run the procedure with the resulting parameters and compute the scores"""
+        parameters = [float(x) for x in parameters]
+        score = float(score)
+        self._calibration_result = (list(parameters),score)
         save_result = save_result if save_result is not None else self.save_result
         if save_result:
             json.dump(
@@ -435,7 +512,7 @@ class DownhillSimplexCalibration(Calibration):
                 indent = 4
             )
         # self._calibration_result = (list(parameters),score)
-        self.runReturnScore(parameters=parameters, objective_function=self.objective_function)
+        self.runReturnScore(parameters=parameters, objective_function=self.objective_function, use_cache=False, all_metrics=True)
         if self._procedure is None:
             raise RuntimeError("_procedure not set")
         self.scores = self._procedure.read_statistics(as_dataframe=True)
@@ -443,4 +520,3 @@ class DownhillSimplexCalibration(Calibration):
             return None 
         else:
             return (parameters, score)
-        
@@ -54,7 +54,10 @@ class LinearRegressionCalibration(Calibration):
             objective_function : str = 'rmse',
             save_result : Optional[str] = None,
             calibration_period : Optional[List[datetime]] = None,
-            base_path : Union[str,Path,None] = None
+            base_path : Union[str,Path,None] = None,
+            cache_size : Optional[int] = None,
+            cache_decimals : int = 10,
+            cache_file : Optional[str] = None
             ):
         """
         Parameters:
@@ -81,6 +84,18 @@ class LinearRegressionCalibration(Calibration):
         calibration_period : Optional[List[datetime]] = None
 
             Begin and end dates of training set. Data outside this period is used for validation. If not set, validation is not performed
+
+        cache_size : int = None
+
+            Maximum number of objective function values (runReturnScore) kept in memory. If None or 0 (default), the cache is disabled
+
+        cache_decimals : int = 10
+
+            Parameter values are rounded to this number of decimals to look up the cache
+
+        cache_file : str = None
+
+            Also store the objective function values in this json lines file. Requires cache_size
         """
         super().__init__(
             procedure = procedure,
@@ -89,7 +104,10 @@ class LinearRegressionCalibration(Calibration):
             calibration_period = calibration_period,
             objective_function = "rmse",
             result_index = 0,
-            base_path = base_path)
+            base_path = base_path,
+            cache_size = cache_size,
+            cache_decimals = cache_decimals,
+            cache_file = cache_file)
         self._linearRegression : Optional[LinearCombinationCallable] = getattr(self._procedure, "linearRegression", None)
         if not callable(self._linearRegression):
             raise Exception("linear regression not available for this procedure function")
@@ -101,7 +119,8 @@ class LinearRegressionCalibration(Calibration):
             "objective_function": self.objective_function,
             "save_result": self.save_result,
             "calibration_period": [self.calibration_period[0].isoformat(), self.calibration_period[1].isoformat()] if self.calibration_period is not None else None,
-            "calibration_result": self.calibration_result
+            "calibration_result": self.calibration_result,
+            "cache": self._cache.stats if self._cache is not None else None
         }
         for key in cal_dict:
             try:
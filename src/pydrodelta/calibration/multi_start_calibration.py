@@ -0,0 +1,346 @@
+from ..downhill_simplex import DownhillSimplex
+import logging
+import json
+import os
+from typing import Optional, List, Union, Tuple, Literal
+from ..descriptors.int_descriptor import IntDescriptor
+from ..descriptors.string_descriptor import StringDescriptor
+from ..descriptors.dataframe_descriptor import DataFrameDescriptor
+from .downhill_simplex_calibration import DownhillSimplexCalibration
+from .score_pool import ScorePool, workerProcedure
+from pathlib import Path
+from pandas import DataFrame
+import numpy as np
+from datetime import datetime
+
+def runChainInWorker(points : List[List[float]]) -> Tuple[List[float],float,int]:
+    """Run one downhill simplex chain using the procedure held by the current worker process"""
+    return workerProcedure().calibration.runChain(points)
+
+class MultiStartCalibration(DownhillSimplexCalibration):
+    """Calibration procedure that runs several independent Nelder Mead Downhill Simplex chains from different starting simplexes and keeps the best result. Chains are run in parallel worker processes, each holding one copy of the procedure with the input and observed output already loaded"""
+
+    _start_methods = ["latin-hypercube", "random"]
+
+    n_starts = IntDescriptor()
+    """Number of independent downhill simplex chains"""
+
+    start_method = StringDescriptor()
+    """Method used to generate the initial simplexes: 'latin-hypercube' (the starting points of the chains are spread over the parameter ranges using latin hypercube sampling) or 'random' (each simplex is generated as in DownhillSimplexCalibration)"""
+
+    seed = IntDescriptor()
+    """Seed of the random number generator used to generate the initial simplexes"""
+
+    chains = DataFrameDescriptor()
+    """Endpoints of the chains. One row per chain with columns chain, iters, score and one column per calibrated parameter"""
+
+    @property
+    def best_chain(self) -> Optional[int]:
+        """Index of the chain that produced the calibration result"""
+        return self._best_chain
+
+    def __init__(
+            self,
+            procedure,
+            calibrate : bool = True,
+            result_index : int = 0,
+            objective_function : Literal['rmse','mse','bias','stdev_dif','r','nse','cov',"oneminusr","kge"] = 'rmse',
+            limit : bool = True,
+            sigma : float = 0.25,
+            ranges : Optional[List[Tuple[float,float]]] = None,
+            no_improve_thr : float = 0.0000001,
+            max_stagnations : int = 10,
+            max_iter : int = 5000,
+            save_result : Optional[str] = None,
+            calibration_period : Optional[List[datetime]] = None,
+            base_path : Union[str,Path,None] = None,
+            n_starts : int = 4,
+            start_method : Literal["latin-hypercube","random"] = "latin-hypercube",
+            seed : Optional[int] = None,
+            workers : Optional[int] = None,
+            cache_size : Optional[int] = None,
+            cache_decimals : int = 10,
+            cache_file : Optional[str] = None
+            ):
+        """
+        Parameters:
+        -----------
+        procedure : Procedure
+            The procedure to be calibrated
+
+        calibrate : bool = True
+
+            Perform the calibration
+
+        result_index : int = 0
+
+            Index of the output element to use to compute the objective function
+
+        objective_function : str = 'rmse'
+
+            Objective function for the calibration procedure. One of 'rmse', 'mse', 'bias', 'stdev_dif', 'r', 'nse', 'cov', 'oneminusr'
+
+        limit : bool = True
+
+            Limit values of the parameters to the provided min-max ranges
+
+        sigma : float = 0.25
+
+            For start_method='random', ratio of the standard deviation of the initial distribution of the parameter values with the min-max range. For start_method='latin-hypercube', size of the initial simplexes relative to the min-max range
+
+        ranges : List[Tuple[float,float]] = None
+
+            Override default parameter ranges with these values. A list of length equal to the number of parameters of the procedure function (._procedure.function._parameters) where each element is a 2-tuple of floats (range_min, range_max)
+
+        no_improve_thr : float = 0.000001
+
+            break after max_stagnations iterations with an improvement lower than no_improv_thr
+
+        max_stagnations : int = 10
+
+            break after max_stagnations iterations with an improvement lower than no_improve_thr
+
+        max_iter : int = 5000
+
+            maximum iterations of each chain
+
+        save_result : str = None
+
+            Save calibration result into this file
+
+        calibration_period : list = None
+
+            Calibration period (begin date, end date)
+
+        n_starts : int = 4
+
+            Number of independent downhill simplex chains
+
+        start_method : str = "latin-hypercube"
+
+            Method used to generate the initial simplexes. One of 'latin-hypercube', 'random'
+
+        seed : int = None
+
+            Seed of the random number generator used to generate the initial simplexes. If not set, the starts are not reproducible
+
+        workers : int = None
+
+            Number of worker processes. Each one runs whole chains. Defaults to min(n_starts, number of cpus). If 1, the chains are run sequentially in the current process
+
+        cache_size : int = None
+
+            Maximum number of objective function values kept in memory. If None or 0 (default), the cache is disabled. With workers > 1, each worker process keeps its own cache
+
+        cache_decimals : int = 10
+
+            Parameter values are rounded to this number of decimals to look up the cache
+
+        cache_file : str = None
+
+            Also store the objective function values in this json lines file. Values found there are reused, i.e. to resume an interrupted calibration. Requires cache_size
+        """
+        if n_starts < 1:
+            raise ValueError("n_starts must be greater than 0")
+        if start_method not in self._start_methods:
+            raise ValueError("start_method must be one of %s" % ", ".join(self._start_methods))
+        super().__init__(
+            procedure = procedure,
+            calibrate = calibrate,
+            result_index = result_index,
+            objective_function = objective_function,
+            limit = limit,
+            sigma = sigma,
+            ranges = ranges,
+            no_improve_thr = no_improve_thr,
+            max_stagnations = max_stagnations,
+            max_iter = max_iter,
+            save_result = save_result,
+            calibration_period = calibration_period,
+            base_path = base_path,
+            workers = workers if workers is not None else min(n_starts, os.cpu_count() or 1),
+            cache_size = cache_size,
+            cache_decimals = cache_decimals,
+            cache_file = cache_file)
+        self.n_starts = n_starts
+        self.start_method = start_method
+        self.seed = seed
+        self.chains = None
+        self._best_chain = None
+
+    def toDict(self) -> dict:
+        cal_dict = super().toDict()
+        del cal_dict["speculative"]
+        cal_dict["n_starts"] = self.n_starts
+        cal_dict["start_method"] = self.start_method
+        cal_dict["seed"] = self.seed
+        cal_dict["best_chain"] = self.best_chain
+        cal_dict["chains"] = self.chains.to_dict(orient="records") if self.chains is not None else None
+        try:
+            json.dumps(cal_dict["chains"])
+        except TypeError as e:
+            logging.error("calibration['chains'] is not JSON serializable")
+            raise(e)
+        return cal_dict
+
+    def __repr__(self) -> str:
+        lines = [
+            f"MultiStartCalibration("
+            f"  calibrate={self.calibrate},",
+            f"  result_index={self.result_index},",
+            f"  objective_function={self.objective_function},",
+            f"  save_result={self.save_result},",
+            f"  calibration_period={[x.isoformat() for x in self.calibration_period] if self.calibration_period is not None else None},",
+            f"  calibration_result={self.calibration_result},",
+            f"  limit={self.limit},",
+            f"  sigma={self.sigma},",
+            f"  ranges={self.ranges},",
+            f"  no_improve_thr={self.no_improve_thr},",
+            f"  max_stagnations={self.max_stagnations},",
+            f"  max_iter={self.max_iter},",
+            f"  n_starts={self.n_starts},",
+            f"  start_method={self.start_method},",
+            f"  seed={self.seed},",
+            f"  workers={self.workers},",
+            f"  best_chain={self.best_chain},",
+            f"  chains={self.chains.to_dict(orient='records') if self.chains is not None else None},",
+            f"  cache={self._cache.stats if self._cache is not None else None},",
+            f")"
+        ]
+        return "\n".join(lines)
+
+    def makeStarts(
+        self,
+        n_starts : Optional[int] = None,
+        start_method : Optional[str] = None,
+        seed : Optional[int] = None
+        ) -> List[List[List[float]]]:
+        """Generate the initial simplexes of the chains
+
+        Parameters:
+        -----------
+        n_starts : int = None
+
+            Number of simplexes. Defaults to self.n_starts
+
+        start_method : str = None
+
+            One of 'latin-hypercube', 'random'. Defaults to self.start_method
+
+        seed : int = None
+
+            Seed of the random number generator. Defaults to self.seed
+
+        Returns:
+        --------
+        list of simplexes : List[List[List[float]]]
+
+            Each simplex is a list of len(parameters_for_calibration) + 1 points
+        """
+        n_starts = n_starts if n_starts is not None else self.n_starts
+        start_method = start_method if start_method is not None else self.start_method
+        seed = seed if seed is not None else self.seed
+        if self._procedure is None:
+            raise RuntimeError("_procedure not set")
+        if start_method == "random":
+            return [
+                self._procedure.makeSimplex(sigma=self.sigma, limit=self.limit, ranges=self.ranges, rng=np.random.default_rng(seed_sequence))
+                for seed_sequence in np.random.SeedSequence(seed).spawn(n_starts)]
+        elif start_method != "latin-hypercube":
+            raise ValueError("start_method must be one of %s" % ", ".join(self._start_methods))
+        ranges = np.array(self.ranges if self.ranges is not None else [(p.range_min, p.range_max) for p in self._procedure.parameters_for_calibration], dtype=float)
+        minmax = np.array(self._procedure.limits, dtype=float)
+        n_pars = len(ranges)
+        width = ranges[:,1] - ranges[:,0]
+        rng = np.random.default_rng(seed)
+        # one stratum per chain on each parameter, strata shuffled independently
+        u = (np.array([rng.permutation(n_starts) for _ in range(n_pars)]).T + rng.random((n_starts, n_pars))) / n_starts
+        centers = ranges[:,0] + u * width
+        starts = []
+        for center in centers:
+            points = np.tile(center, (n_pars + 1, 1))
+            for j in range(n_pars):
+                step = self.sigma * width[j]
+                points[j + 1, j] += step if center[j] + step <= ranges[j,1] else -step
+            if self.limit:
+                points = np.clip(points, ranges[:,0], ranges[:,1])
+            points = np.clip(points, minmax[:,0], minmax[:,1])
+            starts.append(points.tolist())
+        return starts
+
+    def runChain(
+        self,
+        points : List[List[float]]
+        ) -> Tuple[List[float],float,int]:
+        """Run one downhill simplex chain starting from points. procedure.input and procedure.output_obs must be already loaded
+
+        Returns:
+        --------
+        Tuple[List[float],float,int]
+
+            Resulting parameters, objective function value and number of iterations"""
+        if self._procedure is None:
+            raise RuntimeError("_procedure not set")
+        downhill_simplex = DownhillSimplex(
+            self.runReturnScore,
+            np.array(points),
+            no_improve_thr=self.no_improve_thr,
+            max_stagnations=self.max_stagnations,
+            max_iter=self.max_iter,
+            limit = self.limit,
+            limits = self.ranges if self.ranges is not None else self._procedure.limits,
+            maximize = self.maximize,
+            minmax = self._procedure.limits
+        )
+        result = downhill_simplex.run()
+        return ([float(x) for x in result[0]], float(result[1]), int(downhill_simplex.iters))
+
+    def run(
+        self,
+        inplace : bool = True,
+        save_result : Optional[Union[Path,str]] = None,
+        workers : Optional[int] = None,
+        **kwargs
+        ) -> Union[None,Tuple[List[float],float]]:
+        """
+        Execute calibration: generate the initial simplexes, run the chains and keep the best result
+
+        Parameters:
+        -----------
+        inplace : bool = True
+
+            Save result inplace (self.calibration_result) and return None. Else return result
+
+        save_result : str = None
+
+            Save the calibration result into this file
+
+        workers : int = None
+
+            Number of worker processes. Defaults to self.workers
+
+        Returns:
+        --------
+        None or calibration result : Tuple[List[float],float]
+
+            First element is the list of calibrated parameters. Second element is the obtained objective function value
+        """
+        if self._procedure is None:
+            raise RuntimeError("_procedure not set")
+        starts = self.makeStarts()
+        self._procedure.loadInputDefault()
+        self._procedure.loadOutputObs()
+        self.resetConfigHash()
+        workers = min(workers if workers is not None else self.workers, len(starts))
+        if workers > 1:
+            with ScorePool(self._procedure, workers) as pool:
+                results = pool.map(runChainInWorker, [(points,) for points in starts])
+        else:
+            results = [self.runChain(points) for points in starts]
+        self.chains = DataFrame([
+            dict({"chain": i, "iters": iters, "score": score}, **{p.name: x for p, x in zip(self._procedure.parameters_for_calibration, parameters)})
+            for i, (parameters, score, iters) in enumerate(results)])
+        scores = np.array([r[1] for r in results])
+        self._best_chain = int(np.nanargmax(scores) if self.maximize else np.nanargmin(scores))
+        logging.debug("Multi-start calibration: best chain %i of %i, score %f" % (self._best_chain, len(results), scores[self._best_chain]))
+        return self.setCalibrationResult(results[self._best_chain][0], results[self._best_chain][1], inplace, save_result)
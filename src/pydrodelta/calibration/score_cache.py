@@ -0,0 +1,117 @@
+from collections import OrderedDict
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union, Dict
+
+ScoreCacheKey = Tuple[str, str, int, Tuple[float, ...]]
+
+class ScoreCache:
+    """Least recently used cache of objective function values, keyed by the procedure configuration hash, the objective function, the result index and the rounded parameter values. Optionally, every computed value is appended to a json lines file, so that an interrupted calibration may be resumed without recomputing the already scored points"""
+
+    def __init__(
+        self,
+        maxsize : int = 1000,
+        decimals : int = 10,
+        path : Union[str,Path,None] = None
+        ):
+        """
+        Parameters:
+        -----------
+        maxsize : int = 1000
+
+            Maximum number of values kept in memory. The least recently used value is discarded first
+
+        decimals : int = 10
+
+            Parameter values are rounded to this number of decimals to build the key
+
+        path : str or Path = None
+
+            Append computed values to this json lines file and read previously stored values from it
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be greater than 0")
+        self.maxsize = int(maxsize)
+        self.decimals = int(decimals)
+        self.path = Path(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._values : OrderedDict[ScoreCacheKey, float] = OrderedDict()
+        self._loaded = False
+
+    def key(
+        self,
+        config_hash : str,
+        objective_function : str,
+        result_index : int,
+        parameters : Sequence[float]
+        ) -> ScoreCacheKey:
+        return (config_hash, objective_function, int(result_index), tuple(round(float(x), self.decimals) for x in parameters))
+
+    def load(self) -> None:
+        """Read stored values from self.path (if it exists)"""
+        self._loaded = True
+        if self.path is None or not self.path.exists():
+            return
+        count = 0
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                    key = (item["config"], item["objective_function"], int(item["result_index"]), tuple(round(float(x), self.decimals) for x in item["parameters"]))
+                except (ValueError, KeyError, TypeError):
+                    logging.warning("ScoreCache: skipping invalid line in %s" % self.path)
+                    continue
+                self._put(key, float(item["score"]))
+                count += 1
+        logging.debug("ScoreCache: read %i values from %s" % (count, self.path))
+
+    def get(self, key : ScoreCacheKey) -> Optional[float]:
+        """Return the cached value for key (and count a hit) or None (and count a miss)"""
+        if not self._loaded:
+            self.load()
+        if key in self._values:
+            self._values.move_to_end(key)
+            self.hits += 1
+            return self._values[key]
+        self.misses += 1
+        return None
+
+    def set(self, key : ScoreCacheKey, value : float) -> None:
+        """Store value for key, in memory and (if self.path is set) on disk"""
+        self._put(key, float(value))
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps({
+                    "config": key[0],
+                    "objective_function": key[1],
+                    "result_index": key[2],
+                    "parameters": list(key[3]),
+                    "score": float(value)
+                }) + "\n")
+
+    def _put(self, key : ScoreCacheKey, value : float) -> None:
+        self._values[key] = value
+        self._values.move_to_end(key)
+        if len(self._values) > self.maxsize:
+            self._values.popitem(last = False)
+
+    def clear(self) -> None:
+        """Discard values kept in memory and reset the counters. The file at self.path is left untouched"""
+        self._values.clear()
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters and current number of values in memory"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._values)
+        }
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,88 @@
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+import logging
+from typing import Optional, List, Sequence, Callable, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pydrodelta.procedure import Procedure
+
+_worker_procedure : Optional["Procedure"] = None
+"""Copy of the procedure held by each worker process"""
+
+def initWorker(pickled_procedure : bytes) -> None:
+    global _worker_procedure
+    _worker_procedure = pickle.loads(pickled_procedure)
+
+def workerProcedure() -> "Procedure":
+    """Copy of the procedure held by the current worker process"""
+    if _worker_procedure is None or _worker_procedure.calibration is None:
+        raise RuntimeError("Worker procedure not initialized")
+    return _worker_procedure
+
+def scoreInWorker(
+    parameters : List[float],
+    objective_function : Optional[str] = None,
+    result_index : Optional[int] = None
+    ) -> float:
+    return workerProcedure().calibration.runReturnScore(
+        parameters = parameters,
+        objective_function = objective_function,
+        result_index = result_index)
+
+class ScorePool:
+    """Process pool that computes the objective function of parameter sets in parallel. Each worker holds a pickled copy of the procedure, with input and output_obs already loaded. Scores are returned in the order of the parameter sets, so results are the same as when scoring sequentially"""
+
+    def __init__(
+        self,
+        procedure : "Procedure",
+        workers : int,
+        objective_function : Optional[str] = None,
+        result_index : Optional[int] = None
+        ):
+        """
+        Parameters:
+        -----------
+        procedure : Procedure
+
+            The procedure to be calibrated. procedure.input and procedure.output_obs must be already loaded
+
+        workers : int
+
+            Number of worker processes
+
+        objective_function : Optional[str] = None
+
+            Name of the objective function. If not set, procedure.calibration.objective_function is used
+
+        result_index : Optional[int] = None
+
+            Index of the output to use to compute the objective function. If not set, procedure.calibration.result_index is used
+        """
+        if workers < 1:
+            raise ValueError("workers must be greater than 0")
+        self.workers = workers
+        self.objective_function = objective_function
+        self.result_index = result_index
+        logging.debug("ScorePool: starting %i workers" % workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers = workers,
+            initializer = initWorker,
+            initargs = (pickle.dumps(procedure),))
+
+    def score(self, points : Sequence[Sequence[float]]) -> List[float]:
+        """Compute the objective function for each parameter set of points"""
+        return self.map(scoreInWorker, [([float(x) for x in point], self.objective_function, self.result_index) for point in points])
+
+    def map(self, func : Callable, args_list : Sequence[Sequence[Any]]) -> List[Any]:
+        """Run func(*args) in the workers for each args of args_list. func must be a module-level function and may use workerProcedure(). Results are returned in the order of args_list"""
+        futures = [self._executor.submit(func, *args) for args in args_list]
+        return [f.result() for f in futures]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait = True, cancel_futures = True)
+
+    def __enter__(self) -> "ScorePool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,263 @@
+"""Chunked, concurrent upload of forecasts (corridas) and observations to the output api (Plan.uploadSim and Topology.uploadData when Topology.upload_concurrency is set).
+
+Series are grouped into chunks of at most max_series_per_chunk series and approximately max_chunk_size megabytes of json. An observation series larger than max_chunk_size is split into pieces of equal record count. A forecast series is never split: it makes a chunk of its own. Chunks are uploaded on a bounded thread pool, and failed chunks are retried with exponential backoff. The number of series, records and bytes, the attempts and the time of each chunk are returned as a report (list of dicts)"""
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+from a5client import Crud
+from . import profiling
+from . import serialization
+
+K = TypeVar("K")
+
+Chunk = List[Tuple[K, list]]
+"""Pieces of series of a chunk: (series key, records)"""
+
+def splitSeries(
+    series : List[Tuple[K, list]],
+    max_series_per_chunk : Optional[int] = None,
+    max_chunk_size : Optional[float] = None,
+    split : bool = True
+    ) -> Tuple[List[Chunk], List[int]]:
+    """Group series into chunks, keeping their order
+
+    Parameters:
+    -----------
+    series : list of (key, records)
+        key identifies the series (e.g. series_id), records is its list of time-value pairs
+
+    max_series_per_chunk : int = None
+        Maximum number of series (or series pieces) per chunk. If None, not limited
+
+    max_chunk_size : float = None
+        Approximate maximum json size of a chunk in megabytes. If None, not limited
+
+    split : bool = True
+        Split series larger than max_chunk_size into pieces of equal record count. If False, such a series makes a chunk of its own
+
+    Returns:
+    --------
+    chunks : list of chunks, each a list of (key, records)
+
+    sizes : estimated json size in bytes of each chunk (0 if max_chunk_size is None)
+    """
+    if max_series_per_chunk is not None and max_series_per_chunk < 1:
+        raise ValueError("max_series_per_chunk must be greater than 0")
+    if max_chunk_size is not None and max_chunk_size <= 0:
+        raise ValueError("max_chunk_size must be a positive number")
+    max_bytes = max_chunk_size * 1024**2 if max_chunk_size is not None else None
+    pieces : List[Tuple[K, list, int]] = []
+    for key, records in series:
+        if max_bytes is None:
+            pieces.append((key, records, 0))
+            continue
+        size = len(serialization.dumps(records))
+        n_pieces = max(math.ceil(size / max_bytes), 1)
+        if n_pieces == 1 or len(records) < 2 or not split:
+            pieces.append((key, records, size))
+            continue
+        n_pieces = min(n_pieces, len(records))
+        length = math.ceil(len(records) / n_pieces)
+        for start in range(0, len(records), length):
+            piece = records[start:start + length]
+            pieces.append((key, piece, size * len(piece) // len(records)))
+    chunks : List[Chunk] = []
+    sizes : List[int] = []
+    for key, records, size in pieces:
+        if len(chunks) and (max_series_per_chunk is None or len(chunks[-1]) < max_series_per_chunk) and (max_bytes is None or sizes[-1] + size <= max_bytes):
+            chunks[-1].append((key, records))
+            sizes[-1] += size
+        else:
+            chunks.append([(key, records)])
+            sizes.append(size)
+    return chunks, sizes
+
+def sendWithRetry(
+    send : Callable[[Chunk], Any],
+    chunk : Chunk,
+    label : str,
+    max_retries : int = 2,
+    retry_backoff : float = 1
+    ) -> Tuple[Any, int]:
+    """Call send(chunk), retrying up to max_retries times with exponential backoff if it fails. Returns the result and the number of attempts"""
+    attempt = 0
+    while True:
+        try:
+            return send(chunk), attempt + 1
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            wait = retry_backoff * 2 ** attempt
+            logging.warning("Upload of %s failed (attempt %i of %i): %s. Retrying in %.2f seconds" % (label, attempt + 1, max_retries + 1, str(e), wait))
+            time.sleep(wait)
+            attempt += 1
+
+def runUploads(
+    chunks : List[Chunk],
+    send : Callable[[Chunk], Any],
+    sizes : Optional[List[int]] = None,
+    max_workers : int = 1,
+    max_retries : int = 2,
+    retry_backoff : float = 1,
+    first_alone : bool = False,
+    raise_errors : bool = True
+    ) -> Tuple[List[Any], List[dict]]:
+    """Upload chunks on a bounded thread pool
+
+    Parameters:
+    -----------
+    chunks : list of chunks
+        See splitSeries
+
+    send : callable
+        Uploads a chunk and returns the api response
+
+    sizes : list of int = None
+        Estimated size of each chunk in bytes, for the report
+
+    max_workers : int = 1
+        Maximum number of simultaneous uploads
+
+    max_retries : int = 2
+        Retries per failed chunk
+
+    retry_backoff : float = 1
+        Seconds to wait before the first retry. Doubled on each subsequent retry
+
+    first_alone : bool = False
+        Upload the first chunk before the others are started (e.g. so that it creates the forecast run the other chunks are added to)
+
+    raise_errors : bool = True
+        If a chunk fails after all retries, raise its exception (pending uploads are cancelled). Else, log the error and go on with the other chunks
+
+    Returns:
+    --------
+    responses : api response of each chunk, in chunk order (None for failed chunks)
+
+    report : dict of each chunk, in chunk order: chunk, series, records, bytes, attempts, time (seconds), error
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+    responses : List[Any] = [None] * len(chunks)
+    report : List[dict] = [
+        {
+            "chunk": i,
+            "series": len(chunk),
+            "records": sum(len(records) for _, records in chunk),
+            "bytes": sizes[i] if sizes is not None else None,
+            "attempts": 0,
+            "time": None,
+            "error": None
+        } for i, chunk in enumerate(chunks)
+    ]
+
+    def upload(i : int) -> None:
+        label = "chunk %i of %i" % (i + 1, len(chunks))
+        t0 = time.perf_counter()
+        try:
+            with profiling.timer("upload chunk"):
+                profiling.count("series", report[i]["series"])
+                profiling.count("records", report[i]["records"])
+                responses[i], report[i]["attempts"] = sendWithRetry(send, chunks[i], label, max_retries, retry_backoff)
+        except Exception as e:
+            report[i]["attempts"] = max_retries + 1
+            report[i]["error"] = str(e)
+            if raise_errors:
+                raise
+            logging.error("Upload of %s failed: %s" % (label, str(e)))
+        finally:
+            report[i]["time"] = time.perf_counter() - t0
+            logging.info("Upload of %s: %i series, %i records, %.3f seconds%s" % (label, report[i]["series"], report[i]["records"], report[i]["time"], ", failed" if report[i]["error"] is not None else ""))
+
+    logging.debug("runUploads: %i chunks, max_workers: %i" % (len(chunks), max_workers))
+    start = 0
+    if first_alone and len(chunks):
+        upload(0)
+        start = 1
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload") as executor:
+        futures : List[Future] = [
+            executor.submit(profiling.propagate(upload), i)
+            for i in range(start, len(chunks))
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+    return responses, report
+
+def uploadCorrida(
+    crud : Crud,
+    corrida : dict,
+    max_workers : int = 1,
+    max_series_per_chunk : Optional[int] = None,
+    max_chunk_size : Optional[float] = None,
+    max_retries : int = 2,
+    retry_backoff : float = 1
+    ) -> Tuple[dict, List[dict]]:
+    """Upload a forecast run (corrida) in chunks of series. Each chunk is posted as a corrida with the same cal_id and forecast_date, which the api merges into a single forecast run. The first chunk is posted alone, the others concurrently. Series are never split across chunks: a series larger than max_chunk_size is posted in a chunk of its own
+
+    Returns:
+    --------
+    created forecast : dict (response of the first chunk, with the series of the responses of all chunks)
+
+    report : list of dict (see runUploads)
+    """
+    series = [({k: v for k, v in serie.items() if k != "pronosticos"}, serie["pronosticos"]) for serie in corrida["series"]]
+    chunks, sizes = splitSeries(series, max_series_per_chunk, max_chunk_size, split = False)
+    if not len(chunks):
+        chunks = [[]]
+        sizes = [0]
+
+    def send(chunk : Chunk) -> dict:
+        data = {
+            **{k: v for k, v in corrida.items() if k != "series"},
+            "series": [{**header, "pronosticos": pronosticos} for header, pronosticos in chunk]
+        }
+        profiling.countPayload(data)
+        return crud.createCorrida(data)
+
+    responses, report = runUploads(chunks, send, sizes, max_workers, max_retries, retry_backoff, first_alone = True)
+    created = dict(responses[0])
+    created["series"] = [serie for response in responses if response is not None for serie in response.get("series", [])]
+    return created, report
+
+def uploadObservaciones(
+    crud : Crud,
+    series : List[Tuple[int, list]],
+    max_workers : int = 1,
+    max_series_per_chunk : Optional[int] = None,
+    max_chunk_size : Optional[float] = None,
+    max_retries : int = 2,
+    retry_backoff : float = 1
+    ) -> Tuple[List[dict], List[dict]]:
+    """Upload observations of many series in chunks. A chunk of a single series is posted to the observations of the series, a chunk of many series is posted as a list of observations with series_id. Failed chunks are logged and skipped, as in NodeVariable.uploadData
+
+    Parameters:
+    -----------
+    series : list of (series_id, observations)
+
+    Returns:
+    --------
+    created observations : list
+
+    report : list of dict (see runUploads)
+    """
+    chunks, sizes = splitSeries(series, max_series_per_chunk, max_chunk_size)
+
+    def send(chunk : Chunk) -> list:
+        series_ids = {series_id for series_id, _ in chunk}
+        if len(series_ids) == 1:
+            data = [obs for _, observaciones in chunk for obs in observaciones]
+            profiling.countPayload(data)
+            return crud.createObservaciones(data, series_id = chunk[0][0])
+        data = [{**obs, "series_id": series_id} for series_id, observaciones in chunk for obs in observaciones]
+        profiling.countPayload(data)
+        return crud.createObservaciones(data)
+
+    responses, report = runUploads(chunks, send, sizes, max_workers, max_retries, retry_backoff, raise_errors = False)
+    return [obs for response in responses if response is not None for obs in response], report
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Optional, Any, TYPE_CHECKING
+from . import profiling
+
+if TYPE_CHECKING:
+    from .node_serie import NodeSerie
+
+class HostRateLimiter:
+    """Spaces out requests sent to the same api host so that no more than rate_limit requests per second are started. Thread-safe"""
+
+    def __init__(self, rate_limit : Optional[float] = None):
+        """
+        Parameters:
+        -----------
+        rate_limit : float = None
+            Maximum requests per second per host. If None, no limit is applied
+        """
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("rate_limit must be a positive number")
+        self.rate_limit = rate_limit
+        self._next_slot : Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host : Optional[str]) -> None:
+        """Block until a request to host is allowed"""
+        if self.rate_limit is None or host is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + 1 / self.rate_limit
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+class LoadTask:
+    """A single series download. Calls serie.loadData with the given arguments and, if the serie is required, asserts that data was found"""
+
+    def __init__(
+        self,
+        serie : "NodeSerie",
+        **kwargs : Any
+        ):
+        """
+        Parameters:
+        -----------
+        serie : NodeSerie
+            The series to load
+
+        **kwargs:
+            Keyword arguments passed to serie.loadData
+        """
+        self.serie = serie
+        self.kwargs = kwargs
+
+    @property
+    def host(self) -> Optional[str]:
+        """Api host the data is retrieved from. None if data is read from configuration or a local file"""
+        return self.serie.getSourceHost(self.kwargs.get("input_api_config"))
+
+    @property
+    def label(self) -> str:
+        return "series_id %i" % self.serie.series_id
+
+    def fetch(self) -> None:
+        """Load the data"""
+        self.serie.loadData(**self.kwargs)
+
+    def check(self) -> None:
+        """Raise ValueError if the serie is required and no data was found"""
+        if self.serie.required:
+            self.serie.assertNotEmpty()
+
+    def run(self) -> None:
+        self.fetch()
+        self.check()
+
+def runWithRetry(
+    task : LoadTask,
+    rate_limiter : Optional[HostRateLimiter] = None,
+    max_retries : int = 2,
+    retry_backoff : float = 1
+    ) -> None:
+    """Run task, retrying up to max_retries times with exponential backoff if the download fails. Failed required series checks are not retried"""
+    host = task.host
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire(host)
+        try:
+            task.fetch()
+            break
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            wait = retry_backoff * 2 ** attempt
+            logging.warning("Load of %s failed (attempt %i of %i): %s. Retrying in %.2f seconds" % (task.label, attempt + 1, max_retries + 1, str(e), wait))
+            time.sleep(wait)
+            attempt += 1
+    task.check()
+
+def runLoadTasks(
+    tasks : List[LoadTask],
+    max_workers : int = 1,
+    rate_limit : Optional[float] = None,
+    max_retries : int = 2,
+    retry_backoff : float = 1
+    ) -> None:
+    """Run series downloads on a bounded thread pool
+
+    Parameters:
+    -----------
+    tasks : List[LoadTask]
+        Downloads to run
+
+    max_workers : int = 1
+        Maximum number of simultaneous downloads
+
+    rate_limit : float = None
+        Maximum requests per second per api host
+
+    max_retries : int = 2
+        Retries per failed download
+
+    retry_backoff : float = 1
+        Seconds to wait before the first retry. Doubled on each subsequent retry
+
+    Raises:
+    -------
+    The first exception found in task order. Pending downloads are cancelled
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+    rate_limiter = HostRateLimiter(rate_limit)
+    logging.debug("runLoadTasks: %i tasks, max_workers: %i" % (len(tasks), max_workers))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="loadData") as executor:
+        futures : List[Future] = [
+            executor.submit(profiling.propagate(runWithRetry), task, rate_limiter, max_retries, retry_backoff)
+            for task in tasks
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
@@ -94,6 +94,10 @@ class DownhillSimplex(object):
 
     minmax : Optional[List[Tuple[float,float]]]
 
+    f_batch : Optional[Callable[[List[Point]],List[float]]]
+
+    speculative : bool
+
     def __init__(
             self, 
             f : Callable[[np.typing.NDArray[np.float64]],Union[float,np.float64]], 
@@ -105,7 +109,9 @@ class DownhillSimplex(object):
             limits:Optional[List[Tuple[float,float]]]=None, 
             maximize:bool=False,
             save_simplex:Optional[Union[Path,str]] = None,
-            minmax:Optional[List[Tuple[float,float]]]=None):
+            minmax:Optional[List[Tuple[float,float]]]=None,
+            f_batch:Optional[Callable[[List[Point]],List[float]]]=None,
+            speculative:bool=False):
         '''
             f: (function): function to optimize, must return a scalar score 
                 and operate over a numpy array of the same dimensions as x_start
@@ -117,6 +123,9 @@ class DownhillSimplex(object):
             limits: if limit=True, use this ordered list of tuples (min, max) to limit parameter values
             maximize: maximize objective function (instead of the default which is to minimize it)
             save_simplex: save simplex at this file path as comma separated values. Each row is a point. Last column is score.
+            minmax: if limit=False, use this ordered list of tuples (min, max) to limit parameter values
+            f_batch: (function): optional, scores a list of points at once (i.e., in parallel) and returns the list of scores in the same order. Must return the same values as f. Used to score the initial simplex, the reductions and the speculative steps
+            speculative: evaluate the reflection, expansion and contraction points of each iteration together with f_batch (some of the scores may be discarded). The resulting path is the same as the non-speculative one
         '''
         self.f = f
         self.points = points
@@ -134,19 +143,30 @@ class DownhillSimplex(object):
         self.initial_points = None
         self.save_simplex = save_simplex
         self.minmax = minmax
+        self.f_batch = f_batch
+        self.speculative = speculative
 
     def step(self, res : List[PointScoreTuple]) -> List[PointScoreTuple]:
         # centroid of the lowest face
         pts = np.array([tup[0] for tup in res[:-1]])
         x0 = centroid(pts)
 
-        new_res = self.reflection(res, x0, self.refl)
+        rscore = escore = cscore = None
+        if self.speculative and self.f_batch is not None:
+            xr = self.reflectionPoint(res, x0, self.refl)
+            (rscore, escore, cscore) = self.score_batch([
+                xr,
+                self.expansionPoint(xr, x0, self.ext),
+                self.contractionPoint(res, x0, self.cont)
+            ])
+
+        new_res = self.reflection(res, x0, self.refl, rscore)
         if new_res is not None:
-            exp_res = self.expansion(new_res, x0, self.ext)
+            exp_res = self.expansion(new_res, x0, self.ext, escore)
             if exp_res is not None:
                 new_res = exp_res
         else:
-            new_res = self.contraction(res, x0, self.cont)
+            new_res = self.contraction(res, x0, self.cont, cscore)
             if new_res is None:
                 new_res = self.reduction(res, self.red)
         return new_res
@@ -206,15 +226,25 @@ class DownhillSimplex(object):
         """
         return sorted(res, key = lambda x: x[1], reverse=reverse)
 
-    def reflection(self, res : List[PointScoreTuple], x0 : Point, refl : float):
+    def reflectionPoint(self, res : List[PointScoreTuple], x0 : Point, refl : float) -> Point:
+        return self.limitVertex(x0 + refl*(x0 - res[-1][0]))
+
+    def expansionPoint(self, xr : Point, x0 : Point, ext : float) -> Point:
+        return self.limitVertex(xr + ext*(xr - x0))
+
+    def contractionPoint(self, res : List[PointScoreTuple], x0 : Point, cont : float) -> Point:
+        return x0 + cont*(res[-1][0] - x0)
+
+    def reflection(self, res : List[PointScoreTuple], x0 : Point, refl : float, rscore : Optional[np.float64] = None):
         """
         Reflection-extension step.
         refl: refl = 1 is a standard reflection
+        rscore: score of the reflected point, if already computed
         """
         # reflected point and score
-        xr = x0 + refl*(x0 - res[-1][0])
-        xr = self.limitVertex(xr)
-        rscore = np.float64(self.f(xr))
+        xr = self.reflectionPoint(res, x0, refl)
+        if rscore is None:
+            rscore = np.float64(self.f(xr))
 
         new_res = res[:]
 
@@ -225,16 +255,17 @@ class DownhillSimplex(object):
             return new_res
         return None
 
-    def expansion(self, res : List[PointScoreTuple], x0 : Point, ext : float) -> Optional[List[PointScoreTuple]]:
+    def expansion(self, res : List[PointScoreTuple], x0 : Point, ext : float, escore : Optional[np.float64] = None) -> Optional[List[PointScoreTuple]]:
         """
         ext: the amount of the expansion; ext=0 means no expansion
+        escore: score of the expansion point, if already computed
         """
         xr, rscore = res[-1]
         # if it is the new best point, we try to expand
         if (rscore > res[0][1] if self.maximize else rscore < res[0][1]):
-            xe = xr + ext*(xr - x0)
-            xe = self.limitVertex(xe)
-            escore = np.float64(self.f(xe))
+            xe = self.expansionPoint(xr, x0, ext)
+            if escore is None:
+                escore = np.float64(self.f(xe))
             if (escore > rscore if self.maximize else escore < rscore):
                 logging.debug(f"Downhill simplex expansion score: {escore:f}, progress: True")
                 new_res = res[:]
@@ -244,12 +275,14 @@ class DownhillSimplex(object):
             return None
         return None
 
-    def contraction(self, res : List[PointScoreTuple], x0 : Point, cont : float) -> Optional[List[PointScoreTuple]]:
+    def contraction(self, res : List[PointScoreTuple], x0 : Point, cont : float, cscore : Optional[np.float64] = None) -> Optional[List[PointScoreTuple]]:
         """
         cont: contraction parameter: should be between zero and one
+        cscore: score of the contraction point, if already computed
         """
-        xc = x0 + cont*(res[-1][0] - x0)
-        cscore = np.float64(self.f(xc))
+        xc = self.contractionPoint(res, x0, cont)
+        if cscore is None:
+            cscore = np.float64(self.f(xc))
 
         new_res = res[:]
 
@@ -272,15 +305,19 @@ class DownhillSimplex(object):
         return new_res
 
     def make_score(self, points : Iterable[Point]) -> List[PointScoreTuple]:
+        points = list(points)
         res = []
-        i = 0
-        for pt in points:
-            score = np.float64(self.f(pt))
+        for i, (pt, score) in enumerate(zip(points, self.score_batch(points))):
             logging.debug(f"Donwhill simplex make_score point: {i}, score: {score:f}")
             res.append((pt, score))
-            i = i + 1
         return res
 
+    def score_batch(self, points : List[Point]) -> List[np.float64]:
+        """Score points with f_batch if set, else one by one with f"""
+        if self.f_batch is not None:
+            return [np.float64(score) for score in self.f_batch(points)]
+        return [np.float64(self.f(pt)) for pt in points]
+
     def limitVertex(
             self,
             vertex : Iterable[float]
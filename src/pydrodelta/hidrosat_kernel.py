@@ -0,0 +1,143 @@
+"""Fused kernel of the HIDROSAT model time loop (pydrology.HIDROSAT.executeRun).
+
+The soil (retention reservoir), groundwater (discrete linear reservoir cascade) and floodplain (power law reservoir) sub-models are stepped inline over preallocated state arrays instead of creating RetentionReservoir, LinearReservoirCascade and HIDROSATPowerLawReservoir objects on every step (pydrology.HIDROSAT.executeRunReference). Each sub-model is evaluated with the same operation order as its class, so that results are bit-compatible. If numba is installed the kernel is compiled, otherwise it runs as plain python over lists."""
+import math
+import numpy as np
+from typing import Callable
+from numpy.typing import NDArray
+from .routing_kernel import linearReservoirCascadeCoefficients
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def jit(func : Callable) -> Callable:
+    """Compile func with numba if available"""
+    return njit(cache=True)(func) if njit is not None else func
+
+@jit
+def _hidrosat(precipitation, evp, inflow, soil_storage, ev_soil, free_water, runoff, direct_runoff, floodplain_storage, ev_floodplain, q, flooded, cascade, S0 : float, c : float, a : float, b : float, W0 : float, Q0 : float, gamma : float, max_flooded : float, detention_ratio : float, epsilon : float, dt : float, substeps : int) -> None:
+    n_reservoirs = len(cascade)
+    outlet = 1 if n_reservoirs > 1 else 0
+    for i in range(len(precipitation) - 1):
+        phi = 1 - flooded[i]
+        # soil (RetentionReservoir.computeRunoff, 'Abstraction')
+        p_soil = phi*precipitation[i]
+        evp_soil = phi*evp[i]
+        storage = soil_storage[i]
+        sigma = evp_soil - p_soil
+        if 0 > sigma:
+            sigma = 0.0
+        ev = evp_soil+storage*(1-math.exp(-sigma/S0))-sigma
+        free = p_soil-ev+storage-S0
+        if not free > 0:
+            free = 0.0
+        ev_soil[i] = ev
+        free_water[i] = free
+        soil_storage[i+1] = p_soil-(ev+free)+storage
+        # groundwater (LinearReservoirCascade.computeOutFlow). As in the class-based path, the runoff at the end of the step is the outflow of the cascade at the beginning of the step (a cascade routing a single step does not update Outflow[1])
+        runoff[i+1] = cascade[outlet]
+        previous = cascade[0]
+        cascade[0] = free+(cascade[0]-free)*c
+        for j in range(1, n_reservoirs):
+            current = c*cascade[j]+a*previous+b*cascade[j-1]
+            previous = cascade[j]
+            cascade[j] = current
+        # floodplain (HIDROSATPowerLawReservoir.computeOutFlow)
+        direct = (1-phi)*precipitation[i]
+        direct_runoff[i] = direct
+        ev_fp = (1-phi)*evp[i]
+        if not ev_fp < floodplain_storage[i]+direct:
+            ev_fp = floodplain_storage[i]+direct
+        ev_floodplain[i] = ev_fp
+        p_fp = direct*detention_ratio
+        q_direct = direct*(1-detention_ratio)
+        inflow_0 = runoff[i]+inflow[i]
+        inflow_1 = runoff[i+1]+inflow[i+1]
+        storage = floodplain_storage[i]
+        outflow_0 = Q0*(storage/W0)**(gamma)
+        outflow_1 = outflow_0
+        for t in range(substeps):
+            u = (inflow_0+inflow_1-outflow_0)*dt/2+(p_fp-ev_fp)*dt+storage
+            if not u > 0:
+                u = 0.0
+            q_pred = Q0*(u/W0)**(gamma)
+            if q_pred > 0:
+                f = W0*(q_pred/Q0)**(1/gamma)+q_pred/2*dt-u
+                df = W0/(Q0*gamma)*(q_pred/Q0)**(1/gamma-1)+dt/2
+            else:
+                f = 0.0
+                df = dt/2
+            outflow_1 = q_pred-f/df
+            if not outflow_1 > 0:
+                outflow_1 = 0.0
+            while abs(q_pred-outflow_1) > epsilon:
+                q_pred = outflow_1
+                if q_pred > 0:
+                    f = W0*(q_pred/Q0)**(1/gamma)+q_pred/2*dt-u
+                    df = W0/(Q0*gamma)*(q_pred/Q0)**(1/gamma-1)+dt/2
+                else:
+                    f = 0.0
+                    df = dt/2
+                outflow_1 = q_pred-f/df
+                if not outflow_1 > 0:
+                    outflow_1 = 0.0
+            outflow_0 = outflow_1
+            storage = W0*(outflow_0/Q0)**(1/gamma)
+        storage = W0*(outflow_1/Q0)**(1/gamma)
+        floodplain_storage[i+1] = storage
+        fraction = (storage/W0)**(gamma)
+        flooded[i+1] = max_flooded*(fraction if fraction < 1 else 1.0)
+        q[i+1] = outflow_1+q_direct
+
+def hidrosat(
+    precipitation : NDArray[np.float64],
+    evp : NDArray[np.float64],
+    inflow : NDArray[np.float64],
+    soil_storage : NDArray[np.float64],
+    ev_soil : NDArray[np.float64],
+    free_water : NDArray[np.float64],
+    runoff : NDArray[np.float64],
+    direct_runoff : NDArray[np.float64],
+    floodplain_storage : NDArray[np.float64],
+    ev_floodplain : NDArray[np.float64],
+    q : NDArray[np.float64],
+    flooded : NDArray[np.float64],
+    S0 : float,
+    K : float,
+    N : int,
+    W0 : float,
+    Q0 : float,
+    gamma : float,
+    max_flooded : float = 1,
+    detention_ratio : float = 1,
+    epsilon : float = 0.0001,
+    dt : int = 1,
+    initial_groundwater : float = 0
+    ) -> None:
+    """Runs the HIDROSAT time loop over the state and flux arrays of pydrology.HIDROSAT, writing them in place. soil_storage, runoff, floodplain_storage, q and flooded hold the initial states at index 0 (steps + 1 values), the other arrays hold one value per step. Results are identical to those of HIDROSAT.executeRunReference
+
+    Args:
+        S0, K, N, W0, Q0, gamma, max_flooded, detention_ratio, epsilon : model parameters (see pydrology.HIDROSAT)
+        dt : int - subdivision of the floodplain step (see pydrology.HIDROSATPowerLawReservoir)
+        initial_groundwater : float - initial discharge of every reservoir of the groundwater cascade"""
+    n_steps = len(precipitation) - 1
+    if n_steps <= 0:
+        return
+    if K <= 0:
+        raise ValueError("Invalid parameter K: must be > 0")
+    if int(N) < 1:
+        raise ValueError("Invalid parameter N: must be >= 1")
+    c, a, b, _ = linearReservoirCascadeCoefficients(K)
+    substeps = max(round(1/dt+1) - 1, 0)
+    arrays = [precipitation, evp, inflow, soil_storage, ev_soil, free_water, runoff, direct_runoff, floodplain_storage, ev_floodplain, q, flooded]
+    cascade = np.full(int(N), initial_groundwater, dtype=np.float64)
+    scalars = (float(S0), c, a, b, float(W0), float(Q0), float(gamma), float(max_flooded), float(detention_ratio), float(epsilon), float(dt), int(substeps))
+    if njit is not None:
+        _hidrosat(*[np.ascontiguousarray(array, dtype=np.float64) if i < 3 else array for i, array in enumerate(arrays)], cascade, *scalars)
+        return
+    lists = [array.tolist() for array in arrays]
+    _hidrosat(*lists, cascade.tolist(), *scalars)
+    for array, values in zip(arrays[3:], lists[3:]):
+        array[:] = values
@@ -0,0 +1,132 @@
+"""Event-segmented runoff kernel of the HOSH models (engine "fast" of pydrology.HOSH4P1L and pydrology.HOSH4P2L).
+
+Wet events (runs of steps where precipitation exceeds potential evapotranspiration, closed by a dry step) are located with array operations. The SCS abstraction of each event and the water balance of the dry steps run in a single loop that writes the state and flux arrays of the model in place, without building per-event SCSReservoirs arrays. Each step is evaluated with the same operation order as the reference implementation (HOSH4P1L.computeRunoff), so that results are bit-compatible. If numba is installed the loop is compiled, otherwise it runs as plain python over lists."""
+import math
+import numpy as np
+from typing import Callable, Tuple
+from numpy.typing import NDArray
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def jit(func : Callable) -> Callable:
+    """Compile func with numba if available"""
+    return njit(cache=True)(func) if njit is not None else func
+
+def eventBoundaries(
+    precipitation : NDArray[np.float64],
+    evp : NDArray[np.float64]
+    ) -> Tuple[NDArray[np.int64], NDArray[np.int64], int]:
+    """Returns the first and last steps of the wet events that are closed by a dry step, and the number of steps that are computed (a trailing event that is not closed is left as is, as in the reference implementation)"""
+    wet = np.greater(precipitation, evp).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], wet, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    n_steps = len(wet)
+    if len(ends) and ends[-1] == n_steps - 1:
+        n_steps = int(starts[-1])
+        starts = starts[:-1]
+        ends = ends[:-1]
+    return starts.astype(np.int64), ends.astype(np.int64), n_steps
+
+@jit
+def _runoff(precipitation, evp, starts, ends, n_steps : int, surface_storage, soil_storage, net_rainfall, infiltration, runoff, evr1, evr2, max_surface_storage : float, max_soil_storage : float) -> None:
+    j = 0
+    for k in range(len(starts) + 1):
+        stop = starts[k] if k < len(starts) else n_steps
+        # dry steps
+        while j < stop:
+            evr1_j = evp[j]
+            if surface_storage[j]+precipitation[j] < evr1_j:
+                evr1_j = surface_storage[j]+precipitation[j]
+            net = precipitation[j]-evr1_j+surface_storage[j]-max_surface_storage
+            if not net > 0:
+                net = 0.0
+            # computeEVR
+            ev0 = evp[j]-evr1_j
+            sigma = ev0-net
+            if 0 > sigma:
+                sigma = 0.0
+            evr2_j = ev0+soil_storage[j]*(1-math.exp(-sigma/max_soil_storage))-sigma
+            evr1[j] = evr1_j
+            net_rainfall[j] = net
+            evr2[j] = evr2_j
+            surface_storage[j+1] = precipitation[j]-(evr1_j+net)+surface_storage[j]
+            runoff_j = net-evr2_j+soil_storage[j-1]-max_soil_storage
+            if not runoff_j > 0:
+                runoff_j = 0.0
+            runoff[j] = runoff_j
+            soil_storage[j+1] = net-(evr2_j+runoff_j)+soil_storage[j]
+            j += 1
+        if k == len(starts):
+            break
+        # wet event (SCSReservoirs.computeAbstractionAndRunoff, differentiated)
+        start = starts[k]
+        surface_0 = surface_storage[start]
+        soil_0 = soil_storage[start]
+        abstraction = max_surface_storage-surface_0
+        cum_precip = 0.0
+        previous_net = 0.0
+        previous_runoff = 0.0
+        previous_infiltration = 0.0
+        for t in range(start, ends[k] + 1):
+            cum_precip = cum_precip+(precipitation[t]-evp[t])
+            if cum_precip-abstraction > 0:
+                net = cum_precip-abstraction
+                runoff_t = net**2/(max_soil_storage-soil_0+net)
+                infiltration_t = net-runoff_t
+            else:
+                net = 0.0
+                runoff_t = 0.0
+                infiltration_t = 0.0
+            surface = surface_0+abstraction
+            if surface_0+cum_precip < surface:
+                surface = surface_0+cum_precip
+            surface_storage[t+1] = surface
+            if t == start:
+                net_rainfall[t] = net
+                runoff[t] = runoff_t
+                infiltration[t] = infiltration_t
+            else:
+                net_rainfall[t] = net-previous_net
+                runoff[t] = runoff_t-previous_runoff
+                infiltration[t] = infiltration_t-previous_infiltration
+            previous_net = net
+            previous_runoff = runoff_t
+            previous_infiltration = infiltration_t
+            soil_storage[t+1] = infiltration[t]+soil_storage[t]
+            evr1[t] = evp[t]
+        j = ends[k] + 1
+
+def runoff(
+    precipitation : NDArray[np.float64],
+    evp : NDArray[np.float64],
+    surface_storage : NDArray[np.float64],
+    soil_storage : NDArray[np.float64],
+    net_rainfall : NDArray[np.float64],
+    infiltration : NDArray[np.float64],
+    runoff : NDArray[np.float64],
+    evr1 : NDArray[np.float64],
+    evr2 : NDArray[np.float64],
+    max_surface_storage : float,
+    max_soil_storage : float
+    ) -> None:
+    """Computes the runoff of the HOSH models over their state and flux arrays, writing them in place. surface_storage and soil_storage hold the initial states at index 0 (steps + 1 values), the other arrays hold one value per step. Results are identical to those of HOSH4P1L.computeRunoff
+
+    Args:
+        max_surface_storage : float - maximum storage of the retention (abstraction) reservoir
+        max_soil_storage : float - maximum storage of the production (soil) reservoir"""
+    precipitation = np.ascontiguousarray(precipitation, dtype=np.float64)
+    evp = np.ascontiguousarray(evp, dtype=np.float64)
+    starts, ends, n_steps = eventBoundaries(precipitation, evp)
+    arrays = [surface_storage, soil_storage, net_rainfall, infiltration, runoff, evr1, evr2]
+    scalars = (float(max_surface_storage), float(max_soil_storage))
+    if njit is not None:
+        _runoff(precipitation, evp, starts, ends, n_steps, *arrays, *scalars)
+        return
+    lists = [array.tolist() for array in arrays]
+    _runoff(precipitation.tolist(), evp.tolist(), starts.tolist(), ends.tolist(), n_steps, *lists, *scalars)
+    for array, values in zip(arrays, lists):
+        array[:] = values
@@ -0,0 +1,208 @@
+import logging
+import sqlite3
+import pickle
+import time
+from contextlib import closing
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Union, List, Tuple, Iterable, Dict, Any, TYPE_CHECKING
+import networkx as nx
+from pandas import DataFrame
+from .series_cache import DEFAULT_CACHE_PATH
+from .util import parametersHash
+from .types.incremental_dict import IncrementalDict
+
+if TYPE_CHECKING:
+    from .node import Node
+    from .procedure import Procedure
+
+class IncrementalStore:
+    """Persistent store of the last execution of a plan, kept in a sqlite database, for incremental execution.
+
+    For each NodeVariable, the processed data (after outlier removal, regularization, filling, derivation, etc.) is kept together with the data it was computed from, as loaded from the source, the time window of that execution and a hash of the processing configuration. On the next execution, the loaded data are compared with the stored ones over the overlap of the old and new time windows (see loadedDataChanged), so that a new forecast date (which shifts the window) doesn't by itself make any node dirty. Only the nodes with new or revised data or another processing configuration (and the nodes derived from them) are processed again, and only the procedures downstream of those nodes (or whose configuration changed) are run again. The other nodes and procedures reuse the stored results.
+
+    Restored nodes are trimmed to the start of the new window but not processed again, so steps that depend on the window edges (e.g. filling or interpolation of the last steps) keep the values of the execution they were computed in, and reused procedures keep the output of their last run. Run with full=True (see Plan.execute) or .clear() the store to refresh everything.
+    """
+
+    def __init__(
+        self,
+        path : Optional[Union[str,Path]] = None,
+        scope : str = "default"
+        ):
+        """
+        Parameters:
+        -----------
+        path : str or Path = None
+            Store directory. Defaults to ~/.cache/pydrodelta
+
+        scope : str = "default"
+            Identifier of the plan. Plans sharing a store must use different scopes
+        """
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_PATH
+        self.scope = scope
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.path / "incremental.sqlite"
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            with conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS node_variables (
+                    scope TEXT NOT NULL,
+                    node_id INTEGER NOT NULL,
+                    var_id INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (scope, node_id, var_id))""")
+                conn.execute("""CREATE TABLE IF NOT EXISTS procedures (
+                    scope TEXT NOT NULL,
+                    procedure_id TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (scope, procedure_id))""")
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection to the store database. Connections must not be shared between threads"""
+        return sqlite3.connect(self.db_path, timeout=60)
+
+    def readNodeVariableHashes(self) -> Dict[Tuple[int,int], str]:
+        """Read the hashes of the stored node variables, keyed by (node_id, var_id)"""
+        with closing(self.connect()) as conn:
+            rows = conn.execute("SELECT node_id, var_id, hash FROM node_variables WHERE scope=?", (self.scope,)).fetchall()
+        return {(row[0], row[1]): row[2] for row in rows}
+
+    def readNodeVariable(
+        self,
+        node_id : int,
+        var_id : int
+        ) -> Optional[dict]:
+        """Read the processed data of a node variable (see NodeVariable.dumpProcessedData). Returns None if not found"""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT data FROM node_variables WHERE scope=? AND node_id=? AND var_id=?", (self.scope, node_id, var_id)).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def saveNodeVariables(
+        self,
+        node_variables : Iterable[Tuple[int, int, str, dict]]
+        ) -> int:
+        """Save the processed data of node variables, given as (node_id, var_id, hash, data) tuples. Returns the number of saved node variables"""
+        now = time.time()
+        rows = [(self.scope, node_id, var_id, hash_, pickle.dumps(data), now) for node_id, var_id, hash_, data in node_variables]
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO node_variables (scope, node_id, var_id, hash, data, created) VALUES (?,?,?,?,?,?)", rows)
+        return len(rows)
+
+    def readProcedureHash(
+        self,
+        procedure_id : Union[int,str]
+        ) -> Optional[str]:
+        """Read the configuration hash of the stored results of a procedure. Returns None if not found"""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT hash FROM procedures WHERE scope=? AND procedure_id=?", (self.scope, str(procedure_id))).fetchone()
+        return row[0] if row is not None else None
+
+    def readProcedure(
+        self,
+        procedure_id : Union[int,str]
+        ) -> Optional[dict]:
+        """Read the stored results of a procedure (see Procedure.dumpResults). Returns None if not found"""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT data FROM procedures WHERE scope=? AND procedure_id=?", (self.scope, str(procedure_id))).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def saveProcedure(
+        self,
+        procedure_id : Union[int,str],
+        hash_ : str,
+        data : dict
+        ) -> None:
+        """Save the results of a procedure run"""
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO procedures (scope, procedure_id, hash, data, created) VALUES (?,?,?,?,?)", (self.scope, str(procedure_id), hash_, pickle.dumps(data), time.time()))
+
+    def clear(self) -> None:
+        """Remove all stored data of this scope"""
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("DELETE FROM node_variables WHERE scope=?", (self.scope,))
+                conn.execute("DELETE FROM procedures WHERE scope=?", (self.scope,))
+
+    def procedureHash(
+        self,
+        procedure : "Procedure"
+        ) -> str:
+        """Hash of the configuration of a procedure"""
+        return parametersHash(
+            type(procedure).__name__,
+            procedure.parameters,
+            procedure.initial_states,
+            procedure.extra_pars,
+            [(str(b.node_id), b.var_id) for b in procedure.boundaries],
+            [(str(o.node_id), o.var_id) for o in procedure.outputs])
+
+def loadedDataChanged(
+    stored : Optional[DataFrame],
+    loaded : Optional[DataFrame],
+    overlap_start : datetime,
+    overlap_end : datetime
+    ) -> bool:
+    """Whether the data of a serie loaded in this execution are new or revised with respect to the data stored in the last execution: a row of loaded is not found (with the same values) in stored, or a row of stored within the overlap of the time windows of both executions [overlap_start, overlap_end] is missing from loaded. Rows of stored outside the overlap are ignored (they fell out of the new window)"""
+    stored = stored if stored is not None else DataFrame()
+    loaded = loaded if loaded is not None else DataFrame()
+    if not len(loaded):
+        return bool(len(stored[(stored.index >= overlap_start) & (stored.index <= overlap_end)])) if len(stored) else False
+    if not len(stored) or list(stored.columns) != list(loaded.columns) or not loaded.index.isin(stored.index).all():
+        return True
+    if not loaded.equals(stored.loc[loaded.index]):
+        return True
+    return not stored.index[(stored.index >= overlap_start) & (stored.index <= overlap_end)].isin(loaded.index).all()
+
+def derivedNodesGraph(nodes : Iterable["Node"]) -> nx.DiGraph:
+    """Directed graph of node ids where an edge (a, b) means that a variable of node b is derived or interpolated from a variable of node a"""
+    from .derived_node_variable import DerivedNodeVariable
+    from .derived_node_serie import DerivedNodeSerie
+    DG = nx.DiGraph()
+    for node in nodes:
+        DG.add_node(node.id)
+        for variable in node.variables.values():
+            if not isinstance(variable, DerivedNodeVariable) or variable.series is None:
+                continue
+            for serie in variable.series:
+                if not isinstance(serie, DerivedNodeSerie):
+                    continue
+                if serie.derived_from is not None:
+                    DG.add_edge(serie.derived_from.node_id, node.id)
+                if serie.interpolated_from is not None:
+                    DG.add_edge(serie.interpolated_from.node_id_1, node.id)
+                    DG.add_edge(serie.interpolated_from.node_id_2, node.id)
+    return DG
+
+def descendantsOf(
+    graph : nx.DiGraph,
+    sources : Iterable[Any]
+    ) -> set:
+    """Sources (present in graph) and all their descendants"""
+    result = set()
+    for source in sources:
+        if source in result or not graph.has_node(source):
+            continue
+        result.add(source)
+        result.update(nx.descendants(graph, source))
+    return result
+
+def createIncrementalStore(
+    config : Optional[IncrementalDict],
+    base_path : Optional[Path] = None,
+    scope : str = "default"
+    ) -> Optional[IncrementalStore]:
+    """Create IncrementalStore from configuration dict. Returns None if config is None. Relative paths are resolved against base_path"""
+    if config is None:
+        return None
+    path = config.get("path")
+    if path is not None and base_path is not None and not Path(path).is_absolute():
+        path = base_path / path
+    return IncrementalStore(
+        path = path,
+        scope = scope)
@@ -58,7 +58,8 @@ class ModelParameter:
         sigma : float = 0.25,
         limit : bool = True,
         range_min : Optional[float] = None,
-        range_max : Optional[float] = None
+        range_max : Optional[float] = None,
+        rng : Optional[random.Generator] = None
         ) -> float:
         """
         Generates random value using normal distribution centered between self.range_min and self.range_max
@@ -84,13 +85,17 @@ class ModelParameter:
 
             Override self.range_max
 
+        rng : numpy.random.Generator = None
+
+            Random number generator. If not set, numpy.random global state is used
+
         Returns:
         --------
         float
         """
         range_min = range_min if range_min is not None else self.range_min
         range_max = range_max if range_max is not None else self.range_max
-        rand = range_min + random.normal(0.5,sigma) * (range_max - range_min)
+        rand = range_min + (rng.normal(0.5,sigma) if rng is not None else random.normal(0.5,sigma)) * (range_max - range_min)
         if limit:
             rand = self.range_min if rand < self.min else rand if rand < self.max else self.range_max
         return self.min if rand < self.min else rand if rand < self.max else self.max
@@ -25,6 +25,8 @@ from a5client.util_types import ApiConfigDict, SeriesDict, TVP, Dateable, Interv
 import traceback
 from pathlib import Path
 from .station import Station
+from .concurrent_load import LoadTask
+from .plot_rendering import PlotSpec
 
 if TYPE_CHECKING:
     from .topology import Topology
@@ -937,6 +939,26 @@ class Node:
                 filename, lineno, func, text = tb[-1]
                 raise ValueError("Plot prono failed at node %i variable %i. Catched exception at file %s, line %i, function %s: %s" % (self.id, variable.id, filename, lineno, func, str(e)))
 
+    def plotPronoSpecs(
+        self,
+        **kwargs
+        ) -> List[PlotSpec]:
+        """For each variable in .variables run .plotPronoSpecs(). Collects the plots of .plotProno without rendering them (see plot_rendering)
+
+        Parameters:
+        -----------
+        Same as .plotProno
+        """
+        specs : List[PlotSpec] = []
+        for variable in self.variables.values():
+            try:
+                specs.extend(variable.plotPronoSpecs(**kwargs))
+            except ValueError as e:
+                tb = traceback.extract_tb(e.__traceback__)
+                filename, lineno, func, text = tb[-1]
+                raise ValueError("Plot prono failed at node %i variable %i. Catched exception at file %s, line %i, function %s: %s" % (self.id, variable.id, filename, lineno, func, str(e)))
+        return specs
+
     def plotAll(
             self, 
             var_ids : Optional[List[int]]=None,
@@ -993,6 +1015,41 @@ class Node:
                     tryParseAndLocalizeDate(forecast_timeend) if forecast_timeend is not None else None,
                     input_api_config,
                     no_metadata = no_metadata)
+
+    def getLoadTasks(
+        self,
+        timestart : Dateable,
+        timeend : Dateable,
+        include_prono : bool = True,
+        forecast_timeend : Optional[Dateable] = None,
+        input_api_config : Optional[ApiConfigDict] = None,
+        no_metadata : bool = False,
+        ) -> List[LoadTask]:
+        """
+        For each variable in variables, if variable is an ObservedNodeVariable, get the downloads needed to load its series. Parameters are the same as in .loadData. After running the tasks, .setLoadedData() must be called
+
+        Returns:
+        --------
+        List[LoadTask]
+        """
+        tasks : List[LoadTask] = []
+        for variable in self.variables.values():
+            if isinstance(variable,ObservedNodeVariable):
+                tasks.extend(variable.getLoadTasks(
+                    tryParseAndLocalizeDate(timestart),
+                    tryParseAndLocalizeDate(timeend),
+                    include_prono,
+                    tryParseAndLocalizeDate(forecast_timeend) if forecast_timeend is not None else None,
+                    input_api_config,
+                    no_metadata = no_metadata))
+        return tasks
+
+    def setLoadedData(self) -> None:
+        """For each variable in variables, if variable is an ObservedNodeVariable, run .setLoadedData()"""
+        for variable in self.variables.values():
+            if isinstance(variable,ObservedNodeVariable):
+                variable.setLoadedData()
+
     def removeOutliers(self) -> bool:
         """
         For each variable of .variables, if variable is an ObservedNodeVariable, run .removeOutliers(). Removes outilers and returns True if any outliers were removed
@@ -6,7 +6,7 @@ from a5client import createEmptyObsDataFrame, observacionesListToDataFrame, Crud
 from pandas import isna, DataFrame, DatetimeIndex
 from dateutil.relativedelta import relativedelta
 from .config import config
-from typing import Union, List, Tuple, Optional, Literal, TYPE_CHECKING, overload
+from typing import Union, List, Tuple, Optional, Literal, TYPE_CHECKING, overload, cast
 from .types.api_config_dict import ApiConfigDict
 from .types.series_prono_serializable_dict import SeriesPronoSerializableDict
 from .descriptors.int_descriptor import IntDescriptor
@@ -20,12 +20,16 @@ from .descriptors.bool_descriptor import BoolDescriptor
 import json
 import yaml
 from .base import Base
+from . import profiling
+from . import serialization
 from a5client.util import tryParseAndLocalizeDate
 from a5client.util_types import Dateable, TVPdateable, TVP, SeriesDict, TVPserializable, SeriesSerializableDict, TVPList
 from pathlib import Path
+from urllib.parse import urlparse
 
 if TYPE_CHECKING:
     from pydrodelta.node_variable import NodeVariable
+    from pydrodelta.series_cache import SeriesCache
 
 class NodeSerie(Base):
     """Represents a timestamped series of observed or simulated values for a variable in a node. """
@@ -297,6 +301,7 @@ class NodeSerie(Base):
         elif not len(self.data["valor"].dropna()):
             self.raiseValueError("valor column of data has no non-null values")
 
+    @profiling.timed(lambda self, *args, **kwargs: "series %s" % self.series_id, counters = lambda self: {"observations": len(self.data) if self.data is not None else 0})
     def loadData(
         self,
         timestart : Dateable,
@@ -363,26 +368,94 @@ class NodeSerie(Base):
             else:
                 raise KeyError("Observaciones key not found in file " % self.json_file)
         else:
-            if self._variable is not None and self._variable.time_support is not None:
-                timeend_ = timeend_ + self._variable.time_support
+            timeend_ = self.getApiTimeend(timeend_)
             logging.debug("Load data for series_id: %i [%s to %s] from a5 api" % (self.series_id,timestart.isoformat(),timeend_.isoformat()))
-            crud = Crud(**input_api_config) if input_api_config is not None else self._variable._node._crud if self._variable is not None and self._variable._node is not None else self.input_crud
+            crud = self.getCrud(input_api_config)
             if crud is None:
                 raise Exception("crud is not set")
-            self.metadata = crud.readSerie(
-                self.series_id,
-                timestart,
-                timeend_,
-                tipo = self.type, 
-                no_metadata = no_metadata)
-            if len(self.metadata["observaciones"]):
-                self.data = observacionesListToDataFrame(self.metadata["observaciones"],tag=tag)
+            cache = self.getCache()
+            if cache is not None:
+                serie = cache.readSerie(
+                    crud,
+                    self.series_id,
+                    timestart,
+                    timeend_,
+                    tipo = self.type, 
+                    no_metadata = no_metadata)
             else:
-                logging.warning("No data found for series_id=%i" % self.series_id)
-                self.data = createEmptyObsDataFrame(extra_columns={"tag":"str"})
-            self.original_data = self.data.copy(deep=True)
-            del self.metadata["observaciones"]
+                serie = crud.readSerie(
+                    self.series_id,
+                    timestart,
+                    timeend_,
+                    tipo = self.type, 
+                    no_metadata = no_metadata)
+            self.setApiData(serie, tag = tag)
+
+    def getApiTimeend(
+        self,
+        timeend : datetime
+        ) -> datetime:
+        """End time of the data requested from the input api: timeend plus the time support of the variable, if set"""
+        if self._variable is not None and self._variable.time_support is not None:
+            return timeend + self._variable.time_support
+        return timeend
+
+    def setApiData(
+        self,
+        serie : dict,
+        tag : str = "obs"
+        ) -> None:
+        """Set .data, .original_data and .metadata from an input api series response
+        
+        Parameters:
+        -----------
+        serie : dict
+            Series as returned by the api, with the time-value pairs in the 'observaciones' key
+        
+        tag : str = "obs"
+            Tag observations with this string"""
+        self.metadata = serie
+        if len(self.metadata["observaciones"]):
+            self.data = observacionesListToDataFrame(self.metadata["observaciones"],tag=tag)
+        else:
+            logging.warning("No data found for series_id=%i" % self.series_id)
+            self.data = createEmptyObsDataFrame(extra_columns={"tag":"str"})
+        self.original_data = self.data.copy(deep=True)
+        del self.metadata["observaciones"]
     
+    def getCrud(
+        self,
+        input_api_config : Optional[ApiConfigDict] = None
+        ) -> Optional[Crud]:
+        """Api client used to load data. Priority is input_api_config, then the api client of the node and then the global input api
+        
+        Parameters:
+        -----------
+        input_api_config : dict = None
+            Api connection parameters. Overrides self._variable._node._crud and global config.input_api"""
+        return Crud(**input_api_config) if input_api_config is not None else self._variable._node._crud if self._variable is not None and self._variable._node is not None else self.input_crud
+
+    def getCache(self) -> Optional["SeriesCache"]:
+        """Local cache of input api data of the topology that contains this series. None if not set"""
+        if self._variable is None or self._variable._node is None or self._variable._node._topology is None:
+            return None
+        return self._variable._node._topology.series_cache
+
+    def getSourceHost(
+        self,
+        input_api_config : Optional[ApiConfigDict] = None
+        ) -> Optional[str]:
+        """Network location (host:port) of the api the data is loaded from. None if data is read from .observations, .csv_file or .json_file
+        
+        Parameters:
+        -----------
+        input_api_config : dict = None
+            Api connection parameters. Overrides self._variable._node._crud and global config.input_api"""
+        if self.observations is not None or self.csv_file is not None or self.json_file is not None:
+            return None
+        crud = self.getCrud(input_api_config)
+        return urlparse(crud.url).netloc if crud is not None else None
+
     def saveData(
         self,
         output_file = None,
@@ -496,7 +569,8 @@ class NodeSerie(Base):
             logging.debug("applyOffset: self.data is empty")
             return
         if isinstance(self.x_offset,relativedelta):
-            self.data.index = DatetimeIndex(self.data.apply(lambda row: row.name + self.x_offset, axis=1)) # self.applyTimedeltaOffset(row,self.x_offset), axis=1) # for x in self.data.index]
+            if self.x_offset:
+                self.data.index = DatetimeIndex(self.data.apply(lambda row: row.name + self.x_offset, axis=1)) # self.applyTimedeltaOffset(row,self.x_offset), axis=1) # for x in self.data.index]
             self.data.index.rename("timestart",inplace=True)
         elif self.x_offset != 0:
             self.data["valor"] = self.data["valor"].shift(self.x_offset, axis = 0) 
@@ -650,67 +724,22 @@ class NodeSerie(Base):
         list of time-value pair dicts : List[TVP]"""
         if self.data is None:
             return list()
-        data = self.data[self.data.index <= max_obs_date] if max_obs_date is not None else self.data.copy(deep=True)
-        data["timestart"] = data.index
-        data["timeend"] = [x + timeSupport for x in data["timestart"]] if timeSupport is not None else data["timestart"]
-        data["timestart"] = [x.isoformat() for x in data["timestart"]]
-        data["timeend"] = [x.isoformat() for x in data["timeend"]]
-        if include_series_id:
-            data["series_id"] = self.output_series_id or self.series_id
-        main_obs = []
-        qualifier_obs = []
-        for obs in data.to_dict(orient="records"):
-            obs[value_key] = None if isna(obs[value_key]) else obs[value_key]
-            obs["tag"] = None if "tag" not in obs else None if isna(obs["tag"]) else obs["tag"]
-            if qualifiers is not None:
-                for qualifier in qualifiers:
-                    if qualifier in obs:
-                        if not isna(obs[qualifier]):
-                            new_obs = {
-                                "timestart": obs["timestart"],
-                                "timeend": obs["timeend"],
-                                "valor":  obs[qualifier],
-                                "qualifier": qualifier
-                            }
-                            if include_series_id:
-                                new_obs["series_id"] = self.output_series_id or self.series_id
-                            qualifier_obs.append(new_obs)
-                        else:
-                            logging.warning(f"Qualifier {qualifier} is NaN in series_id {self.series_id}, {obs['timestart']}")
-                    elif qualifier == "main":
-                        if not isna(obs["valor"]):
-                            new_obs = {
-                                "timestart": obs["timestart"],
-                                "timeend": obs["timeend"],
-                                "valor":  obs["valor"],
-                                "qualifier": "main"
-                            }
-                            if include_series_id:
-                                new_obs["series_id"] = self.output_series_id or self.series_id
-                            qualifier_obs.append(new_obs)
-                        else:
-                            logging.warning(f"Main qualifier is NaN in series_id {self.series_id}, {obs['timestart']}")
-                    else:
-                        logging.debug(f"Qualifier {qualifier} not found in series_id {self.series_id}, {obs['timestart']}")
-            obs["valor"] = obs[value_key]
-            if strict_properties:
-                obs = {
-                    "timestart": obs["timestart"],
-                    "timeend": obs["timeend"],
-                    "valor":  obs["valor"]
-                }
-                if include_series_id:
-                    obs["series_id"] = self.output_series_id or self.series_id
-            if qualifiers is not None:
-                if 'main' not in qualifiers:
-                    obs["qualifier"] = "main"
-                    main_obs.append(obs)
-            else:
-                main_obs.append(obs)
-        all_obs = [*main_obs, *qualifier_obs]
-        if remove_nulls:
-            all_obs = [x for x in all_obs if x["valor"] is not None] # remove nulls
-        return all_obs
+        data = self.data[self.data.index <= max_obs_date] if max_obs_date is not None else self.data
+        return cast(List[TVPserializable], serialization.toRecords(
+            data,
+            series_id = self.output_series_id or self.series_id,
+            include_series_id = include_series_id,
+            timeSupport = timeSupport,
+            remove_nulls = remove_nulls,
+            qualifiers = qualifiers,
+            value_key = value_key,
+            strict_properties = strict_properties))
+
+    _processing_attributes = ("series_id", "type", "lim_outliers", "lim_jump", "x_offset", "y_offset", "scale", "moving_average", "agg_func")
+
+    def processingParameters(self) -> dict:
+        """Configuration of this serie used by the input processing steps (outlier removal, jump detection, offset, regularization, moving average). Part of the key of the processing cache (see ProcessingCache)"""
+        return {"class": type(self).__name__, **{a: getattr(self, a, None) for a in self._processing_attributes}}
     
     @overload
     def toDict(
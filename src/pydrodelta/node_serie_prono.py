@@ -1,8 +1,8 @@
 from .node_serie import NodeSerie
 import logging
-from a5client import Crud, observacionesListToDataFrame, createEmptyObsDataFrame
+from a5client import observacionesListToDataFrame, createEmptyObsDataFrame
 from .node_serie_prono_metadata import NodeSeriePronoMetadata
-from .config import config
+from . import profiling
 from datetime import datetime
 import pytz
 from .descriptors.string_descriptor import StringDescriptor
@@ -15,8 +15,6 @@ from .types.api_config_dict import ApiConfigDict
 from a5client.util_types import Dateable, TVPGroupedByQualifier
 from a5client.util import tryParseAndLocalizeDate
 
-input_crud = Crud(**config["input_api"])
-# output_crud = Crud(**config["output_api"])
 
 
 class NodeSerieProno(NodeSerie):
@@ -143,6 +141,8 @@ class NodeSerieProno(NodeSerie):
         self.tail = tail
         self.sim_range = sim_range
 
+    _processing_attributes = (*NodeSerie._processing_attributes, "cal_id", "qualifier", "cor_id", "main_qualifier", "adjust", "warmup", "tail", "sim_range")
+
     def __repr__(self) -> str:
         lines = [
             f"NodeSerie(",
@@ -168,6 +168,7 @@ class NodeSerieProno(NodeSerie):
         
 
 
+    @profiling.timed(lambda self, *args, **kwargs: "series_prono %s cal_id %s" % (self.series_id, self.cal_id), counters = lambda self: {"observations": len(self.data) if self.data is not None else 0})
     def loadData(
         self,
         timestart : Dateable,
@@ -219,12 +220,23 @@ class NodeSerieProno(NodeSerie):
         elif self.cal_id == 0:
             # Lee observaciones
             logging.debug("Load prono data from observaciones, series_id: %i, tipo: %s" % (self.series_id, self.type))
-            crud = Crud(**input_api_config) if input_api_config is not None else self._variable._node._crud if self._variable is not None and self._variable._node is not None else input_crud
-            metadata = crud.readSerie(
-                series_id=self.series_id, 
-                timestart=timestart,
-                timeend=timeend,
-                tipo=self.type)
+            crud = self.getCrud(input_api_config)
+            if crud is None:
+                raise Exception("crud is not set")
+            cache = self.getCache()
+            if cache is not None:
+                metadata = cache.readSerie(
+                    crud,
+                    self.series_id,
+                    timestart,
+                    timeend,
+                    tipo=self.type)
+            else:
+                metadata = crud.readSerie(
+                    series_id=self.series_id, 
+                    timestart=timestart,
+                    timeend=timeend,
+                    tipo=self.type)
             if len(metadata["observaciones"]):
                 self.data = observacionesListToDataFrame(metadata["observaciones"], tag="prono")
             else:
@@ -234,7 +246,9 @@ class NodeSerieProno(NodeSerie):
             self.metadata = { "series_id": metadata["id"], "cal_id": 0 , "series_table": "series_areal" if metadata["tipo"] == "areal" else "series", "forecast_date": datetime.now(pytz.timezone("America/Argentina/Buenos_Aires")) }
         else:
             logging.debug("Load prono data for series_id: %i, tipo: %s, cal_id: %i, cor_id: %s" % (self.series_id, self.type, self.cal_id, str(self.cor_id) if self.cor_id is not None else "last"))
-            crud = Crud(**input_api_config) if input_api_config is not None else self._variable._node._crud if self._variable is not None and self._variable._node is not None else input_crud
+            crud = self.getCrud(input_api_config)
+            if crud is None:
+                raise Exception("crud is not set")
             if previous_runs_timestart is not None:
                 if self.qualifier is not None and self.qualifier == "all":
                     metadata = crud.readSeriePronoConcat(
@@ -267,6 +281,17 @@ class NodeSerieProno(NodeSerie):
                         qualifier = self.qualifier if self.qualifier is not None and self.qualifier != "all" else None,
                         tipo = self.type,
                         group_by_qualifier=False)
+            elif self.getCache() is not None:
+                metadata = self.getCache().readSerieProno(
+                    crud,
+                    self.series_id,
+                    self.cal_id,
+                    timestart,
+                    timeend,
+                    qualifier = self.qualifier, 
+                    cor_id = self.cor_id,
+                    forecast_timestart = forecast_timestart,
+                    tipo = self.type)
             else:
                 metadata = crud.readSerieProno(
                     self.series_id,
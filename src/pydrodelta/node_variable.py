@@ -3,8 +3,11 @@ from a5client.util_types import TVP, Intervaleable, SeriesDict, ApiConfigDict, T
 from a5client.util import interval2relativedelta, relativedeltaToSeconds, parseVar, tryParseAndLocalizeDate
 from .node_serie import NodeSerie
 from .node_serie_prono import NodeSerieProno
+from . import profiling
 import os
-from .util import adjustSeries, linearCombination, adjustSeries, serieFillNulls, interpolateData, getParamOrDefaultTo, plot_prono, coalesce, multiply_relativedelta, relativedelta_to_timedelta, resolve_path, ensure_local, relativedelta_to_iso
+from .plot_rendering import PlotSpec
+from .util import adjustSeries, linearCombination, adjustSeries, serieFillNulls, interpolateData, getParamOrDefaultTo, plot_prono, coalesce, multiply_relativedelta, relativedelta_to_timedelta, resolve_path, ensure_local, relativedelta_to_iso, dataFrameHash
+from .incremental import loadedDataChanged
 import pandas
 import logging
 import json
@@ -306,7 +309,93 @@ class NodeVariable:
     def setOriginalData(self):
         """copies .data into .original_data"""
         self.original_data = self.data.copy(deep=True) if self.data is not None else None
-    
+
+    _serie_data_attributes = ("data", "original_data", "outliers_data", "jumps_data", "adjust_results")
+
+    def loadedDataHash(self) -> str:
+        """Content hash of the data of .series and .series_prono, as loaded from the source. Used to detect new or revised data in incremental execution (see IncrementalStore)"""
+        hashes = []
+        for series in (self.series, self.series_prono):
+            hashes.append([dataFrameHash(serie.data) for serie in series] if series is not None else None)
+        return json.dumps(hashes)
+
+    def dumpLoadedData(self) -> dict:
+        """Get a copy of the data of .series and .series_prono, as loaded from the source, to be compared with the data of a later execution with .loadedDataChanged"""
+        return {
+            key: [serie.data.copy() if serie.data is not None else None for serie in series] if series is not None else None
+            for key, series in (("series", self.series), ("series_prono", self.series_prono))
+        }
+
+    def loadedDataChanged(
+        self,
+        loaded_data : dict,
+        overlap_start : datetime,
+        overlap_end : datetime
+        ) -> bool:
+        """Whether the data of .series and .series_prono, as loaded from the source, are new or revised with respect to loaded_data (as returned by .dumpLoadedData in an earlier execution) over the overlap of the time windows of both executions (see incremental.loadedDataChanged)"""
+        for key, series in (("series", self.series), ("series_prono", self.series_prono)):
+            series = series if series is not None else []
+            stored = loaded_data.get(key) or []
+            if len(series) != len(stored):
+                return True
+            if any(loadedDataChanged(stored_data, serie.data, overlap_start, overlap_end) for serie, stored_data in zip(series, stored)):
+                return True
+        return False
+
+    _processing_attributes = ("id", "timestart", "timeend", "forecast_timeend", "time_interval", "time_offset", "interpolation_limit", "fill_value", "adjust_from", "linear_combination", "use_filled_truth")
+
+    _window_attributes = ("timestart", "timeend", "forecast_timeend")
+
+    def processingParameters(self, window : bool = True) -> dict:
+        """Configuration of this variable and of its .series and .series_prono used by the input processing steps. Part of the key of the processing cache (see ProcessingCache)
+
+        Parameters:
+        -----------
+        window : bool = True
+            Include the time window (timestart, timeend, forecast_timeend). The incremental store leaves it out, as it compares the loaded data over the overlap of the windows instead (see IncrementalStore)"""
+        return {
+            "class": type(self).__name__,
+            **{a: getattr(self, a, None) for a in self._processing_attributes if window or a not in self._window_attributes},
+            "series": [serie.processingParameters() for serie in self.series] if self.series is not None else None,
+            "series_prono": [serie.processingParameters() for serie in self.series_prono] if self.series_prono is not None else None
+        }
+
+    def dumpProcessedData(self) -> dict:
+        """Get the results of the input processing (.data, .original_data, .adjust_results and the processed data of each serie of .series and .series_prono) as a dict, to be restored with .restoreProcessedData"""
+        return {
+            "data": self.data,
+            "original_data": self.original_data,
+            "adjust_results": self.adjust_results,
+            "series": [{a: getattr(serie, a) for a in self._serie_data_attributes if hasattr(serie, a)} for serie in self.series] if self.series is not None else None,
+            "series_prono": [{a: getattr(serie, a) for a in self._serie_data_attributes if hasattr(serie, a)} for serie in self.series_prono] if self.series_prono is not None else None
+        }
+
+    def restoreProcessedData(
+        self,
+        processed_data : dict,
+        timestart : Optional[datetime] = None
+        ) -> None:
+        """Set the results of the input processing from a dict generated by .dumpProcessedData
+
+        Parameters:
+        -----------
+        processed_data : dict
+            As returned by .dumpProcessedData
+
+        timestart : datetime = None
+            Drop the rows before this date (i.e., when restoring data processed for an earlier time window)"""
+        def trim(value):
+            return value[value.index >= timestart] if timestart is not None and isinstance(value, pandas.DataFrame) and isinstance(value.index, pandas.DatetimeIndex) else value
+        self.data = trim(processed_data["data"])
+        self.original_data = trim(processed_data["original_data"])
+        self.adjust_results = processed_data["adjust_results"]
+        for key, series in (("series", self.series), ("series_prono", self.series_prono)):
+            if series is None or processed_data[key] is None:
+                continue
+            for serie, attributes in zip(series, processed_data[key]):
+                for name, value in attributes.items():
+                    setattr(serie, name, trim(value))
+
     @property
     def metadata_serializable(self) -> dict:
         time_support = relativedelta_to_iso(self.metadata["timeSupport"]) 
@@ -772,19 +861,11 @@ class NodeVariable:
         """
         api_client = Crud(**api_config) if api_config is not None else output_crud
         if self.series_output is not None:
-            if self.series_output[0].data is None:
-                self.setOutputData()
             obs_created = []
-            for serie in self.series_output:
-                obs_list = serie.toList(remove_nulls=True,max_obs_date=None if include_prono else self.max_obs_date if hasattr(self,"max_obs_date") else None) # include_series_id=True)
-                if serie.save_post is not None:
-                    json.dump(
-                        obs_list,
-                        open(serie.save_post,"w")
-                    )
-                    logging.info("Wrote output of node %s, variable %i, serie %i to %s" % (self.node_id,self.id, serie.series_id, serie.save_post))
+            for series_id, obs_list in self.outputUploadList(include_prono = include_prono):
                 try:
-                    created = api_client.createObservaciones(obs_list,series_id=serie.series_id)
+                    profiling.countPayload(obs_list)
+                    created = api_client.createObservaciones(obs_list,series_id=series_id)
                     obs_created.extend(created)
                 except Exception as e:
                     logging.error(str(e))
@@ -792,6 +873,38 @@ class NodeVariable:
         else:
             logging.info("Missing output series for node %i, variable %i, skipping upload" % (self._node.id if self._node is not None else "unknown", self.id))
             return []
+
+    def outputUploadList(
+        self,
+        include_prono : bool = False
+        ) -> List[Tuple[int,List[TVP]]]:
+        """
+        Converts series_output into the lists of records uploaded by .uploadData. If a serie has save_post set, its records are saved into that file
+
+        Parameters:
+        -----------
+        include_prono : bool = False
+            Includes the forecast period of data
+
+        Returns:
+        --------
+        list of (series_id, records) : List[Tuple[int,List[TVP]]]. Empty if series_output is not set
+        """
+        if self.series_output is None:
+            return []
+        if self.series_output[0].data is None:
+            self.setOutputData()
+        series = []
+        for serie in self.series_output:
+            obs_list = serie.toList(remove_nulls=True,max_obs_date=None if include_prono else self.max_obs_date if hasattr(self,"max_obs_date") else None) # include_series_id=True)
+            if serie.save_post is not None:
+                json.dump(
+                    obs_list,
+                    open(serie.save_post,"w")
+                )
+                logging.info("Wrote output of node %s, variable %i, serie %i to %s" % (self.node_id,self.id, serie.series_id, serie.save_post))
+            series.append((serie.series_id, obs_list))
+        return series
     
     def pivotData(
         self,
@@ -1430,12 +1543,32 @@ class NodeVariable:
         footnote_height : float = 0.2
             Height of space for footnote in inches
         """
+        for spec in self.plotPronoSpecs(output_dir, use_series_sim, **kwargs):
+            spec.render(**spec.kwargs)
+
+    def plotPronoSpecs(
+        self,
+        output_dir : Optional[str] = None,
+        use_series_sim : Optional[bool] = None,
+        **kwargs
+        ) -> List[PlotSpec]:
+        """Collect the plots of .plotProno (one per serie in series_prono or series_sim with an output file) without rendering them. See plot_rendering
+
+        Parameters:
+        -----------
+        Same as .plotProno
+
+        Returns:
+        --------
+        list of PlotSpec (rendering function: util.plot_prono)
+        """
         # locals_ = {k: v for k, v in locals().items() if v is not None and k not in ["output_dir"]}
         use_series_sim = use_series_sim if use_series_sim is not None else False
         series = self.series_sim if use_series_sim else self.series_prono
         if series is None:
             logging.debug("Missing series_prono, skipping variable")
-            return
+            return []
+        specs : List[PlotSpec] = []
         for serie_prono in series:
             output_file = getParamOrDefaultTo(
                 "output_file",
@@ -1477,45 +1610,16 @@ class NodeVariable:
             if self.data is None:
                 raise RuntimeError("data not loaded")
 
-            plot_prono(
-                self.data,
-                serie_prono.data,
+            specs.append(PlotSpec(
+                plot_prono,
+                "node %s variable %i cal_id %s" % (str(self._node.id) if self._node is not None else "-", self.id, str(serie_prono.cal_id)),
+                output = plot_prono_kwargs["output_file"],
+                obs_df = self.data,
+                sim_df = serie_prono.data,
                 forecast_date=serie_prono.metadata["forecast_date"] if serie_prono.metadata is not None and "forecast_date" in serie_prono.metadata else None,
                 **plot_prono_kwargs
-                # title=title,
-                # markersize=markersize,
-                # prono_label=prono_label,
-                # obs_label=obs_label,
-                # errorBand=errorBand,
-                # errorBandLabel=errorBandLabel,
-                # obsLine=obsLine,
-                # prono_annotation=prono_annotation,
-                # obs_annotation=obs_annotation,
-                # forecast_date_annotation=forecast_date_annotation,
-                # station_name=station_name,
-                # thresholds=thresholds,
-                # datum=datum,
-                # footnote=footnote,
-                # figsize=figsize,
-                # ylim=ylim,
-                # ydisplay=ydisplay,
-                # text_xoffset=text_xoffset,
-                # xytext=xytext,
-                # tz=tz,
-                # datum_template_string=datum_template_string,
-                # title_template_string=title_template_string,
-                # x_label=x_label,
-                # y_label=y_label,
-                # xlim=xlim,
-                # prono_fmt=prono_fmt,
-                # annotate=annotate,
-                # table_columns=table_columns,
-                # date_form=date_form,
-                # xaxis_minor_tick_hours=xaxis_minor_tick_hours,
-                # error_band_fmt=error_band_fmt,
-                # forecast_table=forecast_table,
-                # footnote_height=footnote_height
-            )
+            ))
+        return specs
 
     def saveSeriesSeparately(self,types : list=["series","series_prono"]):
         """For each series type (series, series_prono, series_sim and series_output), save data into file if .output_file is defined"""
@@ -13,6 +13,7 @@ from .types.api_config_dict import ApiConfigDict
 from a5client.util_types import Dateable
 from a5client.util import tryParseAndLocalizeDate
 import traceback
+from .concurrent_load import LoadTask
 
 class ObservedNodeVariable(NodeVariable):
     """This class represents a variable observed at a node"""
@@ -73,10 +74,31 @@ class ObservedNodeVariable(NodeVariable):
         no_metadata : bool = False
             Don't retrieve series metadata on load from api
         """
+        for task in self.getLoadTasks(timestart, timeend, include_prono, forecast_timeend, input_api_config, no_metadata):
+            task.run()
+        self.setLoadedData()
+
+    def getLoadTasks(
+        self,
+        timestart : Dateable,
+        timeend : Dateable,
+        include_prono : bool = True,
+        forecast_timeend : Optional[Dateable] = None,
+        input_api_config : Optional[ApiConfigDict] = None,
+        no_metadata : bool = False
+        ) -> List[LoadTask]:
+        """
+        Get the list of downloads needed to load data of each serie in .series (and .series_prono if include_prono is True), in load order. Parameters are the same as in .loadData. After running the tasks, .setLoadedData() must be called
+
+        Returns:
+        --------
+        List[LoadTask]
+        """
         timestart = tryParseAndLocalizeDate(timestart)
         timeend = tryParseAndLocalizeDate(timeend)
         forecast_timeend = tryParseAndLocalizeDate(forecast_timeend) if forecast_timeend is not None else None
         logging.debug("Load data for observed node: %i" % (self.id))
+        tasks : List[LoadTask] = []
         if self.series is not None:
             for serie in self.series:
                 if serie.x_offset is not None:
@@ -85,13 +107,12 @@ class ObservedNodeVariable(NodeVariable):
                 else:
                     ts = timestart
                     te = timeend
-                serie.loadData(
-                    ts,
-                    te,
-                    input_api_config,
-                    no_metadata=no_metadata)
-                if serie.required:
-                    serie.assertNotEmpty()
+                tasks.append(LoadTask(
+                    serie,
+                    timestart = ts,
+                    timeend = te,
+                    input_api_config = input_api_config,
+                    no_metadata = no_metadata))
         elif hasattr(self,"derived_from"): # and self.derived_from is not None:
             self.series = []
         else:
@@ -110,17 +131,15 @@ class ObservedNodeVariable(NodeVariable):
                     ts = timestart
                     te = timeend
                     fte = forecast_timeend
-                try:
-                    if fte is not None:
-                        serie.loadData(ts,fte,input_api_config)
-                    else:
-                        serie.loadData(ts,te,input_api_config)
-                    if serie.required:
-                        serie.assertNotEmpty()
-                except Exception as e:
-                    raise e
-                    # logging.error(e)
-                    # raise Exception("Node %s, Variable: %i, series_id %i, cal_id %i, forecast_timestart: %s: failed loadData: %s" % (self._node.id if self._node is not None else "None",self.id,serie.series_id,serie.cal_id,serie.forecast_timestart.isoformat() if serie.forecast_timestart is not None else "None", str(e)))
+                tasks.append(LoadTask(
+                    serie,
+                    timestart = ts,
+                    timeend = fte if fte is not None else te,
+                    input_api_config = input_api_config))
+        return tasks
+
+    def setLoadedData(self) -> None:
+        """After the series are loaded, initialize .data (with the data of the first serie, if any)"""
         if self.data is None and self.series is not None and len(self.series) and self.series[0].data is not None:
             self.setDataWithNoValues()
             self.concatenate(self.series[0].data)
@@ -1,6 +1,8 @@
 import yaml
 import os
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from threading import Lock
 from dateutil.relativedelta import relativedelta
 import json
 import logging
@@ -8,7 +10,7 @@ from pandas import concat
 import networkx as nx
 from networkx.readwrite import json_graph
 import matplotlib.pyplot as plt
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Dict, Tuple, Set
 from pandas import DataFrame
 from pathlib import Path
 
@@ -31,6 +33,11 @@ from .types.save_variable_sim_dict import SaveVariableSimDict
 from a5client.util_types import CorridaDict, Dateable, CorridaNoIdSerializableDict
 from .node import Node
 from .create_procedure import createProcedure
+from .incremental import IncrementalStore, createIncrementalStore, descendantsOf
+from . import profiling
+from . import serialization
+from .chunked_upload import uploadCorrida
+from .types.incremental_dict import IncrementalDict
 from textwrap import indent
 
 from pydrodelta.config import config
@@ -149,6 +156,29 @@ class Plan(Base):
     """File path where to save graph representation of the plan"""
     output_graph : Optional[Path]# = FilepathDescriptor()
 
+    max_workers = IntDescriptor()
+    """Maximum number of procedures executed at the same time. If greater than 1, procedures that don't depend on each other (see procedureDependencies) run concurrently in a thread pool. Default 1 (sequential)"""
+
+    @property
+    def incremental(self) -> Optional[IncrementalDict]:
+        """Incremental execution settings (path). If set, .execute() only processes the nodes with new or revised data and only runs the procedures affected by them, reusing the results of the previous execution elsewhere"""
+        return self._incremental
+    @incremental.setter
+    def incremental(
+        self,
+        incremental : Optional[IncrementalDict]
+        ) -> None:
+        self._incremental = incremental
+        self._incremental_store = createIncrementalStore(incremental, base_path = self.base_path, scope = str(self.id))
+
+    @property
+    def incremental_store(self) -> Optional[IncrementalStore]:
+        """Store of the previous execution, created from .incremental"""
+        return self._incremental_store
+
+    dirty_procedures : Optional[Set[Union[str,int]]]
+    """Ids of the procedures run in the last incremental .execute(). The other procedures reused the results of the previous execution. None if the last execution was not incremental"""
+
     def __init__(
             self,
             name : str,
@@ -167,6 +197,8 @@ class Plan(Base):
             qualifiers : Optional[List[str]] = None,
             save_variable_sim : Optional[List[SaveVariableSimDict]] = None,
             output_graph : Optional[str] = None,
+            max_workers : int = 1,
+            incremental : Optional[IncrementalDict] = None,
             **kwargs
             ):
         """
@@ -223,6 +255,14 @@ class Plan(Base):
         output_graph : str or None
             File path where to save graph representation of the plan
 
+        max_workers : int = 1
+            Maximum number of procedures executed at the same time. Procedures that don't depend on each other run concurrently. Default 1 (sequential, in list order)
+
+        incremental : IncrementalDict or None
+            Incremental execution. The processed data of each node variable and the results of each procedure are kept in a local store. On the next execution (also with a later forecast date and time window), only the nodes with new or revised data (over the overlap of both time windows) are processed and only the procedures downstream of them (see .getDirtyProcedures) are run. If not set, everything is processed and run on each execution
+                IncrementalDict:
+                    path : str (store directory, default ~/.cache/pydrodelta), optional
+
         base_path Optional[Path]= None
             Base path. Used to resolve input/output relative paths
         
@@ -244,7 +284,9 @@ class Plan(Base):
             "output_sim_csv": output_sim_csv,
             "qualifiers" : qualifiers,
             "save_variable_sim": save_variable_sim,
-            "output_graph": output_graph
+            "output_graph": output_graph,
+            "max_workers": max_workers,
+            "incremental": incremental
         }
         getSchemaAndValidate(params=params, name="plan")
 
@@ -264,7 +306,13 @@ class Plan(Base):
         self.qualifiers = qualifiers
         self.save_variable_sim = save_variable_sim
         self.output_graph = self.resolve_path(output_graph)
+        if max_workers < 1:
+            raise ValueError("max_workers must be greater than 0")
+        self.max_workers = max_workers
+        self._output_locks : Dict[Tuple[str,int], Lock] = {}
         self.procedures = procedures
+        self.incremental = incremental
+        self.dirty_procedures = None
 
     def __repr__(self) -> str:
         procedures_repr = ",\n".join([f"    {i}:\n{indent(p._repr_short(),'    ')}" for i, p in enumerate(self.procedures)])
@@ -290,15 +338,18 @@ class Plan(Base):
                 return p
         raise KeyError("Procedure id %s not found" % str(id))
     
+    @profiling.timed("execute")
     def execute(
         self,
         include_prono : bool = True,
         upload : bool = True,
         pretty : bool = False,
         input_api_config : Optional[ApiConfigDict] = None,
-        output_api_config : Optional[ApiConfigDict] = None):
+        output_api_config : Optional[ApiConfigDict] = None,
+        max_workers : Optional[int] = None,
+        full : bool = False):
         """
-        Runs analysis and then each procedure sequentially
+        Runs analysis and then the procedures (see executeProcedures)
 
         Parameters:
         -----------
@@ -328,6 +379,12 @@ class Plan(Base):
             - token : str
             - proxy_dict : dict
 
+        max_workers : int = None
+            Maximum number of procedures executed at the same time. Overrides self.max_workers
+
+        full : bool = False
+            If .incremental is set, process all nodes and run all procedures anyway (and refresh the incremental store)
+
         Returns:
         --------
         
@@ -335,7 +392,8 @@ class Plan(Base):
         """
         if self.topology is None:
             raise Exception("topology is not set")
-        self.topology.batchProcessInput(include_prono=include_prono,input_api_config=input_api_config)
+        self.topology.batchProcessInput(include_prono=include_prono,input_api_config=input_api_config,incremental=self.incremental_store,full=full)
+        self.dirty_procedures = self.getDirtyProcedures(full=full) if self.incremental_store is not None else None
         if self.output_analysis is not None:
             util.createParent(self.output_analysis)
             with open(self.output_analysis,'w') as analysisfile:
@@ -343,14 +401,7 @@ class Plan(Base):
                     json.dump(self.topology.toList(pivot=self.pivot),analysisfile,indent=4)
                 else:
                     json.dump(self.topology.toList(pivot=self.pivot),analysisfile)
-        for procedure in self.procedures:
-            if procedure.calibration is not None and procedure.calibration.calibrate:
-                procedure.calibration.run()
-            else:
-                procedure.run()
-            procedure.outputToNodes()
-            # logging.debug("statistics type: %s" % type(procedure.procedure_function_results.statistics))
-            # self.output_stats.append(procedure.procedure_function_results.statistics)
+        self.executeProcedures(max_workers=max_workers)
         if upload:
             try:
                 self.uploadSim(api_config = output_api_config)
@@ -392,6 +443,130 @@ class Plan(Base):
         if self.output_graph:
             self.printGraph(output_file=self.output_graph)
     
+    @profiling.timed(lambda self, procedure: "procedure %s" % procedure.id)
+    def executeProcedure(self, procedure : Procedure) -> None:
+        """Run (or calibrate) procedure and save its output into the topology. In incremental execution, procedures not in .dirty_procedures reuse the results of the previous execution, and the results of the procedures that run are saved into the incremental store"""
+        store = self.incremental_store
+        results = store.readProcedure(procedure.id) if store is not None and self.dirty_procedures is not None and procedure.id not in self.dirty_procedures else None
+        if results is not None:
+            logging.debug("Procedure %s: reusing results of the previous execution" % str(procedure.id))
+            procedure.restoreResults(results)
+        else:
+            procedure_hash = store.procedureHash(procedure) if store is not None else None
+            if procedure.calibration is not None and procedure.calibration.calibrate:
+                with profiling.timer("calibrate"):
+                    procedure.calibration.run()
+            else:
+                procedure.run()
+            if store is not None and procedure_hash is not None:
+                store.saveProcedure(procedure.id, procedure_hash, procedure.dumpResults())
+        locks = [self._output_locks.setdefault(key, Lock()) for key in sorted({(str(o.node_id), o.var_id) for o in procedure.outputs})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            with profiling.timer("outputToNodes"):
+                procedure.outputToNodes()
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        # logging.debug("statistics type: %s" % type(procedure.procedure_function_results.statistics))
+        # self.output_stats.append(procedure.procedure_function_results.statistics)
+
+    def getDirtyProcedures(self, full : bool = False) -> Set[Union[str,int]]:
+        """
+        Ids of the procedures that must run in an incremental execution: the procedures downstream (in the graph of .toGraph) of the nodes processed by the last .topology.batchProcessInput (.topology.dirty_nodes), of the procedures that are calibrated and of the procedures whose configuration changed or that have no results in the incremental store. Must be run after .topology.batchProcessInput
+
+        Parameters:
+        -----------
+        full : bool = False
+            Return all procedures
+
+        Returns:
+        --------
+        set of procedure ids
+        """
+        store = self.incremental_store
+        if store is None or full or self.topology is None or self.topology.dirty_nodes is None:
+            return set(self.procedureIndex)
+        sources : set = set(self.topology.dirty_nodes)
+        for procedure in self.procedures:
+            if (procedure.calibration is not None and procedure.calibration.calibrate) or store.readProcedureHash(procedure.id) != store.procedureHash(procedure):
+                sources.add("procedure_%s" % procedure.id)
+        dirty = descendantsOf(self.toGraph(None, include_objects=False), sources)
+        dirty_procedures = {procedure.id for procedure in self.procedures if "procedure_%s" % procedure.id in dirty}
+        logging.info("Incremental execution: %i of %i procedures affected by changes" % (len(dirty_procedures), len(self.procedures)))
+        return dirty_procedures
+
+    def procedureDependencies(self) -> nx.DiGraph:
+        """
+        Generate the directed graph of procedure ids where an edge (a, b) means that procedure b must run after procedure a, because b reads a node variable written by a, both write the same node variable or b writes a node variable read by a. Procedures are only linked to procedures that precede them in self.procedures, so that any execution order that respects the graph gives the same result as the sequential execution
+
+        Returns:
+        --------
+        NetworkX.DiGraph
+        """
+        DG = nx.DiGraph()
+        last_writer : Dict[Tuple[str,int], Union[str,int]] = {}
+        readers : Dict[Tuple[str,int], List[Union[str,int]]] = {}
+        for procedure in self.procedures:
+            DG.add_node(procedure.id)
+            inputs = {(str(b.node_id), b.var_id) for b in procedure.boundaries}
+            outputs = {(str(o.node_id), o.var_id) for o in procedure.outputs}
+            for key in inputs | outputs:
+                if key in last_writer:
+                    DG.add_edge(last_writer[key], procedure.id)
+            for key in outputs:
+                for reader in readers.get(key, []):
+                    DG.add_edge(reader, procedure.id)
+            for key in inputs:
+                readers.setdefault(key, []).append(procedure.id)
+            for key in outputs:
+                last_writer[key] = procedure.id
+                readers[key] = []
+        return DG
+
+    @profiling.timed("executeProcedures")
+    def executeProcedures(self, max_workers : Optional[int] = None) -> None:
+        """
+        Run (or calibrate) the procedures and save their outputs into the topology. With max_workers = 1, procedures run sequentially in list order. Else, procedures with no pending dependencies (see procedureDependencies) run concurrently in a thread pool. Writes into each node variable are serialized
+
+        Parameters:
+        -----------
+        max_workers : int = None
+            Maximum number of procedures executed at the same time. Defaults to self.max_workers
+        """
+        max_workers = max_workers if max_workers is not None else self.max_workers
+        if max_workers <= 1 or len(self.procedures) <= 1:
+            for procedure in self.procedures:
+                self.executeProcedure(procedure)
+            return
+        dependencies = self.procedureDependencies()
+        pending = {procedure.id: dependencies.in_degree(procedure.id) for procedure in self.procedures}
+        ready = [procedure for procedure in self.procedures if pending[procedure.id] == 0]
+        running : Dict[Future, Procedure] = {}
+        logging.debug("Executing %i procedures with up to %i workers" % (len(self.procedures), max_workers))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while len(ready) or len(running):
+                    while len(ready) and len(running) < max_workers:
+                        procedure = ready.pop(0)
+                        running[executor.submit(profiling.propagate(self.executeProcedure), procedure)] = procedure
+                    done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        procedure = running.pop(future)
+                        future.result()
+                        for successor in dependencies.successors(procedure.id):
+                            pending[successor] -= 1
+                            if pending[successor] == 0:
+                                ready.append(self.getProcedure(successor))
+                    # keep list order among ready procedures
+                    ready.sort(key=lambda p: self.procedureIndex.index(p.id))
+            except Exception:
+                for future in running:
+                    future.cancel()
+                raise
+
+    @profiling.timed("saveSimData")
     def saveSimData(self):
         if self.topology is None:
             raise RuntimeError("topology not set")
@@ -428,6 +603,7 @@ class Plan(Base):
             "series": series_sim,
             "id": None 
         }
+    @profiling.timed("uploadSim")
     def uploadSim(
         self,
         api_config : Optional[ApiConfigDict] = None) -> CorridaDict:
@@ -436,6 +612,8 @@ class Plan(Base):
         If self.save_post is not None, saves the post message before request into that filepath. 
 
         If self.save_response not None, saves server response (either the created forecast or an error message) into that filepath
+
+        If self.topology.upload_concurrency is set, the forecast is uploaded in chunks of series, concurrently (see chunked_upload.uploadCorrida), and the report of the chunks is saved into self.topology.upload_report
         
         Args:
         -----
@@ -455,18 +633,24 @@ class Plan(Base):
         corrida = self.toCorrida(strict_properties=True)
         if self.save_post is not None:
             save_path = self.save_post
-            json.dump(corrida,open(save_path,"w"))
+            with open(save_path,"w") as f:
+                serialization.dump(corrida,f)
             logging.info("Saved simulation post data to %s" % save_path)
         api_client = Crud(**api_config) if api_config is not None else output_crud
-        response = api_client.createCorrida(corrida)
+        if self.topology is not None and self.topology.upload_concurrency is not None:
+            response, self.topology.upload_report = uploadCorrida(api_client, corrida, **self.topology.upload_concurrency)
+        else:
+            profiling.countPayload(corrida)
+            response = api_client.createCorrida(corrida)
         if self.save_response:
             save_path = self.save_response
-            json.dump(corrida,open(save_path,"w"))
+            with open(save_path,"w") as f:
+                serialization.dump(corrida,f)
             logging.info("Saved simulation post response to %s" % save_path)
         return response
     def toCorridaJson(self,filename,pretty=False) -> None:
         """
-        Saves forecast into filename (json) using alerta5DBIO schema (https://raw.githubusercontent.com/jbianchi81/alerta5DBIO/master/public/schemas/a5/corrida.yml)
+        Saves forecast into filename (json) using alerta5DBIO schema (https://raw.githubusercontent.com/jbianchi81/alerta5DBIO/master/public/schemas/a5/corrida.yml). NaN values are written as null
 
         Parameters:
         -----------
@@ -482,12 +666,11 @@ class Plan(Base):
         None
         """
         corrida = self.toCorrida()
-        f = open(filename,"w")
-        if pretty:
-            f.write(json.dumps(corrida,indent=4))
-        else:
-            f.write(json.dumps(corrida))
-        f.close()
+        with open(filename,"w") as f:
+            if pretty:
+                f.write(serialization.dumps(corrida,indent=4))
+            else:
+                serialization.dump(corrida,f)
     def toCorridaDataFrame(self,pivot=False) -> DataFrame:
         """
         Concatenates forecast data into a DataFrame
@@ -552,7 +735,8 @@ class Plan(Base):
     
     def toGraph(
             self,
-            nodes : Union[TypedList[Node],None]) -> nx.DiGraph:
+            nodes : Union[TypedList[Node],None],
+            include_objects : bool = True) -> nx.DiGraph:
         """
         Generate directioned graph from the plan. Topology nodes are linked to procedures according to the mapping provided at procedure.function.boundaries (node to procedure) and procedure.function.outputs (procedure to node)
 
@@ -560,6 +744,9 @@ class Plan(Base):
         -----------
         nodes : list or None
             List of nodes to use for building the graph. If None, uses self.topology.nodes 
+
+        include_objects : bool = True
+            Set the dict representation of each node and procedure (including data) as the "object" attribute of the graph nodes. If False, only the structure is generated
         
         Returns:
         --------
@@ -573,10 +760,17 @@ class Plan(Base):
         """
         if self.topology is None:
             raise RuntimeError("topology not set")
-        DG = self.topology.toGraph(nodes)
+        DG = self.topology.toGraph(nodes, include_objects=include_objects)
         edges = list()
         for procedure in self.procedures:
             proc_id = "procedure_%s" % procedure.id
+            if not include_objects:
+                DG.add_node(proc_id)
+                for b in procedure.boundaries:
+                    edges.append((b.node_id, proc_id))
+                for o in procedure.outputs:
+                    edges.append((proc_id,o.node_id))
+                continue
             proc_dict = procedure.toDict()
             proc_dict["node_type"] = "procedure"
             # logging.debug(proc_dict)
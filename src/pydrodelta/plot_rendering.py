@@ -0,0 +1,411 @@
+"""Rendering of plots on a process pool (Topology.plotProno and Topology.plotVariable when Topology.plot_rendering is set).
+
+Plots are first collected as PlotSpecs (a module-level rendering function and its arguments: data and options), which are sent to worker processes that render them with the Agg backend. Image files (plotProno) are saved by the workers. The pages of a pdf (plotVariable) are rendered by the workers and merged in order by the main process: if pypdf is installed, pages are returned as single-page pdf documents, otherwise as pickled figures which the main process saves into the pdf.
+
+With skip_unchanged, files whose input hash (data and options of their PlotSpecs) equals the one saved on their last rendering are not rendered again. Hashes are kept in a .pydrodelta_plots.json file in the directory of each output file"""
+import io
+import os
+import json
+import pickle
+import logging
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.backends.backend_pdf
+import pandas
+from pandas import DataFrame
+from colour import Color
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from concurrent.futures import ProcessPoolExecutor, Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .util import createParent, getRandColor, parametersHash, dataFrameHash
+from . import profiling
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+class PlotSpec:
+    """A plot to render: a module-level rendering function (so that it can be sent to a worker process) and its keyword arguments"""
+
+    def __init__(
+        self,
+        render : Callable[..., Any],
+        label : str,
+        output : Optional[Union[str,Path]] = None,
+        **kwargs : Any
+        ):
+        """
+        Parameters:
+        -----------
+        render : callable
+            Rendering function. For image files, it saves the file. For pdf pages, it returns the figure
+
+        label : str
+            Description of the plot, for logs and error messages (e.g. "node 1 variable 2")
+
+        output : str or Path = None
+            File written by render (image files only)
+
+        **kwargs :
+            Arguments of render
+        """
+        self.render = render
+        self.label = label
+        self.output = Path(output) if output is not None else None
+        self.kwargs = kwargs
+
+    def hash(self) -> str:
+        """Hash of the rendering function and its arguments. DataFrames are hashed by content"""
+        return parametersHash(self.render.__module__, self.render.__name__, _hashable(self.kwargs))
+
+def _hashable(value : Any) -> Any:
+    if isinstance(value, DataFrame):
+        return dataFrameHash(value)
+    if isinstance(value, dict):
+        return {str(k): _hashable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_hashable(v) for v in value]
+    return value
+
+class PlotHashes:
+    """Input hashes of the last rendering of output files, kept in a .pydrodelta_plots.json file in the directory of each file"""
+
+    filename = ".pydrodelta_plots.json"
+
+    def __init__(self):
+        self._manifests : Dict[Path,Dict[str,str]] = {}
+
+    def _manifest(self, output : Path) -> Dict[str,str]:
+        directory = output.resolve().parent
+        if directory not in self._manifests:
+            path = directory / self.filename
+            manifest = {}
+            if path.exists():
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError) as e:
+                    logging.warning("Couldn't read plot hashes from %s: %s" % (str(path), str(e)))
+            self._manifests[directory] = manifest
+        return self._manifests[directory]
+
+    def unchanged(self, output : Path, hash_ : str) -> bool:
+        """output exists and was rendered from inputs with this hash"""
+        return output.exists() and self._manifest(output).get(output.name) == hash_
+
+    def set(self, output : Path, hash_ : str) -> None:
+        self._manifest(output)[output.name] = hash_
+
+    def save(self) -> None:
+        for directory, manifest in self._manifests.items():
+            os.makedirs(directory, exist_ok=True)
+            with open(directory / self.filename, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+def _initWorker() -> None:
+    matplotlib.use("Agg", force=True)
+
+def _renderFile(spec : PlotSpec) -> None:
+    try:
+        spec.render(**spec.kwargs)
+    finally:
+        plt.close("all")
+
+def _renderPage(spec : PlotSpec) -> Tuple[str,bytes]:
+    """Render a pdf page. Returns ("pdf", single-page pdf document) if pypdf is installed, else ("figure", pickled figure)"""
+    fig = spec.render(**spec.kwargs)
+    try:
+        if pypdf is not None:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="pdf")
+            return "pdf", buffer.getvalue()
+        return "figure", pickle.dumps(fig)
+    finally:
+        plt.close("all")
+
+def _results(
+    specs : List[PlotSpec],
+    func : Callable[[PlotSpec],Any],
+    max_workers : int
+    ) -> List[Any]:
+    """Run func on each spec, in a process pool if max_workers > 1. ValueErrors are raised with the label of the spec"""
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+    if max_workers == 1 or len(specs) < 2:
+        results = []
+        for spec in specs:
+            try:
+                results.append(func(spec))
+            except ValueError as e:
+                raise ValueError("Plot failed at %s: %s" % (spec.label, str(e)))
+        return results
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(specs)), initializer=_initWorker) as executor:
+        futures : List[Future] = [executor.submit(func, spec) for spec in specs]
+        try:
+            results = []
+            for spec, future in zip(specs, futures):
+                try:
+                    results.append(future.result())
+                except ValueError as e:
+                    raise ValueError("Plot failed at %s: %s" % (spec.label, str(e)))
+            return results
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+@profiling.timed("renderFiles")
+def renderFiles(
+    specs : List[PlotSpec],
+    max_workers : int = 1,
+    skip_unchanged : bool = False
+    ) -> int:
+    """Render image files (each spec saves spec.output)
+
+    Parameters:
+    -----------
+    specs : List[PlotSpec]
+        Plots to render
+
+    max_workers : int = 1
+        Number of worker processes. If 1, plots are rendered in this process
+
+    skip_unchanged : bool = False
+        Don't render the files whose input hash is the one saved on their last rendering
+
+    Returns:
+    --------
+    number of rendered files : int
+    """
+    hashes = PlotHashes()
+    pending = []
+    for spec in specs:
+        if skip_unchanged and spec.output is not None:
+            hash_ = spec.hash()
+            if hashes.unchanged(spec.output, hash_):
+                logging.debug("Plot of %s unchanged, skipping" % spec.label)
+                continue
+            pending.append((spec, hash_))
+        else:
+            pending.append((spec, None))
+    # output directories are created here: workers creating the same directory would race
+    for spec, _ in pending:
+        if spec.output is not None:
+            os.makedirs(spec.output.parent, exist_ok=True)
+    _results([spec for spec, _ in pending], _renderFile, max_workers)
+    if skip_unchanged:
+        for spec, hash_ in pending:
+            if spec.output is not None and hash_ is not None:
+                hashes.set(spec.output, hash_)
+        hashes.save()
+    profiling.count("plots", len(pending))
+    return len(pending)
+
+@profiling.timed("renderPdf")
+def renderPdf(
+    specs : List[PlotSpec],
+    output : Union[str,Path],
+    max_workers : int = 1,
+    skip_unchanged : bool = False
+    ) -> bool:
+    """Render a pdf file with one page per spec, in order (each spec returns a figure)
+
+    Parameters:
+    -----------
+    specs : List[PlotSpec]
+        Pages to render
+
+    output : str or Path
+        Pdf file
+
+    max_workers : int = 1
+        Number of worker processes. If 1, pages are rendered in this process
+
+    skip_unchanged : bool = False
+        Don't render the file if its input hash (of all pages) is the one saved on its last rendering
+
+    Returns:
+    --------
+    True if the file was rendered, False if it was skipped
+    """
+    output = Path(output)
+    hashes = PlotHashes()
+    hash_ = parametersHash(*[spec.hash() for spec in specs]) if skip_unchanged else None
+    if hash_ is not None and hashes.unchanged(output, hash_):
+        logging.debug("Plots of %s unchanged, skipping" % str(output))
+        return False
+    createParent(output)
+    if max_workers == 1 or len(specs) < 2:
+        pdf = matplotlib.backends.backend_pdf.PdfPages(str(output))
+        try:
+            for spec in specs:
+                try:
+                    fig = spec.render(**spec.kwargs)
+                except ValueError as e:
+                    raise ValueError("Plot failed at %s: %s" % (spec.label, str(e)))
+                pdf.savefig(fig)
+                plt.close(fig)
+        finally:
+            pdf.close()
+    else:
+        pages = _results(specs, _renderPage, max_workers)
+        if pypdf is not None:
+            writer = pypdf.PdfWriter()
+            for _, page in pages:
+                writer.append(io.BytesIO(page))
+            with open(output, "wb") as f:
+                writer.write(f)
+        else:
+            pdf = matplotlib.backends.backend_pdf.PdfPages(str(output))
+            try:
+                for _, page in pages:
+                    fig = pickle.loads(page)
+                    pdf.savefig(fig)
+                    plt.close(fig)
+            finally:
+                pdf.close()
+    if hash_ is not None:
+        hashes.set(output, hash_)
+        hashes.save()
+    profiling.count("plots", len(specs))
+    return True
+
+def plotVariablePage(
+    title : str,
+    data : DataFrame,
+    original_data : Optional[DataFrame],
+    series_sim : List[Tuple[int,DataFrame]],
+    timestart : Optional[datetime] = None,
+    timeend : Optional[datetime] = None,
+    max_obs_date : Optional[datetime] = None,
+    forecast_date : Optional[datetime] = None,
+    time_interval : Optional[relativedelta] = None,
+    extra_sim_columns : bool = True,
+    table : bool = True,
+    round_to : int = 2
+    ) -> matplotlib.figure.Figure:
+    """Time-value plot of a node variable (a page of Topology.plotVariable): data by tag, original data (analysis) and series_sim, with an optional table of the last 40 rows
+
+    Parameters:
+    -----------
+    title : str
+        Plot title (node name)
+
+    data : DataFrame
+        Data of the variable (columns valor, tag)
+
+    original_data : DataFrame or None
+        Original data of the variable (column valor)
+
+    series_sim : list of (series_id, DataFrame)
+        Simulated series with data
+
+    timestart, timeend : datetime = None
+        Plot period
+
+    max_obs_date : datetime = None
+        Draw a vertical line at this date
+
+    forecast_date : datetime = None
+        Draw a vertical line at this date
+
+    time_interval : relativedelta = None
+        Time step of the node. Dates of the table are formatted without time if it is 1 day or longer
+
+    extra_sim_columns, table, round_to :
+        See Topology.plotVariable
+
+    Returns:
+    --------
+    The figure : matplotlib.figure.Figure
+    """
+    color_map = {"obs": "blue", "sim": "red","interpolated": "yellow","extrapolated": "orange","analysis": "green", "prono": "purple", "sum": "yellow","filled":"gray", "moving_average": "blue"}
+    data = data.reset_index().rename(columns={"index":"timestart"}) # .plot(y="valor")
+    data["valor"] = pandas.to_numeric(data["valor"], errors="coerce")
+    if timestart is not None:
+        data = data[data["timestart"] >= timestart]
+    if timeend is not None:
+        data = data[data["timestart"] <= timeend]
+
+    fig, ax = plt.subplots(ncols=2 if table else 1,figsize=(20,8),gridspec_kw={'width_ratios': [2, 1] if table else [1]})
+    plot_ax = ax[0] if table else ax
+    grouped = data.groupby('tag')
+    for key, group in grouped:
+        group.plot(ax=plot_ax,kind='scatter', x='timestart', y='valor', label=key,title=title, figsize=(20,8),grid=True, color=color_map[str(key)])
+    if not isinstance(original_data, DataFrame):
+        raise Exception("Missing original data")
+    original_data = original_data.reset_index().rename(columns={"index":"timestart"})
+    original_data["valor"] = pandas.to_numeric(original_data["valor"], errors="coerce")
+    data_table = data.set_index("timestart")[["valor"]].rename(columns={"valor":"analysis"})
+    if len(original_data.dropna()["valor"]):
+        logging.debug("Add original data to plot at node %s" % title)
+        if timestart is not None:
+            original_data = original_data[original_data["timestart"] >= timestart]
+        if timeend is not None:
+            original_data = original_data[original_data["timestart"] <= timeend]
+        original_data.plot(
+            ax=plot_ax,
+            kind='line',
+            x='timestart',
+            y='valor',
+            label="analysis",
+            color=color_map["analysis"]
+        )
+        data_table["analysis"] = original_data.set_index("timestart")["valor"].combine_first(data_table["analysis"])
+    else:
+        logging.debug("Missing original data at node %s" % title)
+    data_table["analysis"] = data_table["analysis"].round(2)
+    if len(series_sim):
+        sim_colors = list(Color("orange").range_to(Color("red"),len(series_sim)))
+        for i, (series_id, serie_sim_data) in enumerate(series_sim):
+            if serie_sim_data is not None and len(serie_sim_data.dropna()["valor"]):
+                logging.debug("Add sim data to plot at node %s, series_sim %i" % (title,i))
+                data_sim = serie_sim_data.reset_index().rename(columns={"index":"timestart"})
+                data_sim["valor"] = pandas.to_numeric(data_sim["valor"], errors="coerce")
+                if timestart is not None:
+                    data_sim = data_sim[data_sim["timestart"] >= timestart]
+                if timeend is not None:
+                    data_sim = data_sim[data_sim["timestart"] <= timeend]
+                label = "sim_%i" % series_id
+                data_sim.plot(
+                    ax=plot_ax,
+                    kind='line',
+                    x='timestart',
+                    y='valor',
+                    label=label,
+                    color=sim_colors[i].get_hex()
+                )
+                data_table = data_table.join(data_sim.set_index("timestart")[["valor"]].rename(columns={"valor":label}))
+                data_table[label] = data_table[label].round(2)
+                # plot extra sim columns
+                if extra_sim_columns:
+                    for i, c in enumerate([c for c in data_sim.columns.to_list() if c not in [ "timestart", "valor", "tag"]]):
+                        data_sim[c] = pandas.to_numeric(data_sim[c], errors="coerce")
+                        label = "sim_%i_%s" % (series_id, c)
+                        logging.debug("Add series sim column %s, label %s" % (c,label))
+                        data_sim.plot(
+                            ax=plot_ax,
+                            kind='line',
+                            x='timestart',
+                            y=c,
+                            label=label,
+                            color=getRandColor(),
+                            linestyle="--",
+                            alpha=0.5
+                        )
+                        data_table = data_table.join(data_sim.set_index("timestart")[[c]].rename(columns={c:label}))
+                        data_table[label] = data_table[label].round(2)
+    if max_obs_date is not None:
+        plt.axvline(max_obs_date, color='k', linestyle='--') # type: ignore[arg-type]
+    if forecast_date is not None:
+        plt.axvline(forecast_date, color='gray', linestyle='--') # type: ignore[arg-type]
+    if table:
+        ax[1].axis('off')  # Hide axes of subplot 2
+        data_table = data_table.reset_index()
+        data_table["timestart"] = data_table["timestart"].dt.strftime('%Y-%m-%d' if time_interval is not None and datetime(2000, 1, 1) + time_interval >= datetime(2000, 1, 1) + relativedelta(days=1) else '%Y-%m-%d %H:%M')
+        cell_table = ax[1].table(cellText=[[s[-9:] for s in data_table.columns.tolist()]] + data_table.tail(40).round(round_to).values.tolist(), loc='center')
+        cell_table.auto_set_font_size(False) # type: ignore[arg-type]
+    return fig
@@ -1,12 +1,14 @@
 import logging
 import json
 from . import util
+from . import profiling
 from a5client import createEmptyObsDataFrame
-from .result_statistics import ResultStatistics, ResultStatisticsDict, ResultStatisticsShortDict
+from .result_statistics import ResultStatistics, ResultStatisticsDict, ResultStatisticsShortDict, computeMetricsBatch, metric_dependencies
 from .procedure_function_results import ProcedureFunctionResults
 from .pydrology import testPlot, SimonovKhristoforov
 from .calibration.downhill_simplex_calibration import DownhillSimplexCalibration
 from .calibration.linear_regression_calibration import LinearRegressionCalibration
+from .calibration.multi_start_calibration import MultiStartCalibration
 from typing import Optional, Union, List, Tuple, Literal, overload, TypedDict, cast
 from pandas import DataFrame, read_csv
 from .descriptors.int_descriptor import IntDescriptor
@@ -20,20 +22,25 @@ from .observed_node_variable import ObservedNodeVariable
 from .base import Base
 from .procedure_boundary import ProcedureBoundary
 from .procedure_function_results import ProcedureFunctionResults
-from typing import Optional, Union, Tuple, List, cast, Any, Mapping, Dict, overload, TYPE_CHECKING
+from typing import Optional, Union, Tuple, List, cast, Any, Mapping, Dict, overload, TYPE_CHECKING, NamedTuple
 from .types.procedure_boundary_dict import ProcedureBoundaryDict
 from .descriptors.list_descriptor import ListDescriptor
 from .descriptors.list_or_dict_descriptor import ListOrDictDescriptor
 from pydrodelta.descriptors.datetime_descriptor import DatetimeDescriptor
 from numpy import array, ndarray, integer, floating
+from numpy.random import Generator
 from numpy.typing import NDArray
-from pandas import DataFrame, Series
+from pandas import DataFrame, Series, Index
 from datetime import datetime
+from copy import deepcopy
+import numpy as np
 from .types.typed_list import TypedList
 from .types.enhanced_typed_list import EnhancedTypedList
 from .types.any_calibration_dict import AnyCalibrationDict
 from .function_boundary import FunctionBoundary
-from .util import getInputListFromDataFrame, tvpListToDataFrame, pivot_data
+from .state_checkpoints import StateCheckpointStore, createStateCheckpointStore
+from .types.state_checkpoints_dict import StateCheckpointsDict
+from .util import getInputListFromDataFrame, tvpListToDataFrame, pivot_data, parametersHash
 from .model_parameter import ModelParameter
 from a5client.util_types import TVPList, Dateable, Intervaleable
 from a5client.util import tryParseAndLocalizeDate, interval2relativedelta
@@ -54,6 +61,15 @@ class StatsDict(TypedDict):
 class ExtraParsDict(TypedDict):
     pass
 
+class BatchRunResults(NamedTuple):
+    """Results of Procedure.run_batch"""
+    index : Index
+    """time index of the output"""
+    output : NDArray[np.float64]
+    """simulated output, one row per parameter set (K x T)"""
+    scores : DataFrame
+    """statistics of each parameter set against the observed output, one row per parameter set (K x metrics)"""
+
 class Procedure(Base):
     """
     A Procedure defines a hydrological, hydrodinamic or static procedure which takes one or more NodeVariables from the Plan as boundary condition, one or more NodeVariables from the Plan as outputs and a ProcedureFunction. The input is read from the selected boundary NodeVariables and fed into the ProcedureFunction which produces an output, which is written into the output NodeVariables
@@ -100,7 +116,8 @@ class Procedure(Base):
 
     _available_calibration_methods : dict = {
         "downhill-simplex": DownhillSimplexCalibration,
-        "linear-regression": LinearRegressionCalibration
+        "linear-regression": LinearRegressionCalibration,
+        "multi-start": MultiStartCalibration
     }
 
     _calibration : Union[DownhillSimplexCalibration, LinearRegressionCalibration,None] = None
@@ -344,6 +361,24 @@ class Procedure(Base):
     def forecast_date(self, value : Optional[Dateable]) -> None:
         self._forecast_date = tryParseAndLocalizeDate(value) if value is not None else None
 
+    _checkpoints : Optional[StateCheckpointsDict] = None
+
+    _checkpoint_store : Optional[StateCheckpointStore] = None
+
+    @property
+    def checkpoints(self) -> Optional[StateCheckpointsDict]:
+        """Warm-start state checkpoints configuration (path, save_window, save_interval, keep). If not set, every run starts from initial_states"""
+        return self._checkpoints
+    @checkpoints.setter
+    def checkpoints(self, checkpoints : Optional[StateCheckpointsDict]) -> None:
+        self._checkpoints = checkpoints
+        self._checkpoint_store = createStateCheckpointStore(checkpoints, base_path = self.base_path)
+
+    @property
+    def checkpoint_store(self) -> Optional[StateCheckpointStore]:
+        """Store of warm-start state checkpoints, created from .checkpoints"""
+        return self._checkpoint_store
+
     save_results : Optional[Path]
 
     @property
@@ -412,6 +447,7 @@ class Procedure(Base):
         timestart : Optional[Dateable] = None,
         timeend : Optional[Dateable] = None,
         bias_correction : Optional[bool] = False,
+        checkpoints : Optional[StateCheckpointsDict] = None,
         **kwargs
         ):
         """
@@ -472,6 +508,14 @@ class Procedure(Base):
 
         bias_correction : Optional[bool]
 
+        checkpoints : Optional[StateCheckpointsDict], default=None
+            Save the states of each run (up to forecast_date) as checkpoints, and start the next runs from the latest checkpoint within their window instead of from initial_states. Only procedures that implement getStateTrajectory support it
+                StateCheckpointsDict:
+                    path : str (checkpoints directory, default ~/.cache/pydrodelta), optional
+                    save_window : dict (save checkpoints of this period before forecast_date, default {"days": 30}), optional
+                    save_interval : dict (minimum interval between saved checkpoints, default every step), optional
+                    keep : int (maximum number of checkpoints kept per procedure and parameter set, default 100), optional
+
         """
         if "type" in kwargs:
             del kwargs["type"]
@@ -508,6 +552,7 @@ class Procedure(Base):
                 "outputs": self.dfToBoundaryDicts(outputs, columns=[b.name for b in self._outputs]) if isinstance(outputs, DataFrame) else outputs if outputs is not None else [],
                 "extra_pars": extra_pars or {},
                 "forecast_date": forecast_date,
+                "checkpoints": checkpoints,
                 **kwargs
             },
             # type(self).__name__)
@@ -571,6 +616,7 @@ class Procedure(Base):
         self.save_dict = self.resolve_path(save_dict)
         self.drop_warmup = drop_warmup
         self.bias_correction = bias_correction
+        self.checkpoints = checkpoints
     
     def getCalibrationPeriod(self) -> Union[tuple,None]:
         """Read the calibration period from the calibration configuration"""
@@ -920,7 +966,8 @@ class Procedure(Base):
         calibration_period : Optional[tuple]=None,
         result_index : int = 0,
         tail : Optional[int] = None,
-        warmup : Optional[int] = None
+        warmup : Optional[int] = None,
+        metrics : Optional[List[str]] = None
         ) -> Tuple[List[ResultStatistics],List[ResultStatistics]]:
         """Compute statistics over procedure results.
         
@@ -936,6 +983,9 @@ class Procedure(Base):
         calibration_period : tuple or None
             start and end date for split statistics computations between calibration and validation periods
 
+        metrics : list of str or None
+            Compute only these metrics (see result_statistics.metric_dependencies). If None, all metrics are computed
+
         Returns
         -------
         (calibration_results, validation_results) : 2-length tuple of lists of ResultStatistics. The length of the lists equals that of obs 
@@ -985,7 +1035,8 @@ class Procedure(Base):
                     compute = o.compute_statistics, 
                     metadata = o.toDict(),
                     calibration_period = calibration_period,
-                    group = "cal"
+                    group = "cal",
+                    metrics = metrics
                 ))
                 if inner_join_val is not None and len(inner_join_val):
                     result_val.append(ResultStatistics(
@@ -994,7 +1045,8 @@ class Procedure(Base):
                         compute = o.compute_statistics, 
                         metadata = o.toDict(),
                         calibration_period = calibration_period,
-                        group = "val"
+                        group = "val",
+                        metrics = metrics
                     ))
                 else:
                     logging.warning("No data found for validation")
@@ -1003,7 +1055,8 @@ class Procedure(Base):
                     obs = inner_join["obs"].values.tolist(), 
                     sim = inner_join["sim"].values.tolist(), 
                     compute = o.compute_statistics, 
-                    metadata = o.toDict()
+                    metadata = o.toDict(),
+                    metrics = metrics
                 ))
         if self.procedure_function_results is not None:
             self.procedure_function_results.setStatistics(result)
@@ -1100,7 +1153,9 @@ class Procedure(Base):
         error_band : Optional[bool] = None,
         save_dict : Optional[Union[str,Path]] = None,
         drop_warmup : Optional[bool] = None,
-        bias_correction : Optional[bool] = None
+        bias_correction : Optional[bool] = None,
+        metrics : Optional[List[str]] = None,
+        use_checkpoints : Optional[bool] = None
         ) -> Union[List[DataFrame], DataFrame, None]:
         """
         Run self.exec()
@@ -1123,7 +1178,7 @@ class Procedure(Base):
         adjust : bool = False
             Adjust results with observations by means of linear regression. Adjustment is performed after statistics computation
         warmup_steps : int = None
-            For adjustment, skip this number of initial steps
+            For adjustment, skip this number of initial steps. On a warm start (see use_checkpoints), this and .warmup_steps (for statistics) are shifted by the number of input steps skipped before the checkpoint
         tail_steps : int = None
             For adjustment, user this number of final steps
         error_band : bool = True
@@ -1134,6 +1189,10 @@ class Procedure(Base):
             Eliminate warmup steps from adjusted output 
         bias_correction : bool = None
             Perform bias correction
+        metrics : list of str = None
+            Compute only these statistics metrics (i.e., the objective function during calibration). If None, all metrics are computed
+        use_checkpoints : bool = None
+            If .checkpoints is set, start from the latest state checkpoint within the input window and save the states of this run as checkpoints. Defaults to True unless parameters or initial_states are given (e.g. calibration runs)
             
         Returns
         -------
@@ -1153,15 +1212,16 @@ class Procedure(Base):
         # loads input inplace
         if load_input:
             # logging.debug("Loading input")
-            if self.pivot_input:
-                input = self.loadInput(
-                    inplace=inplace,
-                    pivot=True,
-                    use_boundary_name=True,
-                    tag_column=False,
-                    read_sim=self.read_sim)
-            else:
-                input = self.loadInput(inplace)
+            with profiling.timer("loadInput"):
+                if self.pivot_input:
+                    input = self.loadInput(
+                        inplace=inplace,
+                        pivot=True,
+                        use_boundary_name=True,
+                        tag_column=False,
+                        read_sim=self.read_sim)
+                else:
+                    input = self.loadInput(inplace)
         else:
             # logging.debug("Input already loaded")
             input = self.input
@@ -1169,12 +1229,13 @@ class Procedure(Base):
         # loads observed outputs
         if load_output_obs:
             # logging.debug("Loading output obs")
-            output_obs = self.loadOutputObs(
-                inplace=inplace,
-                pivot=self.pivot_output_obs,
-                original_data=self._read_original_data,
-                use_boundary_name=self._use_boundary_name
-            )
+            with profiling.timer("loadOutputObs"):
+                output_obs = self.loadOutputObs(
+                    inplace=inplace,
+                    pivot=self.pivot_output_obs,
+                    original_data=self._read_original_data,
+                    use_boundary_name=self._use_boundary_name
+                )
         else:
             # logging.debug("Output obs already loaded")
             output_obs = self.output_obs
@@ -1184,10 +1245,35 @@ class Procedure(Base):
             self.setParameters(parameters)
         if initial_states is not None:
             self.setInitialStates(initial_states)
-        output, procedure_function_results = self.exec(input)
+        use_checkpoints = self.checkpoint_store is not None and (use_checkpoints if use_checkpoints is not None else parameters is None and initial_states is None)
+        checkpoint = self.loadCheckpoint(input if input is not None else self.input) if use_checkpoints else None
+        skipped_steps = 0
+        with profiling.timer("exec"):
+            if checkpoint is not None:
+                # warm start: skip the input steps before the checkpoint
+                full_input = input if input is not None else self.input
+                trimmed_input = self.trimInput(full_input, checkpoint[0])
+                skipped_steps = len(full_input if isinstance(full_input, DataFrame) else full_input[0]) - len(trimmed_input if isinstance(trimmed_input, DataFrame) else trimmed_input[0])
+                configured_initial_states = self.initial_states
+                self.initial_states = checkpoint[1]
+                try:
+                    output, procedure_function_results = self.exec(trimmed_input)
+                finally:
+                    self.initial_states = configured_initial_states
+            else:
+                output, procedure_function_results = self.exec(input)
         
+        # warmup counts from the first step of the full input: shift it by the steps skipped on a warm start
+        statistics_warmup = max(0, self.warmup_steps - skipped_steps) if self.warmup_steps is not None else None
+        warmup_steps = max(0, warmup_steps - skipped_steps) if warmup_steps is not None else None
+
         # sets procedure_function_results
         self.procedure_function_results = ProcedureFunctionResults(**procedure_function_results) if isinstance(procedure_function_results, dict) else procedure_function_results
+
+        # saves state checkpoints
+        if use_checkpoints:
+            with profiling.timer("saveCheckpoints"):
+                self.saveCheckpoints()
         
         # sets states
         if self.procedure_function_results.states is not None:
@@ -1197,67 +1283,256 @@ class Procedure(Base):
         if not self._no_sim:
             if inplace:
                 self.output = output
-                self.computeStatistics(
-                    calibration_period=self.getCalibrationPeriod(),
-                    result_index=self.getResultIndex())
-            else:
-                self.computeStatistics(
-                    obs=output_obs,
-                    sim=output,
-                    calibration_period=self.getCalibrationPeriod(),
-                    result_index=self.getResultIndex())
+            with profiling.timer("computeStatistics"):
+                if inplace:
+                    self.computeStatistics(
+                        calibration_period=self.getCalibrationPeriod(),
+                        result_index=self.getResultIndex(),
+                        warmup=statistics_warmup,
+                        metrics=metrics)
+                else:
+                    self.computeStatistics(
+                        obs=output_obs,
+                        sim=output,
+                        calibration_period=self.getCalibrationPeriod(),
+                        result_index=self.getResultIndex(),
+                        warmup=statistics_warmup,
+                        metrics=metrics)
         else:
             if inplace:
                 self.output = output
 
         # bias correction
         if bias_correction:
-            self.run_bias_correction()
+            with profiling.timer("biasCorrection"):
+                self.run_bias_correction()
         
         # adjust
         if adjust:
-            if self.output_obs is None:
-                raise Exception("Can't adjust: missing observed outputs at procedure %s" % str(self.id))
-            if self.output is None:
-                raise Exception("Can't adjust: missing simulated outputs at procedure %s" % str(self.id))
-            for i, o in enumerate(self.output):
-                o = cast(DataFrame, o)
-                if len(self.output_obs) < i + 1:
-                    raise Exception("Can't adjust: missing observed output at index %i of procedure %s" % (i, str(self.id)))
-                (adjusted, adjusted_tag, lm_stats) = util.adjustSeries(
-                    o,
-                    cast(DataFrame, self.output_obs[i]),
-                    warmup = warmup_steps,
-                    tail = tail_steps,
-                    method = adjust_method,
-                    return_df = True,
-                    drop_warmup = drop_warmup)
-                self.linear_model = lm_stats
-                columns_drop = [ c for c in ["valor","valor_sim", "valor_obs"] if c in adjusted.columns ]
-                adjusted = adjusted.drop(columns=columns_drop)
-                if "adj" not in adjusted:
-                    raise Exception("adj column missing in data")
-                o["valor"] = adjusted["adj"] # .fillna(o["valor"])
-                for col in adjusted.columns:
-                    if col != "adj":
-                        o[col] = adjusted[col]
-                if error_band:
-                    o["inferior"] = o["valor"] - self.linear_model["quant_Err"][0.950]
-                    o["superior"] = o["valor"] + self.linear_model["quant_Err"][0.950]
-                self.procedure_function_results.setAdjustResults(lm_stats)
+            with profiling.timer("adjust"):
+                if self.output_obs is None:
+                    raise Exception("Can't adjust: missing observed outputs at procedure %s" % str(self.id))
+                if self.output is None:
+                    raise Exception("Can't adjust: missing simulated outputs at procedure %s" % str(self.id))
+                for i, o in enumerate(self.output):
+                    o = cast(DataFrame, o)
+                    if len(self.output_obs) < i + 1:
+                        raise Exception("Can't adjust: missing observed output at index %i of procedure %s" % (i, str(self.id)))
+                    (adjusted, adjusted_tag, lm_stats) = util.adjustSeries(
+                        o,
+                        cast(DataFrame, self.output_obs[i]),
+                        warmup = warmup_steps,
+                        tail = tail_steps,
+                        method = adjust_method,
+                        return_df = True,
+                        drop_warmup = drop_warmup)
+                    self.linear_model = lm_stats
+                    columns_drop = [ c for c in ["valor","valor_sim", "valor_obs"] if c in adjusted.columns ]
+                    adjusted = adjusted.drop(columns=columns_drop)
+                    if "adj" not in adjusted:
+                        raise Exception("adj column missing in data")
+                    o["valor"] = adjusted["adj"] # .fillna(o["valor"])
+                    for col in adjusted.columns:
+                        if col != "adj":
+                            o[col] = adjusted[col]
+                    if error_band:
+                        o["inferior"] = o["valor"] - self.linear_model["quant_Err"][0.950]
+                        o["superior"] = o["valor"] + self.linear_model["quant_Err"][0.950]
+                    self.procedure_function_results.setAdjustResults(lm_stats)
         
         # saves results to file
         if bool(save_results):
-            self.procedure_function_results.save(output=save_results)
+            with profiling.timer("saveResults"):
+                self.procedure_function_results.save(output=save_results)
         if bool(save_dict):
-            self.saveDict(output=save_dict)
+            with profiling.timer("saveResults"):
+                self.saveDict(output=save_dict)
         
         # returns
         if inplace:
             return
         else:
             return output
-        
+
+    def dumpResults(self) -> dict:
+        """Get the results of the last run (.input, .output, .output_obs, .states and .procedure_function_results) as a dict, to be restored with .restoreResults. Used for incremental plan execution (see IncrementalStore)"""
+        return {
+            "input": self.input,
+            "output": self.output,
+            "output_obs": self.output_obs,
+            "states": self.states,
+            "procedure_function_results": self.procedure_function_results
+        }
+
+    def restoreResults(self, results : dict) -> None:
+        """Set the results of a previous run from a dict generated by .dumpResults"""
+        self.input = results["input"]
+        self.output = results["output"]
+        self.output_obs = results["output_obs"]
+        self.states = results["states"]
+        self.procedure_function_results = results["procedure_function_results"]
+
+    def getStateTrajectory(self) -> Optional[DataFrame]:
+        """States at the beginning of each step of the last run, used to save warm-start checkpoints. One row per step (indexed by timestamp) and one column per state, so that a row, as a dict, is a valid value of .initial_states to restart the procedure at that step. Procedures that can't be restarted from their states return None (default)"""
+        return None
+
+    def getCheckpointKey(self) -> Tuple[str, str]:
+        """Key of the state checkpoints of this procedure: procedure identifier (prefixed with the plan identifier, if any) and hash of the procedure type, parameters and extra_pars"""
+        procedure_id = "%s/%s" % (str(self._plan.id), str(self.id)) if self._plan is not None and getattr(self._plan, "id", None) is not None else str(self.id)
+        return procedure_id, parametersHash(type(self).__name__, self.parameters, self.extra_pars)
+
+    def loadCheckpoint(
+        self,
+        input : Optional[Union[List[DataFrame],DataFrame]]
+        ) -> Optional[Tuple[datetime, dict]]:
+        """Find the latest state checkpoint between the first step of input and forecast_date (or the last step of input)
+
+        Returns:
+        --------
+        (datetime, dict) : timestamp and states of the checkpoint, or None if not found (or checkpoints not set)
+        """
+        if self.checkpoint_store is None or input is None:
+            return None
+        index = input.index if isinstance(input, DataFrame) else input[0].index if len(input) else None
+        if index is None or not len(index):
+            return None
+        timeend = self.forecast_date if self.forecast_date is not None else index[-1]
+        checkpoint = self.checkpoint_store.latest(*self.getCheckpointKey(), index[0], timeend)
+        if checkpoint is not None:
+            logging.info("Procedure %s: warm start from state checkpoint at %s" % (str(self.id), checkpoint[0].isoformat()))
+        return checkpoint
+
+    def saveCheckpoints(self) -> int:
+        """Save the states of the last run (see getStateTrajectory) as checkpoints, within the save window before forecast_date (or the last step of the run)
+
+        Returns:
+        --------
+        int : number of saved checkpoints
+        """
+        if self.checkpoint_store is None:
+            return 0
+        trajectory = self.getStateTrajectory()
+        if trajectory is None or not len(trajectory):
+            return 0
+        timeend = self.forecast_date if self.forecast_date is not None else trajectory.index[-1]
+        positions = self.checkpoint_store.select(list(trajectory.index), timeend)
+        if not len(positions):
+            return 0
+        trajectory = trajectory.iloc[positions]
+        return self.checkpoint_store.save(
+            *self.getCheckpointKey(),
+            zip(trajectory.index, trajectory.to_dict("records")))
+
+    def trimInput(
+        self,
+        input : Union[List[DataFrame],DataFrame],
+        timestart : datetime
+        ) -> Union[List[DataFrame],DataFrame]:
+        """Drop the input rows before timestart"""
+        if isinstance(input, DataFrame):
+            return input[input.index >= timestart]
+        return [df[df.index >= timestart] for df in input]
+
+    def run_batch(
+        self,
+        parameter_matrix : Union[NDArray[np.float64], List[List[float]]],
+        load_input : bool = False,
+        load_output_obs : bool = False,
+        result_index : Optional[int] = None,
+        metrics : Optional[List[str]] = None
+        ) -> BatchRunResults:
+        """
+        Run the procedure function once per parameter set (row of parameter_matrix) against the loaded input and score each run against the observed output.
+
+        Unlike run, no output DataFrames, ResultStatistics or ProcedureFunctionResults are built: procedures with an array kernel (see execBatch) evaluate all the parameter sets at once, the others loop over exec. self.parameters is restored at the end, while self.output and self.procedure_function_results are left untouched. Adjustment and bias correction are not applied
+
+        Parameters:
+        ----------
+
+        parameter_matrix : 2-d array or list of lists
+            One parameter set per row, ordered as self._parameters (as in run(parameters=...))
+        load_input : bool = False
+            If True, load input using .loadInput. Else, reads from .input (loaded if not set)
+        load_output_obs : bool = False
+            If True, load observed output using .loadOutputObs. Else, reads from .output_obs (loaded if not set)
+        result_index : int = None
+            Index of the output to return and score. Defaults to the calibration result index
+        metrics : list of str = None
+            Compute only these statistics metrics. If None, all metrics are computed. rse is computed with the number of parameters of the procedure as k
+
+        Returns
+        -------
+        BatchRunResults : (index, output, scores) where output is a K x T array and scores a DataFrame with one row per parameter set and columns n and metrics. Scores are computed over the calibration period (if set), skipping warmup_steps and keeping the last tail_steps, as in computeStatistics
+        """
+        parameter_matrix = np.atleast_2d(np.asarray(parameter_matrix, dtype=float))
+        result_index = result_index if result_index is not None else self.getResultIndex()
+        if load_input or self.input is None:
+            if self.pivot_input:
+                self.loadInput(
+                    inplace=True,
+                    pivot=True,
+                    use_boundary_name=True,
+                    tag_column=False,
+                    read_sim=self.read_sim)
+            else:
+                self.loadInput(True)
+        if not self._no_sim and (load_output_obs or self.output_obs is None):
+            self.loadOutputObs(
+                inplace=True,
+                pivot=self.pivot_output_obs,
+                original_data=self._read_original_data,
+                use_boundary_name=self._use_boundary_name
+            )
+        parameters = deepcopy(self.parameters)
+        try:
+            index, output = self.execBatch(parameter_matrix, self.input, result_index)
+        finally:
+            self.setParameters(parameters)
+        if self._no_sim:
+            return BatchRunResults(index, output, DataFrame(index=range(len(output))))
+        return BatchRunResults(index, output, self.computeBatchStatistics(index, output, result_index, metrics))
+
+    def computeBatchStatistics(
+        self,
+        index : Index,
+        output : NDArray[np.float64],
+        result_index : int = 0,
+        metrics : Optional[List[str]] = None
+        ) -> DataFrame:
+        """Score each row of output (simulated values of output result_index over index) against the observed output. See run_batch
+
+        Returns
+        -------
+        DataFrame with one row per row of output and columns n and metrics (NaN where undefined)"""
+        obs = self.output_obs
+        if obs is None:
+            raise Exception("obs (self.output_obs) is not set")
+        if isinstance(obs, DataFrame):
+            o = self.outputs[result_index]
+            df_obs = obs if "valor" in obs.columns else obs[[o.name]].rename(columns={o.name: "valor"})
+        else:
+            if len(obs) < result_index + 1:
+                raise Exception("List of obs outputs is smaller than .outputs (%i < %i" % (len(obs), result_index + 1))
+            df_obs = obs[result_index]
+        positions = np.arange(len(index))
+        if self.warmup_steps is not None:
+            df_obs = df_obs.iloc[self.warmup_steps:]
+            positions = positions[self.warmup_steps:]
+        if self.tail_steps is not None:
+            df_obs = df_obs.tail(self.tail_steps)
+            positions = positions[-self.tail_steps:] if self.tail_steps > 0 else positions[0:0]
+        obs_values = df_obs["valor"].reindex(index[positions]).to_numpy(dtype=float)
+        calibration_period = self.getCalibrationPeriod()
+        if calibration_period is not None:
+            selected = (index[positions] >= calibration_period[0]) & (index[positions] <= calibration_period[1])
+            if not (selected & ~np.isnan(obs_values)).any():
+                raise Exception("Invalid calibration period: no data found")
+            positions = positions[selected]
+            obs_values = obs_values[selected]
+        result = computeMetricsBatch(obs_values, output[:,positions], metrics, k = len(self.parameter_list))
+        columns = ["n"] + (list(metrics) if metrics is not None else [m for m in metric_dependencies if m in result])
+        return DataFrame({column: result[column] for column in columns})
+
     def getOutputNodeData(
         self,
         node_id : int,
@@ -1553,12 +1828,52 @@ class Procedure(Base):
         # data = self._plan.topology.pivotData(nodes=self.output_nodes,include_tag=False,use_output_series_id=False,use_node_id=True)
         return input, ProcedureFunctionResults()
 
+    def execBatch(
+        self,
+        parameter_matrix : NDArray[np.float64],
+        input : Optional[Union[List[DataFrame],DataFrame]] = None,
+        result_index : int = 0
+        ) -> Tuple[Index, NDArray[np.float64]]:
+        """
+        Execute the procedure function once per row of parameter_matrix and collect output result_index. This generic implementation sets the parameters and runs .exec for each row. Procedures with an array kernel override it to evaluate all the parameter sets at once
+
+        Parameters:
+        -----------
+        parameter_matrix : 2-d array
+            One parameter set per row
+        input : list of DataFrames or DataFrame
+            Procedure function input (boundary conditions)
+        result_index : int = 0
+            Index of the output to collect
+
+        Returns:
+        --------
+        2-tuple : time index of the output and simulated values, one row per parameter set (aligned to the index of the first run)
+        """
+        index : Optional[Index] = None
+        rows = []
+        for parameters in parameter_matrix:
+            self.setParameters(parameters.tolist())
+            output, _ = self.exec(input)
+            if isinstance(output, DataFrame):
+                o = self.outputs[result_index]
+                values = output["valor"] if "valor" in output.columns else output[o.name]
+            else:
+                values = output[result_index]["valor"]
+            if index is None:
+                index = values.index
+            rows.append(values.reindex(index).to_numpy(dtype=float))
+        if index is None:
+            return Index([]), np.empty((0, 0))
+        return index, np.vstack(rows)
+
     def makeSimplex(
         self,
         sigma : float = 0.25,
         limit : bool = True,
         ranges : Optional[list] = None,
         # minmax : Optional[list] = None
+        rng : Optional[Generator] = None
         ) -> List[List[float]]:
         """Generate Simplex from procedure function parameters. 
         
@@ -1574,6 +1889,9 @@ class Procedure(Base):
             
         ranges : list or None
             Override parameter ranges with these values. Length must be equal to self._parameters and each element of the list must be a 2-tuple (range_min, range_max) 
+
+        rng : numpy.random.Generator or None
+            Random number generator. If not set, numpy.random global state is used
         
         Returns:
         --------
@@ -1602,7 +1920,7 @@ class Procedure(Base):
                 # else:
                 #     abs_min = None
                 #     abs_max = None
-                point.append(p.makeRandom(sigma=sigma, limit=limit, range_min=range_min, range_max=range_max)) # , abs_min=abs_min,abs_max=abs_max)
+                point.append(p.makeRandom(sigma=sigma, limit=limit, range_min=range_min, range_max=range_max, rng=rng)) # , abs_min=abs_min,abs_max=abs_max)
             points.append(list(point))
         return points
     
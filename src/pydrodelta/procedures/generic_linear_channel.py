@@ -1,11 +1,12 @@
 from ..procedure import Procedure
 from ..procedure_function_results import ProcedureFunctionResults
 from ..function_boundary import FunctionBoundary
-from ..pydrology import LinearChannel
+from ..pydrology import LinearChannel, convolveBatch
 from ..descriptors.int_descriptor import IntDescriptor 
 import numpy as np
-from pandas import DataFrame
-from typing import List, Union, Optional
+from numpy.typing import NDArray
+from pandas import DataFrame, Index
+from typing import List, Union, Optional, Tuple
 from typing_extensions import Unpack
 from ..types.procedure_full_init_kwargs import ProcedureFullInitKwargs
 
@@ -102,4 +103,31 @@ class GenericLinearChannelProcedure(Procedure):
                 },       
                 data = data
             )
-        )
\ No newline at end of file
+        )
+
+    def execBatch(
+        self,
+        parameter_matrix : NDArray[np.float64],
+        input : Optional[Union[List[DataFrame],DataFrame]] = None,
+        result_index : int = 0
+        ) -> Tuple[Index, NDArray[np.float64]]:
+        """Same as Procedure.execBatch, convolving the input with the distribution function of every parameter set at once (pydrology.convolveBatch)"""
+        if input is None:
+            input = self.loadInput(inplace=False,pivot=False)
+        if isinstance(input,DataFrame):
+            input = [ input ]
+        data = input[0][["valor"]].rename(columns={"valor":"input"})
+        if not len(data.dropna().index):
+            raise Exception("Procedure %s: Missing input data: no valid values found" % self.id)
+        last_date = max(data.dropna().index)
+        linear_channel_input = data[data.index <= last_date]["input"].values
+        if True in np.isnan(linear_channel_input):
+            raise Exception("NaN values found in input before last date %s" % last_date.isoformat())
+        u = []
+        for parameters in parameter_matrix:
+            self.setParameters(parameters.tolist())
+            u.append(LinearChannel(self.coefficients,[0],self.Proc,self.dt).u)
+        outflows = convolveBatch(linear_channel_input, u)[:,:len(data)]
+        output = np.full((len(parameter_matrix), len(data)), np.nan)
+        output[:,:outflows.shape[1]] = outflows
+        return data.index, output
@@ -1,5 +1,6 @@
 import numpy as np
-from pandas import DataFrame
+from pandas import DataFrame, Index
+from numpy.typing import NDArray
 from typing import Union, List, Tuple, Optional, Mapping, Any, TypedDict
 import logging
 from typing_extensions import Unpack
@@ -7,7 +8,7 @@ from typing_extensions import Unpack
 from ..types.procedure_full_init_kwargs import ProcedureFullInitKwargs
 from ..procedure_function_results import ProcedureFunctionResults
 from ..procedures.pq import PQProcedure
-from ..pydrology import GR4J
+from ..pydrology import GR4J, gr4jBatch
 from ..model_parameter import ModelParameter
 from ..model_state import ModelState
 from .pq import PQExtraParsDict
@@ -222,6 +223,30 @@ class GR4JProcedure(PQProcedure):
             )
         )
     
+    def execBatch(
+        self,
+        parameter_matrix : NDArray[np.float64],
+        input : Optional[Union[List[DataFrame],DataFrame]] = None,
+        result_index : int = 0
+        ) -> Tuple[Index, NDArray[np.float64]]:
+        """Same as Procedure.execBatch, running all the parameter sets at once with pydrology.gr4jBatch. Outputs are q (result_index=0) and smc (result_index=1)"""
+        if result_index > 1:
+            return super().execBatch(parameter_matrix, input, result_index)
+        if input is None:
+            input = self.loadInput(inplace=False,pivot=False)
+        if isinstance(input, DataFrame):
+            input = [input]
+        pars = np.empty((len(parameter_matrix), 4))
+        for i, parameters in enumerate(parameter_matrix):
+            self.setParameters(parameters.tolist())
+            pars[i] = [self.X0,self.X3,self.X2,self.X1]
+        Q, SoilStorage = gr4jBatch(pars, [ list(input[0].valor), list(input[1].valor) ], [self.Sk_init,self.Rk_init])
+        if result_index == 0:
+            output = Q / 1000 / 24 / 60 / 60 / self.dt * self.area * self.ae
+        else:
+            output = SoilStorage / pars[:,0:1] * (self.rho - self.wp) + self.wp
+        return input[0].index, output
+
     def setEngine(
         self,
         input : List[List[float]]
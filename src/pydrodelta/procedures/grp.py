@@ -2,12 +2,13 @@ import logging
 from numpy import tanh
 from pandas import DataFrame
 from typing import Union, List, Tuple, Optional, Mapping, Any, TypedDict
-from numpy import inf, isnan
+from numpy import inf
+import numpy as np
 
 from ..procedure_function_results import ProcedureFunctionResults
 from ..model_parameter import ModelParameter
 from ..model_state import ModelState
-from .pq import PQProcedure
+from .pq import PQProcedure, PQForcings
 from ..descriptors.bool_descriptor import BoolDescriptor
 from ..descriptors.list_descriptor import ListDescriptor
 from ..types import ExecInput
@@ -105,6 +106,13 @@ class GRPProcedure(PQProcedure):
             return self.initial_states[1]
         return self.initial_states["Rk"] if "Rk" in self.initial_states else 0
 
+    @property
+    def Pr_init(self) -> List[float]:
+        """Runoff of the previous steps still in transit through the unit hydrograph (set by state checkpoints)"""
+        if isinstance(self.initial_states, dict) and "Pr" in self.initial_states:
+            return list(self.initial_states["Pr"])
+        return []
+
     @property
     def dt(self) -> float:
         """computation step of the unit hydrograph"""
@@ -232,51 +240,26 @@ class GRPProcedure(PQProcedure):
                 tag_column=False)
         if isinstance(input, list):
             input = input[0]
-        result_rows = []
         # initialize states
         Sk = min(self.Sk_init,self.X0)
-        self.Pr : List[float] = []
-        k = -1
+        # runoff of the steps before a warm start (state checkpoint), still in transit through the unit hydrograph
+        self.Pr : List[float] = self.Pr_init
+        offset = len(self.Pr)
         Rk = self.Rk_init # *self.X2
 
         # series: pma*, etp*, q_obs, smc_obs [*: required]
         if len(input) < 2:
             raise Exception("Missing input series: at least pma and etp required")
-        # instantiate lists for statistics computation
-        sim = []
-        obs = []
-        # iterate series using pma's index:
-        for i, row in input.iterrows():
-            k = k + 1
-            pma = row["pma"]
-            etp = row["etp"] # input[1].loc[[i]].valor.item()
-            q_obs = row["q_obs"] # input[2].loc[[i]].valor.item() if len(input) > 2 else None
-            smc_obs = row["smc_obs"] # input[3].loc[[i]].valor.item() if len(input) > 3 else None
-            smc = (self.rho-self.wp)*Sk/self.X0+self.wp
-            if isnan(pma):
-                if self.fill_nulls:
-                    logging.warning("Missing pma value for date: %s. Filling up with 0" % i)
-                    pma = 0
-                else:
-                    logging.warning("Missing pma value for date: %s. Unable to continue" % i)
-                    break
-            if isnan(etp):
-                if self.fill_nulls:
-                    logging.warning("Missing etp value for date: %s. Filling up with 0" % i)
-                    etp = 0
-                else:
-                    logging.warning("Missing etp value for date: %s. Unable to continue" % i)
-                    break
-            Sk_, Rk_, q, runoff, inflow, leakages = self.advance_step(Sk, Rk, pma, etp, k, q_obs)
-            # new_row = DataFrame([[i, pma, etp, q_obs, smc_obs, Sk, Rk, q, smc, k, runoff, inflow, leakages]], columns= ["timestart", "pma", "etp", "q_obs", "smc_obs", "Sk", "Rk", "q", "smc", "k", "runoff", "inflow", "leakages"])
-            result_rows.append([i, pma, etp, q_obs, smc_obs, Sk, Rk, q, smc, k, runoff, inflow, leakages]) # concat([results,new_row])
-            Sk = Sk_
-            Rk = Rk_
-            if q_obs is not None:
-                sim.append(q)
-                obs.append(q_obs)
-        results = DataFrame(result_rows, columns= ["timestart", "pma", "etp", "q_obs", "smc_obs", "Sk", "Rk", "q", "smc", "k", "runoff", "inflow", "leakages"])
-        results.set_index("timestart", inplace=True)
+        # missing pma and etp values are filled up with 0 or truncate the run (fill_nulls) before the time loop
+        forcings = PQForcings(input, self.fill_nulls)
+        outputs = forcings.outputs(["Sk", "Rk", "q", "smc", "k", "runoff", "inflow", "leakages"])
+        outputs["k"] = np.arange(len(forcings))
+        for k, i, pma, etp, q_obs, smc_obs in forcings.steps():
+            outputs["Sk"][k] = Sk
+            outputs["Rk"][k] = Rk
+            outputs["smc"][k] = (self.rho-self.wp)*Sk/self.X0+self.wp
+            Sk, Rk, outputs["q"][k], outputs["runoff"][k], outputs["inflow"][k], outputs["leakages"][k] = self.advance_step(Sk, Rk, pma, etp, offset + k, q_obs)
+        results = forcings.results(outputs)
         # logging.debug(str(results))
         procedure_results = ProcedureFunctionResults(
             border_conditions = results[["pma","etp","q_obs","smc_obs"]],
@@ -303,6 +286,19 @@ class GRPProcedure(PQProcedure):
             procedure_results
         )
     
+    def getStateTrajectory(self) -> Optional[DataFrame]:
+        """Soil (Sk) and routing (Rk) storages at the beginning of each step of the last run, together with the runoff of the previous steps still in transit through the unit hydrograph (Pr) (see Procedure.getStateTrajectory)"""
+        if self.procedure_function_results is None or self.procedure_function_results.data is None:
+            return None
+        data = self.procedure_function_results.data
+        offset = len(self.Pr) - len(data)
+        memory = int(self.X3) + 1
+        return DataFrame({
+            "Sk": data["Sk"],
+            "Rk": data["Rk"],
+            "Pr": [self.Pr[max(0, offset + k - memory):offset + k] for k in range(len(data))]
+        }, index = data.index)
+
     def advance_step(
         self,
         Sk: float,
@@ -35,6 +35,8 @@ class HOSHExtraParsDict(PQExtraParsDict):
     """shift (procedure configuration). Default = False"""
     approx : NotRequired[Optional[bool]]
     """approx (procedure configuration). Default = False"""
+    engine : NotRequired[Literal["reference","fast"]]
+    """Runoff computation engine (procedure configuration): 'reference' or 'fast' (event-segmented kernel, see hosh_kernel). Default = 'reference'"""
 
 class HOSHInitialStatesDict(TypedDict):
     SurfaceStorage : NotRequired[Optional[float]]
@@ -101,6 +103,11 @@ class HOSH4P1LProcedure(PQProcedure):
         """approx (procedure configuration)"""
         return bool(self.extra_pars["approx"]) if "approx" in self.extra_pars else False
            
+    @property
+    def runoff_engine(self) -> Literal["reference","fast"]:
+        """Runoff computation engine (procedure configuration, extra_pars["engine"]): "reference" (default) or "fast" (event-segmented kernel, compiled with numba if available). Results are identical"""
+        return self.extra_pars["engine"] if "engine" in self.extra_pars else "reference"
+
     @property
     def k(self) -> Optional[float]:
         """Nash linear channel coefficient k (model parameter)"""
@@ -159,7 +166,8 @@ class HOSH4P1LProcedure(PQProcedure):
             pars = hosh_pars,
             Boundaries = input, 
             InitialConditions = [self.SurfaceStorage,self.SoilStorage],
-            Proc = self.Proc)
+            Proc = self.Proc,
+            engine = self.runoff_engine)
 
     _required_extra_pars : list = ["area", "ae", "rho", "wp"]
     """When inheriting this class, override this property according to the procedure requirements. Method self.setBasinMetadata iterates this list to check for missing extra parameters (e.g. basin parameters)"""
@@ -1,14 +1,16 @@
 from pydrodelta.procedure_function_results import ProcedureFunctionResults
 from pydrodelta.function_boundary import FunctionBoundary
 from pydrodelta.pydrology import LagAndRoute
+from pydrodelta.routing_kernel import linearReservoirCascadeSets
 from pydrodelta.procedure import Procedure
 from pydrodelta.model_parameter import ModelParameter
 import numpy as np
+from numpy.typing import NDArray
 from typing import Union, List, TypedDict, Tuple, Optional, Mapping, Any
 from typing_extensions import Unpack
 from ..types.procedure_init_kwargs import ProcedureInitKwargs
 from ..types import ExecInput
-from pandas import DataFrame
+from pandas import DataFrame, Index
 
 class LagAndRouteParsDict(TypedDict):
        lag : float
@@ -151,3 +153,41 @@ class LagAndRouteProcedure(Procedure):
                 data = data
             )
         )
+
+    def execBatch(
+        self,
+        parameter_matrix : NDArray[np.float64],
+        input : ExecInput = None,
+        result_index : int = 0
+        ) -> Tuple[Index, NDArray[np.float64]]:
+        """Same as Procedure.execBatch, lagging the inflow of each parameter set and routing all of them at once with routing_kernel.linearReservoirCascadeSets. Falls back to the generic loop when a parameter set has no routing (k or n equal to 0) or initial states are given per reservoir"""
+        if input is None:
+            input = self.loadInput(inplace=False)
+        if isinstance(input, DataFrame):
+            input = [input]
+        initial_conditions = self.initial_states if isinstance(self.initial_states, list) else list(self.initial_states.values())
+        if len(initial_conditions) > 1:
+            return super().execBatch(parameter_matrix, input, result_index)
+        input_list = self.extractListsFromInput(input, allow_na=[False,True])
+        inflow = np.array(input_list[0], dtype='float')
+        length = len(input[0])
+        lagged_inflows = np.zeros((len(parameter_matrix), length))
+        k = np.empty(len(parameter_matrix))
+        n = np.empty(len(parameter_matrix), dtype=int)
+        for i, parameters in enumerate(parameter_matrix):
+            self.setParameters(parameters.tolist())
+            engine = LagAndRoute(pars=self.pars_list, Boundaries=[[0]], dt=self.dt)
+            if engine.routingSystem is None:
+                return super().execBatch(parameter_matrix, input, result_index)
+            lag = int(round(engine.lag))
+            if lag < length:
+                lagged_inflows[i,lag:] = inflow[:length - lag]
+            k[i] = engine.k
+            n[i] = engine.n
+        outflows = linearReservoirCascadeSets(
+            lagged_inflows,
+            k,
+            n,
+            dt = self.dt,
+            initial_condition = initial_conditions[0] if len(initial_conditions) else 0)
+        return input[0].index, outflows[:,:length]
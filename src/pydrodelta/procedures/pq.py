@@ -1,8 +1,11 @@
 from ..procedure import Procedure
 from ..function_boundary import FunctionBoundary
-from typing import TypedDict, Optional, Union, List, Any, Mapping
+from typing import TypedDict, Optional, Union, List, Any, Mapping, Tuple, Dict, Iterator
 from typing_extensions  import Unpack
 from ..types.procedure_init_kwargs import ProcedureInitKwargs
+from pandas import DataFrame, Index
+import numpy as np
+from numpy.typing import NDArray
 
 import logging
 
@@ -18,6 +21,114 @@ class PQExtraParsDict(TypedDict, total=False):
     wp : float
     """wilting point of soil (0-1)"""
 
+class PQForcings:
+    """Boundary conditions of a PQ procedure as contiguous float arrays sharing a single time index.
+
+    The input is read once: missing values of the required series are either filled up with zeros (fill_nulls=True) or the series are truncated at the first missing value (fill_nulls=False), logging the same warnings as the step-by-step loops did. Procedures then iterate plain floats with steps(), write into the buffers allocated with outputs() and build the results DataFrame once with results()"""
+
+    series = ("pma", "etp", "q_obs", "smc_obs")
+    """Boundary names, in results column order"""
+
+    index : Index
+    """Time index"""
+
+    pma : NDArray[np.float64]
+    """Mean areal precipitation"""
+
+    etp : NDArray[np.float64]
+    """Potential evapotranspiration"""
+
+    q_obs : NDArray[np.float64]
+    """Observed discharge (nan where missing)"""
+
+    smc_obs : NDArray[np.float64]
+    """Observed soil moisture (nan where missing)"""
+
+    def __init__(
+        self,
+        input : DataFrame,
+        fill_nulls : bool = False,
+        required : Tuple[str,...] = ("pma", "etp")):
+        """
+        Args:
+            input (DataFrame): pivoted boundaries (columns pma, etp, q_obs, smc_obs). Missing optional columns are set to nan
+            fill_nulls (bool, optional): fill missing values of the required series with zeros. Else, truncate at the first missing value. Defaults to False.
+            required (Tuple[str,...], optional): series to which the fill_nulls policy applies, in order of precedence. Defaults to ("pma", "etp").
+        """
+        self.index = input.index
+        for name in self.series:
+            setattr(self, name, input[name].to_numpy(dtype=float, copy=True) if name in input.columns else np.full(len(input), np.nan))
+        self.fillNulls(fill_nulls, required)
+
+    @classmethod
+    def fromList(
+        cls,
+        input : List[DataFrame],
+        fill_nulls : bool = False,
+        required : Tuple[str,...] = ("pma", "etp")) -> "PQForcings":
+        """Create from a list of unpivoted series (pma, etp[, q_obs[, smc_obs]]) with column 'valor', aligned to the index of the first one"""
+        index = input[0].index
+        return cls(
+            DataFrame({name: input[i]["valor"].reindex(index) for i, name in enumerate(cls.series[:len(input)])}, index = index),
+            fill_nulls,
+            required)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def fillNulls(
+        self,
+        fill_nulls : bool,
+        required : Tuple[str,...]) -> None:
+        if not len(required):
+            return
+        missing = {name: np.isnan(getattr(self, name)) for name in required}
+        any_missing = np.logical_or.reduce([missing[name] for name in required])
+        if not any_missing.any():
+            return
+        if fill_nulls:
+            for k in np.flatnonzero(any_missing):
+                for name in required:
+                    if missing[name][k]:
+                        logging.warning("Missing %s value for date: %s. Filling up with 0" % (name, self.index[k]))
+            for name in required:
+                getattr(self, name)[missing[name]] = 0
+        else:
+            last = int(np.argmax(any_missing))
+            name = [name for name in required if missing[name][last]][0]
+            logging.warning("Missing %s value for date: %s. Unable to continue" % (name, self.index[last]))
+            self.truncate(last)
+
+    def truncate(
+        self,
+        length : int) -> None:
+        """Keep the first length steps"""
+        self.index = self.index[:length]
+        for name in self.series:
+            setattr(self, name, getattr(self, name)[:length])
+
+    def steps(self) -> Iterator[Tuple[int, Any, float, float, float, float]]:
+        """Iterate steps as (k, timestart, pma, etp, q_obs, smc_obs), with python floats"""
+        return zip(range(len(self)), self.index, self.pma.tolist(), self.etp.tolist(), self.q_obs.tolist(), self.smc_obs.tolist())
+
+    def outputs(
+        self,
+        names : List[str]) -> Dict[str, Any]:
+        """Allocate one float buffer (filled with nan) per name, of the length of the forcings. Buffers may be replaced by other sequences of the same length (e.g. integer arrays or lists of objects): the results column order is the order of names"""
+        return {name: np.full(len(self), np.nan) for name in names}
+
+    def results(
+        self,
+        outputs : Mapping[str, Any]) -> DataFrame:
+        """Build the results DataFrame: the forcings followed by the outputs, indexed by timestart. Object columns holding numbers are converted to numeric dtypes"""
+        results = DataFrame({
+            "timestart": self.index,
+            **{name: getattr(self, name) for name in self.series},
+            **outputs
+        }).infer_objects()
+        results.set_index("timestart", inplace=True)
+        return results
+
 class PQProcedure(Procedure):
     _boundaries = [
         FunctionBoundary({"name": "pma"}),
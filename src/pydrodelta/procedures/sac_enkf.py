@@ -4,11 +4,15 @@ from typing_extensions import Unpack
 from ..types.procedure_init_kwargs import ProcedureInitKwargs
 from ..series_data import SeriesData
 import numpy as np 
-from pandas import DataFrame, Series, concat, Timestamp
+from numpy.typing import NDArray
+from pandas import DataFrame, Series, concat, Timestamp, Index
 from datetime import datetime
 from ..util import get_stats, StatsDict
 from ..procedure_function_results import ProcedureFunctionResults
 import pydrodelta.procedures.sacramento_simplified as sac
+from ..procedure import Procedure
+from .. import sac_enkf_kernel
+from .pq import PQForcings
 
 from ..descriptors.list_descriptor import ListDescriptor
 
@@ -24,6 +28,7 @@ class AsimParsDict(TypedDict, total=False):
     xpert : bool
     replicates : int
     stddev_forzantes: List[float]
+    seed : int
 
 class Asim(NamedTuple):
     sm : bool
@@ -152,6 +157,11 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
         """Number of ensemble members"""
         return self.asim_pars["replicates"] if "replicates" in self.asim_pars else self._kalman_def["replicates"]
 
+    @property
+    def seed(self) -> Optional[int]:
+        """Seed of the random number streams of the fast engine. If not set, runs are not reproducible"""
+        return self.asim_pars["seed"] if "seed" in self.asim_pars else None
+
     ens : List[sac.States]
     """Ensemble of model states (length = len(self.replicates) list of 4-tuples)"""
 
@@ -194,7 +204,8 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
             - asim : 2-tuple of str or None - Option to assimilate soil moisture and discharge, respectively
             - update : 4-tuple or str or None - Option to correct model states via data assimilation (x1, x2, x3, x4)
             - xpert : bool - Option to add noise to model states at the beginning of each step
-            - replicates : int - Number of ensemble members"""
+            - replicates : int - Number of ensemble members
+            - seed : int - Seed of the random number streams of the fast engine (extra_pars.engine = "fast")"""
         super().__init__(
             parameters=parameters,
             initial_states=initial_states,
@@ -655,6 +666,47 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
             self.ens[j] = sac.States(*updated)
         return err
 
+    def asimilaArray(
+        self,
+        ens : np.ndarray,
+        obs : list,
+        R : list,
+        KG_j : np.ndarray,
+        rng : np.random.Generator
+        ) -> np.ndarray:
+        """Same as asimila, for an ensemble stored as a (replicates x 4) array (engine: "fast")
+        
+        Parameters:
+        -----------
+        ens : numpy.ndarray
+            Ensemble of model states (replicates x 4)
+
+        obs : list
+            Available observations for data assimilation
+        
+        R : list
+            Observation error covariance matrix
+        
+        KG_j : numpy.ndarray
+            Kalman gain matrix
+
+        rng : numpy.random.Generator
+            Random number generator for the observation perturbations
+        
+        Returns:
+        --------
+        updated ensemble : numpy.ndarray
+        """
+        if self.H is None:
+            raise Exception("H is not set")
+        update = np.flatnonzero(self.update)
+        H = np.array(self.H)[0:len(obs)]
+        # as in asimila, the innovation of the first member is applied to every member
+        err = np.array(obs) + rng.standard_normal(len(obs)) * np.sqrt(np.diag(R)) - np.matmul(H, ens[0,update])
+        updated = np.array(ens, dtype=float)
+        updated[:,update] += np.matmul(KG_j, err)
+        return sac_enkf_kernel.constrainStates(updated, self.x1_0, self.x2_0)
+
     def resultsDF(self) -> DataFrame:
         """Convert simulation results into a DataFrame"""
         results =  DataFrame({
@@ -682,20 +734,35 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
         """Generate single-row DataFrame from simulation states and outputs"""
         return DataFrame([[timestart, x1, x2, x3, x4, q4, smc]], columns= ["timestart", "x1", "x2", "x3", "x4", "q4", "smc"])
 
+    def getStateTrajectory(self) -> Optional[DataFrame]:
+        """Not supported: the ensemble is initialized from the states of the last assimilation (self.x), not from initial_states"""
+        return None
+
+    def execBatch(
+        self,
+        parameter_matrix : NDArray[np.float64],
+        input : Optional[Union[DataFrame,List[DataFrame]]]=None,
+        result_index : int = 0
+        ) -> Tuple[Index, NDArray[np.float64]]:
+        """Runs the generic Procedure.execBatch loop (the assimilation steps are not covered by the batch kernels of SacramentoSimplifiedProcedure)"""
+        return Procedure.execBatch(self, parameter_matrix, input, result_index)
+
     def exec(
         self,
         input : Optional[Union[DataFrame,List[DataFrame]]]=None
         ) -> Tuple[List[DataFrame], ProcedureFunctionResults]:
+        if input is None:
+            input = cast(List[DataFrame],self.loadInput(inplace=False,pivot=False))
+        elif isinstance(input,DataFrame):
+            input = [input]
+        if self.engine == "fast":
+            return self.execFast(input)
+
         init_states = [self.constraint(self.x[i],self._statenames[i]) for i in range(4)]
         self.setInitialEnsemble(init_states)
         x = sac.States(*init_states)
         x_al = sac.States(*init_states)
         denom_rk = (2,2,1)
-        
-        if input is None:
-            input = cast(List[DataFrame],self.loadInput(inplace=False,pivot=False))
-        elif isinstance(input,DataFrame):
-            input = [input]
         results = DataFrame({
             "timestart": Series(dtype='datetime64[ns]'),
             "pma": Series(dtype='float'),
@@ -745,15 +812,13 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
         if len(input) < 2:
             raise Exception("Missing input series: at least pma and etp required")
 
-        k = -1
-        # iterate series using pma's index:
-        for timestart, row in input[0].iterrows():
-            k = k + 1
-            pma = row["valor"]
-            etp = input[1].loc[[timestart]].valor.item()
-            q_obs = float(input[2].loc[[timestart]].valor.item()) if len(input) > 2 else None
-            smc_obs = input[3].loc[[timestart]].valor.item() if len(input) > 3 else None
-            smc_var = input[4].loc[[timestart]].valor.item() if len(input) > 4 else None
+        # align series to pma's index
+        forcings = PQForcings.fromList(input[0:4], required = ())
+        smc_var_series = input[4]["valor"].reindex(forcings.index).tolist() if len(input) > 4 else None
+        for k, timestart, pma, etp, q_obs_k, smc_obs_k in forcings.steps():
+            q_obs = q_obs_k if len(input) > 2 else None
+            smc_obs = smc_obs_k if len(input) > 3 else None
+            smc_var = smc_var_series[k] if smc_var_series is not None else None
             smc = (self.rho - self.wp) * x[0] / self.x1_0 + self.wp
 
             innov = dict()
@@ -785,7 +850,7 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
             q_ = q_obs if q_obs is not None and q_obs != -9999 else None
             sm_ = smc_obs+self.wp if smc_obs is not None and smc_obs != -1 else None
             if pma is None or etp is None:
-                raise Exception("pma and/or etp value missing in step %s" % str(row["timestart"]))
+                raise Exception("pma and/or etp value missing in step %s" % str(timestart))
             
             self.sm_obs.append(sm_)
             
@@ -922,3 +987,154 @@ class SacEnkfProcedure(sac.SacramentoSimplifiedProcedure):
             ],
             procedure_results
         )
+
+    def execFast(
+        self,
+        input : List[DataFrame]
+        ) -> Tuple[List[DataFrame], ProcedureFunctionResults]:
+        """Same as exec, using the ensemble kernel (engine: "fast"). 
+        
+        The ensembles (self.ens, self.ens1, self.ens2) are kept as (replicates x 4) arrays and advanced at once with sac_enkf_kernel.advance, the covariance matrix and the state update are computed with matrix operations and the input series are aligned to the index of the first series (pma) once. Random numbers are drawn from four independent streams (initial ensemble, forcings, observations and states perturbation) spawned from self.seed. The assimilation scheme is the same as in exec. Missing soil moisture observations are not assimilated. Results data has one row per step"""
+        if len(input) < 2:
+            raise Exception("Missing input series: at least pma and etp required")
+        forcings = PQForcings.fromList(input[0:4], required = ())
+        index = forcings.index
+        pma = forcings.pma
+        etp = forcings.etp
+        q_obs = forcings.q_obs if len(input) > 2 else None
+        smc_obs = forcings.smc_obs if len(input) > 3 else None
+        smc_var = input[4]["valor"].reindex(index).to_numpy(dtype=float) if len(input) > 4 else None
+        missing = np.isnan(pma) | np.isnan(etp)
+        if missing.any():
+            raise Exception("pma and/or etp value missing in step %s" % str(index[int(np.argmax(missing))]))
+        init_rng, forcings_rng, obs_rng, pert_rng = [np.random.default_rng(s) for s in np.random.SeedSequence(self.seed).spawn(4)]
+        replicates = self.replicates
+        pars = np.array([self.x1_0, self.x2_0, self.m1, self.c1, self.c2, self.c3, self.mu, self.alfa, self.m2, self.m3], dtype=float)
+        max_npasos = -1 if self.max_npasos is None else int(self.max_npasos)
+        update = np.flatnonzero(self.update)
+
+        def toSmc(x1 : float) -> float:
+            return x1 * (self.rho - self.wp) / self.x1_0 + self.wp
+
+        def toQ(x4 : float) -> float:
+            return x4 * self.alfa * self.area / 1000 / 24 / 60 / 60
+
+        def advance(x : np.ndarray, p : np.ndarray, pet : np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            return sac_enkf_kernel.advance(x, p, pet, pars, bool(self.no_check1), bool(self.no_check2), max_npasos, bool(self.rk2))
+
+        # initial ensemble
+        init_states = np.array([self.constraint(self.x[i],self._statenames[i]) for i in range(4)], dtype=float)
+        scale = np.array([self.x1_0, self.x2_0, init_states[2], init_states[3]]) * self.x_stddev
+        ens = sac_enkf_kernel.constrainStates(init_states + init_rng.standard_normal((replicates, 4)) * scale, self.x1_0, self.x2_0)
+        ens1 = ens.copy()
+        ens2 = ens.copy()
+        x_al = init_states.copy()
+        smc = toSmc(init_states[0])
+        self.sm_sim = list()
+        self.sm_obs = list()
+
+        rows = []
+        KG_list = []
+        for k, timestart in enumerate(index):
+            obs = []
+            smc_obs_k = smc_obs[k] if smc_obs is not None and not np.isnan(smc_obs[k]) else None
+            if smc_obs_k is not None and self.asim[0]:
+                smc_obs_k = max(smc,self.wp) if self.trim_sm[0] else smc_obs_k
+                smc_obs_k = min(smc,self.rho) if self.trim_sm[1] else smc_obs_k
+                smc_obs_k -= self.wp
+                obs.append(smc_obs_k)
+                innov_sm = True
+            else:
+                innov_sm = False
+            q_obs_k = float(q_obs[k]) if q_obs is not None else None
+            qvar = None
+            if q_obs_k is not None and not np.isnan(q_obs_k) and self.asim[1]:
+                qvar, qbias = self.q(q_obs_k)
+                obs.append(q_obs_k)
+                innov_q = True
+            else:
+                innov_q = False
+            smc_var_k = smc_var[k] if smc_var is not None else None
+            sm_al = toSmc(x_al[0])
+            q_al = toQ(x_al[3])
+            self.sm_sim.append(sm_al)
+            q_ = q_obs_k if q_obs_k is not None and q_obs_k != -9999 else None
+            self.sm_obs.append(smc_obs_k + self.wp if smc_obs_k is not None and smc_obs_k != -1 else None)
+
+            # ensemble means before assimilation
+            means_min = ens.mean(axis=0)
+            means_h1 = ens1.mean(axis=0)
+            means_h2 = ens2.mean(axis=0)
+            self.mediassinpert = means_min[update].tolist()
+
+            # assimilation
+            deviations = ens[:,update] - means_min[update]
+            C = np.matmul(deviations.T, deviations) / replicates
+            R, H_j = self.getR(Asim(innov_sm, innov_q), qvar, smc_var_k)
+            if len(R) > 0:
+                KG_j = self.getKG(H_j, C.tolist(), R)
+                ens2 = ens1
+                ens1 = ens
+                ens = self.asimilaArray(ens, obs, R, KG_j, obs_rng)
+            else:
+                KG_j = None
+            KG_list.append(KG_j.tolist() if KG_j is not None else None)
+
+            # ensemble stats after assimilation
+            means = ens.mean(axis=0)
+            sorted_ens = np.sort(ens, axis=0)
+            p10 = sorted_ens[int(0.10 * (replicates - 1))]
+            p90 = sorted_ens[int(0.90 * (replicates - 1))]
+            Q_out_plus = toQ(means[3])
+            if self.par_fg is not None:
+                Qcurrent = q_ if q_ is not None else Q_out_plus
+                (fg1, fg2) = self.computeFloodGuidance(sac.States(*means.tolist()),Qcurrent)
+            else:
+                fg1 = None
+                fg2 = None
+            rows.append([
+                timestart, pma[k], etp[k], q_obs_k, smc_obs_k, smc_var_k, *means.tolist(), toQ(means[2]), Q_out_plus, toSmc(means[0]), k, fg1, fg2,
+                toQ(means_min[3]), toQ(means_h1[3]), toQ(means_h2[3]),
+                toSmc(sorted_ens[0,0]), toSmc(p10[0]), toSmc(p90[0]), toSmc(sorted_ens[-1,0]),
+                toQ(sorted_ens[0,3]), toQ(p10[3]), toQ(p90[3]), toQ(sorted_ens[-1,3]),
+                *x_al.tolist(), q_al, sm_al,
+                *means_min.tolist(), *means_h1.tolist(), toSmc(means_h1[0]), *means_h2.tolist(), toSmc(means_h2[0])])
+
+            # advance step: the three ensembles share the perturbed forcings
+            p_alt = np.maximum(pma[k] + forcings_rng.standard_normal(replicates) * (self.p_stddev * pma[k]), 0)
+            pet_alt = np.maximum(etp[k] + forcings_rng.standard_normal(replicates) * self.pet_stddev, 0)
+            x, npasos = advance(np.vstack([ens, ens1, ens2]), np.tile(p_alt, 3), np.tile(pet_alt, 3))
+            ens, ens1, ens2 = x[0:replicates], x[replicates:2*replicates], x[2*replicates:]
+            x, npasos = advance(x_al[np.newaxis,:], np.array([pma[k]]), np.array([etp[k]]))
+            x_al = x[0]
+            if self.xpert:
+                x_al = sac_enkf_kernel.constrainStates((x_al * (pert_rng.standard_normal(4) * self.x_stddev))[np.newaxis,:], self.x1_0, self.x2_0)[0]
+            rows[-1].append(int(npasos[0]))
+
+        self.ens = [sac.States(*x) for x in ens.tolist()]
+        self.ens1 = [sac.States(*x) for x in ens1.tolist()]
+        self.ens2 = [sac.States(*x) for x in ens2.tolist()]
+        columns = ["timestart", "pma", "etp", "q_obs", "smc_obs", "smc_var", "x1", "x2", "x3", "x4", "q3", "q4", "smc", "k", "fg1", "fg2","q4_min","q4_h1","q4_h2", "smc_min", "smc_p10", "smc_p90", "smc_max", "q_min", "q_p10", "q_p90", "q_max"]
+        data = DataFrame(rows, columns = columns + [
+            "x1_al", "x2_al", "x3_al", "x4_al", "q4_al", "smc_al",
+            "x1_min", "x2_min", "x3_min", "x4_min",
+            "x1_h1", "x2_h1", "x3_h1", "x4_h1", "smc_h1",
+            "x1_h2", "x2_h2", "x3_h2", "x4_h2", "smc_h2",
+            "substeps"])
+        data["KG"] = KG_list
+        data.set_index("timestart", inplace=True)
+        results = data[columns[1:]]
+        procedure_results = ProcedureFunctionResults(
+            border_conditions = results[["pma","etp","q_obs","smc_obs","smc_var"]],
+            initial_states = self.initial_states,
+            states = results[["x1","x2","x3","x4"]],
+            parameters = self.parameters,
+            data = data
+        )
+        return (
+            [
+                results[["q4","q_p10","q_p90"]].rename(columns={"q4":"valor", "q_p10": "inferior", "q_p90": "superior"}),
+                results[["smc","smc_p10", "smc_p90"]].rename(columns={"smc":"valor","smc_p10": "inferior", "smc_p90": "superior"})
+            ],
+            procedure_results
+        )
@@ -1,19 +1,22 @@
 import logging
 from typing import Optional, List
-from pandas import DataFrame, Timestamp
+from pandas import DataFrame, Timestamp, Index
 from math import sqrt
 from typing import Union, Tuple, NamedTuple, Dict, TypedDict, cast
 from typing_extensions import Unpack
 from ..types.procedure_init_kwargs import ProcedureInitKwargs
 import numpy as np
+from numpy.typing import NDArray
 from ..procedure_function_results import ProcedureFunctionResults
-from ..procedures.pq import PQProcedure, PQExtraParsDict
+from ..procedures.pq import PQProcedure, PQExtraParsDict, PQForcings
 from ..util import interval2timedelta, relativedeltaToSeconds, IntervalDict
 from ..model_parameter import ModelParameter
 from ..model_state import ModelState
 from ..descriptors.float_descriptor import FloatDescriptor
 from ..descriptors.list_descriptor import ListDescriptor
 from ..descriptors.dataframe_descriptor import DataFrameDescriptor
+from .. import sacramento_simplified_kernel
+from .. import sac_enkf_kernel
 
 class SacInitialStatesDict(TypedDict):
     x1 : float
@@ -60,6 +63,7 @@ class SacExtraParsDict(PQExtraParsDict, total=False):
     rk2: bool
     mock_run: bool
     compute_mass_balance : bool
+    engine : str
 
 
 class States(NamedTuple):
@@ -279,6 +283,11 @@ class SacramentoSimplifiedProcedure(PQProcedure):
         """compute mass balance"""
         return self.extra_pars["compute_mass_balance"] if "compute_mass_balance" in self.extra_pars else False
 
+    @property
+    def engine(self) -> str:
+        """Execution engine: "reference" (default) or "fast" (state-array kernel, see sacramento_simplified_kernel)"""
+        return self.extra_pars["engine"] if "engine" in self.extra_pars else "reference"
+
     volume = FloatDescriptor()
     """Water balance"""    
 
@@ -373,6 +382,8 @@ class SacramentoSimplifiedProcedure(PQProcedure):
                 Perform step subdivision based on states derivatives (for numerical stability)        
             - rk2 : bool
                 Use Runge-Kutta-2 instead of Runge-Kutta-4
+            - engine : str
+                Execution engine: "reference" (default) or "fast". The fast engine runs a state-array kernel (compiled with numba if available). Results are numerically equivalent but X and Xw are not recorded
         
         initial_states : list
         
@@ -556,89 +567,150 @@ class SacramentoSimplifiedProcedure(PQProcedure):
                 tag_column=False))
         elif isinstance(input, list):
             input = input[0]
+
+        if self.engine == "fast" and not self.mock_run:
+            return self.execFast(input)
         
         # initialize states
         self.x = States(*[self.constraint(self.initial_states_list[i],self._statenames[i]) for i in range(4)])
-        step = 0
         if self.compute_mass_balance:
             self.flows = DataFrame(columns = ["step", "substep", "substep_duration", "p", "sr", "et1", "int", "pc", "et2", "gw", "bf", "q2", "q3","deep_perc", "x1", "x2", "x3", "x4", "X1", "X2", "X3", "X4"])
 
         # series: pma*, etp*, q_obs, smc_obs [*: required]
         if len(input) < 2:
             raise Exception("Missing input series: at least pma and etp required")
-        # instantiate lists for statistics computation
-        sim = []
-        obs = []
-        sm_obs = []
-        sm_sim = []
-        k = -1
-        result_rows = []
-        # iterate series using pma's index:
-        for i, row in input.iterrows():
-            k = k + 1
-            pma = row["pma"]
-            etp = row["etp"] # input[1].loc[[i]].valor.item()
-            q_obs = row["q_obs"] # input[2].loc[[i]].valor.item() if len(input) > 2 else None
-            smc_obs = row["smc_obs"] # input[3].loc[[i]].valor.item() if len(input) > 3 else None
-
-            if self.mock_run:
-                result_rows.append([i, pma, etp, q_obs, smc_obs, self.x[0], self.x[1], self.x[2], self.x[3], 0, 0, 0, k, 0, 0, 1])
-                sim.append(0)
-                obs.append(0)
-                continue
-
-            smc = (self.rho - self.wp) * self.x[0] / self.x1_0 + self.wp
-
-            if np.isnan(pma):
-                if self.fill_nulls:
-                    logging.warning("Missing pma value for date: %s. Filling up with 0" % i)
-                    pma = 0
-                else:
-                    logging.warning("Missing pma value for date: %s. Unable to continue" % i)
-                    break
-            if etp is None:
-                if self.fill_nulls:
-                    logging.warning("Missing etp value for date: %s. Filling up with 0" % i)
-                    etp = 0
-                else:
-                    logging.warning("Missing etp value for date: %s. Unable to continue" % i)
-                    break
+        # missing pma values are filled up with 0 or truncate the run (fill_nulls) before the time loop
+        forcings = PQForcings(input, self.fill_nulls, required = () if self.mock_run else ("pma",))
+        outputs = forcings.outputs(["x0", "x1", "x2", "x3", "q3", "q4", "smc", "k", "fg1", "fg2", "substeps", "deep_perc", "real_et"])
+        outputs["k"] = np.arange(len(forcings))
+        outputs["fg1"] = [None] * len(forcings)
+        outputs["fg2"] = [None] * len(forcings)
+        outputs["substeps"] = np.ones(len(forcings), dtype=int)
+
+        if self.mock_run:
+            for i in range(4):
+                outputs["x%i" % i][:] = self.x[i]
+            for key in ("q3", "q4", "smc", "deep_perc", "real_et"):
+                outputs[key][:] = 0
+            return self.setResults(forcings.results(outputs))
+
+        for k, i, pma, etp, q_obs, smc_obs in forcings.steps():
             # calculate fluxes at the beggining of the step 
-            q3 = self.area * self.alfa * self.x[2] / 1000 / self.dt_sec * self.ae
-            q4 = self.area * self.alfa * self.x[3] / 1000 / self.dt_sec * self.ae
-            deep_perc = self.c3 * self.x[1] * (1 - (1 + self.mu)**(-1) )
-            real_et = etp * (self.x[0] / self.x1_0  + (1 - self.x[0] / self.x1_0) * (self.x[1] / self.x2_0)**self.m3)
-            smcsim = (self.rho - self.wp) * self.x[0] / self.x1_0 + self.wp
-            gl_date = i
-            q_ = q_obs
-            sm_ = min(max(smc,self.wp),self.rho) if smc is not None else None
-            sm_obs.append(sm_)
-            sm_sim.append(smcsim)
+            outputs["x0"][k], outputs["x1"][k], outputs["x2"][k], outputs["x3"][k] = self.x
+            outputs["q3"][k] = self.area * self.alfa * self.x[2] / 1000 / self.dt_sec * self.ae
+            outputs["q4"][k] = self.area * self.alfa * self.x[3] / 1000 / self.dt_sec * self.ae
+            outputs["deep_perc"][k] = self.c3 * self.x[1] * (1 - (1 + self.mu)**(-1) )
+            outputs["real_et"][k] = etp * (self.x[0] / self.x1_0  + (1 - self.x[0] / self.x1_0) * (self.x[1] / self.x2_0)**self.m3)
+            outputs["smc"][k] = (self.rho - self.wp) * self.x[0] / self.x1_0 + self.wp
             # flood guidance
             if self.par_fg is not None:
-                Qcurrent = q_ if q_ is not None else q4
-                (fg1, fg2) = self.computeFloodGuidance(self.x,Qcurrent)
-            else:
-                fg1 = None
-                fg2 = None
+                Qcurrent = q_obs if q_obs is not None else outputs["q4"][k]
+                (outputs["fg1"][k], outputs["fg2"][k]) = self.computeFloodGuidance(self.x,Qcurrent)
 
-            # new_row = DataFrame([[i, pma, etp, q_obs, smc_obs, x[0], x[1], x[2], x[3], q3, q4, smcsim, k, fg1, fg2, None]], columns= ["timestart", "pma", "etp", "q_obs", "smc_obs", "x0", "x1", "x2", "x3", "q3", "q4", "smc", "k", "fg1", "fg2","substeps"])
-            
             #advance step
-            x_0 = States(*self.x)
-            (self.x, npasos) = self.advance_step(self.x,pma,etp, cast(Timestamp, i))
-            # new_row.loc[[0],'substeps'] = npasos
-            
-            # write row
-            result_rows.append([i, pma, etp, q_obs, smc_obs, x_0[0], x_0[1], x_0[2], x_0[3], q3, q4, smcsim, k, fg1, fg2, npasos, deep_perc, real_et])
-            if q_obs is not None:
-                sim.append(q4)
-                obs.append(q_obs)
+            (self.x, outputs["substeps"][k]) = self.advance_step(self.x,pma,etp, cast(Timestamp, i))
         
-        results = DataFrame(result_rows, columns= ["timestart", "pma", "etp", "q_obs", "smc_obs", "x0", "x1", "x2", "x3", "q3", "q4", "smc", "k", "fg1", "fg2","substeps","deep_perc","real_et"])
-        results.set_index("timestart", inplace=True)
-        # results = concat(result_rows).set_index("timestart")
-        # logging.debug(str(results))
+        return self.setResults(forcings.results(outputs))
+
+    def execFast(
+            self,
+            input : DataFrame
+            ) -> Tuple[List[DataFrame], ProcedureFunctionResults]:
+        """Same as exec, using the state-array kernel (engine: "fast")"""
+        # initialize states
+        self.x = States(*[self.constraint(self.initial_states_list[i],self._statenames[i]) for i in range(4)])
+        if len(input) < 2:
+            raise Exception("Missing input series: at least pma and etp required")
+        forcings = PQForcings(input, self.fill_nulls, required = ("pma",))
+        pma = forcings.pma
+        etp = forcings.etp
+        states, substeps, flows = sacramento_simplified_kernel.run(
+            pma,
+            etp,
+            np.array(self.x, dtype=float),
+            np.array([self.x1_0, self.x2_0, self.m1, self.c1, self.c2, self.c3, self.mu, self.alfa, self.m2, self.m3], dtype=float),
+            bool(self.no_check1),
+            bool(self.no_check2),
+            -1 if self.max_npasos is None else int(self.max_npasos),
+            bool(self.rk2),
+            bool(self.compute_mass_balance))
+        self.x = States(*states[-1].tolist())
+        x = states[:-1]
+        q_obs = forcings.q_obs
+        if self.par_fg is not None:
+            fg = [self.computeFloodGuidance(States(*x[k]), q_obs[k]) for k in range(len(x))]
+        else:
+            fg = [(None, None)] * len(x)
+        # fluxes at the beggining of each step
+        results = forcings.results({
+            "x0": x[:,0],
+            "x1": x[:,1],
+            "x2": x[:,2],
+            "x3": x[:,3],
+            "q3": self.area * self.alfa * x[:,2] / 1000 / self.dt_sec * self.ae,
+            "q4": self.area * self.alfa * x[:,3] / 1000 / self.dt_sec * self.ae,
+            "smc": (self.rho - self.wp) * x[:,0] / self.x1_0 + self.wp,
+            "k": np.arange(len(x)),
+            "fg1": [f[0] for f in fg],
+            "fg2": [f[1] for f in fg],
+            "substeps": substeps,
+            "deep_perc": self.c3 * x[:,1] * (1 - (1 + self.mu)**(-1) ),
+            "real_et": etp * (x[:,0] / self.x1_0  + (1 - x[:,0] / self.x1_0) * (x[:,1] / self.x2_0)**self.m3)
+        })
+        if self.compute_mass_balance:
+            self.flows = DataFrame(flows, columns = sacramento_simplified_kernel.flow_columns)
+            self.flows["step"] = forcings.index[flows[:,0].astype(int)]
+            self.flows["substep"] = flows[:,1].astype(int)
+        return self.setResults(results)
+
+    def execBatch(
+            self,
+            parameter_matrix : NDArray[np.float64],
+            input : Optional[Union[List[DataFrame],DataFrame]] = None,
+            result_index : int = 0
+            ) -> Tuple[Index, NDArray[np.float64]]:
+        """Same as Procedure.execBatch, using the state-array kernels regardless of engine. With numba, the compiled kernel runs once per parameter set. Else, the parameter sets are advanced together as members of the ensemble kernel (see sacramento_simplified_kernel.min_vectorized_sets). Outputs are q4 (result_index=0) and smc (result_index=1)"""
+        if self.mock_run or result_index > 1:
+            return super().execBatch(parameter_matrix, input, result_index)
+        if input is None:
+            input = cast(DataFrame, self.loadInput(
+                inplace=False,
+                pivot=True,
+                use_boundary_name=True,
+                tag_column=False))
+        elif isinstance(input, list):
+            input = input[0]
+        if len(input) < 2:
+            raise Exception("Missing input series: at least pma and etp required")
+        forcings = PQForcings(input, self.fill_nulls, required = ("pma",))
+        pars = np.empty((len(parameter_matrix), 10))
+        x_init = np.empty((len(parameter_matrix), 4))
+        for i, parameters in enumerate(parameter_matrix):
+            self.setParameters(parameters.tolist())
+            pars[i] = [self.x1_0, self.x2_0, self.m1, self.c1, self.c2, self.c3, self.mu, self.alfa, self.m2, self.m3]
+            x_init[i] = [self.constraint(self.initial_states_list[j],self._statenames[j]) for j in range(4)]
+        no_check1 = bool(self.no_check1)
+        no_check2 = bool(self.no_check2)
+        max_npasos = -1 if self.max_npasos is None else int(self.max_npasos)
+        rk2 = bool(self.rk2)
+        if sacramento_simplified_kernel.njit is not None or len(pars) < sacramento_simplified_kernel.min_vectorized_sets:
+            states = np.empty((len(forcings) + 1, len(pars), 4))
+            for i in range(len(pars)):
+                states[:,i], _, _ = sacramento_simplified_kernel.run(forcings.pma, forcings.etp, x_init[i], pars[i], no_check1, no_check2, max_npasos, rk2, False)
+        else:
+            states, _ = sac_enkf_kernel.run(forcings.pma, forcings.etp, x_init, pars, no_check1, no_check2, max_npasos, rk2)
+        # states at the beggining of each step, shape (sets, steps)
+        if result_index == 0:
+            output = self.area * pars[:,7:8] * states[:-1,:,3].T / 1000 / self.dt_sec * self.ae
+        else:
+            output = (self.rho - self.wp) * states[:-1,:,0].T / pars[:,0:1] + self.wp
+        return forcings.index, output
+
+    def setResults(
+            self,
+            results : DataFrame
+            ) -> Tuple[List[DataFrame], ProcedureFunctionResults]:
+        """Set results and return procedure function outputs"""
         procedure_results = ProcedureFunctionResults(
             border_conditions = results[["pma","etp","q_obs","smc_obs"]],
             initial_states = self.initial_states,
@@ -670,6 +742,12 @@ class SacramentoSimplifiedProcedure(PQProcedure):
             procedure_results
         )
 
+    def getStateTrajectory(self) -> Optional[DataFrame]:
+        """States x1, x2, x3, x4 at the beginning of each step of the last run (see Procedure.getStateTrajectory)"""
+        if self.results is None or self.mock_run:
+            return None
+        return self.results[["x0","x1","x2","x3"]].set_axis(self._statenames, axis=1)
+
     # def setParameters(
     #     self, 
     #     parameters: Union[list, tuple, Mapping[str, Any]] = [],
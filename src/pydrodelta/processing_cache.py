@@ -0,0 +1,163 @@
+import logging
+import os
+import pickle
+import time
+import tempfile
+from pathlib import Path
+from typing import Optional, Union, List, Iterable
+from dateutil.relativedelta import relativedelta
+from a5client.util import interval2relativedelta
+from .series_cache import DEFAULT_CACHE_PATH
+from .util import parametersHash, relativedeltaToSeconds
+from .types.processing_cache_dict import ProcessingCacheDict
+
+PROCESSING_CACHE_FORMAT = 1
+"""Version of the stored entries. Increase it when the input processing steps change, so that entries computed by previous versions are not reused"""
+
+class ProcessingCache:
+    """Persistent, content-addressed cache of processed node variable data.
+
+    Each entry holds the state of a NodeVariable after the input processing steps that depend only on its loaded data and its configuration (removeOutliers, detectJumps, applyOffset, regularize, applyMovingAverage, fillNulls and adjust, see NodeVariable.dumpProcessedData). Entries are keyed by a hash of the loaded data and the processing parameters (see processingKey), so they are reused across executions, plans and analysis runs that share the cache directory. Entries are stored as one pickle file each.
+
+    Entries not read or written during max_age are evicted, and beyond max_size the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path : Optional[Union[str,Path]] = None,
+        max_size : float = 1024,
+        max_age : Union[dict,float,relativedelta] = {"days": 7}
+        ):
+        """
+        Parameters:
+        -----------
+        path : str or Path = None
+            Cache directory. Entries are saved into its 'processing' subdirectory. Defaults to ~/.cache/pydrodelta
+
+        max_size : float = 1024
+            Maximum size of the cache in megabytes
+
+        max_age : dict or float or relativedelta = {"days": 7}
+            Entries not used during this period are evicted
+        """
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_PATH
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive number")
+        self.max_size = max_size
+        self.max_age = interval2relativedelta(max_age)
+        self.entries_path = self.path / "processing"
+        self.entries_path.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        """Number of node variables restored from the cache"""
+        self.misses = 0
+        """Number of node variables processed because they were not found in the cache"""
+
+    def entryPath(self, key : str) -> Path:
+        return self.entries_path / ("%s.pkl" % key)
+
+    def read(
+        self,
+        keys : List[str]
+        ) -> Optional[List[dict]]:
+        """Read the entries of keys (the variables of a node). All of them are returned (and counted as hits) or, if any is missing, None is returned (and all are counted as misses)"""
+        entries = []
+        for key in keys:
+            entry_path = self.entryPath(key)
+            try:
+                with open(entry_path, "rb") as f:
+                    entries.append(pickle.load(f))
+            except FileNotFoundError:
+                self.misses += len(keys)
+                return None
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+                logging.warning("ProcessingCache: discarding unreadable entry %s: %s" % (key, str(e)))
+                entry_path.unlink(missing_ok=True)
+                self.misses += len(keys)
+                return None
+        for key in keys:
+            # last access, for eviction
+            self.entryPath(key).touch()
+        self.hits += len(keys)
+        return entries
+
+    def save(
+        self,
+        entries : Iterable[tuple]
+        ) -> int:
+        """Save entries given as (key, data) tuples, then evict. Returns the number of saved entries"""
+        count = 0
+        for key, data in entries:
+            fd, tmp_path = tempfile.mkstemp(dir=self.entries_path, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.entryPath(key))
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+            count += 1
+        if count:
+            self.evict()
+        return count
+
+    def size(self) -> float:
+        """Size of the stored entries in megabytes"""
+        return sum(entry.stat().st_size for entry in os.scandir(self.entries_path) if entry.is_file()) / 1024**2
+
+    def evict(self) -> int:
+        """Remove entries not used during max_age, then least recently used entries until the size of the cache is not greater than max_size. Returns the number of removed entries"""
+        entries = sorted(
+            [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in os.scandir(self.entries_path) if entry.is_file() and entry.name.endswith(".pkl")])
+        min_time = time.time() - relativedeltaToSeconds(self.max_age)
+        size = sum(entry[1] for entry in entries)
+        max_size = self.max_size * 1024**2
+        removed = 0
+        for mtime, entry_size, path in entries:
+            if mtime >= min_time and size <= max_size:
+                break
+            Path(path).unlink(missing_ok=True)
+            size -= entry_size
+            removed += 1
+        if removed:
+            logging.debug("ProcessingCache: evicted %i entries" % removed)
+        return removed
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        for entry in os.scandir(self.entries_path):
+            if entry.is_file():
+                Path(entry.path).unlink(missing_ok=True)
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """Fraction of node variable reads served from the cache. None if nothing was read"""
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def report(self) -> dict:
+        """Hits, misses, hit rate and size of the cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "size": self.size()
+        }
+
+def processingKey(*items) -> str:
+    """Cache key of a node variable: hash of its loaded data (see NodeVariable.loadedDataHash) and its processing parameters (see NodeVariable.processingParameters)"""
+    return parametersHash(PROCESSING_CACHE_FORMAT, *items)
+
+def createProcessingCache(
+    config : Optional[ProcessingCacheDict],
+    base_path : Optional[Path] = None
+    ) -> Optional[ProcessingCache]:
+    """Create ProcessingCache from configuration dict. Returns None if config is None. Relative paths are resolved against base_path"""
+    if config is None:
+        return None
+    path = config.get("path")
+    if path is not None and base_path is not None and not Path(path).is_absolute():
+        path = base_path / path
+    return ProcessingCache(
+        path = path,
+        max_size = config.get("max_size", 1024),
+        max_age = config.get("max_age", {"days": 7}))
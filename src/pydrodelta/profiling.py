@@ -0,0 +1,209 @@
+import logging
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union, Dict, Callable, Any, Iterator, ContextManager, Literal
+
+class TimingNode:
+    """Node of the timing tree: accumulated time and number of calls of a named section, counters (e.g. observations, bytes) and nested sections"""
+
+    def __init__(self, name : str):
+        self.name = name
+        self.calls = 0
+        self.time = 0.0
+        """Total seconds spent in the section, summed over calls"""
+        self.counters : Dict[str,float] = {}
+        self.children : Dict[str,"TimingNode"] = {}
+
+    def toDict(self) -> dict:
+        result : Dict[str,Any] = {
+            "name": self.name,
+            "calls": self.calls,
+            "time": self.time
+        }
+        if len(self.counters):
+            result["counters"] = dict(self.counters)
+        if len(self.children):
+            result["children"] = [child.toDict() for child in self.children.values()]
+        return result
+
+_current : "contextvars.ContextVar[Optional[TimingNode]]" = contextvars.ContextVar("pydrodelta_profiling_node", default=None)
+
+class Profiler:
+    """Collects a tree of timed sections. Sections opened inside another section (in the same thread, or in a thread pool task submitted with propagate) are nested into it. Thread-safe. In concurrent sections, the time of the children may add up to more than the time of the parent"""
+
+    def __init__(self):
+        self.root = TimingNode("root")
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, name : str) -> Iterator[TimingNode]:
+        """Time the enclosed block as section name of the current section"""
+        parent = _current.get()
+        parent = parent if parent is not None else self.root
+        with self._lock:
+            node = parent.children.get(name)
+            if node is None:
+                node = parent.children[name] = TimingNode(name)
+        token = _current.set(node)
+        t0 = time.perf_counter()
+        try:
+            yield node
+        finally:
+            elapsed = time.perf_counter() - t0
+            _current.reset(token)
+            with self._lock:
+                node.calls += 1
+                node.time += elapsed
+
+    def count(self, name : str, value : float = 1) -> None:
+        """Add value to counter name of the current section"""
+        node = _current.get()
+        node = node if node is not None else self.root
+        with self._lock:
+            node.counters[name] = node.counters.get(name, 0) + value
+
+    def toDict(self) -> dict:
+        """Timing tree. The root holds the wall time since the profiler was created"""
+        with self._lock:
+            self.root.calls = 1
+            self.root.time = time.perf_counter() - self._t0
+            return {
+                "started": self.started.isoformat(),
+                **self.root.toDict()
+            }
+
+    def save(self, output : Union[str,Path]) -> None:
+        """Save the timing tree as json"""
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(self.toDict(), f, indent=2)
+        logging.info("Profile saved to %s" % str(output))
+
+_profiler : Optional[Profiler] = None
+
+def getProfiler() -> Optional[Profiler]:
+    """The active profiler. None if profiling is not active"""
+    return _profiler
+
+def timer(name : str) -> ContextManager:
+    """Time the enclosed block as section name of the active profiler. Does nothing if profiling is not active"""
+    if _profiler is None:
+        return nullcontext()
+    return _profiler.timer(name)
+
+def count(name : str, value : float = 1) -> None:
+    """Add value to counter name of the current section of the active profiler. Does nothing if profiling is not active"""
+    if _profiler is not None:
+        _profiler.count(name, value)
+
+def countPayload(payload : Any) -> None:
+    """Count a request payload (one call and the size of its json representation in bytes) in the current section of the active profiler. The payload is only serialized if profiling is active"""
+    if _profiler is not None:
+        _profiler.count("requests")
+        _profiler.count("bytes", len(json.dumps(payload, default=str).encode()))
+
+def timed(
+    name : Union[str,Callable[...,str]],
+    counters : Optional[Callable[...,Dict[str,float]]] = None
+    ) -> Callable:
+    """Decorator that times each call of a function (or method) as a section of the active profiler.
+
+    Parameters:
+    -----------
+    name : str or callable
+        Section name, or function that takes the arguments of the call and returns the section name
+
+    counters : callable = None
+        Function that takes the first argument of the call (e.g. self) after the call and returns counters to add to the section
+    """
+    def decorator(func : Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.timer(name(*args, **kwargs) if callable(name) else name):
+                result = func(*args, **kwargs)
+                if counters is not None and len(args):
+                    for key, value in counters(args[0]).items():
+                        _profiler.count(key, value)
+                return result
+        return wrapper
+    return decorator
+
+def propagate(func : Callable) -> Callable:
+    """Bind func to the current section, so that sections opened by func when run in another thread (e.g. submitted to a thread pool) are nested into it. Call once per submission"""
+    if _profiler is None:
+        return func
+    context = contextvars.copy_context()
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
+
+@contextmanager
+def profile(
+    output : Optional[Union[str,Path]] = None,
+    dump : Optional[Union[str,Path]] = None,
+    profiler : Literal["cprofile","pyinstrument"] = "cprofile"
+    ) -> Iterator[Profiler]:
+    """Activate profiling for the enclosed block
+
+    Parameters:
+    -----------
+    output : str or Path = None
+        Save the timing tree (json) into this file on exit, also if the block raises
+
+    dump : str or Path = None
+        Also run a statistical/deterministic profiler and save its results into this file
+
+    profiler : "cprofile" or "pyinstrument" = "cprofile"
+        Profiler used for dump. cprofile saves pstats data (read it with pstats or snakeviz). pyinstrument (optional dependency) saves an html report
+    """
+    global _profiler
+    if _profiler is not None:
+        raise RuntimeError("Profiling is already active")
+    dumper : Any = None
+    if dump is not None:
+        if profiler == "pyinstrument":
+            try:
+                from pyinstrument import Profiler as PyinstrumentProfiler
+            except ImportError:
+                raise ImportError("pyinstrument is not installed. Install it or use profiler='cprofile'")
+            dumper = PyinstrumentProfiler()
+        elif profiler == "cprofile":
+            import cProfile
+            dumper = cProfile.Profile()
+        else:
+            raise ValueError("Invalid profiler: %s. Options: cprofile, pyinstrument" % profiler)
+    _profiler = Profiler()
+    active = _profiler
+    try:
+        if dumper is not None:
+            if profiler == "cprofile":
+                dumper.enable()
+            else:
+                dumper.start()
+        try:
+            yield active
+        finally:
+            if dumper is not None:
+                if profiler == "cprofile":
+                    dumper.disable()
+                    dumper.dump_stats(str(dump))
+                else:
+                    dumper.stop()
+                    with open(dump, "w", encoding="utf-8") as f:
+                        f.write(dumper.output_html())
+                logging.info("Profiler dump saved to %s" % str(dump))
+    finally:
+        _profiler = None
+        # also saved if the block fails, to show where time was spent until then
+        if output is not None:
+            active.save(output)
@@ -5,6 +5,9 @@ from typing import Optional, Union, List, Tuple, cast, Any, overload, Literal, T
 from sys import maxsize
 from zlib import MAX_WBITS
 from .pydrology_procedure_interface import PydrologyProcedureInterface
+from .routing_kernel import linearReservoirCascade, linearReservoirCascadeCoefficients, muskingum, muskingumCoefficients
+from .hidrosat_kernel import hidrosat
+from . import hosh_kernel
 import numpy  as np
 from numpy.typing import NDArray
 import pandas as pd
@@ -291,6 +294,113 @@ def getPulseMatrix(inflows : Union[float,List[float],NDArray[np.float64]],u : ND
         k=k+1
     return(I)
 
+fft_convolution_threshold = 128
+"""Longitud mínima de hidrograma de entrada y de función de transferencia a partir de la cual convolve y convolveNet utilizan FFT (por defecto, np.convolve)"""
+
+def _fftSize(size : int) -> int:
+    return 1 << max(size - 1, 0).bit_length()
+
+def convolve(inflows : Union[float,List[float],NDArray[np.float64]],u : Union[List[float],NDArray[np.float64]],method : Literal["auto","direct","fft"] = "auto") -> NDArray[np.float64]:
+    """Computa la convolución de 'Inflows' (hidrograma de entrada) con la función de transferencia o HU 'u', sin construir la matriz de pulsos (equivale a np.dot(getPulseMatrix(inflows,u),u))
+
+     Args:
+        inflows : Union[float,List[float],NDArray[np.float64]]
+            lista o array1d con hidrograma de entrada
+        u : Union[List[float],NDArray[np.float64]]
+            función de transferencia (HU)
+        method : str
+            'direct' (np.convolve), 'fft' o 'auto' (fft si ambas longitudes superan fft_convolution_threshold y los valores son finitos)
+
+    Returns:
+        Devuelve un array1d de longitud len(inflows)+len(u)-1
+    """
+    return convolveNet(np.atleast_1d(np.asarray(inflows,dtype='float'))[np.newaxis,:],[u],method)
+
+def convolveNet(inflows : Union[List[List[float]],NDArray[np.float64]],u : Union[List[List[float]],List[NDArray[np.float64]],NDArray[np.float64]],method : Literal["auto","direct","fft"] = "auto") -> NDArray[np.float64]:
+    """Computa la suma de las convoluciones de cada hidrograma de entrada (fila de 'inflows') con su respectiva función de transferencia (elemento de 'u'), sin construir matrices de pulsos. Las funciones de transferencia pueden tener distinta cantidad de ordenadas. Con method='fft' las transformadas de todos los bordes se suman antes de antitransformar
+
+     Args:
+        inflows : Union[List[List[float]],NDArray[np.float64]]
+            array2d con un hidrograma de entrada por fila (de igual longitud)
+        u : Union[List[List[float]],List[NDArray[np.float64]],NDArray[np.float64]]
+            lista con una función de transferencia por hidrograma de entrada
+        method : str
+            'direct' (np.convolve), 'fft' o 'auto' (fft si ambas longitudes superan fft_convolution_threshold y los valores son finitos)
+
+    Returns:
+        Devuelve un array1d de longitud len(inflows[0])+max(len(u[j]))-1
+    """
+    inflows = np.asarray(inflows,dtype='float')
+    if inflows.ndim != 2:
+        raise ValueError("inflows must be a 2-dimensional array")
+    us = [np.atleast_1d(np.asarray(u_j,dtype='float')) for u_j in u]
+    if len(us) != inflows.shape[0]:
+        raise ValueError("u must have one transfer function per inflow row")
+    n = inflows.shape[1]
+    m = max([len(u_j) for u_j in us], default=0)
+    size = max(n + m - 1, 0)
+    if n == 0 or m == 0:
+        return np.zeros(size)
+    if method == "auto":
+        method = "fft" if min(n, m) >= fft_convolution_threshold and np.isfinite(inflows).all() and all([np.isfinite(u_j).all() for u_j in us]) else "direct"
+    if method == "direct":
+        outflow = np.zeros(size)
+        for inflow, u_j in zip(inflows, us):
+            if len(u_j):
+                outflow[0:n+len(u_j)-1] += np.convolve(inflow, u_j)
+        return outflow
+    elif method == "fft":
+        nfft = _fftSize(size)
+        spectrum = np.fft.rfft(inflows, nfft, axis=1)
+        transfer = np.zeros((len(us), nfft // 2 + 1), dtype=complex)
+        for j, u_j in enumerate(us):
+            transfer[j] = np.fft.rfft(u_j, nfft)
+        return np.fft.irfft((spectrum * transfer).sum(axis=0), nfft)[0:size]
+    else:
+        raise ValueError("Argumento method inválido. Debe ser 'auto', 'direct' o 'fft'")
+
+def convolveBatch(inflows : Union[List[float],NDArray[np.float64]],u : Union[List[List[float]],List[NDArray[np.float64]]],method : Literal["auto","direct","fft"] = "auto") -> NDArray[np.float64]:
+    """Computa la convolución de un mismo hidrograma de entrada con cada una de las funciones de transferencia de 'u' (p. ej. una por juego de parámetros). Con method='fft' la transformada del hidrograma de entrada se computa una sola vez y se antitransforman todas las filas juntas
+
+     Args:
+        inflows : Union[List[float],NDArray[np.float64]]
+            array1d con el hidrograma de entrada
+        u : Union[List[List[float]],List[NDArray[np.float64]]]
+            lista de funciones de transferencia (pueden tener distinta cantidad de ordenadas)
+        method : str
+            'direct' (np.convolve), 'fft' o 'auto' (fft si ambas longitudes superan fft_convolution_threshold y los valores son finitos)
+
+    Returns:
+        Devuelve un array2d con una fila por función de transferencia, de longitud len(inflows)+max(len(u[j]))-1 (completada con ceros)
+    """
+    inflows = np.atleast_1d(np.asarray(inflows,dtype='float'))
+    us = [np.atleast_1d(np.asarray(u_j,dtype='float')) for u_j in u]
+    n = len(inflows)
+    m = max([len(u_j) for u_j in us], default=0)
+    size = max(n + m - 1, 0)
+    outflows = np.zeros((len(us), size))
+    if n == 0 or m == 0:
+        return outflows
+    if method == "auto":
+        method = "fft" if min(n, m) >= fft_convolution_threshold and np.isfinite(inflows).all() and all([np.isfinite(u_j).all() for u_j in us]) else "direct"
+    if method == "direct":
+        for j, u_j in enumerate(us):
+            if len(u_j):
+                outflows[j,0:n+len(u_j)-1] = np.convolve(inflows, u_j)
+        return outflows
+    elif method == "fft":
+        nfft = _fftSize(size)
+        transfer = np.zeros((len(us), nfft // 2 + 1), dtype=complex)
+        for j, u_j in enumerate(us):
+            transfer[j] = np.fft.rfft(u_j, nfft)
+        outflows[:] = np.fft.irfft(np.fft.rfft(inflows, nfft) * transfer, nfft, axis=1)[:,0:size]
+        for j, u_j in enumerate(us):
+            # fuera del soporte de cada convolución el resultado es nulo
+            outflows[j,n+len(u_j)-1:] = 0
+        return outflows
+    else:
+        raise ValueError("Argumento method inválido. Debe ser 'auto', 'direct' o 'fft'")
+
 def waterBalance(Storage: float =0,Inflow : float =0,Outflow : float =0) -> float:
     """Computa la ecuación de conservación del volumen (balance hídrico)   
     Args:
@@ -903,24 +1013,8 @@ class LinearReservoirCascade(PydrologyProcedureInterface):
                 self.Outflow=np.array([self.Cascade[0,1]]*(len(self.boundaries)+1),dtype='float')
         self.dt=dt
     def computeOutFlow(self):
-        dt=self.dt
-        k=self.K    
-        c=math.exp(-dt/k)
-        a=k/dt*(1-c)-c
-        b=1-k/dt*(1-c)
-        end=int(1/dt+1)
-        for i in range(0,len(self.Inflow)):
-            last_j = 0
-            for n in range(1,end,1):
-                self.Cascade[1][0]=self.Inflow[i]+(self.Cascade[0][0]-self.Inflow[i])*c
-                if self.N > 1:
-                    for j in range(1,self.N,1):
-                        self.Cascade[1][j]=c*self.Cascade[0][j]+a*self.Cascade[0][j-1]+b*self.Cascade[1][j-1]
-                        last_j = j
-                for j in range(0,self.N,1):
-                    self.Cascade[0][j]=self.Cascade[1][j]
-                    last_j = j
-            self.Outflow[i]=self.Cascade[0][last_j]
+        c, a, b, substeps = linearReservoirCascadeCoefficients(self.K, self.dt)
+        linearReservoirCascade(self.Inflow, self.Cascade, self.Outflow, c, a, b, substeps)
 
 #Reservorio de enrutamiento (HIDROSAT)
 class HIDROSATPowerLawReservoir(PydrologyProcedureInterface):
@@ -1110,21 +1204,8 @@ class MuskingumChannel(PydrologyProcedureInterface):
             raise NameError('Matrix of Initial Conditions must have'+str(self.N+1)+'cols as it have'+str(self.N)+'subreaches')        
         self.Outflow[0]=self.InitialConditions[1][self.N]
     def computeOutFlow(self):
-        K=self.K/self.N
-        X=self.X
-        tau=self.tau
-        D=(2*K*(1-X)+tau)    
-        C0=(tau+2*K*X)/D
-        C1=(tau-2*K*X)/D
-        C2=(2*K*(1-X)-tau)/D
-        for i in range(0,len(self.Inflow)-1,1):
-            self.InitialConditions[0][0]=self.Inflow[i]
-            self.InitialConditions[1][0]=self.Inflow[i+1]
-            for j in range(1,self.N+1,1):
-                for t in range(0,self.M,1):
-                    self.InitialConditions[1][j]=C0*self.InitialConditions[0][j-1]+C1*self.InitialConditions[1][j-1]+C2*self.InitialConditions[0][j]
-                    self.InitialConditions[0][j]=self.InitialConditions[1][j]
-            self.Outflow[i+1]=max(self.InitialConditions[1][self.N],0)    
+        C0, C1, C2, _, _ = muskingumCoefficients(self.K, self.X, self.dt)
+        muskingum(self.Inflow, self.InitialConditions[:,0:self.N+1], self.Outflow, C0, C1, C2, self.M)
             
 
 #Tránsito Lineal con funciones de transferencia. Por defecto, se asume una distrinución gamma con parámetros n (número de reservorios) y k (tiempo de residencia). Asimismo, se considera n=2, de modo tal que tp=k (el tiempo al pico es igual al tiempo de residencia) 
@@ -1174,8 +1255,7 @@ class LinearChannel(PydrologyProcedureInterface):
        self.Outflow=np.array([[0]]*(len(self.Inflow)+len(self.u)-1))
 
     def computeOutFlow(self):
-        I=getPulseMatrix(self.Inflow,self.u)
-        self.Outflow=np.dot(I,self.u)
+        self.Outflow=convolve(self.Inflow,self.u)
 
 class LinearNet(PydrologyProcedureInterface):
     """
@@ -1210,24 +1290,11 @@ class LinearNet(PydrologyProcedureInterface):
         self.Inflows=np.array(self.boundaries,dtype='float')
         self.dt=dt
     def computeOutflow(self):
-        for j in range(0,len(self.Inflows)):
-            linear = LinearChannel(
-                pars = self.pars[j],
-                Boundaries = self.Inflows[j],
-                dt = self.dt,
-                Proc = self.routingProc)
-            linear.computeOutFlow()
-            if j == 0:
-                self.Outflow = linear.Outflow
-            else:
-                nrows = max(len(self.Outflow), len(linear.Outflow))
-                f = np.zeros((nrows))
-                if len(self.Outflow) > len(linear.Outflow):
-                   f[0:len(linear.Outflow)] = linear.Outflow[0:len(linear.Outflow)]
-                   self.Outflow=self.Outflow + f
-                else:
-                   f[0:len(self.Outflow)] = self.Outflow[0:len(self.Outflow)]
-                   self.Outflow = f + linear.Outflow 
+        if self.routingProc == 'Nash':
+            u = [gammaDistribution(pars[1],pars[0],self.dt) for pars in self.pars]
+        else:
+            u = list(self.pars)
+        self.Outflow = convolveNet(self.Inflows,u)
 
 #Método de Clark
 class ClarkSystem(PydrologyProcedureInterface):
@@ -1407,6 +1474,8 @@ class HOSH4P1L(PydrologyProcedureInterface):
     
     Proc : str
     """Procedimiento de propagación ('Nash' o 'UH')"""
+    engine : str
+    """Cómputo de escorrentía ('reference' o 'fast')"""
     Precipitation : NDArray[np.float64]
     """Precipitación (serie temporal)"""
     SurfaceStorage: NDArray[np.float64]
@@ -1476,7 +1545,7 @@ class HOSH4P1L(PydrologyProcedureInterface):
         else:
             return None
     
-    def __init__(self,pars : List[Union[float,List[float]]],Boundaries : Union[List[List[float]],NDArray[np.float64]] =[[0],[0]],InitialConditions : Union[List[Tuple[float,float]],List[float]] =[0,0],Proc : Literal["Nash", "UH"] ='Nash'):
+    def __init__(self,pars : List[Union[float,List[float]]],Boundaries : Union[List[List[float]],NDArray[np.float64]] =[[0],[0]],InitialConditions : Union[List[Tuple[float,float]],List[float]] =[0,0],Proc : Literal["Nash", "UH"] ='Nash',engine : Literal["reference", "fast"] ='reference'):
         """
             pars : List[List[float]]
                 Lista con los valores de maxSurFaceStorage (reservorio de abstracción), maxSoilStorage (reservorio de producción) y parámetros tiempo de residencia (k) y n reservorios (caso Proc='Nash') o con último elemento como con ordenadas de Hidrograma Unitario (caso Proc='UH') 
@@ -1486,9 +1555,14 @@ class HOSH4P1L(PydrologyProcedureInterface):
                 Lista con valores de almacenamiento inicial en reservorio de abstracción y en reservorio de producción
             Proc: str
                 Procedimiento para transferencia: 'Nash' (cascada de Nash, debe proveerse k y n) o 'UH' (Hidrogramas Unitarios, array con j-vectores fila con valores de ordenadas)
+            engine: str
+                Cómputo de escorrentía: 'reference' (computeRunoff) o 'fast' (computeRunoffFast, resultados idénticos)
         """
         super().__init__(pars,Boundaries,InitialConditions)
         self.routingProc=Proc
+        if engine not in ['reference','fast']:
+            raise ValueError("invalid engine. Must be one of: reference, fast")
+        self.engine=engine
         self.soilSystem=SCSReservoirs(pars=[self.maxSurfaceStorage,self.maxSoilStorage])
         if self.routingProc == 'Nash':
                 if self.k is None:
@@ -1546,14 +1620,21 @@ class HOSH4P1L(PydrologyProcedureInterface):
                     self.Runoff[j]=max(0,self.NetRainfall[j]-self.EVR2[j]+self.SoilStorage[j-1]-self.maxSoilStorage)
                     self.SoilStorage[j+1]=waterBalance(self.SoilStorage[j],self.NetRainfall[j],self.EVR2[j]+self.Runoff[j])
             j=j+1            
-   
+
+    def computeRunoffFast(self):
+        """Same as computeRunoff, using the event-segmented runoff kernel (see hosh_kernel)"""
+        hosh_kernel.runoff(self.Precipitation,self.EVP,self.SurfaceStorage,self.SoilStorage,self.NetRainfall,self.Infiltration,self.Runoff,self.EVR1,self.EVR2,self.maxSurfaceStorage,self.maxSoilStorage)
+
     def computeOutFlow(self):
         self.routingSystem.Inflow=self.Runoff
         self.routingSystem.computeOutFlow()
         self.Q=self.routingSystem.Outflow
     
     def executeRun(self):
-        self.computeRunoff()
+        if self.engine == 'fast':
+            self.computeRunoffFast()
+        else:
+            self.computeRunoff()
         self.computeOutFlow()
 
 class HOSH4P2L(PydrologyProcedureInterface):
@@ -1563,6 +1644,8 @@ class HOSH4P2L(PydrologyProcedureInterface):
     
     Proc : str
     """Procedimiento de propagación ('Nash' o 'UH')"""
+    engine : str
+    """Cómputo de escorrentía ('reference' o 'fast')"""
     Precipitation : NDArray[np.float64]
     """Precipitación (serie temporal)"""
     SurfaceStorage: NDArray[np.float64]
@@ -1648,7 +1731,7 @@ class HOSH4P2L(PydrologyProcedureInterface):
         else:
             return None
 
-    def __init__(self,pars: List[List[float]],Boundaries : List[List[float]] =[[0],[0]],InitialConditions : List[float] =[0,0],Proc : str ='Nash'):
+    def __init__(self,pars: List[List[float]],Boundaries : List[List[float]] =[[0],[0]],InitialConditions : List[float] =[0,0],Proc : str ='Nash',engine : Literal["reference", "fast"] ='reference'):
         """
             pars : List[List[float]]
                 Lista con los valores de maxSurFaceStorage (reservorio de abstracción), maxSoilStorage (reservorio de producción), coeficiente de prorateo (flujo directo/flujo demorado, phi), coeficiente de recesión (autovalor, kb) y parámetros tiempo de residencia (k) y n reservorios (caso Proc='Nash') o con último elemento como lista incluyendo ordenadas de Hidrograma Unitario (caso Proc='UH') 
@@ -1658,9 +1741,14 @@ class HOSH4P2L(PydrologyProcedureInterface):
                 Lista con los valores de almacenamiento inicial en reservorio de abstracción y en reservorio de producción
             Proc: str
                 Procedimiento para transferencia: 'Nash' (cascada de Nash, debe proveerse k y n) o 'UH' (Hidrogramas Unitarios, array con j-vectores fila con valores de ordenadas)
+            engine: str
+                Cómputo de escorrentía: 'reference' (computeRunoff) o 'fast' (computeRunoffFast, resultados idénticos)
         """
         super().__init__(pars,Boundaries,InitialConditions)
         self.routingProc=Proc
+        if engine not in ['reference','fast']:
+            raise ValueError("invalid engine. Must be one of: reference, fast")
+        self.engine=engine
         self.soilSystem=SCSReservoirs(pars=[self.maxSurfaceStorage,self.maxSoilStorage])
         if self.routingProc not in ['Nash','UH']:
             raise Exception("invalid Proc. Must be one of: Nash, UH")
@@ -1707,6 +1795,11 @@ class HOSH4P2L(PydrologyProcedureInterface):
                     self.Runoff[j]=max(0,self.NetRainfall[j]-self.EVR2[j]+self.SoilStorage[j-1]-self.maxSoilStorage)
                     self.SoilStorage[j+1]=waterBalance(self.SoilStorage[j],self.NetRainfall[j],self.EVR2[j]+self.Runoff[j])
             j=j+1                  
+
+    def computeRunoffFast(self):
+        """Same as computeRunoff, using the event-segmented runoff kernel (see hosh_kernel)"""
+        hosh_kernel.runoff(self.Precipitation,self.EVP,self.SurfaceStorage,self.SoilStorage,self.NetRainfall,self.Infiltration,self.Runoff,self.EVR1,self.EVR2,self.maxSurfaceStorage,self.maxSoilStorage)
+
     def computeOutFlow(self):
         if self.routingProc == 'Nash':
             if self.tr is None:
@@ -1725,7 +1818,10 @@ class HOSH4P2L(PydrologyProcedureInterface):
         self.groundwaterSystem.computeOutFlow()
         self.Q=self.routingSystem.Outflow[0:len(self.Runoff)]+self.groundwaterSystem.Outflow[0:len(self.Runoff)]
     def executeRun(self):
-        self.computeRunoff()
+        if self.engine == 'fast':
+            self.computeRunoffFast()
+        else:
+            self.computeRunoff()
         self.computeOutFlow()
 
 class GR4J(PydrologyProcedureInterface):
@@ -1808,6 +1904,65 @@ class GR4J(PydrologyProcedureInterface):
         self.computeRunoff()
         self.computeOutFlow()
 
+def gr4jBatch(pars : Union[List[List[float]],NDArray[np.float64]], Boundaries : List[List[float]], InitialConditions : List[float] = [0,0]) -> Tuple[NDArray[np.float64],NDArray[np.float64]]:
+    """Ejecuta GR4J para K juegos de parámetros sobre las mismas condiciones de borde. Los reservorios de producción y de tránsito se computan simultáneamente para todos los juegos (operaciones vectorizadas a lo largo de K), con las mismas ecuaciones que ProductionStoreGR4J y RoutingStoreGR4J. Sólo se computan los pasos de las condiciones de borde (la cola de los hidrogramas unitarios se descarta)
+
+    Args:
+        pars : Union[List[List[float]],NDArray[np.float64]]
+            array2d (K x 3 ó K x 4) con un juego de parámetros por fila, en el orden de GR4J.pars (almacenamiento máximo en reservorio de producción, tiempo al pico, almacenamiento máximo en reservorio de tránsito y, opcionalmente, coeficiente de intercambio)
+        Boundaries : List[List[float]]
+            series de precipitación y de evapotranspiración potencial
+        InitialConditions : List[float]
+            almacenamiento inicial en reservorio de producción y en reservorio de tránsito
+
+    Returns:
+        Tuple[NDArray[np.float64],NDArray[np.float64]] : caudal (GR4J.Q) y almacenamiento en reservorio de producción al inicio de cada paso (ProductionStoreGR4J.SoilStorage), arrays2d de K x pasos
+    """
+    pars = np.atleast_2d(np.asarray(pars, dtype='float'))
+    precipitation = np.array(Boundaries[0], dtype='float').tolist()
+    evp = np.array(Boundaries[1], dtype='float').tolist()
+    n = len(precipitation)
+    prodStoreMaxStorage = pars[:,0]
+    routStoreMaxStorage = pars[:,2]
+    waterExchange = pars[:,3] if pars.shape[1] > 3 else np.zeros(len(pars))
+    # reservorio de producción
+    soilStorage = np.empty((n + 1, len(pars)))
+    soilStorage[0] = InitialConditions[0]
+    runoff = np.empty((n, len(pars)))
+    for i in range(n):
+        netRainfall = max(0, precipitation[i] - evp[i])
+        netEVP = max(0, evp[i] - precipitation[i])
+        relativeMoisture = soilStorage[i] / prodStoreMaxStorage
+        ratio_netRainfall_maxStorage = netRainfall / prodStoreMaxStorage
+        ratio_netEVP_maxStorage = netEVP / prodStoreMaxStorage
+        recharge = prodStoreMaxStorage*(1-(relativeMoisture)**2)*np.tanh(ratio_netRainfall_maxStorage)/(1+relativeMoisture*np.tanh(ratio_netRainfall_maxStorage))
+        evr = soilStorage[i]*(2-relativeMoisture)*np.tanh(ratio_netEVP_maxStorage)/(1+(1-relativeMoisture)*np.tanh(ratio_netEVP_maxStorage))
+        storage = waterBalance(soilStorage[i], recharge, evr)
+        relativeMoisture = storage / prodStoreMaxStorage
+        infiltration = storage*(1-(1+(4/9*relativeMoisture)**4)**(-1/4))
+        soilStorage[i+1] = waterBalance(storage, 0, infiltration)
+        runoff[i] = infiltration + netRainfall - recharge
+    # hidrogramas unitarios
+    inflow1 = np.empty((n, len(pars)))
+    inflow2 = np.empty((n, len(pars)))
+    for j, T in enumerate(pars[:,1]):
+        inflow1[:,j] = convolve(apportion(runoff[:,j], 0.9), grXDistribution(T, distribution='SH1'))[0:n]
+        inflow2[:,j] = convolve(apportion(runoff[:,j], 0.1), grXDistribution(T, distribution='SH2'))[0:n]
+    # reservorio de tránsito
+    routStorage = np.full(len(pars), float(InitialConditions[1]))
+    Q = np.empty((n, len(pars)))
+    for i in range(n):
+        relativeMoisture = routStorage / routStoreMaxStorage
+        leakages = waterExchange*relativeMoisture**(7/2)
+        storage = routStorage + inflow1[i] + leakages
+        storage = np.where(storage > 0, storage, 0.0)
+        relativeMoisture = storage / routStoreMaxStorage
+        routRunoff = storage*(1-(1+relativeMoisture**4)**(-1/4))
+        routStorage = waterBalance(storage, 0, routRunoff)
+        directRunoff = inflow2[i] + leakages
+        Q[i] = routRunoff + np.where(directRunoff > 0, directRunoff, 0.0)
+    return Q.T.copy(), soilStorage[0:n].T.copy()
+
 class HIDROSAT(PydrologyProcedureInterface):
     """
     Modelo Operacional de Transformación de Precipitación en Escorrentía HIDROSAT. 
@@ -1932,6 +2087,16 @@ class HIDROSAT(PydrologyProcedureInterface):
             self.Flooded=np.array([self.initial_conditions[3]]*(len(self.Precipitation)+1),dtype='float')
         
     def executeRun(self):
+        """Run the model with the fused time loop kernel (see hidrosat_kernel), over the preallocated state arrays. Results are identical to those of executeRunReference"""
+        hidrosat(
+            self.Precipitation, self.EVP, self.inFlow,
+            self.soilStorage, self.EVSoil, self.freeWater, self.Runoff, self.DirectRunoff, self.floodplainStorage, self.EVFloodPlain, self.Q, self.Flooded,
+            self.S0, self.K, int(self.N), self.W0, self.Q0, self.gamma, self.maxFlooded, self.detentionRatio, self.epsilon,
+            dt = int(self.dt),
+            initial_groundwater = self.initial_conditions[0])
+
+    def executeRunReference(self):
+        """Run the model stepping the RetentionReservoir, LinearReservoirCascade and HIDROSATPowerLawReservoir sub-models (one instance of each per time step)"""
         for i in range(0,len(self.Precipitation)-1,1):
             phi=(1-self.Flooded[i])
             p_soil=[phi*self.Precipitation[i]]
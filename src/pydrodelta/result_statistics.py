@@ -1,7 +1,8 @@
 import logging
 from pandas import DataFrame, Timestamp
 import math
-from typing import List, Tuple, Optional, TypedDict, cast, Union
+import numpy as np
+from typing import List, Tuple, Optional, TypedDict, cast, Union, Dict, Iterable, Set, Any
 from datetime import datetime
 
 
@@ -29,6 +30,210 @@ class ResultStatisticsDict(ResultStatisticsShortDict):
     sim : Optional[List[float]]
 
 
+metric_dependencies : Dict[str, List[str]] = {
+    "mse": [],
+    "rmse": ["mse"],
+    "bias": [],
+    "mean_obs": [],
+    "mean_sim": [],
+    "stdev_obs": ["mean_obs"],
+    "stdev_sim": ["mean_sim"],
+    "var_obs": ["stdev_obs"],
+    "var_sim": ["stdev_sim"],
+    "stdev_diff": ["stdev_obs", "stdev_sim"],
+    "nse": ["mse", "stdev_obs"],
+    "cov": ["mean_obs", "mean_sim"],
+    "r": ["cov", "var_obs", "var_sim"],
+    "oneminusr": ["r"],
+    "kge": ["r", "mean_obs", "mean_sim", "stdev_obs", "stdev_sim"],
+    "rse": []
+}
+"""Metrics computed by computeMetrics and the metrics each of them is derived from"""
+
+def resolveMetrics(metrics : Optional[Iterable[str]] = None) -> Set[str]:
+    """Return the set of metrics required to compute metrics (all if None)"""
+    if metrics is None:
+        return set(metric_dependencies.keys())
+    resolved : Set[str] = set()
+    pending = list(metrics)
+    while len(pending):
+        metric = pending.pop()
+        if metric in resolved:
+            continue
+        if metric not in metric_dependencies:
+            raise ValueError("Invalid metric '%s'. Must be one of %s" % (metric, ", ".join(metric_dependencies.keys())))
+        resolved.add(metric)
+        pending.extend(metric_dependencies[metric])
+    return resolved
+
+def computeMetrics(
+    obs : Union[np.ndarray, List[float]],
+    sim : Union[np.ndarray, List[float]],
+    metrics : Optional[Iterable[str]] = None,
+    k : Optional[int] = None
+    ) -> Dict[str, Any]:
+    """Compute error statistics of sim against obs over the pairs where neither is NaN
+
+    Parameters:
+    -----------
+    obs : array or list of floats
+
+        Observed values
+
+    sim : array or list of floats
+
+        Simulated values. Must be of the same length as obs
+
+    metrics : iterable of str = None
+
+        Compute only these metrics (and the ones they are derived from). If None, all metrics are computed
+
+    k : int = None
+
+        Number of independent variables. Required to compute rse
+
+    Returns:
+    --------
+    dict with keys n, obs, sim and errors (float64 arrays without the NaN pairs) and the computed metrics (floats or None where undefined)
+    """
+    obs = np.asarray(obs, dtype=np.float64)
+    sim = np.asarray(sim, dtype=np.float64)
+    mask = ~(np.isnan(obs) | np.isnan(sim))
+    if not mask.all():
+        obs = obs[mask]
+        sim = sim[mask]
+    errors = sim - obs
+    n = len(errors)
+    result : Dict[str, Any] = {"n": n, "obs": obs, "sim": sim, "errors": errors}
+    if n == 0:
+        return result
+    required = resolveMetrics(metrics)
+    if "mse" in required or "rse" in required:
+        sum_squared_errors = float(np.dot(errors, errors))
+        result["mse"] = sum_squared_errors / n
+        if "rmse" in required:
+            result["rmse"] = result["mse"] ** 0.5
+        if "rse" in required and k is not None:
+            result["rse"] = (sum_squared_errors / (n - k - 1)) ** 0.5 if n - k - 1 != 0 else None
+    if "bias" in required:
+        result["bias"] = float(errors.sum()) / n
+    if "mean_obs" in required:
+        result["mean_obs"] = float(obs.sum()) / n
+        dev_obs = obs - result["mean_obs"]
+        if "stdev_obs" in required:
+            # stdev_* hold the variances and var_* the standard deviations, as in ResultStatistics
+            result["stdev_obs"] = float(np.dot(dev_obs, dev_obs)) / n
+            if "var_obs" in required:
+                result["var_obs"] = result["stdev_obs"] ** 0.5
+    if "mean_sim" in required:
+        result["mean_sim"] = float(sim.sum()) / n
+        dev_sim = sim - result["mean_sim"]
+        if "stdev_sim" in required:
+            result["stdev_sim"] = float(np.dot(dev_sim, dev_sim)) / n
+            if "var_sim" in required:
+                result["var_sim"] = result["stdev_sim"] ** 0.5
+    if "stdev_diff" in required:
+        result["stdev_diff"] = result["stdev_sim"] - result["stdev_obs"]
+    if "nse" in required:
+        result["nse"] = 1 - result["mse"] / result["stdev_obs"] if result["stdev_obs"] != 0 else None
+    if "cov" in required:
+        result["cov"] = float(np.dot(dev_obs, dev_sim)) / n
+    if "r" in required:
+        result["r"] = result["cov"] / result["var_obs"] / result["var_sim"] if result["var_obs"] != 0 and result["var_sim"] != 0 else None
+    if "oneminusr" in required:
+        result["oneminusr"] = 1 - result["r"] if result["r"] is not None else None
+    if "kge" in required:
+        if result["r"] is not None and result["mean_obs"] != 0:
+            beta = result["mean_sim"] / result["mean_obs"]
+            alfa = result["stdev_sim"] / result["stdev_obs"]
+            result["kge"] = 1 - ((result["r"] - 1)**2 + (alfa - 1)**2 + (beta - 1)**2)**0.5
+        else:
+            result["kge"] = None
+    return result
+
+def computeMetricsBatch(
+    obs : Union[np.ndarray, List[float]],
+    sim : Union[np.ndarray, List[List[float]]],
+    metrics : Optional[Iterable[str]] = None,
+    k : Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+    """Compute the error statistics of each row of sim against obs, as computeMetrics does for a single simulation. Each row is compared over the pairs where neither value is NaN
+
+    Parameters:
+    -----------
+    obs : array or list of floats
+
+        Observed values (length T)
+
+    sim : 2-d array or list of lists of floats
+
+        Simulated values, one simulation per row (shape K x T)
+
+    metrics : iterable of str = None
+
+        Compute only these metrics (and the ones they are derived from). If None, all metrics are computed
+
+    k : int = None
+
+        Number of independent variables. Required to compute rse
+
+    Returns:
+    --------
+    dict with key n (int array of length K) and the computed metrics (float arrays of length K, NaN where undefined)
+    """
+    obs = np.asarray(obs, dtype=np.float64)
+    sim = np.atleast_2d(np.asarray(sim, dtype=np.float64))
+    if sim.shape[1] != len(obs):
+        raise ValueError("sim rows must be of the same length as obs")
+    mask = ~(np.isnan(obs)[np.newaxis,:] | np.isnan(sim))
+    n = mask.sum(axis=1)
+    result : Dict[str, np.ndarray] = {"n": n}
+    required = resolveMetrics(metrics)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n_ = np.where(n > 0, n, np.nan)
+        obs_ = np.where(mask, obs, 0.0)
+        sim_ = np.where(mask, sim, 0.0)
+        errors = sim_ - obs_
+        if "mse" in required or "rse" in required:
+            sum_squared_errors = (errors * errors).sum(axis=1)
+            result["mse"] = sum_squared_errors / n_
+            if "rmse" in required:
+                result["rmse"] = result["mse"] ** 0.5
+            if "rse" in required and k is not None:
+                result["rse"] = np.where(n - k - 1 != 0, (sum_squared_errors / (n_ - k - 1)) ** 0.5, np.nan)
+        if "bias" in required:
+            result["bias"] = errors.sum(axis=1) / n_
+        if "mean_obs" in required:
+            result["mean_obs"] = obs_.sum(axis=1) / n_
+            dev_obs = np.where(mask, obs_ - result["mean_obs"][:,np.newaxis], 0.0)
+            if "stdev_obs" in required:
+                # stdev_* hold the variances and var_* the standard deviations, as in ResultStatistics
+                result["stdev_obs"] = (dev_obs * dev_obs).sum(axis=1) / n_
+                if "var_obs" in required:
+                    result["var_obs"] = result["stdev_obs"] ** 0.5
+        if "mean_sim" in required:
+            result["mean_sim"] = sim_.sum(axis=1) / n_
+            dev_sim = np.where(mask, sim_ - result["mean_sim"][:,np.newaxis], 0.0)
+            if "stdev_sim" in required:
+                result["stdev_sim"] = (dev_sim * dev_sim).sum(axis=1) / n_
+                if "var_sim" in required:
+                    result["var_sim"] = result["stdev_sim"] ** 0.5
+        if "stdev_diff" in required:
+            result["stdev_diff"] = result["stdev_sim"] - result["stdev_obs"]
+        if "nse" in required:
+            result["nse"] = np.where(result["stdev_obs"] != 0, 1 - result["mse"] / result["stdev_obs"], np.nan)
+        if "cov" in required:
+            result["cov"] = (dev_obs * dev_sim).sum(axis=1) / n_
+        if "r" in required:
+            result["r"] = np.where((result["var_obs"] != 0) & (result["var_sim"] != 0), result["cov"] / result["var_obs"] / result["var_sim"], np.nan)
+        if "oneminusr" in required:
+            result["oneminusr"] = 1 - result["r"]
+        if "kge" in required:
+            beta = result["mean_sim"] / result["mean_obs"]
+            alfa = result["stdev_sim"] / result["stdev_obs"]
+            result["kge"] = np.where(result["mean_obs"] != 0, 1 - ((result["r"] - 1)**2 + (alfa - 1)**2 + (beta - 1)**2)**0.5, np.nan)
+    return result
+
 class ResultStatistics:
     """Collection of statistic analysis results for one output of the procedure"""
     def __init__(
@@ -41,7 +246,8 @@ class ResultStatistics:
         compute : bool = False,
         procedure = None,
         output = None,
-        k : Optional[int] = None
+        k : Optional[int] = None,
+        metrics : Optional[List[str]] = None
         ) -> None:
         """Initiate collection of statistic analysis for the procedure
         
@@ -67,10 +273,13 @@ class ResultStatistics:
         
         k : int
             Number of independent variables
+
+        metrics : list of str or None
+            Compute only these metrics (and the ones they are derived from). If None, all metrics are computed
             """
-        self.obs : List[float] = list(obs) if obs is not None else list()
+        self.obs : List[float] = (obs.tolist() if isinstance(obs, np.ndarray) else list(obs)) if obs is not None else list()
         """List of observed values"""
-        self.sim : List[float] = list(sim) if sim is not None else list()
+        self.sim : List[float] = (sim.tolist() if isinstance(sim, np.ndarray) else list(sim)) if sim is not None else list()
         """List of simulated values. Must be of the same length as obs"""
         self.metadata : Optional[dict] = metadata
         """Metadata of the node and the variable (dict)"""
@@ -119,50 +328,34 @@ class ResultStatistics:
         self.kge : Optional[float] = None
 
         if compute:
-            self.compute()
+            self.compute(metrics)
 
-    def compute(self) -> None:
-        """Compute the statistical analysis.
+    def compute(self, metrics : Optional[List[str]] = None) -> None:
+        """Compute the statistical analysis (see computeMetrics).
         
-        Saves the results inplace (returns None)"""
+        Saves the results inplace (returns None)
+
+        Parameters:
+        -----------
+        metrics : list of str or None
+            Compute only these metrics (and the ones they are derived from). The other ones are left as None. If None, all metrics are computed"""
         if not len(self.sim):
             # logging.warn("No values found for statistics computation, skipping")
             return
         if len(self.obs) != len(self.sim):
             logging.warning("Length of obs and sim lists must be equal. No computation performed")
             return
-        df = DataFrame({"obs":self.obs,"sim":self.sim})
-        df = df.dropna()
-        self.errors = [self.sim[i] - self.obs[i] for i in range(0,len(self.sim))]
-        df["errors"] = df["sim"] - df["obs"]
-        self.errors = [v for v in df["errors"]]
-        self.n = len(df["errors"])
-        if len(self.errors) == 0:
+        result = computeMetrics(self.obs, self.sim, metrics, self.k)
+        self.n = result["n"]
+        self.errors = result["errors"].tolist()
+        if self.n == 0:
             logging.warning("No obs/sim pairs found for error calculation")
             return
-        self.mse = sum([ e**2 for e in self.errors]) / len(self.errors)
-        self.rmse = self.mse ** 0.5
-        self.bias =  sum(self.errors) / self.n
-        self.mean_obs = sum(df["obs"]) / self.n
-        self.mean_sim = sum(df["sim"]) / self.n
-        self.stdev_obs = sum([(x - self.mean_obs)**2 for x in df["obs"]]) / self.n
-        self.stdev_sim = sum([(x - self.mean_sim)**2 for x in df["sim"]]) / self.n
-        self.var_obs = self.stdev_obs ** 0.5
-        self.var_sim = self.stdev_sim ** 0.5
-        self.stdev_diff = self.stdev_sim - self.stdev_obs
-        self.obs = [v for v in df["obs"]]
-        self.sim = [v for v in df["sim"]]
-        self.nse = 1 - self.mse / self.stdev_obs if self.stdev_obs != 0 else None
-        self.cov = sum([ (self.obs[i] - self.mean_obs) * (self.sim[i] - self.mean_sim) for i in range(len(self.obs))]) / self.n
-        self.r = self.cov / self.var_obs / self.var_sim if self.var_obs is not None and self.var_obs != 0 and self.var_sim is not None and self.var_sim != 0 else None
-        self.oneminusr = 1 - self.r if self.r is not None else None
-        if self.k is not None:
-            self.rse = ( sum([ e ** 2 for e in self.errors]) / ( self.n - self.k - 1 )) ** 0.5
-        # kge
-        if self.r is not None:
-            beta = self.mean_sim / self.mean_obs
-            alfa = self.stdev_sim / self.stdev_obs
-            self.kge = 1 - ((self.r - 1)**2 + (alfa - 1)**2 + (beta - 1)**2)**0.5
+        self.obs = result["obs"].tolist()
+        self.sim = result["sim"].tolist()
+        for key in metric_dependencies:
+            if key in result:
+                setattr(self, key, result[key])
 
     def toDict(self) -> ResultStatisticsDict:
         """Convert result statistics into dict
@@ -0,0 +1,260 @@
+"""Array kernels of the discrete linear reservoir cascade and Muskingum channel recurrences (pydrology.LinearReservoirCascade and pydrology.MuskingumChannel).
+
+The recurrences are evaluated with the same operation order as the original loops, so that results are bit-compatible. If numba is installed the kernels are compiled, otherwise the single series kernels run as plain python over lists and the batch kernels are vectorized with numpy along the series axis."""
+import math
+import numpy as np
+from typing import Tuple, Callable, Union, List
+from numpy.typing import NDArray
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+min_vectorized_series = 32
+"""Without numba, batches of fewer series are routed one series at a time (the numpy overhead per time step is only amortized over many series)"""
+
+def jit(func : Callable) -> Callable:
+    """Compile func with numba if available"""
+    return njit(cache=True)(func) if njit is not None else func
+
+def linearReservoirCascadeCoefficients(k : float, dt : float = 1) -> Tuple[float, float, float, int]:
+    """Returns c, a, b and the number of substeps of the discrete linear reservoir cascade"""
+    c = math.exp(-dt/k)
+    a = k/dt*(1-c)-c
+    b = 1-k/dt*(1-c)
+    end = int(1/dt+1)
+    return c, a, b, max(end - 1, 0)
+
+def muskingumCoefficients(K : float, X : float, dt : float = 1) -> Tuple[float, float, float, int, int]:
+    """Returns C0, C1, C2, the number of subreaches N and the number of substeps M of the Muskingum channel (see pydrology.MuskingumChannel)"""
+    if X > 1/2:
+        raise ValueError("X must be between 0 and 1/2")
+    lowerbound = 2*K*X
+    upperbound = 2*K*(1-X)
+    N = 1
+    tau = dt
+    if dt > upperbound:
+        tau = upperbound
+    else:
+        if dt < lowerbound:
+            N = round(lowerbound/dt)
+    M = round(dt/tau)
+    K = K/N
+    D = (2*K*(1-X)+tau)
+    C0 = (tau+2*K*X)/D
+    C1 = (tau-2*K*X)/D
+    C2 = (2*K*(1-X)-tau)/D
+    return C0, C1, C2, N, M
+
+@jit
+def _linearReservoirCascade(inflow, previous, current, outflow, c : float, a : float, b : float, substeps : int) -> None:
+    n_reservoirs = len(previous)
+    last_j = n_reservoirs - 1 if substeps > 0 else 0
+    for i in range(len(inflow)):
+        for n in range(substeps):
+            current[0] = inflow[i]+(previous[0]-inflow[i])*c
+            for j in range(1, n_reservoirs):
+                current[j] = c*previous[j]+a*previous[j-1]+b*current[j-1]
+            for j in range(n_reservoirs):
+                previous[j] = current[j]
+        outflow[i] = previous[last_j]
+
+@jit
+def _muskingum(inflow, previous, current, outflow, C0 : float, C1 : float, C2 : float, M : int) -> None:
+    N = len(previous) - 1
+    for i in range(len(inflow) - 1):
+        previous[0] = inflow[i]
+        current[0] = inflow[i+1]
+        for j in range(1, N+1):
+            for t in range(M):
+                current[j] = C0*previous[j-1]+C1*current[j-1]+C2*previous[j]
+                previous[j] = current[j]
+        value = current[N]
+        outflow[i+1] = 0.0 if 0 > value else value
+
+def linearReservoirCascade(inflow : NDArray[np.float64], cascade : NDArray[np.float64], outflow : NDArray[np.float64], c : float, a : float, b : float, substeps : int) -> None:
+    """Routes inflow through the cascade, updating the state matrix cascade (2 x N) and writing outflow[0:len(inflow)] in place"""
+    inflow = np.ascontiguousarray(inflow, dtype=np.float64)
+    if njit is not None:
+        _linearReservoirCascade(inflow, cascade[0], cascade[1], outflow, c, a, b, substeps)
+        return
+    rows = cascade.tolist()
+    values = outflow.tolist()
+    _linearReservoirCascade(inflow.tolist(), rows[0], rows[1], values, c, a, b, substeps)
+    cascade[:] = rows
+    outflow[:] = values
+
+def muskingum(inflow : NDArray[np.float64], state : NDArray[np.float64], outflow : NDArray[np.float64], C0 : float, C1 : float, C2 : float, M : int) -> None:
+    """Routes inflow through the N = state.shape[1] - 1 subreaches, updating the state matrix (2 x N+1) and writing outflow[1:len(inflow)] in place"""
+    inflow = np.ascontiguousarray(inflow, dtype=np.float64)
+    if njit is not None:
+        _muskingum(inflow, state[0], state[1], outflow, C0, C1, C2, M)
+        return
+    rows = state.tolist()
+    values = outflow.tolist()
+    _muskingum(inflow.tolist(), rows[0], rows[1], values, C0, C1, C2, M)
+    state[:] = rows
+    outflow[:] = values
+
+@jit
+def _linearReservoirCascadeBatch(inflows, cascades, outflows, c : float, a : float, b : float, substeps : int) -> None:
+    for s in range(inflows.shape[0]):
+        _linearReservoirCascade(inflows[s], cascades[s, 0], cascades[s, 1], outflows[s], c, a, b, substeps)
+
+@jit
+def _muskingumBatch(inflows, states, outflows, C0 : float, C1 : float, C2 : float, M : int) -> None:
+    for s in range(inflows.shape[0]):
+        _muskingum(inflows[s], states[s, 0], states[s, 1], outflows[s], C0, C1, C2, M)
+
+def _linearReservoirCascadeColumns(inflows : NDArray[np.float64], previous : NDArray[np.float64], current : NDArray[np.float64], outflows : NDArray[np.float64], c : float, a : float, b : float, substeps : int) -> None:
+    """Same recurrence as _linearReservoirCascade, vectorized along the series (last) axis"""
+    n_reservoirs = previous.shape[0]
+    last_j = n_reservoirs - 1 if substeps > 0 else 0
+    for i in range(inflows.shape[0]):
+        for n in range(substeps):
+            current[0] = inflows[i]+(previous[0]-inflows[i])*c
+            for j in range(1, n_reservoirs):
+                current[j] = c*previous[j]+a*previous[j-1]+b*current[j-1]
+            previous[:] = current
+        outflows[i] = previous[last_j]
+
+def _muskingumColumns(inflows : NDArray[np.float64], previous : NDArray[np.float64], current : NDArray[np.float64], outflows : NDArray[np.float64], C0 : float, C1 : float, C2 : float, M : int) -> None:
+    """Same recurrence as _muskingum, vectorized along the series (last) axis"""
+    N = previous.shape[0] - 1
+    for i in range(inflows.shape[0] - 1):
+        previous[0] = inflows[i]
+        current[0] = inflows[i+1]
+        for j in range(1, N+1):
+            for t in range(M):
+                current[j] = C0*previous[j-1]+C1*current[j-1]+C2*previous[j]
+                previous[j] = current[j]
+        outflows[i+1] = np.where(0 > current[N], 0.0, current[N])
+
+def linearReservoirCascadeBatch(
+    inflows : Union[NDArray[np.float64],List[List[float]]],
+    K : float,
+    N : int = 2,
+    dt : float = 1,
+    initial_condition : float = 0.
+    ) -> NDArray[np.float64]:
+    """Routes a batch of inflow series through a discrete cascade of N linear reservoirs with residence time K. Results are identical to those of LinearReservoirCascade(pars=[K,N], Boundaries=inflow, InitialConditions=[initial_condition], dt=dt).computeOutFlow() for each series
+
+    Args:
+        inflows : 2-d array (series x steps)
+        K : float - residence time
+        N : int - number of reservoirs
+        dt : float - computation step
+        initial_condition : float - initial discharge of every reservoir
+
+    Returns:
+        outflows : 2-d array (series x steps + 1)"""
+    if K <= 0:
+        raise ValueError("Invalid parameter K: must be > 0")
+    inflows = np.atleast_2d(np.asarray(inflows, dtype=np.float64))
+    c, a, b, substeps = linearReservoirCascadeCoefficients(K, dt)
+    n_series, n_steps = inflows.shape
+    outflows = np.full((n_series, n_steps + 1), initial_condition, dtype=np.float64)
+    if njit is not None:
+        cascades = np.full((n_series, 2, int(N)), initial_condition, dtype=np.float64)
+        _linearReservoirCascadeBatch(np.ascontiguousarray(inflows), cascades, outflows, c, a, b, substeps)
+        return outflows
+    if n_series < min_vectorized_series:
+        for s in range(n_series):
+            linearReservoirCascade(inflows[s], np.full((2, int(N)), initial_condition, dtype=np.float64), outflows[s], c, a, b, substeps)
+        return outflows
+    previous = np.full((int(N), n_series), initial_condition, dtype=np.float64)
+    columns = np.full((n_steps + 1, n_series), initial_condition, dtype=np.float64)
+    _linearReservoirCascadeColumns(np.ascontiguousarray(inflows.T), previous, previous.copy(), columns, c, a, b, substeps)
+    return np.ascontiguousarray(columns.T)
+
+def _linearReservoirCascadeSetsColumns(inflows : NDArray[np.float64], previous : NDArray[np.float64], current : NDArray[np.float64], outflows : NDArray[np.float64], c : NDArray[np.float64], a : NDArray[np.float64], b : NDArray[np.float64], last : NDArray[np.int64], substeps : int) -> None:
+    """Same recurrence as _linearReservoirCascadeColumns, with one set of coefficients and one output reservoir (last) per series. Reservoirs below last do not affect the output of the series"""
+    n_reservoirs = previous.shape[0]
+    columns = np.arange(previous.shape[1])
+    for i in range(inflows.shape[0]):
+        for n in range(substeps):
+            current[0] = inflows[i]+(previous[0]-inflows[i])*c
+            for j in range(1, n_reservoirs):
+                current[j] = c*previous[j]+a*previous[j-1]+b*current[j-1]
+            previous[:] = current
+        outflows[i] = previous[last, columns]
+
+def linearReservoirCascadeSets(
+    inflows : Union[NDArray[np.float64],List[List[float]]],
+    K : Union[NDArray[np.float64],List[float]],
+    N : Union[NDArray[np.int64],List[int]],
+    dt : float = 1,
+    initial_condition : float = 0.
+    ) -> NDArray[np.float64]:
+    """Routes each inflow series through its own discrete cascade of linear reservoirs (one residence time K[s] and number of reservoirs N[s] per series). Results are identical to those of LinearReservoirCascade(pars=[K[s],N[s]], Boundaries=inflows[s], InitialConditions=[initial_condition], dt=dt).computeOutFlow() for each series s
+
+    Args:
+        inflows : 2-d array (series x steps)
+        K : 1-d array - residence time of each series
+        N : 1-d array - number of reservoirs of each series
+        dt : float - computation step
+        initial_condition : float - initial discharge of every reservoir
+
+    Returns:
+        outflows : 2-d array (series x steps + 1)"""
+    inflows = np.atleast_2d(np.asarray(inflows, dtype=np.float64))
+    K = np.asarray(K, dtype=np.float64)
+    N = np.asarray(N).astype(np.int64)
+    n_series, n_steps = inflows.shape
+    if len(K) != n_series or len(N) != n_series:
+        raise ValueError("K and N must have one value per inflow series")
+    if (K <= 0).any():
+        raise ValueError("Invalid parameter K: must be > 0")
+    if (N < 1).any():
+        raise ValueError("Invalid parameter N: must be >= 1")
+    coefficients = [linearReservoirCascadeCoefficients(float(k), dt) for k in K]
+    substeps = coefficients[0][3] if n_series else 0
+    outflows = np.full((n_series, n_steps + 1), initial_condition, dtype=np.float64)
+    if njit is not None or n_series < min_vectorized_series:
+        for s in range(n_series):
+            c, a, b, _ = coefficients[s]
+            linearReservoirCascade(inflows[s], np.full((2, int(N[s])), initial_condition, dtype=np.float64), outflows[s], c, a, b, substeps)
+        return outflows
+    c, a, b = [np.array([coefficient[i] for coefficient in coefficients]) for i in range(3)]
+    previous = np.full((int(N.max()), n_series), initial_condition, dtype=np.float64)
+    columns = np.full((n_steps + 1, n_series), initial_condition, dtype=np.float64)
+    _linearReservoirCascadeSetsColumns(np.ascontiguousarray(inflows.T), previous, previous.copy(), columns, c, a, b, N - 1 if substeps > 0 else np.zeros(n_series, dtype=np.int64), substeps)
+    return np.ascontiguousarray(columns.T)
+
+def muskingumChannelBatch(
+    inflows : Union[NDArray[np.float64],List[List[float]]],
+    K : float,
+    X : float,
+    dt : float = 1,
+    initial_condition : float = 0.
+    ) -> NDArray[np.float64]:
+    """Routes a batch of inflow series through a Muskingum channel. Results are identical to those of MuskingumChannel(pars=[K,X], Boundaries=inflow, InitialConditions=[initial_condition], dt=dt).computeOutFlow() for each series
+
+    Args:
+        inflows : 2-d array (series x steps)
+        K : float - travel time
+        X : float - shape factor (0 <= X <= 1/2)
+        dt : float - computation step
+        initial_condition : float - initial discharge of every subreach
+
+    Returns:
+        outflows : 2-d array (series x steps)"""
+    inflows = np.atleast_2d(np.asarray(inflows, dtype=np.float64))
+    C0, C1, C2, N, M = muskingumCoefficients(K, X, dt)
+    n_series, n_steps = inflows.shape
+    outflows = np.zeros((n_series, n_steps), dtype=np.float64)
+    if n_steps:
+        outflows[:, 0] = initial_condition
+    if njit is not None:
+        states = np.full((n_series, 2, N + 1), initial_condition, dtype=np.float64)
+        _muskingumBatch(np.ascontiguousarray(inflows), states, outflows, C0, C1, C2, M)
+        return outflows
+    if n_series < min_vectorized_series:
+        for s in range(n_series):
+            muskingum(inflows[s], np.full((2, N + 1), initial_condition, dtype=np.float64), outflows[s], C0, C1, C2, M)
+        return outflows
+    previous = np.full((N + 1, n_series), initial_condition, dtype=np.float64)
+    columns = np.ascontiguousarray(outflows.T)
+    _muskingumColumns(np.ascontiguousarray(inflows.T), previous, previous.copy(), columns, C0, C1, C2, M)
+    return np.ascontiguousarray(columns.T)
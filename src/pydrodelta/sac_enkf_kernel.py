@@ -0,0 +1,184 @@
+"""Ensemble kernel of the simplified Sacramento model (engine "fast" of SacEnkfProcedure).
+
+The states of all ensemble members are stored as a (members x 4) float64 array and advanced at once: the equations, the stability checks (check, check2, check3) and the Runge-Kutta schemes of sacramento_simplified_kernel are evaluated element-wise over the members. Each member keeps its own number of substeps: members that need fewer substeps are left untouched in the remaining ones. The parameters may be common to all members (ensemble of states) or differ between members (ensemble of parameter sets, see run)."""
+import numpy as np
+from typing import Tuple, List, Union
+from numpy.typing import NDArray
+
+_tiny = float(np.finfo(np.float64).tiny)
+
+def constrain(value : NDArray[np.float64], upper : float) -> NDArray[np.float64]:
+    """max(0, min(value, upper)), with the nan semantics of sacramento_simplified_kernel.constrain"""
+    value = np.where(upper < value, upper, value)
+    return np.where(value > 0, value, 0.0)
+
+def derivatives(x1 : NDArray[np.float64], x2 : NDArray[np.float64], x3 : NDArray[np.float64], x4 : NDArray[np.float64], p : NDArray[np.float64], pet : NDArray[np.float64], x1_0 : float, x2_0 : float, m1 : float, c1 : float, c2 : float, c3 : float, mu : float, alfa : float, m2 : float, m3 : float) -> Tuple[NDArray[np.float64], NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]]:
+    """Returns dx1, dx2, dx3, dx4"""
+    sr = p * (x1 / x1_0)**m1
+    et1 = pet * (x1 / x1_0)
+    int_ = c1 * x1
+    pc = c3 * x2_0 * (1 + c2*(1 - x2 / x2_0)**m2) * (x1 / x1_0)
+    et2 = (pet - et1) * (x2 / x2_0)**m3
+    gw = c3 * x2
+    bf = (1 + mu)**(-1) * gw + int_
+    return p - sr - pc - et1 - int_, pc - et2 - gw, sr + bf - x3 * alfa, x3 * alfa - x4 * alfa
+
+def check3(x1n : NDArray[np.float64], X0 : NDArray[np.float64], c : float) -> NDArray[np.int64]:
+    cond = (x1n > _tiny) & (x1n + X0 * c < 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # values over 15 are capped below anyway
+        n = np.minimum(np.where(cond, 1/x1n * c * np.abs(X0), 0.0), 15.0)
+    return np.minimum(15, np.where(cond, 2 + np.trunc(n).astype(np.int64), 1))
+
+def check2(x2 : NDArray[np.float64], x2_0 : float, x1 : NDArray[np.float64]) -> Tuple[NDArray[np.int64], NDArray[np.bool_]]:
+    below = x2 < 0
+    above = ~below & (x2 > x2_0)
+    dry = ~below & ~above & (x1 < 0)
+    n = np.where(below, np.trunc(2 - x2 / x2_0 * 2), np.where(above, np.trunc(2 + (x2 - x2_0) / x2_0 * 2), np.where(dry, np.trunc(2 - x1 * 10), 1.0)))
+    return n.astype(np.int64), below | above | dry
+
+def check(x1n : NDArray[np.float64], x2n : NDArray[np.float64], p : NDArray[np.float64], pet : NDArray[np.float64], x1_0 : float, x2_0 : float, m1 : float, c1 : float, c2 : float, c3 : float, mu : float, m2 : float, m3 : float) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Number of substeps required for numerical stability of each member. Equivalent to sacramento_simplified_kernel.check"""
+    n1 = np.ones(len(x1n), dtype=np.int64)
+    n2 = np.ones(len(x1n), dtype=np.int64)
+    zeros = np.zeros(len(x1n))
+    x1 = x1n
+    x2 = x2n
+    done = np.zeros(len(x1n), dtype=bool)
+    for rk in range(4):
+        d = derivatives(x1, x2, zeros, zeros, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, 0.0, m2, m3)
+        denom = 1.0 if rk == 2 else 2.0
+        if rk < 3:
+            n1 = np.where(done, n1, np.maximum(n1, check3(x1n, d[0], 1 / denom)))
+        (n, fl) = check2(x2, x2_0, x1)
+        n2 = np.where(done, n2, np.maximum(n, n2))
+        done = done | fl
+        if rk < 3:
+            x1 = np.where(done, x1, constrain(x1n + d[0] / denom, x1_0))
+            x2 = np.where(done, x2, constrain(x2n + d[1] / denom, x2_0))
+    return n1, n2
+
+def memberParameters(pars : NDArray[np.float64]) -> List[Union[float, NDArray[np.float64]]]:
+    """Split pars into the 10 parameters: floats if pars has shape (10,), arrays of the members' values if pars has shape (members, 10)"""
+    pars = np.asarray(pars, dtype=np.float64)
+    if pars.ndim == 1:
+        return [float(v) for v in pars]
+    return [np.ascontiguousarray(pars[:,i]) for i in range(pars.shape[1])]
+
+def advance(
+    x : NDArray[np.float64],
+    pma : NDArray[np.float64],
+    etp : NDArray[np.float64],
+    pars : NDArray[np.float64],
+    no_check1 : bool = False,
+    no_check2 : bool = False,
+    max_npasos : int = -1,
+    rk2 : bool = False
+    ) -> Tuple[NDArray[np.float64], NDArray[np.int64]]:
+    """Advance one step of every member
+
+    Args:
+        x (NDArray[np.float64]): states of each member at the beginning of the step (shape (members, 4), already constrained)
+        pma (NDArray[np.float64]): precipitation of each member
+        etp (NDArray[np.float64]): potential evapotranspiration of each member
+        pars (NDArray[np.float64]): parameters x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3, common to all members (shape (10,)) or of each member (shape (members, 10))
+        no_check1 (bool): skip the precipitation intensity substep check
+        no_check2 (bool): skip the state derivatives substep check
+        max_npasos (int): maximum number of substeps. Negative for no limit
+        rk2 (bool): use Runge-Kutta-2 instead of Runge-Kutta-4
+
+    Returns:
+        Tuple[NDArray[np.float64], NDArray[np.int64]]: states of each member at the end of the step (shape (members, 4)) and number of substeps of each member
+    """
+    parameters = memberParameters(pars)
+    x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3 = parameters
+    inf = np.inf
+    x = np.array(x, dtype=np.float64)
+    pma = np.asarray(pma, dtype=np.float64)
+    etp = np.asarray(etp, dtype=np.float64)
+    npasos = np.ones(len(x), dtype=np.int64) if no_check1 else np.maximum(1, np.trunc(pma / 2).astype(np.int64))
+    n1 = np.ones(len(x), dtype=np.int64)
+    n2 = np.ones(len(x), dtype=np.int64)
+    if not no_check2:
+        (n1, n2) = check(x[:,0], x[:,1], pma, etp, x1_0, x2_0, m1, c1, c2, c3, mu, m2, m3)
+    npasos = np.maximum(n2, np.maximum(npasos, np.minimum(24, n1)))
+    if max_npasos >= 0:
+        npasos = np.minimum(max_npasos, npasos)
+    for l in range(int(npasos.max(initial=0))):
+        active = np.flatnonzero(l < npasos)
+        x1n, x2n, x3n, x4n = x[active,0], x[active,1], x[active,2], x[active,3]
+        x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3 = [v[active] if isinstance(v, np.ndarray) else v for v in parameters]
+        p = pma[active]
+        pet = etp[active]
+        n = npasos[active]
+        a = derivatives(x1n, x2n, x3n, x4n, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+        if rk2:
+            y1 = constrain(x1n + a[0] / n, x1_0)
+            y2 = constrain(x2n + a[1] / n, x2_0)
+            y3 = constrain(x3n + a[2] / n, inf)
+            y4 = constrain(x4n + a[3] / n, inf)
+            b = derivatives(y1, y2, y3, y4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+            w = [(a[i] + b[i]) / 2 / n for i in range(4)]
+        else:
+            y1 = constrain(x1n + a[0] / 2 / n, x1_0)
+            y2 = constrain(x2n + a[1] / 2 / n, x2_0)
+            y3 = constrain(x3n + a[2] / 2 / n, inf)
+            y4 = constrain(x4n + a[3] / 2 / n, inf)
+            b = derivatives(y1, y2, y3, y4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+            z1 = constrain(x1n + b[0] / 2 / n, x1_0)
+            z2 = constrain(x2n + b[1] / 2 / n, x2_0)
+            z3 = constrain(x3n + b[2] / 2 / n, inf)
+            z4 = constrain(x4n + b[3] / 2 / n, inf)
+            c = derivatives(z1, z2, z3, z4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+            u1 = constrain(x1n + c[0] / 1 / n, x1_0)
+            u2 = constrain(x2n + c[1] / 1 / n, x2_0)
+            u3 = constrain(x3n + c[2] / 1 / n, inf)
+            u4 = constrain(x4n + c[3] / 1 / n, inf)
+            d = derivatives(u1, u2, u3, u4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+            w = [(a[i] + 2 * b[i] + 2 * c[i] + d[i]) / 6 / n for i in range(4)]
+        x[active,0] = constrain(x1n + w[0], x1_0)
+        x[active,1] = constrain(x2n + w[1], x2_0)
+        x[active,2] = constrain(x3n + w[2], inf)
+        x[active,3] = constrain(x4n + w[3], inf)
+    return x, npasos
+
+def constrainStates(x : NDArray[np.float64], x1_0 : float, x2_0 : float) -> NDArray[np.float64]:
+    """Apply SacramentoSimplifiedProcedure.constraint to each column of x (shape (members, 4))"""
+    return np.column_stack([
+        constrain(x[:,0], x1_0),
+        constrain(x[:,1], x2_0),
+        constrain(x[:,2], np.inf),
+        constrain(x[:,3], np.inf)
+    ])
+
+def run(
+    pma : NDArray[np.float64],
+    etp : NDArray[np.float64],
+    x : NDArray[np.float64],
+    pars : NDArray[np.float64],
+    no_check1 : bool = False,
+    no_check2 : bool = False,
+    max_npasos : int = -1,
+    rk2 : bool = False
+    ) -> Tuple[NDArray[np.float64], NDArray[np.int64]]:
+    """Run the model over the forcings for a set of members sharing pma and etp (e.g. parameter sets)
+
+    Args:
+        pma (NDArray[np.float64]): precipitation of each step
+        etp (NDArray[np.float64]): potential evapotranspiration of each step
+        x (NDArray[np.float64]): initial states of each member (shape (members, 4), already constrained)
+        pars (NDArray[np.float64]): parameters common to all members (shape (10,)) or of each member (shape (members, 10))
+        no_check1, no_check2, max_npasos, rk2: see advance
+
+    Returns:
+        Tuple[NDArray[np.float64], NDArray[np.int64]]: states at the beginning of each step plus the final states (shape (steps + 1, members, 4)) and number of substeps of each step and member (shape (steps, members))
+    """
+    x = np.array(x, dtype=np.float64)
+    members = len(x)
+    states = np.empty((len(pma) + 1, members, 4))
+    substeps = np.empty((len(pma), members), dtype=np.int64)
+    states[0] = x
+    for t in range(len(pma)):
+        x, substeps[t] = advance(x, np.full(members, pma[t]), np.full(members, etp[t]), pars, no_check1, no_check2, max_npasos, rk2)
+        states[t + 1] = x
+    return states, substeps
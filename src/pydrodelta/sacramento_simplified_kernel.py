@@ -0,0 +1,213 @@
+"""State-array kernel of the simplified Sacramento model (engine "fast" of SacramentoSimplifiedProcedure).
+
+Forcings, states and fluxes are float64 arrays and scalars, and the step is subdivided with the same stability checks (check, check2, check3) and Runge-Kutta schemes of the reference implementation. If numba is installed the functions are compiled, otherwise they run as plain python."""
+import numpy as np
+from typing import Tuple, Callable
+from numpy.typing import NDArray
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+min_vectorized_sets = 20
+"""Without numba, batches of fewer parameter sets are run one set at a time by SacramentoSimplifiedProcedure.execBatch (the numpy overhead per time step of the ensemble kernel is only amortized over many sets)"""
+
+def jit(func : Callable) -> Callable:
+    """Compile func with numba if available"""
+    return njit(cache=True)(func) if njit is not None else func
+
+_tiny = float(np.finfo(np.float64).tiny)
+
+flow_columns = ["step", "substep", "substep_duration", "p", "sr", "et1", "int", "pc", "et2", "gw", "bf", "q2", "q3","deep_perc", "x1", "x2", "x3", "x4", "X1", "X2", "X3", "X4"]
+"""Columns of the mass balance flows buffer (same as SacramentoSimplifiedProcedure.flows)"""
+
+@jit
+def constrain(value : float, upper : float) -> float:
+    """max(0, min(value, upper)), with the nan semantics of the builtins"""
+    if upper < value:
+        value = upper
+    return value if value > 0 else 0.0
+
+@jit
+def derivatives(x1 : float, x2 : float, x3 : float, x4 : float, p : float, pet : float, x1_0 : float, x2_0 : float, m1 : float, c1 : float, c2 : float, c3 : float, mu : float, alfa : float, m2 : float, m3 : float) -> Tuple[float, float, float, float, float, float, float, float, float, float, float]:
+    """Returns dx1, dx2, dx3, dx4, sr, et1, int, pc, et2, gw, bf"""
+    sr = p * (x1 / x1_0)**m1
+    et1 = pet * (x1 / x1_0)
+    int_ = c1 * x1
+    pc = c3 * x2_0 * (1 + c2*(1 - x2 / x2_0)**m2) * (x1 / x1_0)
+    et2 = (pet - et1) * (x2 / x2_0)**m3
+    gw = c3 * x2
+    bf = (1 + mu)**(-1) * gw + int_
+    return p - sr - pc - et1 - int_, pc - et2 - gw, sr + bf - x3 * alfa, x3 * alfa - x4 * alfa, sr, et1, int_, pc, et2, gw, bf
+
+@jit
+def check3(x1n : float, X0 : float, c : float) -> int:
+    nn = 1
+    if x1n > _tiny and x1n + X0 * c < 0:
+        nn = 2 + int(1/x1n * c * abs(X0))
+    return min(15, nn)
+
+@jit
+def check2(x2 : float, x2_0 : float, x1 : float) -> Tuple[int, int]:
+    if x2 < 0:
+        return (int(2 - x2 / x2_0 * 2), 1)
+    elif x2 > x2_0:
+        return (int( 2 + (x2 - x2_0) / x2_0 * 2), 1)
+    elif x1 < 0:
+        return (int(2 - x1 * 10), 1)
+    else:
+        return (1, 0)
+
+@jit
+def check(x1n : float, x2n : float, p : float, pet : float, x1_0 : float, x2_0 : float, m1 : float, c1 : float, c2 : float, c3 : float, mu : float, m2 : float, m3 : float) -> Tuple[int, int]:
+    """Number of substeps required for numerical stability. Equivalent to SacramentoSimplifiedProcedure.check"""
+    n1 = 1
+    n2 = 1
+    x1 = x1n
+    x2 = x2n
+    rk = 0
+    while rk <= 3:
+        d = derivatives(x1, x2, 0.0, 0.0, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, 0.0, m2, m3)
+        denom = 1.0 if rk == 2 else 2.0
+        if rk < 3:
+            n1 = max(n1, check3(x1n, d[0], 1 / denom))
+        (n, fl) = check2(x2, x2_0, x1)
+        n2 = max(n, n2)
+        rk = 3 if fl == 1 else rk
+        if rk < 3:
+            x1 = constrain(x1n + d[0] / denom, x1_0)
+            x2 = constrain(x2n + d[1] / denom, x2_0)
+        rk = rk + 1
+    return (n1, n2)
+
+@jit
+def run(
+    pma : NDArray[np.float64],
+    etp : NDArray[np.float64],
+    x_init : NDArray[np.float64],
+    pars : NDArray[np.float64],
+    no_check1 : bool,
+    no_check2 : bool,
+    max_npasos : int,
+    rk2 : bool,
+    compute_mass_balance : bool
+    ) -> Tuple[NDArray[np.float64], NDArray[np.int64], NDArray[np.float64]]:
+    """Run the model over the forcings
+
+    Args:
+        pma (NDArray[np.float64]): precipitation of each step
+        etp (NDArray[np.float64]): potential evapotranspiration of each step
+        x_init (NDArray[np.float64]): initial states x1, x2, x3, x4 (already constrained)
+        pars (NDArray[np.float64]): parameters x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3
+        no_check1 (bool): skip the precipitation intensity substep check
+        no_check2 (bool): skip the state derivatives substep check
+        max_npasos (int): maximum number of substeps. Negative for no limit
+        rk2 (bool): use Runge-Kutta-2 instead of Runge-Kutta-4
+        compute_mass_balance (bool): accumulate the mean flows of each substep
+
+    Returns:
+        Tuple[NDArray[np.float64], NDArray[np.int64], NDArray[np.float64]]: states at the beginning of each step plus final states (shape (n+1, 4)), number of substeps of each step, and mean flows of each substep (shape (m, 22), see flow_columns. Empty if compute_mass_balance is False)
+    """
+    x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3 = pars[0], pars[1], pars[2], pars[3], pars[4], pars[5], pars[6], pars[7], pars[8], pars[9]
+    inf = np.inf
+    n = len(pma)
+    states = np.empty((n + 1, 4))
+    substeps = np.empty(n, dtype=np.int64)
+    flows = np.empty((4 * n if compute_mass_balance else 0, 22))
+    n_flows = 0
+    deep_perc_coef = c3 * (1 - (1 + mu)**(-1))
+    x1, x2, x3, x4 = x_init[0], x_init[1], x_init[2], x_init[3]
+    for k in range(n):
+        states[k, 0] = x1
+        states[k, 1] = x2
+        states[k, 2] = x3
+        states[k, 3] = x4
+        p = pma[k]
+        pet = etp[k]
+        npasos = 1 if no_check1 else max(1, int(p / 2))
+        n1 = 1
+        n2 = 1
+        if not no_check2:
+            (n1, n2) = check(x1, x2, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, m2, m3)
+        npasos = max(n2, max(npasos, min(24, n1)))
+        if max_npasos >= 0:
+            npasos = min(max_npasos, npasos)
+        substeps[k] = npasos
+        for l in range(npasos):
+            # x_n: states at the beginning of the substep
+            x1n, x2n, x3n, x4n = x1, x2, x3, x4
+            a = derivatives(x1n, x2n, x3n, x4n, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+            if rk2:
+                y1 = constrain(x1n + a[0] / npasos, x1_0)
+                y2 = constrain(x2n + a[1] / npasos, x2_0)
+                y3 = constrain(x3n + a[2] / npasos, inf)
+                y4 = constrain(x4n + a[3] / npasos, inf)
+                b = derivatives(y1, y2, y3, y4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+                w1 = (a[0] + b[0]) / 2 / npasos
+                w2 = (a[1] + b[1]) / 2 / npasos
+                w3 = (a[2] + b[2]) / 2 / npasos
+                w4 = (a[3] + b[3]) / 2 / npasos
+            else:
+                y1 = constrain(x1n + a[0] / 2 / npasos, x1_0)
+                y2 = constrain(x2n + a[1] / 2 / npasos, x2_0)
+                y3 = constrain(x3n + a[2] / 2 / npasos, inf)
+                y4 = constrain(x4n + a[3] / 2 / npasos, inf)
+                b = derivatives(y1, y2, y3, y4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+                z1 = constrain(x1n + b[0] / 2 / npasos, x1_0)
+                z2 = constrain(x2n + b[1] / 2 / npasos, x2_0)
+                z3 = constrain(x3n + b[2] / 2 / npasos, inf)
+                z4 = constrain(x4n + b[3] / 2 / npasos, inf)
+                c = derivatives(z1, z2, z3, z4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+                u1 = constrain(x1n + c[0] / 1 / npasos, x1_0)
+                u2 = constrain(x2n + c[1] / 1 / npasos, x2_0)
+                u3 = constrain(x3n + c[2] / 1 / npasos, inf)
+                u4 = constrain(x4n + c[3] / 1 / npasos, inf)
+                d = derivatives(u1, u2, u3, u4, p, pet, x1_0, x2_0, m1, c1, c2, c3, mu, alfa, m2, m3)
+                w1 = (a[0] + 2 * b[0] + 2 * c[0] + d[0]) / 6 / npasos
+                w2 = (a[1] + 2 * b[1] + 2 * c[1] + d[1]) / 6 / npasos
+                w3 = (a[2] + 2 * b[2] + 2 * c[2] + d[2]) / 6 / npasos
+                w4 = (a[3] + 2 * b[3] + 2 * c[3] + d[3]) / 6 / npasos
+            x1 = constrain(x1n + w1, x1_0)
+            x2 = constrain(x2n + w2, x2_0)
+            x3 = constrain(x3n + w3, inf)
+            x4 = constrain(x4n + w4, inf)
+            if compute_mass_balance:
+                if n_flows == flows.shape[0]:
+                    grown = np.empty((2 * flows.shape[0] + 16, 22))
+                    grown[:n_flows] = flows[:n_flows]
+                    flows = grown
+                row = flows[n_flows]
+                row[0] = k
+                row[1] = l
+                row[2] = 1 / npasos
+                # p, sr, et1, int, pc, et2, gw, bf
+                row[3] = p
+                for j in range(7):
+                    if rk2:
+                        row[4 + j] = (a[4 + j] + b[4 + j]) / 2
+                    else:
+                        row[4 + j] = (a[4 + j] + 2 * b[4 + j] + 2 * c[4 + j] + d[4 + j]) / 6
+                # q2, q3, deep_perc
+                if rk2:
+                    row[11] = (x3n + y3) * alfa / 2
+                    row[12] = (x4n + y4) * alfa / 2
+                    row[13] = (x2n + y2) * deep_perc_coef / 2
+                else:
+                    row[11] = (x3n + 2 * y3 + 2 * z3 + u3) * alfa / 6
+                    row[12] = (x4n + 2 * y4 + 2 * z4 + u4) * alfa / 6
+                    row[13] = (x2n + 2 * y2 + 2 * z2 + u2) * deep_perc_coef / 6
+                row[14] = x1n
+                row[15] = x2n
+                row[16] = x3n
+                row[17] = x4n
+                row[18] = w1
+                row[19] = w2
+                row[20] = w3
+                row[21] = w4
+                n_flows += 1
+    states[n, 0] = x1
+    states[n, 1] = x2
+    states[n, 2] = x3
+    states[n, 3] = x4
+    return states, substeps, flows[:n_flows]
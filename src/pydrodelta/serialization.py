@@ -0,0 +1,227 @@
+"""Columnar serialization of timeseries into time-value pair records (NodeSerie.toList) and json output of the resulting payloads.
+
+Timestamps are formatted in bulk with numpy (wall time plus the UTC offset of each row) and the time support is added with index arithmetic when it is a fixed duration. Value, tag and qualifier columns are read as lists and qualifier records are melted with array operations, so that the only per-row python work left is building the dicts. Records (content, key order and order of records) are identical to those of the per-record implementation. json output uses orjson if installed, otherwise the standard json module. Both write NaN and Infinity as null."""
+import json
+import logging
+import math
+import numpy as np
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from pandas import DataFrame, DatetimeIndex, Timedelta, isna
+from typing import Any, Dict, IO, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _formatOffset(seconds : int) -> str:
+    sign = "-" if seconds < 0 else "+"
+    hours, minutes = divmod(abs(seconds) // 60, 60)
+    return "%s%02d:%02d" % (sign, hours, minutes)
+
+def isoformat(dates : DatetimeIndex) -> List[str]:
+    """Returns [x.isoformat() for x in dates], formatted in bulk. Falls back to per-element formatting for missing dates, dates with fractional seconds or UTC offsets that are not whole minutes"""
+    if not isinstance(dates, DatetimeIndex):
+        dates = DatetimeIndex(dates)
+    if not len(dates):
+        return []
+    if dates.hasnans:
+        return [x.isoformat() for x in dates]
+    wall = dates.tz_localize(None) if dates.tz is not None else dates
+    wall_values = wall.values
+    seconds = wall_values.astype("datetime64[s]")
+    if (wall_values != seconds).any():
+        return [x.isoformat() for x in dates]
+    strings = np.datetime_as_string(seconds, unit="s")
+    if dates.tz is None:
+        return strings.tolist()
+    offsets = (wall_values - dates.tz_convert(None).values).astype("timedelta64[s]").astype(np.int64)
+    unique_offsets, inverse = np.unique(offsets, return_inverse=True)
+    if (unique_offsets % 60).any():
+        return [x.isoformat() for x in dates]
+    suffixes = np.array([_formatOffset(int(o)) for o in unique_offsets])[inverse.ravel()]
+    return np.char.add(strings, suffixes).tolist()
+
+def _fixedDuration(duration : Union[relativedelta,timedelta]) -> Optional[Timedelta]:
+    """duration as a Timedelta if adding it is the same as adding a fixed amount of time (no years, months, leap days, weekday or absolute fields), else None"""
+    if isinstance(duration, timedelta):
+        return Timedelta(duration)
+    if not isinstance(duration, relativedelta):
+        return None
+    if duration.years or duration.months or duration.leapdays or duration.weekday is not None:
+        return None
+    if any(getattr(duration, a) is not None for a in ("year", "month", "day", "hour", "minute", "second", "microsecond")):
+        return None
+    return Timedelta(days=duration.days, hours=duration.hours, minutes=duration.minutes, seconds=duration.seconds, microseconds=duration.microseconds)
+
+def addDuration(dates : DatetimeIndex, duration : Union[relativedelta,timedelta]) -> DatetimeIndex:
+    """Returns [x + duration for x in dates]. Vectorized if duration is a fixed duration"""
+    fixed = _fixedDuration(duration)
+    if fixed is not None:
+        return dates + fixed
+    return DatetimeIndex([x + duration for x in dates])
+
+def _objectArray(values : list) -> np.ndarray:
+    """values as a 1d object array (elements are kept as they are)"""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _columnLists(data : DataFrame) -> Dict[Any,list]:
+    """Columns of data as lists, with the same python values as data.to_dict(orient="records"). Non-object columns are converted with Series.tolist, which is much faster than to_dict for numeric columns"""
+    object_columns = [c for c, dtype in data.dtypes.items() if dtype == object]
+    boxed = data[object_columns].to_dict(orient="list") if len(object_columns) else {}
+    return {c: boxed[c] if c in boxed else data[c].tolist() for c in data.columns}
+
+def _warnNaN(message : str, count : int, first : str) -> None:
+    logging.warning("%s (%i values, first at %s)" % (message, count, first))
+
+def toRecords(
+    data : DataFrame,
+    series_id : Optional[int] = None,
+    include_series_id : bool = False,
+    timeSupport : Optional[Union[relativedelta,timedelta]] = None,
+    remove_nulls : bool = False,
+    qualifiers : Optional[List[str]] = None,
+    value_key : str = "valor",
+    strict_properties : bool = False
+    ) -> List[Dict[str,Any]]:
+    """Convert a timeseries (DataFrame with DatetimeIndex) to a list of time-value pair dicts (see NodeSerie.toList)
+
+    Parameters:
+    -----------
+    data : DataFrame
+        Timeseries. The DatetimeIndex is used as timestart
+
+    series_id : int = None
+        Value of series_id when include_series_id is True
+
+    include_series_id, timeSupport, remove_nulls, qualifiers, value_key, strict_properties :
+        See NodeSerie.toList
+
+    Returns:
+    --------
+    list of time-value pair dicts : List[dict]"""
+    n = len(data)
+    if not n:
+        return []
+    index = data.index if isinstance(data.index, DatetimeIndex) else DatetimeIndex(data.index)
+    timestart = isoformat(index)
+    timeend = isoformat(addDuration(index, timeSupport)) if timeSupport is not None else timestart
+    if strict_properties:
+        needed = {value_key, "valor", "tag", *(qualifiers or [])}
+        columns = _columnLists(data[[c for c in data.columns if c in needed]])
+    else:
+        columns = _columnLists(data)
+    missing = {c: data[c].isna().to_numpy() for c in columns if c in (value_key, "tag", "valor", *(qualifiers or []))}
+    columns["timestart"] = timestart
+    columns["timeend"] = timeend
+    if include_series_id:
+        columns["series_id"] = [series_id] * n
+        missing.pop("series_id", None)
+    for key in ("timestart", "timeend"):
+        missing.pop(key, None)
+    # valor of the "main" qualifier is read before value_key is copied into valor
+    raw_valor = (columns["valor"], missing["valor"]) if "valor" in columns else None
+    values = columns[value_key]
+    value_missing = missing[value_key] if value_key in missing else np.fromiter((isna(v) for v in values), dtype=bool, count=n)
+    if value_missing.any():
+        values = [None if m else v for v, m in zip(values, value_missing.tolist())]
+        columns[value_key] = values
+        if value_key == "valor":
+            raw_valor = (values, value_missing)
+    if "tag" in columns:
+        if missing["tag"].any():
+            columns["tag"] = [None if m else v for v, m in zip(columns["tag"], missing["tag"].tolist())]
+    else:
+        columns["tag"] = [None] * n
+    missing["tag"] = np.ones(n, dtype=bool) if "tag" not in missing else missing["tag"]
+    # qualifier records
+    qualifier_obs : List[Dict[str,Any]] = []
+    if qualifiers is not None:
+        rows = []
+        positions = []
+        qualifier_values = []
+        for j, qualifier in enumerate(qualifiers):
+            if qualifier in columns:
+                source = columns[qualifier]
+                invalid = missing[qualifier] if qualifier in missing else np.fromiter((isna(v) for v in source), dtype=bool, count=n)
+                if invalid.any():
+                    _warnNaN("Qualifier %s is NaN in series_id %s" % (qualifier, series_id), int(invalid.sum()), timestart[int(np.argmax(invalid))])
+            elif qualifier == "main":
+                if raw_valor is None:
+                    raise KeyError("valor")
+                source, invalid = raw_valor
+                if invalid.any():
+                    _warnNaN("Main qualifier is NaN in series_id %s" % series_id, int(invalid.sum()), timestart[int(np.argmax(invalid))])
+            else:
+                logging.debug(f"Qualifier {qualifier} not found in series_id {series_id}")
+                continue
+            valid = np.flatnonzero(~invalid)
+            rows.append(valid)
+            positions.append(np.full(len(valid), j))
+            qualifier_values.append(_objectArray(source)[valid])
+        if len(rows):
+            # row-major order: all qualifiers of a row, in the order they were given, before the next row
+            row = np.concatenate(rows)
+            position = np.concatenate(positions)
+            order = np.lexsort((position, row))
+            row = row[order]
+            fields = [
+                _objectArray(timestart)[row].tolist(),
+                _objectArray(timeend)[row].tolist(),
+                np.concatenate(qualifier_values)[order].tolist(),
+                _objectArray(qualifiers)[position[order]].tolist()
+            ]
+            if include_series_id:
+                qualifier_obs = [{"timestart": ts, "timeend": te, "valor": v, "qualifier": q, "series_id": series_id} for ts, te, v, q in zip(*fields)]
+            else:
+                qualifier_obs = [{"timestart": ts, "timeend": te, "valor": v, "qualifier": q} for ts, te, v, q in zip(*fields)]
+    # main records
+    columns["valor"] = values
+    main_obs : List[Dict[str,Any]] = []
+    if qualifiers is None or "main" not in qualifiers:
+        if strict_properties:
+            keys = ["timestart", "timeend", "valor"] + (["series_id"] if include_series_id else [])
+        else:
+            keys = list(columns.keys())
+        if qualifiers is not None:
+            if "qualifier" not in keys:
+                keys.append("qualifier")
+            columns["qualifier"] = ["main"] * n
+        selected = [columns[k] for k in keys]
+        if remove_nulls and value_missing.any():
+            keep = np.flatnonzero(~value_missing).tolist()
+            selected = [[c[i] for i in keep] for c in selected]
+        main_obs = [dict(zip(keys, row)) for row in zip(*selected)]
+    return [*main_obs, *qualifier_obs]
+
+def _finite(obj : Any) -> Any:
+    """Returns obj with NaN and Infinity floats of nested dicts, lists and tuples replaced by None, as orjson writes them. obj is returned as is if it contains none"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        values = [_finite(v) for v in obj.values()]
+        return obj if all(a is b for a, b in zip(values, obj.values())) else dict(zip(obj.keys(), values))
+    if isinstance(obj, (list, tuple)):
+        items = [_finite(v) for v in obj]
+        return obj if all(a is b for a, b in zip(items, obj)) else items
+    return obj
+
+def dumps(obj : Any, indent : Optional[int] = None) -> str:
+    """Serialize obj to a json string. Uses orjson if installed and indent is None or 2 (orjson output is compact, or indented with 2 spaces). Otherwise, or if orjson can't serialize obj, uses the standard json module. With either backend NaN and Infinity are written as null (json.dumps would write NaN and Infinity, which is not valid json)"""
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent == 2 else 0)
+        try:
+            return orjson.dumps(obj, option=option).decode()
+        except TypeError:
+            pass
+    return json.dumps(_finite(obj), indent=indent)
+
+def dump(obj : Any, fp : IO[str], indent : Optional[int] = None) -> None:
+    """Serialize obj as json into the text file fp (see dumps). With the standard json module, output is written in chunks as it is encoded"""
+    if orjson is not None and indent in (None, 2):
+        fp.write(dumps(obj, indent=indent))
+        return
+    json.dump(_finite(obj), fp, indent=indent)
@@ -0,0 +1,363 @@
+import logging
+import sqlite3
+import json
+import pickle
+import time
+import threading
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union, List, Tuple
+from dateutil.relativedelta import relativedelta
+from a5client import Crud
+from a5client.util import tryParseAndLocalizeDate, interval2relativedelta
+from .types.series_cache_dict import SeriesCacheDict
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "pydrodelta"
+
+class SeriesCache:
+    """Persistent on-disk cache of input api data, stored in a sqlite database.
+
+    Observations are kept per (api, tipo, series_id, qualifier) together with the covered time window. On each read only the missing head, the missing tail and the revision window (the last part of the covered window, where recent data may have been corrected) are requested from the api and merged into the cached observations.
+
+    Forecasts are kept per (api, tipo, series_id, cal_id, cor_id, qualifier) together with the forecast_date of the run. Runs are immutable, so a cached run is reused as long as it covers the requested window. When the last run is requested, a light-weight runs query (without values) tells whether a new run is available.
+
+    When the database grows beyond max_size, least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path : Optional[Union[str,Path]] = None,
+        max_size : float = 1024,
+        revision_window : Union[dict,relativedelta] = {"days": 1}
+        ):
+        """
+        Parameters:
+        -----------
+        path : str or Path = None
+            Cache directory. Defaults to ~/.cache/pydrodelta
+
+        max_size : float = 1024
+            Maximum size of the cache in megabytes
+
+        revision_window : dict or relativedelta = {"days": 1}
+            Observations of this period before the end of the cached window are downloaded again on each read
+        """
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_PATH
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive number")
+        self.max_size = max_size
+        self.revision_window = interval2relativedelta(revision_window)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.path / "series_cache.sqlite"
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            with conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS series (
+                    api TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    series_id INTEGER NOT NULL,
+                    qualifier TEXT NOT NULL,
+                    coverage_start REAL NOT NULL,
+                    coverage_end REAL NOT NULL,
+                    metadata TEXT,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (api, tipo, series_id, qualifier))""")
+                conn.execute("""CREATE TABLE IF NOT EXISTS observaciones (
+                    api TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    series_id INTEGER NOT NULL,
+                    qualifier TEXT NOT NULL,
+                    time REAL NOT NULL,
+                    timestart TEXT NOT NULL,
+                    valor REAL,
+                    PRIMARY KEY (api, tipo, series_id, qualifier, time)) WITHOUT ROWID""")
+                conn.execute("""CREATE TABLE IF NOT EXISTS pronosticos (
+                    api TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    series_id INTEGER NOT NULL,
+                    cal_id INTEGER NOT NULL,
+                    cor_id INTEGER NOT NULL,
+                    qualifier TEXT NOT NULL,
+                    forecast_date REAL NOT NULL,
+                    coverage_start REAL NOT NULL,
+                    coverage_end REAL NOT NULL,
+                    data BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (api, tipo, series_id, cal_id, cor_id, qualifier))""")
+        self.hits = 0
+        """Number of reads served (at least partially) from the cache"""
+        self.misses = 0
+        """Number of reads fully downloaded from the api"""
+        self._counts_lock = threading.Lock()
+
+    def _count(self, hit : bool) -> None:
+        """Count a read as a hit or a miss. Reads may run concurrently (see concurrent_load.runLoadTasks)"""
+        with self._counts_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection to the cache database. Connections must not be shared between threads"""
+        return sqlite3.connect(self.db_path, timeout=60)
+
+    def readSerie(
+        self,
+        crud : Crud,
+        series_id : int,
+        timestart : datetime,
+        timeend : datetime,
+        tipo : str = "puntual",
+        no_metadata : bool = False
+        ) -> dict:
+        """Retrieve serie, downloading from the api only what's missing from the cache. Returns the same structure as Crud.readSerie
+
+        Parameters:
+        -----------
+        crud : Crud
+            Api client
+
+        series_id : int
+            Series identifier
+
+        timestart : datetime
+            Begin timestamp
+
+        timeend : datetime
+            End timestamp
+
+        tipo : str = "puntual"
+            Geometry type: puntual, areal, raster
+
+        no_metadata : bool = False
+            Don't retrieve metadata
+
+        Returns:
+        --------
+        dict : serie with observations in 'observaciones' key
+        """
+        key = (crud.url, tipo, series_id, "")
+        start = timestart.timestamp()
+        end = timeend.timestamp()
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT coverage_start, coverage_end, metadata FROM series WHERE api=? AND tipo=? AND series_id=? AND qualifier=?", key).fetchone()
+        windows : List[Tuple[datetime,datetime]] = []
+        if row is None or start > row[1] or end < row[0]:
+            # not cached or no overlap: download the whole window
+            windows.append((timestart, timeend))
+            coverage = (start, end)
+            replace = True
+        else:
+            replace = False
+            coverage_start = datetime.fromtimestamp(row[0], tz=timestart.tzinfo)
+            coverage_end = datetime.fromtimestamp(row[1], tz=timestart.tzinfo)
+            if timestart < coverage_start:
+                windows.append((timestart, coverage_start))
+            revision_start = max(coverage_end - self.revision_window, timestart)
+            if timeend > revision_start:
+                windows.append((revision_start, timeend))
+            elif not no_metadata and row[2] is None:
+                windows.append((timestart, timeend))
+            coverage = (min(row[0], start), max(row[1], end))
+        metadata = json.loads(row[2]) if row is not None and row[2] is not None and not replace else None
+        replace_all = replace
+        for ws, we in windows:
+            logging.debug("SeriesCache: download series_id %i, tipo %s [%s to %s]" % (series_id, tipo, ws.isoformat(), we.isoformat()))
+            serie = crud.readSerie(series_id, ws, we, tipo = tipo, no_metadata = no_metadata)
+            observaciones = serie.pop("observaciones", [])
+            if not no_metadata:
+                metadata = serie
+            self._storeObservaciones(key, ws.timestamp(), we.timestamp(), observaciones, replace=replace)
+            replace = False
+        self._count(not replace_all)
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO series (api, tipo, series_id, qualifier, coverage_start, coverage_end, metadata, last_access) VALUES (?,?,?,?,?,?,?,?)", (*key, coverage[0], coverage[1], json.dumps(metadata) if metadata is not None else None, time.time()))
+            observaciones = [
+                {"timestart": r[0], "valor": r[1]}
+                for r in conn.execute("SELECT timestart, valor FROM observaciones WHERE api=? AND tipo=? AND series_id=? AND qualifier=? AND time>=? AND time<=? ORDER BY time", (*key, start, end))
+            ]
+        if len(windows):
+            self.evict()
+        if no_metadata or metadata is None:
+            return {"id": series_id, "tipo": tipo, "observaciones": observaciones}
+        return {**metadata, "observaciones": observaciones}
+
+    def _storeObservaciones(
+        self,
+        key : tuple,
+        start : float,
+        end : float,
+        observaciones : list,
+        replace : bool = False
+        ) -> None:
+        """Replace cached observations of [start, end] (or, if replace=True, all cached observations of the series) with observaciones"""
+        rows = [
+            (*key, tryParseAndLocalizeDate(o["timestart"]).timestamp(), o["timestart"] if isinstance(o["timestart"], str) else o["timestart"].isoformat(), o["valor"])
+            for o in observaciones
+        ]
+        with closing(self.connect()) as conn:
+            with conn:
+                if replace:
+                    conn.execute("DELETE FROM observaciones WHERE api=? AND tipo=? AND series_id=? AND qualifier=?", key)
+                else:
+                    conn.execute("DELETE FROM observaciones WHERE api=? AND tipo=? AND series_id=? AND qualifier=? AND time>=? AND time<=?", (*key, start, end))
+                conn.executemany("INSERT OR REPLACE INTO observaciones (api, tipo, series_id, qualifier, time, timestart, valor) VALUES (?,?,?,?,?,?,?)", rows)
+
+    def readSerieProno(
+        self,
+        crud : Crud,
+        series_id : int,
+        cal_id : int,
+        timestart : datetime,
+        timeend : datetime,
+        qualifier : Optional[str] = None,
+        cor_id : Optional[int] = None,
+        forecast_timestart : Optional[datetime] = None,
+        tipo : str = "puntual"
+        ) -> dict:
+        """Retrieve forecast run, reusing a cached run if it covers the requested window. Returns the same structure as Crud.readSerieProno
+
+        Parameters:
+        -----------
+        crud : Crud
+            Api client
+
+        series_id : int
+            Series identifier
+
+        cal_id : int
+            Simulation configuration identifier
+
+        timestart : datetime
+            Begin timestamp
+
+        timeend : datetime
+            End timestamp
+
+        qualifier : str = None
+            Forecast qualifier. If 'all', returns all qualifiers
+
+        cor_id : int = None
+            Forecast run identifier. If None, retrieves the last run
+
+        forecast_timestart : datetime = None
+            Forecast date must be greater or equal to this value. Ignored if cor_id is set
+
+        tipo : str = "puntual"
+            Geometry type: puntual, areal, raster
+
+        Returns:
+        --------
+        dict : forecast run with forecasted values in 'pronosticos' key
+        """
+        qualifier_ = qualifier if qualifier is not None else ""
+        start = timestart.timestamp()
+        end = timeend.timestamp()
+        if cor_id is None:
+            with closing(self.connect()) as conn:
+                newest = conn.execute("SELECT max(forecast_date) FROM pronosticos WHERE api=? AND tipo=? AND series_id=? AND cal_id=? AND qualifier=?", (crud.url, tipo, series_id, cal_id, qualifier_)).fetchone()[0]
+            if newest is not None and (forecast_timestart is None or newest >= forecast_timestart.timestamp()):
+                # look for runs not older than the newest cached one
+                corridas = crud.readCorridas(cal_id, series_id = series_id, tipo = tipo, forecast_timestart = datetime.fromtimestamp(newest, tz=timestart.tzinfo))
+                cor_id = corridas[len(corridas)-1]["id"] if len(corridas) else None
+            else:
+                cor_id = None
+        if cor_id is not None:
+            with closing(self.connect()) as conn:
+                row = conn.execute("SELECT data FROM pronosticos WHERE api=? AND tipo=? AND series_id=? AND cal_id=? AND cor_id=? AND qualifier=? AND coverage_start<=? AND coverage_end>=?", (crud.url, tipo, series_id, cal_id, cor_id, qualifier_, start, end)).fetchone()
+                if row is not None:
+                    with conn:
+                        conn.execute("UPDATE pronosticos SET last_access=? WHERE api=? AND tipo=? AND series_id=? AND cal_id=? AND cor_id=? AND qualifier=?", (time.time(), crud.url, tipo, series_id, cal_id, cor_id, qualifier_))
+            if row is not None:
+                self._count(True)
+                return filterPronosticos(pickle.loads(row[0]), timestart, timeend)
+        self._count(False)
+        logging.debug("SeriesCache: download forecast series_id %i, tipo %s, cal_id %i, cor_id %s" % (series_id, tipo, cal_id, str(cor_id) if cor_id is not None else "last"))
+        metadata = crud.readSerieProno(
+            series_id,
+            cal_id,
+            timestart = timestart,
+            timeend = timeend,
+            qualifier = qualifier,
+            cor_id = cor_id,
+            forecast_timestart = forecast_timestart if cor_id is None else None,
+            tipo = tipo)
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO pronosticos (api, tipo, series_id, cal_id, cor_id, qualifier, forecast_date, coverage_start, coverage_end, data, last_access) VALUES (?,?,?,?,?,?,?,?,?,?,?)", (crud.url, tipo, series_id, cal_id, metadata["cor_id"], qualifier_, tryParseAndLocalizeDate(metadata["forecast_date"]).timestamp(), start, end, pickle.dumps(metadata), time.time()))
+        self.evict()
+        return metadata
+
+    def size(self) -> float:
+        """Size of the stored data in megabytes"""
+        with closing(self.connect()) as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist_count) * page_size / 1024**2
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the size of the cache is not greater than max_size. Returns the number of removed entries"""
+        removed = 0
+        while self.size() > self.max_size:
+            with closing(self.connect()) as conn:
+                with conn:
+                    entry = conn.execute("""SELECT 'series', api, tipo, series_id, qualifier, NULL, NULL, last_access FROM series
+                        UNION ALL SELECT 'pronosticos', api, tipo, series_id, qualifier, cal_id, cor_id, last_access FROM pronosticos
+                        ORDER BY last_access LIMIT 1""").fetchone()
+                    if entry is None:
+                        break
+                    if entry[0] == "series":
+                        conn.execute("DELETE FROM series WHERE api=? AND tipo=? AND series_id=? AND qualifier=?", entry[1:5])
+                        conn.execute("DELETE FROM observaciones WHERE api=? AND tipo=? AND series_id=? AND qualifier=?", entry[1:5])
+                    else:
+                        conn.execute("DELETE FROM pronosticos WHERE api=? AND tipo=? AND series_id=? AND qualifier=? AND cal_id=? AND cor_id=?", entry[1:7])
+                conn.execute("PRAGMA incremental_vacuum")
+            logging.debug("SeriesCache: evicted %s %s" % (entry[0], str(entry[1:7])))
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("DELETE FROM series")
+                conn.execute("DELETE FROM observaciones")
+                conn.execute("DELETE FROM pronosticos")
+            conn.execute("PRAGMA incremental_vacuum")
+
+def filterPronosticos(
+    metadata : dict,
+    timestart : datetime,
+    timeend : datetime
+    ) -> dict:
+    """Copy of forecast run metadata keeping only forecasted values with timestart between timestart and timeend. Supports runs grouped by qualifier"""
+    def inWindow(p : dict) -> bool:
+        t = tryParseAndLocalizeDate(p["timestart"])
+        return t >= timestart and t <= timeend
+    pronosticos = []
+    for p in metadata["pronosticos"]:
+        if "pronosticos" in p:
+            pronosticos.append({**p, "pronosticos": [x for x in p["pronosticos"] if inWindow(x)]})
+        elif inWindow(p):
+            pronosticos.append(p)
+    return {**metadata, "pronosticos": pronosticos}
+
+def createSeriesCache(
+    config : Optional[SeriesCacheDict],
+    base_path : Optional[Path] = None
+    ) -> Optional[SeriesCache]:
+    """Create SeriesCache from configuration dict. Returns None if config is None. Relative paths are resolved against base_path"""
+    if config is None:
+        return None
+    path = config.get("path")
+    if path is not None and base_path is not None and not Path(path).is_absolute():
+        path = base_path / path
+    return SeriesCache(
+        path = path,
+        max_size = config.get("max_size", 1024),
+        revision_window = config.get("revision_window", {"days": 1}))
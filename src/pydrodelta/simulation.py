@@ -7,6 +7,7 @@ from .plan import Plan
 from .config import config
 from json import dump as json_dump 
 from .util import ParseApiConfig, resolve_path
+from . import profiling
 from pathlib import Path
 
 logging.basicConfig(
@@ -86,7 +87,12 @@ root_logger.addHandler(str_handler)
 @click.option("--input-api",help="Override config.input_api. sintax: token@url. Token and url of the service from where to load data", type=str)
 @click.option("--output-api",help="Override config.output_api. sintax: token@url. Token and url of the service where to upload analysis output", type=str)
 @click.option("--save-calibration-result",help="Save fitter parameters and scores as yaml",type=str, default=None)
-def run_plan(self,config_file,csv,json,graph_file,export_corrida_json,export_corrida_csv,pivot,upload,include_prono,verbose,output_stats,output_results,plot_var,pretty,output_analysis,quiet,upload_prono, save_upload_response,input_api,output_api,save_calibration_result):
+@click.option("--no-cache", is_flag=True, help="Don't use the local cache of input api data (download all data)", default=False, show_default=True)
+@click.option("--full", is_flag=True, help="In incremental mode, process all nodes and run all procedures (refreshes the incremental store)", default=False, show_default=True)
+@click.option("--profile", help="Save a timing tree of the run (per stage, node, series and procedure, with call counts and uploaded bytes) into this file (json)", type=str, default=None)
+@click.option("--profile-dump", help="Also save the output of a profiler into this file (see --profiler)", type=str, default=None)
+@click.option("--profiler", help="Profiler used for --profile-dump: cprofile (pstats file) or pyinstrument (html report, requires pyinstrument)", type=click.Choice(["cprofile","pyinstrument"]), default="cprofile", show_default=True)
+def run_plan(self,config_file,csv,json,graph_file,export_corrida_json,export_corrida_csv,pivot,upload,include_prono,verbose,output_stats,output_results,plot_var,pretty,output_analysis,quiet,upload_prono, save_upload_response,input_api,output_api,save_calibration_result,no_cache,full,profile,profile_dump,profiler):
     """
     run plan from plan config file
     
@@ -103,6 +109,9 @@ def run_plan(self,config_file,csv,json,graph_file,export_corrida_json,export_cor
         # root.addHandler(handler)
     elif quiet:
         str_handler.setLevel(logging.ERROR)
+    if profile is not None or profile_dump is not None:
+        # profiling stops (and results are saved) when the command ends
+        self.with_resource(profiling.profile(output=profile, dump=profile_dump, profiler=profiler))
     config_path = Path(config_file).resolve()
     with open(config_path) as f:
         t_config = yaml.safe_load(f)
@@ -124,12 +133,15 @@ def run_plan(self,config_file,csv,json,graph_file,export_corrida_json,export_cor
     except ValueError as e:
         raise ValueError("Invalid parameter --output-api: %s" % str(e))   
     plan = Plan(**t_config, base_path=config_path.parent)
+    if no_cache and plan.topology is not None:
+        plan.topology.cache = None
     plan.execute(
         include_prono = include_prono,
         upload = upload_prono,
         pretty = pretty,
         input_api_config = input_api_config,
-        output_api_config = output_api_config)
+        output_api_config = output_api_config,
+        full = full)
     if csv is not None:
         if plan.topology is None:
             raise RuntimeError("topology not set")
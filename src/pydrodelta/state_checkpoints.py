@@ -0,0 +1,176 @@
+import logging
+import sqlite3
+import json
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union, List, Tuple, Iterable, Any
+from dateutil.relativedelta import relativedelta
+from a5client.util import interval2relativedelta
+from .series_cache import DEFAULT_CACHE_PATH
+from .types.state_checkpoints_dict import StateCheckpointsDict
+
+class StateCheckpointStore:
+    """Persistent store of procedure states (warm-start checkpoints), kept in a sqlite database.
+
+    Checkpoints are keyed by (procedure_id, parameters_hash, timestamp), where the states of a checkpoint are the states at the beginning of the step of that timestamp, as accepted by Procedure.initial_states. A run may then start at the latest checkpoint within its window instead of simulating the whole warmup period from the configured initial states.
+    """
+
+    def __init__(
+        self,
+        path : Optional[Union[str,Path]] = None,
+        save_window : Union[dict,relativedelta] = {"days": 30},
+        save_interval : Optional[Union[dict,relativedelta]] = None,
+        keep : int = 100
+        ):
+        """
+        Parameters:
+        -----------
+        path : str or Path = None
+            Checkpoints directory. Defaults to ~/.cache/pydrodelta
+
+        save_window : dict or relativedelta = {"days": 30}
+            Save checkpoints of this period before forecast_date (or the end of the run)
+
+        save_interval : dict or relativedelta = None
+            Minimum interval between saved checkpoints. If None, the states of every step of the save window are saved
+
+        keep : int = 100
+            Maximum number of checkpoints kept per procedure and parameter set. Older checkpoints are removed
+        """
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_PATH
+        if keep < 1:
+            raise ValueError("keep must be a positive integer")
+        self.keep = keep
+        self.save_window = interval2relativedelta(save_window)
+        self.save_interval = interval2relativedelta(save_interval) if save_interval is not None else None
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.path / "state_checkpoints.sqlite"
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            with conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS checkpoints (
+                    procedure_id TEXT NOT NULL,
+                    parameters_hash TEXT NOT NULL,
+                    time REAL NOT NULL,
+                    timestart TEXT NOT NULL,
+                    states TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (procedure_id, parameters_hash, time)) WITHOUT ROWID""")
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection to the checkpoints database. Connections must not be shared between threads"""
+        return sqlite3.connect(self.db_path, timeout=60)
+
+    def select(
+        self,
+        timestamps : List[datetime],
+        timeend : datetime
+        ) -> List[int]:
+        """Select, among the (sorted) timestamps of a state trajectory, those to be saved: the ones not later than timeend within save_window, separated by at least save_interval (counting back from the latest one)
+
+        Returns:
+        --------
+        list of int : positions of the selected timestamps, in ascending order
+        """
+        timestart = timeend - self.save_window
+        selected : List[int] = []
+        last : Optional[datetime] = None
+        for i in reversed(range(len(timestamps))):
+            t = timestamps[i]
+            if t > timeend:
+                continue
+            if t <= timestart:
+                break
+            if last is None or self.save_interval is None or t <= last - self.save_interval:
+                selected.append(i)
+                last = t
+        return list(reversed(selected))
+
+    def save(
+        self,
+        procedure_id : Union[int,str],
+        parameters_hash : str,
+        checkpoints : Iterable[Tuple[datetime, dict]]
+        ) -> int:
+        """Save checkpoints, replacing existing ones of the same timestamps, and remove the older ones beyond .keep
+
+        Parameters:
+        -----------
+        procedure_id : int or str
+            Procedure identifier
+
+        parameters_hash : str
+            Hash of the procedure configuration (see util.parametersHash)
+
+        checkpoints : iterable of (datetime, dict)
+            Timestamp and states of each checkpoint
+
+        Returns:
+        --------
+        int : number of saved checkpoints
+        """
+        now = time.time()
+        rows = [(str(procedure_id), parameters_hash, t.timestamp(), t.isoformat(), json.dumps(states), now) for t, states in checkpoints]
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO checkpoints (procedure_id, parameters_hash, time, timestart, states, created) VALUES (?,?,?,?,?,?)", rows)
+                conn.execute("""DELETE FROM checkpoints WHERE procedure_id=? AND parameters_hash=? AND time NOT IN (
+                    SELECT time FROM checkpoints WHERE procedure_id=? AND parameters_hash=? ORDER BY time DESC LIMIT ?)""", (str(procedure_id), parameters_hash, str(procedure_id), parameters_hash, self.keep))
+        logging.debug("StateCheckpointStore: saved %i checkpoints of procedure %s" % (len(rows), str(procedure_id)))
+        return len(rows)
+
+    def latest(
+        self,
+        procedure_id : Union[int,str],
+        parameters_hash : str,
+        timestart : datetime,
+        timeend : datetime
+        ) -> Optional[Tuple[datetime, dict]]:
+        """Retrieve the latest checkpoint with timestamp between timestart and timeend
+
+        Returns:
+        --------
+        (datetime, dict) : timestamp and states of the checkpoint, or None if not found
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT timestart, states FROM checkpoints WHERE procedure_id=? AND parameters_hash=? AND time>=? AND time<=? ORDER BY time DESC LIMIT 1", (str(procedure_id), parameters_hash, timestart.timestamp(), timeend.timestamp())).fetchone()
+        if row is None:
+            return None
+        return datetime.fromisoformat(row[0]), json.loads(row[1])
+
+    def read(
+        self,
+        procedure_id : Union[int,str],
+        parameters_hash : Optional[str] = None
+        ) -> List[Tuple[datetime, dict]]:
+        """List the checkpoints of a procedure (optionally, of a single parameter set), in ascending timestamp order"""
+        with closing(self.connect()) as conn:
+            if parameters_hash is None:
+                rows = conn.execute("SELECT timestart, states FROM checkpoints WHERE procedure_id=? ORDER BY time", (str(procedure_id),)).fetchall()
+            else:
+                rows = conn.execute("SELECT timestart, states FROM checkpoints WHERE procedure_id=? AND parameters_hash=? ORDER BY time", (str(procedure_id), parameters_hash)).fetchall()
+        return [(datetime.fromisoformat(row[0]), json.loads(row[1])) for row in rows]
+
+    def clear(self) -> None:
+        """Remove all checkpoints"""
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("DELETE FROM checkpoints")
+
+def createStateCheckpointStore(
+    config : Optional[StateCheckpointsDict],
+    base_path : Optional[Path] = None
+    ) -> Optional[StateCheckpointStore]:
+    """Create StateCheckpointStore from configuration dict. Returns None if config is None. Relative paths are resolved against base_path"""
+    if config is None:
+        return None
+    path = config.get("path")
+    if path is not None and base_path is not None and not Path(path).is_absolute():
+        path = base_path / path
+    return StateCheckpointStore(
+        path = path,
+        save_window = config.get("save_window", {"days": 30}),
+        save_interval = config.get("save_interval"),
+        keep = config.get("keep", 100))
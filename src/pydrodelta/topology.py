@@ -15,14 +15,14 @@ from a5client.util import tryParseAndLocalizeDate, interval2relativedelta, serie
 from a5client.util_types import CorridaDict, SeriesDict, TVP, Dateable, Intervaleable, CorridaNoIdSerializableDict, VariableDict, TVPserializable, SeriesSerializableDict
 import pandas
 import matplotlib.pyplot as plt
-from .util import getParamOrDefaultTo
+from .util import getParamOrDefaultTo, parametersHash
 from .observed_node_variable import ObservedNodeVariable
 from .derived_node_variable import DerivedNodeVariable
 import networkx as nx
 from networkx.readwrite import json_graph
 import matplotlib.backends.backend_pdf
 from colour import Color
-from typing import Union, List, Tuple, Optional, overload, Literal, TYPE_CHECKING, cast, Sequence, Dict
+from typing import Union, List, Tuple, Optional, overload, Literal, TYPE_CHECKING, cast, Sequence, Dict, Set
 from .validation import getSchemaAndValidate
 from pandas import DataFrame
 from .descriptors.datetime_descriptor import DatetimeDescriptor
@@ -45,6 +45,19 @@ from .types.api_config_dict import ApiConfigDict
 from .node_serie import NodeSerie
 from .derived_node_serie import DerivedNodeSerie
 from textwrap import indent
+from .concurrent_load import LoadTask, runLoadTasks
+from .bulk_load import BulkLoadTask, groupLoadTasks
+from .types.load_concurrency_dict import LoadConcurrencyDict
+from .types.upload_concurrency_dict import UploadConcurrencyDict
+from .chunked_upload import uploadObservaciones
+from .series_cache import SeriesCache, createSeriesCache
+from .types.series_cache_dict import SeriesCacheDict
+from .processing_cache import ProcessingCache, createProcessingCache, processingKey
+from .types.processing_cache_dict import ProcessingCacheDict
+from .types.plot_rendering_dict import PlotRenderingDict
+from .plot_rendering import PlotSpec, renderFiles, renderPdf, plotVariablePage
+from . import profiling
+from .incremental import IncrementalStore, derivedNodesGraph, descendantsOf
 
 if TYPE_CHECKING:
     from .plan import Plan
@@ -183,6 +196,65 @@ class Topology(Base):
     var_map : dict
     """Variable metadata is stored in this dict"""
 
+    load_concurrency : Optional[LoadConcurrencyDict]
+    """Concurrent download settings for .loadData (max_workers, rate_limit, max_retries, retry_backoff). If not set, series are loaded sequentially"""
+
+    upload_concurrency : Optional[UploadConcurrencyDict]
+    """Chunked concurrent upload settings for .uploadData and Plan.uploadSim (max_workers, max_series_per_chunk, max_chunk_size, max_retries, retry_backoff). Bounds the number and size of the upload requests only: the forecast run and the analysis data are still built whole in memory before they are split. If not set, the forecast is uploaded in a single request and the analysis data in one request per series, sequentially"""
+
+    upload_report : Optional[List[dict]]
+    """Report of the chunks of the last chunked upload (series, records, bytes, attempts, time, error of each chunk). None if no chunked upload was run"""
+
+    plot_rendering : Optional[PlotRenderingDict]
+    """Process pool rendering settings for .plotProno and .plotVariable (max_workers, skip_unchanged). If not set, plots are rendered sequentially in the main process"""
+
+    bulk_load : bool
+    """In .loadData, retrieve series that share api, tipo and time window with multi-series requests (only series loaded with no_metadata=True). Falls back to per-series requests if the api doesn't support it"""
+
+    @property
+    def cache(self) -> Optional[SeriesCacheDict]:
+        """Local cache of input api data (path, max_size, revision_window). If not set, all data is downloaded on each load"""
+        return self._cache
+    @cache.setter
+    def cache(
+        self,
+        cache : Optional[SeriesCacheDict]
+        ) -> None:
+        self._cache = cache
+        self._series_cache = createSeriesCache(cache, base_path = self.base_path)
+
+    @property
+    def series_cache(self) -> Optional[SeriesCache]:
+        """Local cache of input api data, created from .cache"""
+        return self._series_cache
+
+    @property
+    def processing_cache(self) -> Optional[ProcessingCacheDict]:
+        """Local cache of processed node variable data (path, max_size, max_age). If not set, the loaded data of every node is processed on each .batchProcessInput"""
+        return self._processing_cache
+    @processing_cache.setter
+    def processing_cache(
+        self,
+        processing_cache : Optional[ProcessingCacheDict]
+        ) -> None:
+        self._processing_cache = processing_cache
+        self._processing_cache_store = createProcessingCache(processing_cache, base_path = self.base_path)
+
+    @property
+    def processing_cache_store(self) -> Optional[ProcessingCache]:
+        """Local cache of processed node variable data, created from .processing_cache"""
+        return self._processing_cache_store
+
+    dirty_nodes : Optional[Set[int]]
+    """Ids of the nodes processed in the last incremental .batchProcessInput (nodes with new or revised data and the nodes derived from them). None if the last .batchProcessInput was not incremental"""
+
+    @property
+    def processing_nodes(self) -> List[Node]:
+        """Nodes handled by the input processing steps (.removeOutliers, .regularize, .fillNulls, .derive, etc.). While running an incremental .batchProcessInput, the nodes restored from the incremental store are left out"""
+        if not len(self._skip_nodes):
+            return self.nodes
+        return [node for node in self.nodes if node.id not in self._skip_nodes]
+
     def __init__(
         self,
         timestart : Dateable, 
@@ -213,6 +285,12 @@ class Topology(Base):
         prono_ignore_warmup : bool = True,
         output_graph : Optional[str] = None,
         base_path : Optional[Union[str,Path]] = None,
+        load_concurrency : Optional[LoadConcurrencyDict] = None,
+        upload_concurrency : Optional[UploadConcurrencyDict] = None,
+        bulk_load : bool = False,
+        cache : Optional[SeriesCacheDict] = None,
+        processing_cache : Optional[ProcessingCacheDict] = None,
+        plot_rendering : Optional[PlotRenderingDict] = None,
         **kwargs
         ):
         """Initiate topology
@@ -314,6 +392,46 @@ class Topology(Base):
 
         base_path : Optional[Path]
         Base path. Used to resolve input/output relative paths
+
+        load_concurrency : Optional[LoadConcurrencyDict]
+        Load series concurrently on a bounded thread pool. If not set, series are loaded sequentially
+            LoadConcurrencyDict:
+                max_workers : int
+                rate_limit : float (requests per second per api host), optional
+                max_retries : int (default 2), optional
+                retry_backoff : float (seconds, default 1), optional
+
+        upload_concurrency : Optional[UploadConcurrencyDict]
+        Upload forecasts (Plan.uploadSim) and analysis data (.uploadData) in chunks of series, concurrently on a bounded thread pool, retrying failed chunks. Only the number and size of the requests are bounded: the forecast run and the analysis data are still built whole in memory. If not set, the forecast is uploaded in a single request and the analysis data in one request per series, sequentially
+            UploadConcurrencyDict:
+                max_workers : int
+                max_series_per_chunk : int, optional
+                max_chunk_size : float (megabytes of json, larger observation series are split, forecast series are not), optional
+                max_retries : int (default 2), optional
+                retry_backoff : float (seconds, default 1), optional
+
+        bulk_load : bool
+        Retrieve series that share api, tipo and time window with multi-series requests (only series loaded with no_metadata=True). Falls back to per-series requests if the api doesn't support it
+
+        cache : Optional[SeriesCacheDict]
+        Keep input api data in a local cache and download only the missing and recent data on each load. If not set, all data is downloaded on each load
+            SeriesCacheDict:
+                path : str (cache directory, default ~/.cache/pydrodelta), optional
+                max_size : float (megabytes, default 1024), optional
+                revision_window : dict (data of this period before the end of the cached window is downloaded again, default {"days": 1}), optional
+
+        processing_cache : Optional[ProcessingCacheDict]
+        Keep the processed data of each node variable (after outlier removal, jump detection, offset, regularization, moving average, null filling and adjustment) in a local cache, keyed by a hash of the loaded data and the processing parameters. Nodes whose variables are all found in the cache skip those steps. If not set, all nodes are processed
+            ProcessingCacheDict:
+                path : str (cache directory, default ~/.cache/pydrodelta), optional
+                max_size : float (megabytes, default 1024), optional
+                max_age : dict (entries not used during this period are evicted, default {"days": 7}), optional
+
+        plot_rendering : Optional[PlotRenderingDict]
+        Render the plots of .plotProno and .plotVariable (plot_variable) on a process pool. With skip_unchanged, plot files whose input data and options didn't change since their last rendering are not rendered again. If not set, plots are rendered sequentially in the main process
+            PlotRenderingDict:
+                max_workers : int
+                skip_unchanged : bool (default False), optional
         """
         super().__init__(**kwargs, base_path=base_path)
         params = {
@@ -341,7 +459,13 @@ class Topology(Base):
             "qualifiers": qualifiers,
             "save_response": save_response,
             "save_post_data": save_post_data,
-            "output_graph": output_graph
+            "output_graph": output_graph,
+            "load_concurrency": load_concurrency,
+            "upload_concurrency": upload_concurrency,
+            "bulk_load": bulk_load,
+            "cache": cache,
+            "processing_cache": processing_cache,
+            "plot_rendering": plot_rendering
         }
         getSchemaAndValidate(params=params, name="topology")
         self.var_map = {}
@@ -380,6 +504,15 @@ class Topology(Base):
         self.save_post_data = self.resolve_path(save_post_data)
         self.prono_ignore_warmup = prono_ignore_warmup
         self.output_graph = self.resolve_path(output_graph)
+        self.load_concurrency = load_concurrency
+        self.upload_concurrency = upload_concurrency
+        self.upload_report = None
+        self.bulk_load = bulk_load
+        self.cache = cache
+        self.processing_cache = processing_cache
+        self.plot_rendering = plot_rendering
+        self.dirty_nodes = None
+        self._skip_nodes : Set[int] = set()
     
     def __repr__(self):
         # nodes_str = ",\n    ".join(["%i: Node(id: %i, name: %s)" % (self.nodes.index(n), n.id, n.name) for n in self.nodes])
@@ -423,10 +556,13 @@ class Topology(Base):
                     raise KeyError("Variable with id %i not found in node %i" % (var_id, node_id))
         raise KeyError("Node with id %i not found" % node_id)
 
+    @profiling.timed("batchProcessInput")
     def batchProcessInput(
         self,
         include_prono : bool = False,
-        input_api_config : Optional[ApiConfigDict] = None) -> None:
+        input_api_config : Optional[ApiConfigDict] = None,
+        incremental : Optional[IncrementalStore] = None,
+        full : bool = False) -> None:
         """
         Run input processing sequence. This includes (in this order):
         
@@ -459,34 +595,53 @@ class Topology(Base):
             - url : str
             - token : str
             - proxy_dict : dict
+
+        incremental : IncrementalStore = None
+            Incremental execution. After .loadData(), the nodes without new or revised data since the last execution are restored from this store and left out of the processing steps (see .restoreProcessedData). The results of the processed nodes are saved into the store
+
+        full : bool = False
+            In incremental execution, process all nodes (and refresh the store)
+
+        If .processing_cache is set, the nodes found in the processing cache skip the steps from .removeOutliers() to .adjust() (see .restoreFromProcessingCache), and the results of these steps for the other nodes are saved into the cache
         """
         include_prono = include_prono if include_prono is not None else self.include_prono
         logging.debug("loadData")
         self.loadData(input_api_config=input_api_config)
-        logging.debug("removeOutliers")
-        self.removeOutliers()
-        logging.debug("detectJumps")
-        self.detectJumps()
-        logging.debug("applyOffset")
-        self.applyOffset()
-        logging.debug("regularize")
-        self.regularize()
-        logging.debug("applyMovingAverage")
-        self.applyMovingAverage()
-        logging.debug("fillNulls")
-        self.fillNulls()
-        logging.debug("adjust")
-        self.adjust()
-        if include_prono:
-            logging.debug("concatenateProno")
-            self.concatenateProno()
-        logging.debug("fillNullsWithValue")
-        self.fillNullsWithValue()
-        logging.debug("derive")
-        self.derive()
-        logging.debug("interpolate")
-        self.interpolate()
-        self.setOriginalData()
+        loaded_data = self.restoreProcessedData(incremental, include_prono, full) if incremental is not None else None
+        try:
+            cached_nodes, processing_keys = self.restoreFromProcessingCache() if self.processing_cache_store is not None else (set(), {})
+            self._skip_nodes = self._skip_nodes | cached_nodes
+            logging.debug("removeOutliers")
+            self.removeOutliers()
+            logging.debug("detectJumps")
+            self.detectJumps()
+            logging.debug("applyOffset")
+            self.applyOffset()
+            logging.debug("regularize")
+            self.regularize()
+            logging.debug("applyMovingAverage")
+            self.applyMovingAverage()
+            logging.debug("fillNulls")
+            self.fillNulls()
+            logging.debug("adjust")
+            self.adjust()
+            if self.processing_cache_store is not None:
+                self.saveToProcessingCache(processing_keys)
+            self._skip_nodes = self._skip_nodes - cached_nodes
+            if include_prono:
+                logging.debug("concatenateProno")
+                self.concatenateProno()
+            logging.debug("fillNullsWithValue")
+            self.fillNullsWithValue()
+            logging.debug("derive")
+            self.derive()
+            logging.debug("interpolate")
+            self.interpolate()
+            self.setOriginalData()
+        finally:
+            self._skip_nodes = set()
+        if incremental is not None and loaded_data is not None:
+            self.saveProcessedData(incremental, loaded_data)
         self.setOutputData()
         self.plotProno()
         if(self.report_file is not None):
@@ -505,11 +660,116 @@ class Topology(Base):
         if self.output_graph:
             self.printGraph(output_file=self.output_graph)
 
+    @profiling.timed("restoreProcessedData")
+    def restoreProcessedData(
+        self,
+        incremental : IncrementalStore,
+        include_prono : bool = False,
+        full : bool = False
+        ) -> Dict[Tuple[int,int],Tuple[str,dict]]:
+        """Compare each node variable with the incremental store and restore the processed data of the unchanged nodes. A node variable is changed if its processing configuration (without the time window) changed, or if its loaded data are new or revised over the overlap of the time windows of the stored and the current execution (see NodeVariable.loadedDataChanged). Nodes with changed variables (and the nodes derived from them, see incremental.derivedNodesGraph) are set as .dirty_nodes. The processed data of the other nodes are restored, trimmed to .timestart, and these nodes are left out of the processing steps until the end of .batchProcessInput. Must be run after .loadData()
+
+        Parameters:
+        -----------
+        incremental : IncrementalStore
+            Store of the previous execution
+
+        include_prono : bool = False
+            Whether series_prono are concatenated in this execution. Stored data processed otherwise are not reused
+
+        full : bool = False
+            Don't restore any node (all nodes are dirty)
+
+        Returns:
+        --------
+        dict : configuration hash and loaded data (with the time window) of the variables of .dirty_nodes, keyed by (node_id, var_id). Pass it to .saveProcessedData after processing
+        """
+        window_end = max(self.timeend, self.forecast_timeend) if self.forecast_timeend is not None else self.timeend
+        hashes = {(node.id, var_id): parametersHash(variable.processingParameters(window = False), include_prono) for node in self.nodes for var_id, variable in node.variables.items()}
+        stored = incremental.readNodeVariableHashes() if not full else {}
+        changed = {node_id for (node_id, var_id), hash_ in hashes.items() if stored.get((node_id, var_id)) != hash_}
+        derived_graph = derivedNodesGraph(self.nodes)
+        dirty_nodes = descendantsOf(derived_graph, changed)
+        processed_data : Dict[Tuple[int,int],dict] = {}
+        for node in self.nodes:
+            if node.id in dirty_nodes:
+                continue
+            for var_id, variable in node.variables.items():
+                record = incremental.readNodeVariable(node.id, var_id)
+                if record is None or variable.loadedDataChanged(record["loaded"], max(record["timestart"], self.timestart), min(record["timeend"], window_end)):
+                    changed.add(node.id)
+                    break
+                processed_data[(node.id, var_id)] = record["processed"]
+        self.dirty_nodes = descendantsOf(derived_graph, changed)
+        for (node_id, var_id), processed in processed_data.items():
+            if node_id not in self.dirty_nodes:
+                self.getNodeVariable(node_id, var_id).restoreProcessedData(processed, timestart = self.timestart)
+        self._skip_nodes = {node.id for node in self.nodes if node.id not in self.dirty_nodes}
+        logging.info("Incremental execution: %i of %i nodes changed since the last execution" % (len(self.dirty_nodes), len(self.nodes)))
+        return {
+            (node.id, var_id): (hashes[(node.id, var_id)], {"loaded": variable.dumpLoadedData(), "timestart": self.timestart, "timeend": window_end})
+            for node in self.nodes if node.id in self.dirty_nodes
+            for var_id, variable in node.variables.items()}
+
+    @profiling.timed("restoreFromProcessingCache")
+    def restoreFromProcessingCache(self) -> Tuple[Set[int],Dict[Tuple[int,int],str]]:
+        """Restore from the processing cache the processed data of the nodes whose variables are all found in it (see ProcessingCache). Nodes with derived variables and nodes left out of the processing steps are not looked up. Must be run after .loadData()
+
+        Returns:
+        --------
+        tuple : ids of the restored nodes, and cache keys of the variables of the other looked up nodes, keyed by (node_id, var_id). Pass the keys to .saveToProcessingCache after processing
+        """
+        cache = self.processing_cache_store
+        if cache is None:
+            raise RuntimeError("processing_cache not set")
+        restored : Set[int] = set()
+        keys : Dict[Tuple[int,int],str] = {}
+        for node in self.processing_nodes:
+            if not all(isinstance(variable, ObservedNodeVariable) for variable in node.variables.values()):
+                continue
+            node_keys = {var_id: processingKey(variable.loadedDataHash(), variable.processingParameters()) for var_id, variable in node.variables.items()}
+            entries = cache.read(list(node_keys.values()))
+            if entries is None:
+                keys.update({(node.id, var_id): key for var_id, key in node_keys.items()})
+                continue
+            for var_id, entry in zip(node_keys, entries):
+                node.variables[var_id].restoreProcessedData(entry)
+            restored.add(node.id)
+        logging.info("Processing cache: %i of %i nodes restored" % (len(restored), len(self.nodes)))
+        return restored, keys
+
+    @profiling.timed("saveToProcessingCache")
+    def saveToProcessingCache(
+        self,
+        keys : Dict[Tuple[int,int],str]
+        ) -> int:
+        """Save the processed data of node variables into the processing cache, given their cache keys (as returned by .restoreFromProcessingCache). Returns the number of saved node variables"""
+        cache = self.processing_cache_store
+        if cache is None:
+            raise RuntimeError("processing_cache not set")
+        return cache.save(
+            (key, self.getNodeVariable(node_id, var_id).dumpProcessedData())
+            for (node_id, var_id), key in keys.items())
+
+    @profiling.timed("saveProcessedData")
+    def saveProcessedData(
+        self,
+        incremental : IncrementalStore,
+        loaded_data : Dict[Tuple[int,int],Tuple[str,dict]]
+        ) -> int:
+        """Save the processed data of the variables of .dirty_nodes into the incremental store, together with their configuration hashes and loaded data (as returned by .restoreProcessedData). Returns the number of saved node variables"""
+        return incremental.saveNodeVariables([
+            (node_id, var_id, hash_, {**record, "processed": self.getNodeVariable(node_id, var_id).dumpProcessedData()})
+            for (node_id, var_id), (hash_, record) in loaded_data.items()])
+
+    @profiling.timed("loadData")
     def loadData(
         self,
         include_prono : bool = True,
         input_api_config : Optional[ApiConfigDict] = None,
-        no_metadata : Optional[bool] = None) -> None:
+        no_metadata : Optional[bool] = None,
+        load_concurrency : Optional[LoadConcurrencyDict] = None,
+        bulk_load : Optional[bool] = None) -> None:
         """For each series of each variable of each node, load data from the source.
         
         Parameters:
@@ -528,52 +788,96 @@ class Topology(Base):
             
         no_metadata : bool = None
             Don't retrieve series metadata on load from api. If not given, reads from self.no_metadata
+
+        load_concurrency : LoadConcurrencyDict = None
+            Concurrent download settings. If not given, reads from self.load_concurrency. If max_workers is 1 or no settings are found, series are loaded sequentially
+
+        bulk_load : bool = None
+            Retrieve series that share api, tipo and time window with multi-series requests. If not given, reads from self.bulk_load
         """
+        load_concurrency = coalesce(load_concurrency, self.load_concurrency)
+        concurrent = load_concurrency is not None and load_concurrency["max_workers"] > 1
+        bulk_load = coalesce(bulk_load, self.bulk_load)
+        tasks : List[Union[LoadTask,BulkLoadTask]] = []
         for node in self.nodes:
             # logging.debug("loadData timestart: %s, timeend: %s, time_interval: %s" % (self.timestart.isoformat(), self.timeend.isoformat(), str(node.time_interval)))
             timestart = self.timestart - node.time_interval if node.time_interval is not None else self.timeend
             timeend = self.timeend + node.time_interval if node.time_interval is not None else self.timeend
             forecast_timeend = self.forecast_timeend + node.time_interval if self.forecast_timeend is not None and node.time_interval is not None else self.forecast_timeend
-            if hasattr(node,"loadData"):
-                node.loadData(
+            if not hasattr(node,"loadData"):
+                continue
+            if concurrent or bulk_load:
+                tasks.extend(node.getLoadTasks(
                     timestart, 
                     timeend, 
                     forecast_timeend = forecast_timeend, 
                     include_prono = include_prono,
                     input_api_config = input_api_config,
-                    no_metadata = no_metadata if no_metadata is not None else self.no_metadata)
+                    no_metadata = no_metadata if no_metadata is not None else self.no_metadata))
+            else:
+                with profiling.timer("node %s" % node.id):
+                    node.loadData(
+                        timestart, 
+                        timeend, 
+                        forecast_timeend = forecast_timeend, 
+                        include_prono = include_prono,
+                        input_api_config = input_api_config,
+                        no_metadata = no_metadata if no_metadata is not None else self.no_metadata)
+        if concurrent or bulk_load:
+            if bulk_load:
+                tasks = groupLoadTasks(tasks)
+            if concurrent:
+                assert load_concurrency is not None
+                runLoadTasks(tasks, **load_concurrency)
+            else:
+                for task in tasks:
+                    task.run()
+            for node in self.nodes:
+                if hasattr(node,"setLoadedData"):
+                    node.setLoadedData()
 
+    @profiling.timed("setOriginalData")
     def setOriginalData(self) -> None:
         """For each variable of each node, copy .data into .original_data"""
-        for node in self.nodes:
-            node.setOriginalData()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.setOriginalData()
 
+    @profiling.timed("removeOutliers")
     def removeOutliers(self) -> bool:
         """For each serie of each variable of each node, perform outlier removal (only in series where lim_outliers is not None)."""
         found_outliers = False
-        for node in self.nodes:
-            found_outliers_ = node.removeOutliers()
-            found_outliers = found_outliers_ if found_outliers_ else found_outliers
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                found_outliers_ = node.removeOutliers()
+                found_outliers = found_outliers_ if found_outliers_ else found_outliers
         return found_outliers
 
+    @profiling.timed("detectJumps")
     def detectJumps(self) -> bool:
         """For each serie of each variable of each node, perform jumps detection (only in series where lim_jump is not None). Results are saved in jumps_data of the series object."""
         found_jumps = False
-        for node in self.nodes:
-            found_jumps_ = node.detectJumps()
-            found_jumps = found_jumps_ if found_jumps_ else found_jumps
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                found_jumps_ = node.detectJumps()
+                found_jumps = found_jumps_ if found_jumps_ else found_jumps
         return found_jumps
 
+    @profiling.timed("applyMovingAverage")
     def applyMovingAverage(self) -> None:
         """For each serie of each variable of each node, apply moving average (only in series where moving_average is not None)"""
-        for node in self.nodes:
-            node.applyMovingAverage()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.applyMovingAverage()
 
+    @profiling.timed("applyOffset")
     def applyOffset(self) -> None:
         """For each serie of each variable of each node, apply x and/or y offset (only in series where x_offset (time) or y_offset (value) is defined)"""
-        for node in self.nodes:
-            node.applyOffset()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.applyOffset()
 
+    @profiling.timed("regularize")
     def regularize(self,interpolate=False) -> None:
         """For each series and series_prono of each observed variable of each node, regularize the time step according to time_interval and time_offset
         
@@ -582,43 +886,55 @@ class Topology(Base):
         interpolate : bool default False
             if False, interpolates only to the closest timestep of the regular timeseries. If observation is equidistant to preceding and following timesteps it interpolates to both
         """
-        for node in self.nodes:
-            node.regularize(interpolate=interpolate)
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.regularize(interpolate=interpolate)
 
+    @profiling.timed("fillNulls")
     def fillNulls(self) -> None:
         """For each observed variable of each node, copies data of first series and fills its null values with the other series. In the end it fills nulls with self.fill_value. Saves result in self.data
         """
-        for node in self.nodes:
-            node.fillNulls()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.fillNulls()
 
+    @profiling.timed("fillNullsWithValue")
     def fillNullsWithValue(self) -> None:
         """For each observed variable of each node, if fill_value is defined, fills nulls of data with that value
         """
-        for node in self.nodes:
-            node.fillNullsWithValue()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.fillNullsWithValue()
         
 
+    @profiling.timed("derive")
     def derive(self) -> None:
         """For each derived variable of each node, derives data from related variable according to derived_from attribute
         """
-        for node in self.nodes:
-            node.derive()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.derive()
 
+    @profiling.timed("adjust")
     def adjust(self) -> None:
         """For each series_prono of each variable of each node, if observations are available, perform error correction by linear regression"""
-        for node in self.nodes:
-            node.adjust()
-            node.apply_linear_combination()
-            node.adjustProno()
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.adjust()
+                node.apply_linear_combination()
+                node.adjustProno()
 
+    @profiling.timed("concatenateProno")
     def concatenateProno(self, ignore_warmup : Optional[bool] = None) -> None:
         """For each variable of each node, if series_prono are available, concatenate series_prono into variable.data"""
         ignore_warmup = ignore_warmup if ignore_warmup is not None else self.prono_ignore_warmup
-        for node in self.nodes:
-            for variable in node.variables.values():
-                if variable.series_prono is not None:
-                    variable.concatenateProno(ignore_warmup=ignore_warmup)
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                for variable in node.variables.values():
+                    if variable.series_prono is not None:
+                        variable.concatenateProno(ignore_warmup=ignore_warmup)
 
+    @profiling.timed("interpolate")
     def interpolate(
         self,
         limit : Optional[relativedelta] = None,
@@ -634,9 +950,11 @@ class Topology(Base):
         extrapolate : bool
             Extrapolate up to limit
         """
-        for node in self.nodes:
-            node.interpolate(limit=limit,extrapolate=extrapolate)
+        for node in self.processing_nodes:
+            with profiling.timer("node %s" % node.id):
+                node.interpolate(limit=limit,extrapolate=extrapolate)
 
+    @profiling.timed("setOutputData")
     def setOutputData(self) -> None:
         """For each series_output of each variable of each node, copy variable.data into series_output.data. If x_offset or y_offset are not 0, applies the offset"""
         for node in self.nodes:
@@ -862,6 +1180,7 @@ class Topology(Base):
             for node in self.nodes:
                 list_series.extend(node.variablesOutputToList(flatten=False))
             return list_series
+    @profiling.timed("saveData")
     def saveData(
         self,
         output : Union[Path,str],
@@ -942,6 +1261,7 @@ class Topology(Base):
         f.write(self.outputToCSV(pivot))
         f.close
         return
+    @profiling.timed("uploadData")
     def uploadData(
         self,
         include_prono : bool,
@@ -963,9 +1283,21 @@ class Topology(Base):
             - token : str
             - proxy_dict : dict
 
+        If .upload_concurrency is set, the series of all nodes are uploaded in chunks, concurrently (see chunked_upload.uploadObservaciones), and the report of the chunks is saved into .upload_report
+
         Returns:
         list of Observations
         """
+        if self.upload_concurrency is not None:
+            series = []
+            for node in self.nodes:
+                for variable in node.variables.values():
+                    series.extend(variable.outputUploadList(include_prono = include_prono))
+            api_client = Crud(**api_config) if api_config is not None else self.output_crud
+            if api_client is None:
+                raise Exception("Couldn't instantiate api client")
+            obs_created, self.upload_report = uploadObservaciones(api_client, series, **self.upload_concurrency)
+            return obs_created
         created = []
         for node in self.nodes:
             obs_created = node.uploadData(
@@ -1018,6 +1350,7 @@ class Topology(Base):
                 prono["series"].extend(serieslist)
         return prono
         
+    @profiling.timed("uploadDataAsProno")
     def uploadDataAsProno(
         self,
         include_obs : bool = True,
@@ -1057,6 +1390,7 @@ class Topology(Base):
         api_client = Crud(**api_config) if api_config is not None else self.output_crud
         if api_client is None:
             raise Exception("Couldn't instantiate api client")
+        profiling.countPayload(prono)
         response = api_client.createCorrida(prono)
         if save_response:
             json.dump(response, open(save_response, "w"), indent=4)
@@ -1214,16 +1548,53 @@ class Topology(Base):
 
         table : bool = True
             Add table
+
+        If .plot_rendering is set and output is not None, the pages are rendered on a process pool (see plot_rendering.renderPdf)
         """
-        timestart = tryParseAndLocalizeDate(timestart) if timestart is not None else None
-        timeend = tryParseAndLocalizeDate(timeend) if timeend is not None else None
-        color_map = {"obs": "blue", "sim": "red","interpolated": "yellow","extrapolated": "orange","analysis": "green", "prono": "purple", "sum": "yellow","filled":"gray", "moving_average": "blue"}
+        specs = self.plotVariableSpecs(var_id, timestart, timeend, extra_sim_columns, table, round_to)
+        if output is not None and self.plot_rendering is not None:
+            renderPdf(specs, output, **self.plot_rendering)
+            return
         if output is not None:
             matplotlib.use('pdf')
             createParent(output)
             pdf = matplotlib.backends.backend_pdf.PdfPages(str(output))
         else:
             matplotlib.use(os.environ["MPLBACKEND"] if "MPLBACKEND" in os.environ else "Agg")
+        for spec in specs:
+            spec.render(**spec.kwargs)
+            if output is not None:
+                pdf.savefig() # type: ignore[arg-type]
+            plt.close()
+        
+        if output is not None:
+            pdf.close() # type: ignore[arg-type]
+            matplotlib.use(os.environ["MPLBACKEND"] if "MPLBACKEND" in os.environ else "Agg")
+        else:
+            plt.show()
+
+    def plotVariableSpecs(
+        self,
+        var_id : int,
+        timestart : Optional[Dateable] = None,
+        timeend : Optional[Dateable] = None,
+        extra_sim_columns : bool = True,
+        table : bool = True,
+        round_to : int = 2
+        ) -> List[PlotSpec]:
+        """Collect the pages of .plotVariable (one per node where this variable is found with data) without rendering them. See plot_rendering
+
+        Parameters:
+        -----------
+        Same as .plotVariable
+
+        Returns:
+        --------
+        list of PlotSpec (rendering function: plot_rendering.plotVariablePage)
+        """
+        timestart = tryParseAndLocalizeDate(timestart) if timestart is not None else None
+        timeend = tryParseAndLocalizeDate(timeend) if timeend is not None else None
+        specs : List[PlotSpec] = []
         for node in self.nodes:
             if var_id not in node.variables:
                 logging.debug("topology.plotVariable: Skipping node %s. var_id not found" % str(node.id))
@@ -1238,120 +1609,25 @@ class Topology(Base):
             if not len(nodevariable.data):
                 logging.debug("topology.plotVariable: Skipping node %s. Data has no length" % str(node.id))
                 continue
-            data = nodevariable.data.reset_index().rename(columns={"index":"timestart"}) # .plot(y="valor")
-            data["valor"] = pandas.to_numeric(data["valor"], errors="coerce")
-            if timestart is not None:
-                data = data[data["timestart"] >= timestart]
-            if timeend is not None:
-                data = data[data["timestart"] <= timeend]
-            
-            fig, ax = plt.subplots(ncols=2 if table else 1,figsize=(20,8),gridspec_kw={'width_ratios': [2, 1] if table else [1]})
-            plot_ax = ax[0] if table else ax
-            grouped = data.groupby('tag')
-            for key, group in grouped:
-                group.plot(ax=plot_ax,kind='scatter', x='timestart', y='valor', label=key,title=node.name, figsize=(20,8),grid=True, color=color_map[str(key)])
-            if not isinstance(nodevariable.original_data, DataFrame):
-                raise Exception("Missing original data")
-            original_data = nodevariable.original_data.reset_index().rename(columns={"index":"timestart"})
-            original_data["valor"] = pandas.to_numeric(original_data["valor"], errors="coerce")
-            data_table = data.set_index("timestart")[["valor"]].rename(columns={"valor":"analysis"})
-            if len(original_data.dropna()["valor"]):
-                logging.debug("Add original data to plot at node %s" % str(node.name))
-                if timestart is not None:
-                    original_data = original_data[original_data["timestart"] >= timestart]
-                if timeend is not None:
-                    original_data = original_data[original_data["timestart"] <= timeend]
-                # plot_ax.plot(
-                #     original_data["timestart"],
-                #     original_data["valor"],
-                #     label="analysis",
-                #     color=color_map["analysis"]
-                # )
-                original_data.plot(
-                    ax=plot_ax,
-                    kind='line',
-                    x='timestart', 
-                    y='valor', 
-                    label="analysis",
-                    color=color_map["analysis"]
-                )
-                data_table["analysis"] = original_data.set_index("timestart")["valor"].combine_first(data_table["analysis"])
-            else:
-                logging.debug("Missing original data at node %s variable %i" % (node.name, var_id))
-            data_table["analysis"] = data_table["analysis"].round(2)
-            if nodevariable.series_sim is not None and len(nodevariable.series_sim):
-                sim_colors = list(Color("orange").range_to(Color("red"),len(nodevariable.series_sim)))
-                for i, serie_sim in enumerate(nodevariable.series_sim):
-                    if serie_sim.data is not None and len(serie_sim.data.dropna()["valor"]):
-                        logging.debug("Add sim data to plot at node %s, series_sim %i" % (str(node.name),i))
-                        data_sim = serie_sim.data.reset_index().rename(columns={"index":"timestart"})
-                        data_sim["valor"] = pandas.to_numeric(data_sim["valor"], errors="coerce")
-                        if timestart is not None:
-                            data_sim = data_sim[data_sim["timestart"] >= timestart]
-                        if timeend is not None:
-                            data_sim = data_sim[data_sim["timestart"] <= timeend]
-                        label = "sim_%i" % serie_sim.series_id
-                        # plot_ax.plot(
-                        #     data_sim["timestart"],
-                        #     data_sim["valor"],
-                        #     label=label,
-                        #     color=sim_colors[i].get_hex()
-                        # )
-                        data_sim.plot(
-                            ax=plot_ax,
-                            kind='line',
-                            x='timestart', 
-                            y='valor', 
-                            label=label,
-                            color=sim_colors[i].get_hex()
-                        )
-                        data_table = data_table.join(data_sim.set_index("timestart")[["valor"]].rename(columns={"valor":label}))
-                        data_table[label] = data_table[label].round(2)
-                        # plot extra sim columns
-                        if extra_sim_columns:
-                            for i, c in enumerate([c for c in data_sim.columns.to_list() if c not in [ "timestart", "valor", "tag"]]):
-                                data_sim[c] = pandas.to_numeric(data_sim[c], errors="coerce")
-                                label = "sim_%i_%s" % (serie_sim.series_id, c)
-                                logging.debug("Add series sim column %s, label %s" % (c,label))
-                                # plot_ax.plot(
-                                #     data_sim["timestart"],
-                                #     data_sim[c],
-                                #     label=label,
-                                #     color=getRandColor(),
-                                #     linestyle="--",
-                                #     alpha=0.5
-                                # )
-                                data_sim.plot(
-                                    ax=plot_ax,
-                                    kind='line',
-                                    x='timestart', 
-                                    y=c, 
-                                    label=label,
-                                    color=getRandColor(),
-                                    linestyle="--",
-                                    alpha=0.5
-                                )
-                                data_table = data_table.join(data_sim.set_index("timestart")[[c]].rename(columns={c:label}))
-                                data_table[label] = data_table[label].round(2)
-            if hasattr(nodevariable,"max_obs_date") and nodevariable.max_obs_date is not None:
-                plt.axvline(nodevariable.max_obs_date, color='k', linestyle='--') # type: ignore[arg-type]
-            if self._plan is not None:
-                plt.axvline(self._plan.forecast_date, color='gray', linestyle='--') # type: ignore[arg-type]
-            if table:
-                ax[1].axis('off')  # Hide axes of subplot 2
-                data_table = data_table.reset_index()
-                data_table["timestart"] = data_table["timestart"].dt.strftime('%Y-%m-%d' if node.time_interval is not None and datetime(2000, 1, 1) + node.time_interval >= datetime(2000, 1, 1) + relativedelta(days=1) else '%Y-%m-%d %H:%M')
-                table = ax[1].table(cellText=[[s[-9:] for s in data_table.columns.tolist()]] + data_table.tail(40).round(round_to).values.tolist(), loc='center')
-                table.auto_set_font_size(False) # type: ignore[arg-type]
-            if output is not None:
-                pdf.savefig() # type: ignore[arg-type]
-            plt.close()
-        
-        if output is not None:
-            pdf.close() # type: ignore[arg-type]
-            matplotlib.use(os.environ["MPLBACKEND"] if "MPLBACKEND" in os.environ else "Agg")
-        else:
-            plt.show()
+            specs.append(PlotSpec(
+                plotVariablePage,
+                "node %s variable %i" % (str(node.id), var_id),
+                title = node.name,
+                data = nodevariable.data,
+                original_data = nodevariable.original_data,
+                series_sim = [(serie_sim.series_id, serie_sim.data) for serie_sim in nodevariable.series_sim] if nodevariable.series_sim is not None else [],
+                timestart = timestart,
+                timeend = timeend,
+                max_obs_date = nodevariable.max_obs_date if hasattr(nodevariable,"max_obs_date") else None,
+                forecast_date = self._plan.forecast_date if self._plan is not None else None,
+                time_interval = node.time_interval,
+                extra_sim_columns = extra_sim_columns,
+                table = table,
+                round_to = round_to
+            ))
+        return specs
+
+    @profiling.timed("plotProno")
     def plotProno(
         self,
         **kwargs
@@ -1480,7 +1756,13 @@ class Topology(Base):
         
         footnote_height : float = 0.2
             Height of space for footnote in inches    
+
+        If .plot_rendering is set, the plots of all nodes are collected first (see Node.plotPronoSpecs) and then rendered on a process pool (see plot_rendering.renderFiles)
         """
+        if self.plot_rendering is not None:
+            specs = [spec for node in self.nodes for spec in node.plotPronoSpecs(**kwargs)]
+            renderFiles(specs, **self.plot_rendering)
+            return
         # locals_ = { k: v for k, v in locals().items() if v is not None}
         # plot_prono_kwargs = {**self.plot_params, **kwargs} # **locals_}
         # output_dir = getParamOrDefaultTo("output_dir",output_dir,self.plot_params)
@@ -1602,6 +1884,7 @@ class Topology(Base):
 
         return df.sort_index()
 
+    @profiling.timed("printReport")
     def printReport(self) -> dict:
         """
         Print topology report
@@ -1684,7 +1967,10 @@ class Topology(Base):
                     }
                 node_report["variables"][variable.id] = variable_report
             report["nodes"].append(node_report)
+        if self.processing_cache_store is not None:
+            report["processing_cache"] = self.processing_cache_store.report()
         return report    
+    @profiling.timed("printGraph")
     def printGraph(
         self,
         nodes : Optional[TypedList[Node]] = None,
@@ -1717,7 +2003,7 @@ class Topology(Base):
             plt.savefig(output_file, format='png')
             plt.close()
     
-    def toGraph(self,nodes : Optional[TypedList[Node]]=None) -> nx.DiGraph:
+    def toGraph(self,nodes : Optional[TypedList[Node]]=None, include_objects : bool = True) -> nx.DiGraph:
         """
         Generate directioned graph from the topology.
 
@@ -1725,6 +2011,9 @@ class Topology(Base):
         -----------
         nodes : list or None
             List of nodes to use for building the graph. If None, uses self.topology.nodes 
+
+        include_objects : bool = True
+            Set the dict representation of each node (including data) as the "object" attribute of the graph nodes
         
         Returns:
         --------
@@ -1742,7 +2031,10 @@ class Topology(Base):
         # edges = list()
         for node in nodes:
             # logging.debug("topology.toGraph: adding node: %s. number of nodes: %i, number of edges: %i" % (node.id, DG.number_of_nodes(), DG.number_of_edges()))
-            DG.add_node(node.id,object=node.toDict())
+            if include_objects:
+                DG.add_node(node.id,object=node.toDict())
+            else:
+                DG.add_node(node.id)
             # logging.debug("topology.toGraph: added node: %s. number of nodes: %i, number of edges: %i" % (node.id, DG.number_of_nodes(), DG.number_of_edges()))
             # if node.downstream_node is not None:
                 # if type(node.downstream_node) is list:
@@ -1802,6 +2094,7 @@ class Topology(Base):
         else:
             return json.dumps(json_graph.node_link_data(DG),indent=4)
     
+    @profiling.timed("saveSeries")
     def saveSeries(self):
         """For each series, series_prono, series_sim and series_output of each variable of each node, save data into file if .output_file is defined"""
         for node in self.nodes:
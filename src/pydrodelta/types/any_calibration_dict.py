@@ -1,5 +1,6 @@
 from typing import Union
 from .linear_regression_calibration_dict import LinearRegressionCalibrationDict
 from .downhill_simplex_calibration_dict import DownhillSimplexCalibrationDict
+from .multi_start_calibration_dict import MultiStartCalibrationDict
 
-AnyCalibrationDict = Union[LinearRegressionCalibrationDict, DownhillSimplexCalibrationDict]
+AnyCalibrationDict = Union[LinearRegressionCalibrationDict, DownhillSimplexCalibrationDict, MultiStartCalibrationDict]
@@ -18,4 +18,7 @@ class CalibrationDict(TypedDict, total=False):
     result_index: int
     objective_function: ObjectiveFunction
     save_result: str
-    calibration_period: Tuple[Dateable, Dateable]
\ No newline at end of file
+    calibration_period: Tuple[Dateable, Dateable]
+    cache_size: int
+    cache_decimals: int
+    cache_file: str
\ No newline at end of file
@@ -19,4 +19,8 @@ class DownhillSimplexCalibrationDict(
 
     max_iter: int
 
-    save_simplex: str
\ No newline at end of file
+    save_simplex: str
+
+    workers: int
+
+    speculative: bool
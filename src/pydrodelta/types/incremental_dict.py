@@ -0,0 +1,9 @@
+from typing import TypedDict
+from typing_extensions import NotRequired
+
+class IncrementalDict(TypedDict):
+    """
+        path : str
+            store directory. Defaults to ~/.cache/pydrodelta
+    """
+    path : NotRequired[str]
@@ -0,0 +1,18 @@
+from typing import TypedDict, Optional
+from typing_extensions import NotRequired
+
+class LoadConcurrencyDict(TypedDict):
+    """
+        max_workers : int
+            maximum number of series downloaded at the same time
+        rate_limit : float
+            maximum number of requests per second sent to each api host. If not set, no limit is applied
+        max_retries : int
+            number of times a failed download is retried
+        retry_backoff : float
+            seconds to wait before the first retry. The wait is doubled on each subsequent retry
+    """
+    max_workers : int
+    rate_limit : NotRequired[Optional[float]]
+    max_retries : NotRequired[int]
+    retry_backoff : NotRequired[float]
@@ -0,0 +1,28 @@
+from typing import TypedDict, Literal, Tuple, List
+from .calibration_dict import CalibrationDict
+
+class MultiStartCalibrationDict(
+    CalibrationDict,
+    total=False
+):
+    method: Literal["multi-start"]
+
+    limit: bool
+
+    sigma: float
+
+    ranges: List[Tuple[float, float]]
+
+    no_improve_thr: float
+
+    max_stagnations: int
+
+    max_iter: int
+
+    n_starts: int
+
+    start_method: Literal["latin-hypercube", "random"]
+
+    seed: int
+
+    workers: int
@@ -0,0 +1,12 @@
+from typing import TypedDict
+from typing_extensions import NotRequired
+
+class PlotRenderingDict(TypedDict):
+    """
+        max_workers : int
+            number of worker processes that render the plots
+        skip_unchanged : bool
+            don't render again the plot files whose input data and options didn't change since their last rendering
+    """
+    max_workers : int
+    skip_unchanged : NotRequired[bool]
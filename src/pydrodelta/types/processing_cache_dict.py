@@ -0,0 +1,15 @@
+from typing import TypedDict, Union
+from typing_extensions import NotRequired
+
+class ProcessingCacheDict(TypedDict):
+    """
+        path : str
+            cache directory. Defaults to ~/.cache/pydrodelta
+        max_size : float
+            maximum size of the cache in megabytes. Least recently used entries are evicted beyond this size
+        max_age : Union[dict,float]
+            entries not used during this period are evicted. Defaults to 7 days
+    """
+    path : NotRequired[str]
+    max_size : NotRequired[float]
+    max_age : NotRequired[Union[dict,float]]
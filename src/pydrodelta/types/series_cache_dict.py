@@ -0,0 +1,15 @@
+from typing import TypedDict, Union
+from typing_extensions import NotRequired
+
+class SeriesCacheDict(TypedDict):
+    """
+        path : str
+            cache directory. Defaults to ~/.cache/pydrodelta
+        max_size : float
+            maximum size of the cache in megabytes. Least recently used series are evicted beyond this size
+        revision_window : Union[dict,float]
+            observations of this period before the end of the cached window are downloaded again on each read
+    """
+    path : NotRequired[str]
+    max_size : NotRequired[float]
+    revision_window : NotRequired[Union[dict,float]]
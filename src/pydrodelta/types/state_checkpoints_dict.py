@@ -0,0 +1,18 @@
+from typing import TypedDict, Union
+from typing_extensions import NotRequired
+
+class StateCheckpointsDict(TypedDict):
+    """
+        path : str
+            checkpoints directory. Defaults to ~/.cache/pydrodelta
+        save_window : Union[dict,float]
+            save checkpoints of this period before forecast_date (or the end of the run)
+        save_interval : Union[dict,float]
+            minimum interval between saved checkpoints. Defaults to every step
+        keep : int
+            maximum number of checkpoints kept per procedure and parameter set
+    """
+    path : NotRequired[str]
+    save_window : NotRequired[Union[dict,float]]
+    save_interval : NotRequired[Union[dict,float]]
+    keep : NotRequired[int]
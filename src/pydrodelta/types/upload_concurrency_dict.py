@@ -0,0 +1,21 @@
+from typing import TypedDict, Optional
+from typing_extensions import NotRequired
+
+class UploadConcurrencyDict(TypedDict):
+    """
+        max_workers : int
+            maximum number of chunks uploaded at the same time
+        max_series_per_chunk : int
+            maximum number of series per request. If not set, not limited
+        max_chunk_size : float
+            approximate maximum size of a request in megabytes (json). Larger observation series are split, a larger forecast series is posted alone. If not set, not limited
+        max_retries : int
+            number of times a failed chunk is retried
+        retry_backoff : float
+            seconds to wait before the first retry. The wait is doubled on each subsequent retry
+    """
+    max_workers : int
+    max_series_per_chunk : NotRequired[Optional[int]]
+    max_chunk_size : NotRequired[Optional[float]]
+    max_retries : NotRequired[int]
+    retry_backoff : NotRequired[float]
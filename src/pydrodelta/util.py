@@ -17,8 +17,10 @@ import matplotlib.dates as mdates
 from matplotlib.dates import DateFormatter
 from matplotlib.transforms import Bbox
 import csv
+import hashlib
+import json
 import os.path
-from typing import Union, Tuple, List, Literal, Optional, cast, Any, TypedDict, IO, overload, Mapping, Any
+from typing import Union, Tuple, List, Literal, Optional, cast, Any, TypedDict, IO, overload, Mapping, Any, Callable
 from a5client.util_types import Intervaleable, ApiConfigDict, TVP, Dateable, TVPdateable, TVPList, TVPAllowNone
 from .types.linear_combination_dict import LinearCombinationDict
 from a5client import observacionesListToDataFrame, createEmptyObsDataFrame
@@ -322,6 +324,19 @@ def createDatetimeSequence(
         else:
             return DatetimeIndex([timezone.localize(datetime(dt.year,dt.month,dt.day)) for dt in dts_utc])
     else:
+        if not timeInterval.years and not timeInterval.months and not timeInterval.days:
+            # fixed duration: vectorized generation, equal to the calendar offset one unless the utc offset changes within the range
+            dts = pandas.date_range(
+                start=timestart, 
+                end=timeend, 
+                freq=pandas.Timedelta(
+                    hours=timeInterval.hours, 
+                    minutes=timeInterval.minutes, 
+                    seconds=timeInterval.seconds, 
+                    microseconds=timeInterval.microseconds)
+            )
+            if dts.tz is None or len(np.unique(dts.tz_localize(None).asi8 - dts.asi8)) <= 1:
+                return dts
         freq = pandas.DateOffset(
                 years=timeInterval.years,
                 months=timeInterval.months,
@@ -370,6 +385,36 @@ def f4(row,column="valor",tag_column="tag"):
     else:
         return row[tag_column]
 
+def interpolationTags(
+    data : pandas.DataFrame,
+    column : str = "valor",
+    tag_column : str = "tag",
+    interpolated_column : str = "interpolated",
+    min_obs_date : Optional[datetime] = None,
+    max_obs_date : Optional[datetime] = None
+    ) -> list:
+    """Array-based equivalent of f4 (when min_obs_date and max_obs_date are not set) and f5
+
+    Args:
+        data (DataFrame): must contain column, tag_column and interpolated_column
+        column (str, optional): original (not interpolated) value column. Defaults to "valor".
+        tag_column (str, optional): tag column. Defaults to "tag".
+        interpolated_column (str, optional): interpolated value column. Defaults to "interpolated".
+        min_obs_date (datetime, optional): begin date of observations. Rows before it are tagged as "extrapolated"
+        max_obs_date (datetime, optional): end date of observations. Rows after it are tagged as "extrapolated"
+
+    Returns:
+        list: tags, one for each row of data
+    """
+    tags = data[tag_column].to_numpy(dtype=object)
+    was_na = data[column].isna().to_numpy()
+    filled = data[interpolated_column].notna().to_numpy()
+    new_tags = np.where(filled & was_na, "interpolated", tags)
+    if min_obs_date is not None and max_obs_date is not None:
+        outside = np.asarray((data.index < min_obs_date) | (data.index > max_obs_date))
+        new_tags = np.where(filled & outside, "extrapolated", new_tags)
+    return new_tags.tolist()
+
 def getNSteps(timestep : relativedelta, td : Union[relativedelta,timedelta]) -> int:
     timestep_seconds = relativedeltaToSeconds(timestep)
     if isinstance(td, relativedelta):
@@ -455,7 +500,7 @@ def serieRegular(
             df_join["interpolated"] = df_join["interpolated"].fillna(extrapolated["valor"])
         if tag_column is not None:
             # print("columns: " + df_join.columns)
-            df_join[tag_column] = [x[tag_column] if pandas.isna(x["interpolated"]) else "extrapolated" if i < min_obs_date or i > max_obs_date else "interpolated" if pandas.isna(x[column]) else x[tag_column] for (i, x) in df_join.iterrows()]
+            df_join[tag_column] = interpolationTags(df_join, column, tag_column, "interpolated", min_obs_date, max_obs_date)
         df_join[column] = df_join["interpolated"]
         del df_join["interpolated"]
         for c in df_join.columns:
@@ -497,7 +542,7 @@ def regularizeColumn(
     df_ = df_join.copy()
     df_["interpolated_final"] = interpolate_or_copy_closest(df_[column], timedelta_threshold)
     if tag_column is not None:
-        df_["new_tag"] = df_.apply(lambda row: f4(row,column,tag_column),axis=1) #[x[tag_column] if pandas.isna(x.interpolated_final) else "interpolated" if pandas.isna(x.valor) else x[tag_column] for (i,x) in df_join.iterrows()]
+        df_["new_tag"] = interpolationTags(df_, column, tag_column, "interpolated_final")
         df_regular = df_regular.join(df_[["interpolated_final","new_tag"]].rename(columns={"interpolated_final":column,"new_tag":tag_column}), how = 'left')
     else:
         df_regular = df_regular.join(df_[["interpolated_final",]].rename(columns={"interpolated_final":column}), how = 'left')
@@ -523,7 +568,7 @@ def interpolateData(
     min_obs_date, max_obs_date = (data[~pandas.isna(data[column])].index.min(),data[~pandas.isna(data[column])].index.max())
     data["interpolated"] = data[column].astype(float).interpolate(method='time',limit=interpolation_limit,limit_direction='both',limit_area=None if extrapolate else 'inside')
     if tag_column is not None:
-        data[tag_column] = data.apply(lambda row: f5(row,column,tag_column,min_obs_date,max_obs_date),axis=1)#[x[tag_column] if pandas.isna(x["interpolated"]) else "extrapolated" if i < min_obs_date or i > max_obs_date else "interpolated" if pandas.isna(x[column]) else x[tag_column] for (i, x) in data.iterrows()]
+        data[tag_column] = interpolationTags(data, column, tag_column, "interpolated", min_obs_date, max_obs_date)
     data[column] = data["interpolated"]
     del data["interpolated"]
     return data
@@ -1191,9 +1236,13 @@ def getRandColor():
     return colormap(random.randrange(colormap.N))
 
 def first(l : list) -> Any:
+    if isinstance(l, Series):
+        return l.iloc[0] if len(l) else np.nan
     return l[0] if len(l) else np.nan
 
 def last(l : list) -> Any:
+    if isinstance(l, Series):
+        return l.iloc[len(l)-1] if len(l) else np.nan
     return l[len(l)-1] if len(l) else np.nan
 
 def mad(l : list) -> float:
@@ -1255,7 +1304,95 @@ def aggregateByTimestep(data : pandas.DataFrame, index : pandas.DatetimeIndex, d
     Returns:
         Series: the aggregated series. Series of type float with index of type DatetimeIndex
     """
-    return Series([aggregateValuesWithinTimestep(data, i, dt, column, pass_nan, agg_func) for i in index], index)
+    if agg_func not in agg_func_names:
+        raise ValueError("Invalid agg_func")
+    data_index = DatetimeIndex(data.index)
+    if not len(index) or not data_index.is_monotonic_increasing:
+        return Series([aggregateValuesWithinTimestep(data, i, dt, column, pass_nan, agg_func) for i in index], index)
+    # row positions of each timestep: rows lo[k] to hi[k] - 1 fall within [index[k], index[k] + dt)
+    lo = data_index.searchsorted(index, side="left")
+    hi = data_index.searchsorted(addDuration(index, dt), side="left")
+    hi = np.maximum(lo, hi)
+    count = hi - lo
+    if not pass_nan and agg_func in ("min", "max") and np.any(count == 0):
+        raise ValueError("%s() arg is an empty sequence" % agg_func)
+    values = data[column].to_numpy(dtype=float)
+    if agg_func in ("first", "last"):
+        result = np.full(len(index), np.nan)
+        not_empty = count > 0
+        result[not_empty] = values[lo[not_empty]] if agg_func == "first" else values[hi[not_empty] - 1]
+    else:
+        result = aggregateBins(values, lo, hi, agg_func)
+    if pass_nan:
+        result[count == 0] = np.nan
+    return Series(result, index)
+
+def addDuration(index : pandas.DatetimeIndex, dt : Union[relativedelta,timedelta]) -> pandas.DatetimeIndex:
+    """Add dt to each item of index. Vectorized if dt is a fixed duration (no years, months or absolute fields), otherwise item by item"""
+    if isinstance(index, pandas.DatetimeIndex):
+        if isinstance(dt, timedelta):
+            return index + dt
+        if isinstance(dt, relativedelta) and not dt.years and not dt.months and not dt.leapdays and all([getattr(dt, f) is None for f in ("year", "month", "day", "weekday", "hour", "minute", "second", "microsecond")]):
+            return index + pandas.Timedelta(days=dt.days, hours=dt.hours, minutes=dt.minutes, seconds=dt.seconds, microseconds=dt.microseconds)
+    return DatetimeIndex([i + dt for i in index])
+
+agg_func_names = ("sum", "first", "last", "mean", "median", "min", "max", "std", "var", "prod", "mad")
+
+def applyToBins(lo : NDArray[np.intp], hi : NDArray[np.intp], func : Callable[[NDArray[np.intp], NDArray[np.intp]], NDArray[np.float64]], result : NDArray[np.float64], max_chunk_size : int = 2**20) -> NDArray[np.float64]:
+    """For each group of non-empty bins of the same length L, call func(positions, bins), where positions is a 2d array (one row of L positions per bin) and bins are the bin numbers, and write the returned values into result[bins]. Reducing each row of a 2d array gives the same result as reducing the corresponding 1d slice"""
+    lengths = hi - lo
+    for length in np.unique(lengths):
+        if length == 0:
+            continue
+        bins = np.flatnonzero(lengths == length)
+        chunk = max(1, max_chunk_size // int(length))
+        for i in range(0, len(bins), chunk):
+            b = bins[i:i+chunk]
+            result[b] = func(lo[b][:, None] + np.arange(length), b)
+    return result
+
+def aggregateBins(values : NDArray[np.float64], lo : NDArray[np.intp], hi : NDArray[np.intp], agg_func : str) -> NDArray[np.float64]:
+    """Aggregate values[lo[k]:hi[k]] for each k. Results are the same as those of applying the aggregateValuesWithinTimestep functions to a pandas Series of each bin (sum, mean, std, var and prod skip nan, median and mad propagate nan, min and max follow the builtin comparison semantics)"""
+    nan_mask = np.isnan(values)
+    # number of non-nan values up to each position
+    valid_cumsum = np.concatenate(([0], np.cumsum(~nan_mask)))
+    valid_count = valid_cumsum[hi] - valid_cumsum[lo]
+    nan_count = (hi - lo) - valid_count
+    if agg_func in ("sum", "mean", "std", "var", "mad"):
+        filled = np.where(nan_mask, 0.0, values)
+        sums = applyToBins(lo, hi, lambda pos, b: filled[pos].sum(axis=1), np.zeros(len(lo)))
+        if agg_func == "sum":
+            return sums
+        with np.errstate(all="ignore"):
+            means = np.where(valid_count > 0, sums / valid_count, np.nan)
+        if agg_func == "mean":
+            return means
+        if agg_func == "mad":
+            return applyToBins(lo, hi, lambda pos, b: np.mean(np.abs(values[pos] - means[b][:, None]), axis=1), np.full(len(lo), np.nan))
+        def sumOfSquares(pos, b):
+            sqr = (means[b][:, None] - filled[pos]) ** 2
+            sqr[nan_mask[pos]] = 0
+            return sqr.sum(axis=1)
+        with np.errstate(all="ignore"):
+            var = np.where(valid_count > 0, applyToBins(lo, hi, sumOfSquares, np.zeros(len(lo))) / valid_count, np.nan)
+        return np.sqrt(var) if agg_func == "std" else var
+    elif agg_func == "prod":
+        filled = np.where(nan_mask, 1.0, values)
+        return applyToBins(lo, hi, lambda pos, b: filled[pos].prod(axis=1), np.ones(len(lo)))
+    elif agg_func == "median":
+        result = applyToBins(lo, hi, lambda pos, b: np.median(values[pos], axis=1), np.full(len(lo), np.nan))
+        result[nan_count > 0] = np.nan
+        return result
+    elif agg_func in ("min", "max"):
+        ufunc = np.minimum if agg_func == "min" else np.maximum
+        result = applyToBins(lo, hi, lambda pos, b: ufunc.reduce(values[pos], axis=1), np.full(len(lo), np.nan))
+        # with nan, builtin min and max depend on the position of the nan values
+        builtin = min if agg_func == "min" else max
+        for k in np.flatnonzero(nan_count > 0):
+            result[k] = builtin(values[lo[k]:hi[k]].tolist())
+        return result
+    else:
+        raise ValueError("Invalid agg_func")
 
 def relativedeltaToSeconds(rd : relativedelta) -> int:
     if not isinstance(rd, relativedelta):
@@ -1342,16 +1479,19 @@ def interpolate_or_copy_closest(data : pandas.Series,interpolation_limit : Union
     use_bfill = (delta_bwd <= td)
 
     # Choose closest direction when both are valid
+    isna = data.isna()
+    both = isna & use_ffill & use_bfill
+    only_ffill = isna & use_ffill & ~use_bfill
+    only_bfill = isna & use_bfill & ~use_ffill
     filled = data.copy()
-    for i in data[data.isna()].index:
-        if use_ffill[i] and use_bfill[i]:
-            # interpolate
-            filled[i] = (ffill[i] * delta_fwd[i] + bfill[i] * delta_bwd[i]) / (delta_fwd[i] + delta_bwd[i])
-        elif use_ffill[i]:
-            filled[i] = ffill[i]
-        elif use_bfill[i]:
-            filled[i] = bfill[i]
-        # else: leave as NaN (too far from both sides)
+    if both.any():
+        # interpolate
+        filled[both] = (ffill[both] * delta_fwd[both] + bfill[both] * delta_bwd[both]) / (delta_fwd[both] + delta_bwd[both])
+    if only_ffill.any():
+        filled[only_ffill] = ffill[only_ffill]
+    if only_bfill.any():
+        filled[only_bfill] = bfill[only_bfill]
+    # else: leave as NaN (too far from both sides)
 
     return filled
 
@@ -1575,4 +1715,16 @@ def get_best_lag(x : pandas.Series, y : pandas.Series, max_lag : int=24) -> Tupl
     }
 
     best_lag = max(corrs, key=lambda k: corrs[k])
-    return best_lag, corrs[best_lag]
\ No newline at end of file
+    return best_lag, corrs[best_lag]
+
+def parametersHash(*items : Any) -> str:
+    """Hash of the json representation of items (e.g. procedure type, parameters and extra_pars). Items that are not json serializable are represented by their str"""
+    return hashlib.sha1(json.dumps(items, sort_keys=True, default=str).encode()).hexdigest()
+
+def dataFrameHash(data : Optional[DataFrame]) -> str:
+    """Content hash of a DataFrame (index, columns and values). Returns an empty string if data is None"""
+    if data is None:
+        return ""
+    h = hashlib.sha1(str(list(data.columns)).encode())
+    h.update(pandas.util.hash_pandas_object(data, index=True).values.tobytes())
+    return h.hexdigest()
@@ -0,0 +1,243 @@
+"""Minimal stand-in for the a5 api, for tests and benchmarks that must not depend on a remote server"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from datetime import timedelta
+from threading import Thread, Lock
+from typing import Dict, Optional, List, Tuple, Union
+from pathlib import Path
+import json
+import re
+import yaml
+import time
+from a5client.util import tryParseAndLocalizeDate
+
+def stubObservaciones(series_id : int, timestart : str, timeend : str, step : timedelta = timedelta(hours=1), offset : float = 0) -> list:
+    """Deterministic hourly observations: valor = series_id + hours since 2000-01-01 + offset"""
+    start = tryParseAndLocalizeDate(timestart)
+    end = tryParseAndLocalizeDate(timeend)
+    origin = tryParseAndLocalizeDate("2000-01-01T00:00:00-03:00")
+    t = origin + step * int((start - origin) / step)
+    if t < start:
+        t = t + step
+    observaciones = []
+    while t <= end:
+        observaciones.append({
+            "timestart": t.isoformat(),
+            "timeend": t.isoformat(),
+            "valor": float(series_id + (t - origin) / timedelta(hours=1) + offset)
+        })
+        t = t + step
+    return observaciones
+
+class A5StubServer:
+    """Serves variables, estaciones and series observations on localhost and accepts uploads of corridas and observations. Use as a context manager
+
+    latency: seconds to sleep before answering each series request and each upload
+    fail_first: number of initial requests of each series that answer with status 500
+    multi_id: serve /obs/<tipo>/observaciones?series_id=a,b,c (multi-series read). If False, answers 404
+    offset: added to observed values. Change it between loads to simulate revised data
+    series_offset: added to observed values of the given series ids (series_id: offset)
+    series_timeend: last observation date of the given series ids (series_id: date). Set it to simulate series that stop reporting
+    corridas: forecast runs ({"cor_id": int, "forecast_date": str}) of every cal_id, oldest first. Forecasted values are valor = series_id + cor_id + hours since 2000-01-01
+    fail_uploads: number of initial uploads that answer with status 500
+    upload_seconds_per_mb: seconds to sleep per megabyte of each upload, in addition to latency, to stand for server processing that grows with the payload
+    uploads: (path, body) of every accepted upload, in order of arrival
+    created_corridas: forecast runs created by uploads, by (cal_id, forecast_date). Uploads to an existing run are merged into it: pronosticos of a series already in the run are appended to it
+    """
+
+    def __init__(self, latency : float = 0, fail_first : int = 0, multi_id : bool = True):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.multi_id = multi_id
+        self.request_count = 0
+        self.multi_request_count = 0
+        self.offset : float = 0
+        self.series_offset : Dict[int,float] = {}
+        self.series_timeend : Dict[int,str] = {}
+        self.corridas : List[dict] = []
+        self.prono_request_count = 0
+        self.requests : List[Tuple[str,dict]] = []
+        self.series_request_count : Dict[str,int] = {}
+        self.max_concurrent = 0
+        self.fail_uploads = 0
+        self.upload_seconds_per_mb : float = 0
+        self.upload_count = 0
+        self.uploads : List[Tuple[str,object]] = []
+        self.created_corridas : Dict[Tuple[int,str],dict] = {}
+        self._concurrent = 0
+        self._lock = Lock()
+        self.httpd : Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self.httpd is not None
+        return "http://127.0.0.1:%i" % self.httpd.server_address[1]
+
+    @property
+    def api_config(self) -> dict:
+        return {"url": self.url, "token": "stub"}
+
+    def seriesTimeend(self, series_id : int, timeend : str) -> str:
+        """End of the observations of series_id served for a request up to timeend (see series_timeend)"""
+        if series_id not in self.series_timeend:
+            return timeend
+        return min(tryParseAndLocalizeDate(timeend), tryParseAndLocalizeDate(self.series_timeend[series_id])).isoformat()
+
+    def loadConfig(self, path : Union[str,Path], n_nodes : Optional[int] = None) -> dict:
+        """Read a topology or plan yml file and set this server as the api of its nodes and its input api
+
+        n_nodes: keep only the first n_nodes nodes
+        """
+        with open(path) as f:
+            config = yaml.load(f, yaml.CLoader)
+        topology = config["topology"] if "topology" in config else config
+        if n_nodes is not None:
+            topology["nodes"] = topology["nodes"][:n_nodes]
+        for node in topology["nodes"]:
+            node["api_config"] = self.api_config
+        config["input_api_config"] = self.api_config
+        return config
+
+    def __enter__(self):
+        stub = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            def reply(self, status, body):
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type","application/json")
+                self.send_header("Content-Length",str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.request_count += 1
+                    stub.requests.append((url.path, params))
+                m = re.match(r"^/obs/variables/(\d+)$", url.path)
+                if m:
+                    return self.reply(200, {"id": int(m.group(1)), "nombre": "var %s" % m.group(1), "abrev": "v", "def_unit_id": 1, "timeSupport": {}})
+                if url.path == "/obs/puntual/estaciones":
+                    return self.reply(200, [{"id": int(params["id"]), "nombre": "estacion %s" % params["id"], "tabla": "stub", "geom": {"type": "Point", "coordinates": [-58.4, -34.6]}}])
+                m = re.match(r"^/obs/(puntual|areal|raster)/series/(\d+)$", url.path)
+                if m:
+                    return self.serie(m.group(1), int(m.group(2)), params)
+                m = re.match(r"^/sim/calibrados/(\d+)/corridas$", url.path)
+                if m:
+                    return self.reply(200, [
+                        {"id": c["cor_id"], "cal_id": int(m.group(1)), "forecast_date": c["forecast_date"], "series": []}
+                        for c in stub.corridas
+                        if "forecast_timestart" not in params or tryParseAndLocalizeDate(c["forecast_date"]) >= tryParseAndLocalizeDate(params["forecast_timestart"])
+                    ])
+                m = re.match(r"^/sim/calibrados/(\d+)/corridas/(last|\d+)$", url.path)
+                if m:
+                    return self.corrida(int(m.group(1)), m.group(2), params)
+                m = re.match(r"^/obs/(puntual|areal|raster)/observaciones$", url.path)
+                if m and stub.multi_id:
+                    return self.observaciones(params)
+                self.reply(404, {"message": "not found"})
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length)) if length else None
+                with stub._lock:
+                    stub.request_count += 1
+                    stub.upload_count += 1
+                    count = stub.upload_count
+                    stub._concurrent += 1
+                    stub.max_concurrent = max(stub.max_concurrent, stub._concurrent)
+                try:
+                    if stub.latency or stub.upload_seconds_per_mb:
+                        time.sleep(stub.latency + stub.upload_seconds_per_mb * length / 1024**2)
+                    if count <= stub.fail_uploads:
+                        return self.reply(500, {"message": "stub failure"})
+                    m = re.match(r"^/sim/calibrados/(\d+)/corridas$", url.path)
+                    if m:
+                        cal_id = int(m.group(1))
+                        with stub._lock:
+                            stub.uploads.append((url.path, body))
+                            created = stub.created_corridas.setdefault((cal_id, body["forecast_date"]), {"id": len(stub.created_corridas) + 1, "cal_id": cal_id, "forecast_date": body["forecast_date"], "series": []})
+                            for serie in body["series"]:
+                                merged = [s for s in created["series"] if s["series_id"] == serie["series_id"] and s["series_table"] == serie["series_table"]]
+                                if len(merged):
+                                    merged[0]["pronosticos"].extend(serie["pronosticos"])
+                                else:
+                                    created["series"].append({**serie, "pronosticos": list(serie["pronosticos"])})
+                        return self.reply(200, {"id": created["id"], "cal_id": cal_id, "forecast_date": body["forecast_date"], "series": body["series"]})
+                    m = re.match(r"^/obs/(puntual|areal|raster)/series/(\d+)/observaciones$", url.path)
+                    if m:
+                        with stub._lock:
+                            stub.uploads.append((url.path, body))
+                        return self.reply(200, [dict(obs, series_id = int(m.group(2))) for obs in body["observaciones"]])
+                    m = re.match(r"^/obs/(puntual|areal|raster)/observaciones$", url.path)
+                    if m:
+                        with stub._lock:
+                            stub.uploads.append((url.path, body))
+                        return self.reply(200, body["observaciones"])
+                    self.reply(404, {"message": "not found"})
+                finally:
+                    with stub._lock:
+                        stub._concurrent -= 1
+            def corrida(self, cal_id, cor_id, params):
+                with stub._lock:
+                    stub.prono_request_count += 1
+                matches = [c for c in stub.corridas if cor_id == "last" or c["cor_id"] == int(cor_id)]
+                if not len(matches):
+                    return self.reply(404, {"message": "corrida not found"})
+                corrida = matches[len(matches)-1]
+                series_id = int(params["series_id"])
+                pronosticos = stubObservaciones(series_id + corrida["cor_id"], params["timestart"], params["timeend"])
+                self.reply(200, {
+                    "id": corrida["cor_id"],
+                    "cal_id": cal_id,
+                    "forecast_date": corrida["forecast_date"],
+                    "series": [{
+                        "series_id": series_id,
+                        "series_table": "series_areal" if params.get("tipo") == "areal" else "series",
+                        "pronosticos": pronosticos
+                    }]
+                })
+            def observaciones(self, params):
+                with stub._lock:
+                    stub.multi_request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                observaciones = []
+                for series_id in params["series_id"].split(","):
+                    observaciones.extend([
+                        dict(obs, series_id = int(series_id))
+                        for obs in stubObservaciones(int(series_id), params["timestart"], stub.seriesTimeend(int(series_id), params["timeend"]), offset = stub.offset + stub.series_offset.get(int(series_id), 0))
+                    ])
+                self.reply(200, observaciones)
+            def serie(self, tipo, series_id, params):
+                key = "%s/%i" % (tipo, series_id)
+                with stub._lock:
+                    stub.series_request_count[key] = stub.series_request_count.get(key, 0) + 1
+                    count = stub.series_request_count[key]
+                    stub._concurrent += 1
+                    stub.max_concurrent = max(stub.max_concurrent, stub._concurrent)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    if count <= stub.fail_first:
+                        return self.reply(500, {"message": "stub failure"})
+                    self.reply(200, {
+                        "id": series_id,
+                        "tipo": tipo,
+                        "observaciones": stubObservaciones(series_id, params["timestart"], stub.seriesTimeend(series_id, params["timeend"]), offset = stub.offset + stub.series_offset.get(series_id, 0))
+                    })
+                finally:
+                    with stub._lock:
+                        stub._concurrent -= 1
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        assert self.httpd is not None
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,43 @@
+from unittest import TestCase
+from pydrodelta.util import aggregateByTimestep, aggregateValuesWithinTimestep, agg_func_names
+from dateutil.relativedelta import relativedelta
+from pandas import Series, DatetimeIndex, date_range, Timestamp
+from tests.synthetic_data import tz, irregularIndex, randomData
+import numpy as np
+
+def legacyAggregate(data, index, dt, pass_nan, agg_func) -> Series:
+    return Series([aggregateValuesWithinTimestep(data, i, dt, "valor", pass_nan, agg_func) for i in index], index, dtype=float)
+
+class Test_AggregateByTimestep(TestCase):
+
+    def test_same_as_per_timestep(self):
+        data = randomData(irregularIndex(150, days = 2, step_minutes = 10))
+        index = date_range(Timestamp("2022-12-31T22:00", tz=tz), Timestamp("2023-01-02T02:00", tz=tz), freq="h")
+        for dt in (relativedelta(hours=1), relativedelta(hours=3)):
+            for agg_func in agg_func_names:
+                for pass_nan in (True, False):
+                    if agg_func in ("min", "max") and not pass_nan:
+                        continue
+                    expected = legacyAggregate(data, index, dt, pass_nan, agg_func)
+                    result = aggregateByTimestep(data, index, dt, agg_func = agg_func, pass_nan = pass_nan)
+                    self.assertTrue(np.array_equal(result.to_numpy(), expected.to_numpy(), equal_nan=True), "agg_func: %s, pass_nan: %s, dt: %s" % (agg_func, pass_nan, dt))
+
+    def test_empty_timestep(self):
+        data = randomData(irregularIndex(200, days = 2, step_minutes = 10), nan_fraction = 0)
+        index = date_range(Timestamp("2023-01-10", tz=tz), periods=3, freq="h")
+        self.assertTrue(aggregateByTimestep(data, index, relativedelta(hours=1)).isna().all())
+        self.assertEqual(list(aggregateByTimestep(data, index, relativedelta(hours=1), pass_nan = False)), [0, 0, 0])
+        self.assertRaises(ValueError, aggregateByTimestep, data, index, relativedelta(hours=1), pass_nan = False, agg_func = "max")
+
+    def test_unsorted(self):
+        data = randomData(irregularIndex(50, days = 2, step_minutes = 10), nan_fraction = 0)
+        shuffled = data.sample(frac = 1, random_state = 1)
+        index = date_range(Timestamp("2023-01-01", tz=tz), periods=48, freq="h")
+        for agg_func in ("sum", "first", "last"):
+            expected = legacyAggregate(shuffled, index, relativedelta(hours=1), True, agg_func)
+            result = aggregateByTimestep(shuffled, index, relativedelta(hours=1), agg_func = agg_func)
+            self.assertTrue(np.array_equal(result.to_numpy(), expected.to_numpy(), equal_nan=True))
+
+    def test_invalid_agg_func(self):
+        data = randomData(irregularIndex(10, days = 2, step_minutes = 10))
+        self.assertRaises(ValueError, aggregateByTimestep, data, DatetimeIndex(data.index), relativedelta(hours=1), agg_func = "foo")
@@ -0,0 +1,76 @@
+from pydrodelta.bulk_load import groupLoadTasks, BulkLoadTask, unsupported_urls
+from pydrodelta.concurrent_load import LoadTask
+from pydrodelta.topology import Topology
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer
+from pathlib import Path
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_BulkLoad(TestCase):
+
+    def assertSameData(self, topology_a, topology_b):
+        for node_a, node_b in zip(topology_a.nodes, topology_b.nodes):
+            var_a = node_a.variables[2]
+            var_b = node_b.variables[2]
+            assert var_a.series is not None and var_b.series is not None
+            for serie_a, serie_b in zip(var_a.series, var_b.series):
+                assert serie_a.data is not None and serie_b.data is not None
+                self.assertTrue(serie_a.data.equals(serie_b.data))
+            assert var_a.data is not None and var_b.data is not None
+            self.assertTrue(var_a.data.equals(var_b.data))
+
+    def test_same_data_as_per_series(self):
+        with A5StubServer() as stub:
+            per_series = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), no_metadata = True)
+            per_series.loadData()
+            bulk = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), no_metadata = True, bulk_load = True)
+            bulk.loadData()
+        self.assertSameData(per_series, bulk)
+
+    def test_request_count(self):
+        with A5StubServer() as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 10), no_metadata = True, bulk_load = True)
+            topology.loadData()
+            # one request per tipo
+            self.assertEqual(stub.multi_request_count, 2)
+            self.assertEqual(len(stub.series_request_count), 0)
+
+    def test_concurrent(self):
+        with A5StubServer() as stub:
+            per_series = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), no_metadata = True)
+            per_series.loadData()
+            bulk = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), no_metadata = True, bulk_load = True, load_concurrency = {"max_workers": 2})
+            bulk.loadData()
+            self.assertEqual(stub.multi_request_count, 2)
+        self.assertSameData(per_series, bulk)
+
+    def test_fallback(self):
+        with A5StubServer(multi_id = False) as stub:
+            per_series = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), no_metadata = True)
+            per_series.loadData()
+            bulk = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), no_metadata = True, bulk_load = True)
+            bulk.loadData()
+            self.assertIn(stub.url, unsupported_urls)
+            self.assertEqual(set(stub.series_request_count.values()), {2})
+        self.assertSameData(per_series, bulk)
+
+    def test_metadata_series_not_grouped(self):
+        with A5StubServer() as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), bulk_load = True)
+            topology.loadData()
+            self.assertEqual(stub.multi_request_count, 0)
+            self.assertEqual(len(stub.series_request_count), 8)
+
+    def test_chunking(self):
+        with A5StubServer() as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 5), no_metadata = True)
+        tasks = []
+        for node in topology.nodes:
+            tasks.extend(node.getLoadTasks(topology.timestart, topology.timeend, no_metadata = True))
+        grouped = groupLoadTasks(tasks, max_series_per_request = 2)
+        self.assertTrue(all([isinstance(t, BulkLoadTask) for t in grouped[:-2]]))
+        self.assertEqual([len(t.tasks) if isinstance(t, BulkLoadTask) else 1 for t in grouped], [2, 2, 2, 2, 1, 1])
+        self.assertIsInstance(grouped[-1], LoadTask)
+        self.assertEqual(sum([len(t.tasks) for t in grouped if isinstance(t, BulkLoadTask)]), 8)
+        self.assertRaises(ValueError, groupLoadTasks, tasks, 0)
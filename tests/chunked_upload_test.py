@@ -0,0 +1,120 @@
+from pydrodelta.chunked_upload import splitSeries, uploadCorrida, uploadObservaciones
+from pydrodelta import serialization
+from pydrodelta.plan import Plan
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer, stubObservaciones
+from a5client import Crud
+import logging
+from pathlib import Path
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_ChunkedUpload(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+        # 10 series of 100 hourly records
+        self.series = [(series_id, stubObservaciones(series_id, "2023-01-01T00:00:00-03:00", "2023-01-05T03:00:00-03:00")) for series_id in range(1, 11)]
+        self.corrida = {
+            "cal_id": 1,
+            "forecast_date": "2023-01-01T00:00:00-03:00",
+            "series": [{"series_id": series_id, "series_table": "series", "pronosticos": pronosticos} for series_id, pronosticos in self.series],
+            "id": None
+        }
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def assertSameRecords(self, chunks, series):
+        merged = {}
+        for chunk in chunks:
+            for key, records in chunk:
+                merged.setdefault(key, []).extend(records)
+        self.assertEqual(list(merged.items()), series)
+
+    def test_split(self):
+        series = self.series
+        chunks, _ = splitSeries(series, max_series_per_chunk = 3)
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+        self.assertSameRecords(chunks, series)
+        size = len(serialization.dumps(series[0][1])) / 1024**2
+        # two series per chunk
+        chunks, sizes = splitSeries(series, max_chunk_size = size * 2.5)
+        self.assertEqual([len(chunk) for chunk in chunks], [2] * 5)
+        self.assertTrue(all(s <= size * 2.5 * 1024**2 for s in sizes))
+        self.assertSameRecords(chunks, series)
+        # each series in 4 pieces
+        chunks, _ = splitSeries(series, max_chunk_size = size / 3.5)
+        self.assertEqual(len(chunks), 40)
+        self.assertSameRecords(chunks, series)
+        self.assertEqual(splitSeries([]), ([], []))
+        self.assertRaises(ValueError, splitSeries, series, 0)
+
+    def test_upload_corrida(self):
+        corrida = self.corrida
+        with A5StubServer() as stub:
+            stub.latency = 0.05
+            stub.fail_uploads = 2
+            created, report = uploadCorrida(Crud(**stub.api_config), corrida, max_workers = 4, max_series_per_chunk = 2, retry_backoff = 0.01)
+        self.assertEqual(len(report), 5)
+        self.assertEqual(sum(r["series"] for r in report), 10)
+        self.assertEqual(sum(r["attempts"] for r in report), 7)
+        self.assertTrue(all(r["error"] is None and r["time"] > 0 for r in report))
+        self.assertGreater(stub.max_concurrent, 1)
+        # the first chunk is uploaded alone, before the others
+        self.assertEqual([s["series_id"] for s in stub.uploads[0][1]["series"]], [1, 2])
+        # chunks are merged into a single forecast run
+        self.assertEqual(list(stub.created_corridas.keys()), [(1, corrida["forecast_date"])])
+        merged = stub.created_corridas[(1, corrida["forecast_date"])]
+        self.assertEqual(sorted(merged["series"], key = lambda serie: serie["series_id"]), corrida["series"])
+        self.assertEqual(created["id"], merged["id"])
+        self.assertEqual(created["series"], corrida["series"])
+
+    def test_upload_corrida_large_series(self):
+        size = len(serialization.dumps(self.series[0][1])) / 1024**2
+        with A5StubServer() as stub:
+            created, report = uploadCorrida(Crud(**stub.api_config), self.corrida, max_workers = 3, max_chunk_size = size / 3.5)
+        # a series larger than max_chunk_size is not split: it is posted whole, alone
+        self.assertEqual([(r["series"], r["records"]) for r in report], [(1, 100)] * 10)
+        self.assertEqual([len(body["series"]) for _, body in stub.uploads], [1] * 10)
+        merged = stub.created_corridas[(1, self.corrida["forecast_date"])]
+        self.assertEqual(sorted(merged["series"], key = lambda serie: serie["series_id"]), self.corrida["series"])
+
+    def test_upload_observaciones(self):
+        series = [(series_id, records[:48]) for series_id, records in self.series[:5]]
+        size = len(serialization.dumps(series[0][1])) / 1024**2
+        with A5StubServer() as stub:
+            stub.fail_uploads = 1
+            created, report = uploadObservaciones(Crud(**stub.api_config), series, max_workers = 3, max_series_per_chunk = 2, max_chunk_size = size * 0.6, retry_backoff = 0.01)
+        # each series in 2 pieces, one piece per chunk: posted to the series
+        self.assertEqual(len(report), 10)
+        self.assertTrue(all(path.endswith("/series/%i/observaciones" % (1 + i // 2)) for i, (path, _) in enumerate(sorted(stub.uploads, key = lambda u: int(u[0].split("/")[4])))))
+        self.assertEqual(len(created), sum(len(records) for _, records in series))
+        # many series per chunk: posted with series_id
+        with A5StubServer() as stub:
+            created, report = uploadObservaciones(Crud(**stub.api_config), series, max_workers = 2, max_series_per_chunk = 3)
+        self.assertEqual(sorted(path for path, _ in stub.uploads), ["/obs/puntual/observaciones"] * 2)
+        self.assertEqual(sorted(created, key = lambda obs: (obs["series_id"], obs["timestart"])), [{**obs, "series_id": series_id} for series_id, records in series for obs in records])
+
+    def test_failed_chunks(self):
+        with A5StubServer() as stub:
+            stub.fail_uploads = 100
+            created, report = uploadObservaciones(Crud(**stub.api_config), [(series_id, records[:10]) for series_id, records in self.series[:2]], max_retries = 1, retry_backoff = 0.01)
+            self.assertEqual(created, [])
+            self.assertEqual([r["attempts"] for r in report], [2])
+            self.assertIsNotNone(report[0]["error"])
+            self.assertRaises(Exception, uploadCorrida, Crud(**stub.api_config), dict(self.corrida, series = self.corrida["series"][:2]), max_retries = 0)
+
+    def test_plan(self):
+        with A5StubServer() as stub:
+            plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+            plan.execute(upload = False)
+            assert plan.topology is not None
+            plan.topology.upload_concurrency = {"max_workers": 2, "max_series_per_chunk": 1}
+            plan.uploadSim(api_config = stub.api_config)
+        corrida = plan.toCorrida()
+        self.assertEqual(len(plan.topology.upload_report), len(corrida["series"]))
+        self.assertEqual(len(stub.created_corridas), 1)
+        merged = list(stub.created_corridas.values())[0]
+        self.assertEqual(merged["forecast_date"], corrida["forecast_date"])
+        self.assertEqual(sorted(merged["series"], key = lambda serie: serie["series_id"]), sorted(corrida["series"], key = lambda serie: serie["series_id"]))
@@ -0,0 +1,63 @@
+from pydrodelta.topology import Topology
+from pydrodelta.concurrent_load import HostRateLimiter
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer
+from pathlib import Path
+import time
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_ConcurrentLoad(TestCase):
+
+    def test_same_data_as_sequential(self):
+        with A5StubServer() as stub:
+            sequential = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"))
+            sequential.loadData()
+            concurrent = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), load_concurrency = {"max_workers": 4})
+            concurrent.loadData()
+        for node_s, node_c in zip(sequential.nodes, concurrent.nodes):
+            var_s = node_s.variables[2]
+            var_c = node_c.variables[2]
+            assert var_s.series is not None and var_c.series is not None
+            for serie_s, serie_c in zip(var_s.series, var_c.series):
+                assert serie_s.data is not None and serie_c.data is not None
+                self.assertTrue(serie_s.data.equals(serie_c.data))
+                self.assertEqual(serie_s.metadata, serie_c.metadata)
+            assert var_s.data is not None and var_c.data is not None
+            self.assertTrue(var_s.data.equals(var_c.data))
+
+    def test_max_workers_bound(self):
+        with A5StubServer(latency=0.05) as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 6), load_concurrency = {"max_workers": 3})
+            topology.loadData()
+            self.assertLessEqual(stub.max_concurrent, 3)
+            self.assertGreater(stub.max_concurrent, 1)
+
+    def test_retry(self):
+        with A5StubServer(fail_first=1) as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 2), load_concurrency = {"max_workers": 2, "max_retries": 1, "retry_backoff": 0})
+            topology.loadData()
+            self.assertEqual(set(stub.series_request_count.values()), {2})
+        assert topology.nodes[0].variables[2].series is not None
+        data = topology.nodes[0].variables[2].series[0].data
+        assert data is not None
+        self.assertEqual(len(data), 50)
+
+    def test_retries_exhausted(self):
+        with A5StubServer(fail_first=2) as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 1), load_concurrency = {"max_workers": 2, "max_retries": 1, "retry_backoff": 0})
+            self.assertRaises(Exception, topology.loadData)
+
+    def test_rate_limiter(self):
+        limiter = HostRateLimiter(rate_limit=20)
+        t0 = time.monotonic()
+        for _ in range(5):
+            limiter.acquire("localhost")
+        self.assertGreaterEqual(time.monotonic() - t0, 0.19)
+        t0 = time.monotonic()
+        limiter.acquire("otherhost")
+        self.assertLess(time.monotonic() - t0, 0.05)
+
+    def test_invalid_config(self):
+        with A5StubServer() as stub:
+            self.assertRaises(Exception, Topology, **stub.loadConfig(data_dir / "topologies/stub_series.yml"), load_concurrency = {"max_workers": 0})
@@ -0,0 +1,47 @@
+from pydrodelta.pydrology import convolve, convolveNet, getPulseMatrix, gammaDistribution, LinearChannel, LinearNet
+from unittest import TestCase
+import numpy as np
+
+class Test_Convolution(TestCase):
+
+    rng = np.random.default_rng(0)
+    inflows = rng.gamma(0.5, 20, size = (3, 400))
+
+    def test_convolve(self):
+        for n, m in [(1, 1), (5, 1), (1, 5), (50, 7), (400, 150), (150, 400)]:
+            inflow = self.inflows[0, :n]
+            u = gammaDistribution(2, m / 8, 1)[:m] if m > 1 else np.array([0.7])
+            expected = np.dot(getPulseMatrix(inflow, u), u)
+            for method in ("auto", "direct", "fft"):
+                outflow = convolve(inflow, u, method)
+                self.assertEqual(outflow.shape, expected.shape)
+                np.testing.assert_allclose(outflow, expected, rtol = 1e-10, atol = 1e-10 * expected.max())
+        self.assertEqual(len(convolve([], [1.0, 2.0])), 1)
+        self.assertRaises(ValueError, convolve, [1.0], [1.0], "foo")
+
+    def test_nan(self):
+        inflow = self.inflows[0].copy()
+        inflow[10] = np.nan
+        u = gammaDistribution(2, 40, 1)
+        self.assertGreater(len(u), 128)
+        outflow = convolve(inflow, u)
+        expected = np.dot(getPulseMatrix(inflow, u), u)
+        self.assertTrue(np.array_equal(np.isnan(outflow), np.isnan(expected)))
+        self.assertFalse(np.isnan(outflow[0:10]).any())
+
+    def test_linear_channel(self):
+        channel = LinearChannel([3, 2], self.inflows[0])
+        channel.computeOutFlow()
+        np.testing.assert_allclose(channel.Outflow, np.dot(getPulseMatrix(channel.Inflow, channel.u), channel.u))
+
+    def test_linear_net(self):
+        pars = [[2, 2], [30, 3], [5, 1]]
+        net = LinearNet(pars, self.inflows.tolist(), Proc = "Nash")
+        net.computeOutflow()
+        u = [gammaDistribution(n, k, 1) for k, n in pars]
+        self.assertEqual(len(net.Outflow), 400 + max([len(u_j) for u_j in u]) - 1)
+        expected = np.zeros(len(net.Outflow))
+        for inflow, u_j in zip(self.inflows, u):
+            expected[0:400 + len(u_j) - 1] += np.dot(getPulseMatrix(inflow, u_j), u_j)
+        np.testing.assert_allclose(net.Outflow, expected, rtol = 1e-10, atol = 1e-10 * expected.max())
+        np.testing.assert_allclose(convolveNet(self.inflows, u, "fft"), expected, rtol = 1e-10, atol = 1e-10 * expected.max())
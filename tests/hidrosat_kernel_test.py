@@ -0,0 +1,73 @@
+from pydrodelta.pydrology import HIDROSAT
+from pydrodelta.procedures.hidrosat import HIDROSATProcedure
+from pydrodelta.util import createDatetimeSequence
+from unittest import TestCase
+from unittest.mock import patch
+from tests.synthetic_data import dailyForcings
+from pandas import DataFrame
+import numpy as np
+
+state_attributes = ["soilStorage", "EVSoil", "freeWater", "Runoff", "DirectRunoff", "floodplainStorage", "EVFloodPlain", "Q", "Flooded"]
+
+class Test_HidrosatKernel(TestCase):
+
+    def setUp(self):
+        # twice the precipitation, so that the floodplain fills up
+        forcings = dailyForcings(730)
+        self.boundaries = [(forcings.pma * 2).tolist(), forcings.etp.tolist()]
+        # with upstream inflow
+        forcings = dailyForcings(730, seed = 1)
+        self.boundaries_inflow = [(forcings.pma * 2).tolist(), forcings.etp.tolist(), (np.random.default_rng(1).random(730) * 0.5).tolist()]
+
+    def assertSameRun(self, pars : list, initial_conditions : list, boundaries : list, dt : float = 1):
+        reference = HIDROSAT(pars, boundaries, initial_conditions, dt)
+        reference.executeRunReference()
+        fused = HIDROSAT(pars, boundaries, initial_conditions, dt)
+        fused.executeRun()
+        for attribute in state_attributes:
+            self.assertTrue(np.array_equal(getattr(fused, attribute), getattr(reference, attribute), equal_nan=True), (attribute, pars, initial_conditions, dt))
+
+    def test_same_as_reference(self):
+        for pars, initial_conditions in [
+            ([178.395, 1, 3, 232.505, 12.69, 2.28, 0.09], [0, 0, 0, 0]),
+            ([100, 5, 3, 50, 20, 1.5, 0.6, 0.8, 1e-4], [30, 1, 10, 0.1]),
+            ([80, 2.5, 1, 40, 15, 0.8], [0, 0, 0, 0]),
+            ([200, 10, 4.7, 30, 10, 2, 1, 0.5], [150, 2, 40])
+            ]:
+            self.assertSameRun(pars, initial_conditions, self.boundaries)
+            self.assertSameRun(pars, initial_conditions, self.boundaries_inflow)
+        # floodplain step subdivision
+        self.assertSameRun([100, 5, 3, 50, 20, 1.5, 0.6], [30, 1, 10, 0.1], [b[:100] for b in self.boundaries], dt = 2)
+        self.assertSameRun([100, 5, 3, 50, 20, 1.5, 0.6], [30, 1, 10, 0.1], [b[:100] for b in self.boundaries], dt = 3)
+
+    def test_short_and_invalid(self):
+        self.assertSameRun([100, 5, 3, 50, 20, 1.5], [30, 1, 10, 0.1], [[1.0], [2.0]])
+        self.assertSameRun([100, 5, 3, 50, 20, 1.5], [30, 1, 10, 0.1], [[1.0, 5.0], [2.0, 2.0]])
+        self.assertRaises(ValueError, HIDROSAT([100, 0, 3, 50, 20, 1.5], [b[:10] for b in self.boundaries]).executeRun)
+        self.assertRaises(ValueError, HIDROSAT([100, 5, 0.5, 50, 20, 1.5], [b[:10] for b in self.boundaries]).executeRun)
+
+    def test_procedure(self):
+        procedure = HIDROSATProcedure(
+            boundaries = [
+                {"name": "pma", "node_variable": [1, 1]},
+                {"name": "etp", "node_variable": [1, 15]}
+            ],
+            extra_pars = {"dt": 1, "area": 1000000000, "ae": 1, "rho": 0.5, "wp": 0.03},
+            initial_states = {"soilStorage": 20, "Runoff": 0, "floodPlainStorage": 5, "Flooded": 0},
+            outputs = [
+                {"name": "q_sim", "node_variable": [1, 40]},
+                {"name": "smc_sim", "node_variable": [1, 20]}
+            ],
+            parameters = {"K": 1, "N": 3, "Q0": 12.69, "S0": 178.395, "W0": 232.505, "gamma": 2.28, "maxFlooded": 0.09},
+            type = "HIDROSAT"
+        )
+        dti = createDatetimeSequence(timeInterval={"days":1}, timestart=(2000,1,1), timeend=(2001,1,4))
+        pma, etp = [b[:len(dti)] for b in self.boundaries]
+        input = [DataFrame(index=dti, data={"valor": pma}), DataFrame(index=dti, data={"valor": etp})]
+        output, results = procedure.exec(input)
+        with patch.object(HIDROSAT, "executeRun", HIDROSAT.executeRunReference):
+            reference_output, reference_results = procedure.exec(input)
+        for serie, reference_serie in zip(output, reference_output):
+            self.assertTrue(serie.equals(reference_serie))
+        self.assertTrue(results.data.equals(reference_results.data))
+        self.assertGreater(output[0]["valor"].max(), 0)
@@ -0,0 +1,81 @@
+from pydrodelta.pydrology import HOSH4P1L, HOSH4P2L
+from pydrodelta.hosh_kernel import eventBoundaries
+from pydrodelta.procedures.hosh4p1lnash import HOSH4P1LNashProcedure
+from pydrodelta.procedures.hosh4p1luh import HOSH4P1LUHProcedure
+from pydrodelta.util import createDatetimeSequence
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings
+from pandas import DataFrame
+import numpy as np
+
+state_attributes = ["SurfaceStorage", "SoilStorage", "NetRainfall", "Infiltration", "Runoff", "EVR1", "EVR2", "Q"]
+
+class Test_HoshKernel(TestCase):
+
+    def setUp(self):
+        forcings = dailyForcings(1000)
+        self.boundaries = [forcings.pma.tolist(), forcings.etp.tolist()]
+
+    def assertSameRun(self, cls : type, pars : list, boundaries : list, initial_conditions : list, proc : str):
+        reference = cls(pars, boundaries, initial_conditions, Proc = proc)
+        reference.executeRun()
+        fast = cls(pars, boundaries, initial_conditions, Proc = proc, engine = "fast")
+        fast.executeRun()
+        for attribute in state_attributes:
+            self.assertTrue(np.array_equal(getattr(fast, attribute), getattr(reference, attribute), equal_nan=True), (cls.__name__, attribute, pars, initial_conditions))
+
+    def test_same_as_reference(self):
+        boundaries = self.boundaries
+        forcings = dailyForcings(1000, seed = 1)
+        with_nan = [forcings.pma.tolist(), forcings.etp.tolist()]
+        with_nan[0][10] = np.nan
+        for initial_conditions in ([0, 0], [30, 120], [60, 400]):
+            for b in (boundaries, with_nan):
+                self.assertSameRun(HOSH4P1L, [50, 150, 2.0, 3], b, initial_conditions, "Nash")
+                self.assertSameRun(HOSH4P1L, [5, 300, [0.2, 0.5, 0.3]], b, initial_conditions, "UH")
+                self.assertSameRun(HOSH4P2L, [50, 150, 0.7, 5.0, 2.0, 3], b, initial_conditions, "Nash")
+
+    def test_events(self):
+        starts, ends, n_steps = eventBoundaries(np.array([5.0, 0, 0, 3, 4, 0, 6, 7]), np.ones(8))
+        self.assertEqual(starts.tolist(), [0, 3])
+        self.assertEqual(ends.tolist(), [0, 4])
+        # trailing event is not closed
+        self.assertEqual(n_steps, 6)
+        starts, ends, n_steps = eventBoundaries(np.array([5.0, 5.0]), np.ones(2))
+        self.assertEqual((len(starts), n_steps), (0, 0))
+        for boundaries in ([[5.0, 5.0, 0.0, 8.0], [1.0] * 4], [[0.0, 0.0], [1.0, 1.0]], [[80.0, 0.0, 0.0, 40.0, 0.0], [1.0] * 5]):
+            self.assertSameRun(HOSH4P1L, [20, 100, 2.0, 3], boundaries, [10, 50], "Nash")
+        self.assertRaises(ValueError, HOSH4P1L, [20, 100, 2.0, 3], [b[:10] for b in self.boundaries], [0, 0], "Nash", "compiled")
+
+    def test_procedures(self):
+        dti = createDatetimeSequence(timeInterval={"days":1}, timestart=(2000,1,1), timeend=(2001,1,4))
+        pma, etp = [b[:len(dti)] for b in self.boundaries]
+        input = [DataFrame(index=dti, data={"valor": pma}), DataFrame(index=dti, data={"valor": etp}), DataFrame(index=dti, data={"valor": [np.nan] * len(dti)})]
+        common = {
+            "boundaries": [
+                {"name": "pma", "node_variable": [1, 1]},
+                {"name": "etp", "node_variable": [1, 15]},
+                {"name": "q_obs", "node_variable": [1, 40]}
+            ],
+            "initial_states": {"SurfaceStorage": 10, "SoilStorage": 100},
+            "outputs": [
+                {"name": "q_sim", "node_variable": [1, 40]},
+                {"name": "smc_sim", "node_variable": [1, 20]}
+            ]
+        }
+        for cls, parameters in [
+            (HOSH4P1LNashProcedure, {"maxSurfaceStorage": 30, "maxSoilStorage": 200, "k": 2.0, "n": 3}),
+            (HOSH4P1LUHProcedure, {"maxSurfaceStorage": 30, "maxSoilStorage": 200, "T": 3.2})
+            ]:
+            results = {}
+            for engine in ("reference", "fast"):
+                procedure = cls(
+                    parameters = parameters,
+                    extra_pars = {"dt": 1, "area": 1000000000, "ae": 1, "rho": 0.5, "wp": 0.03, "engine": engine},
+                    **common)
+                results[engine] = procedure.exec(input)
+                self.assertEqual(procedure.engine.engine, engine)
+            for output, reference_output in zip(results["fast"][0], results["reference"][0]):
+                self.assertTrue(output.equals(reference_output))
+            self.assertTrue(results["fast"][1].data.equals(results["reference"][1].data))
+            self.assertGreater(results["fast"][0][0]["valor"].max(), 0)
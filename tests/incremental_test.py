@@ -0,0 +1,199 @@
+from pydrodelta.plan import Plan
+from pydrodelta.procedure import Procedure
+from pydrodelta.incremental import IncrementalStore, loadedDataChanged
+from pydrodelta.util import dataFrameHash
+from unittest import TestCase
+from unittest.mock import patch
+from tests.a5_stub_server import A5StubServer
+from pandas import DataFrame, Timedelta, concat, date_range
+from typing import List, Optional
+from pathlib import Path
+import tempfile
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_IncrementalStore(TestCase):
+
+    def test_store(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = IncrementalStore(path, scope = "1")
+            data = DataFrame({"valor": [1.0, 2.0]})
+            store.saveNodeVariables([(1, 2, "abc", {"data": data})])
+            self.assertEqual(store.readNodeVariableHashes(), {(1, 2): "abc"})
+            self.assertTrue(store.readNodeVariable(1, 2)["data"].equals(data))
+            self.assertIsNone(store.readNodeVariable(1, 3))
+            store.saveProcedure(5, "def", {"output": [data]})
+            self.assertEqual(store.readProcedureHash(5), "def")
+            # scopes are independent
+            other = IncrementalStore(path, scope = "2")
+            self.assertEqual(other.readNodeVariableHashes(), {})
+            self.assertIsNone(other.readProcedure(5))
+            store.clear()
+            self.assertEqual(store.readNodeVariableHashes(), {})
+            self.assertIsNone(store.readProcedureHash(5))
+
+    def test_data_frame_hash(self):
+        data = DataFrame({"valor": [1.0, 2.0]})
+        self.assertEqual(dataFrameHash(data), dataFrameHash(data.copy()))
+        self.assertNotEqual(dataFrameHash(data), dataFrameHash(data + 1))
+        self.assertNotEqual(dataFrameHash(data), dataFrameHash(data.rename(columns={"valor": "value"})))
+        self.assertEqual(dataFrameHash(None), "")
+
+    def test_loaded_data_changed(self):
+        index = date_range("2023-04-23T00:00:00-03:00", periods = 6, freq = "h")
+        stored = DataFrame({"valor": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]}, index = index)
+        # window moved forward two steps without new data: the rows that fell out of it are ignored
+        self.assertFalse(loadedDataChanged(stored, stored.iloc[2:], index[2], index[5]))
+        # new data in the new part of the window
+        loaded = concat([stored.iloc[2:], DataFrame({"valor": [7.0]}, index = [index[5] + Timedelta(hours = 1)])])
+        self.assertTrue(loadedDataChanged(stored, loaded, index[2], index[5]))
+        # revised and missing data within the overlap
+        self.assertTrue(loadedDataChanged(stored, stored.iloc[2:] + 1, index[2], index[5]))
+        self.assertTrue(loadedDataChanged(stored, stored.iloc[3:], index[2], index[5]))
+        self.assertTrue(loadedDataChanged(stored, None, index[2], index[5]))
+        self.assertFalse(loadedDataChanged(None, None, index[2], index[5]))
+
+class Test_IncrementalExecution(TestCase):
+
+    def execute(self, stub : A5StubServer, path : str, plan : Optional[Plan] = None) -> Plan:
+        """Execute plan in a new instance (as in a new cycle), counting procedure runs"""
+        plan = plan if plan is not None else Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), incremental = {"path": path})
+        self.runs : List[int] = []
+        original_run = Procedure.run
+        def run(procedure, *args, **kwargs):
+            self.runs.append(procedure.id)
+            return original_run(procedure, *args, **kwargs)
+        with patch.object(Procedure, "run", run):
+            plan.execute(upload = False)
+        return plan
+
+    def assertSameResults(self, stub : A5StubServer, plan : Plan):
+        """Results of the incremental execution must equal those of a full execution"""
+        reference = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+        reference.execute(upload = False)
+        assert plan.topology is not None and reference.topology is not None
+        for node in reference.topology.nodes:
+            variable = plan.topology.getNodeVariable(node.id, 2)
+            self.assertTrue(variable.data[["valor"]].equals(node.variables[2].data[["valor"]]), node.id)
+            assert variable.series_sim is not None and node.variables[2].series_sim is not None
+            for serie, reference_serie in zip(variable.series_sim, node.variables[2].series_sim):
+                self.assertEqual(serie.data is None, reference_serie.data is None)
+                if serie.data is not None:
+                    self.assertTrue(serie.data[["valor"]].equals(reference_serie.data[["valor"]]), node.id)
+        for procedure in reference.procedures:
+            output = plan.getProcedure(procedure.id).output
+            assert output is not None and procedure.output is not None
+            self.assertTrue(output[0][["valor"]].equals(procedure.output[0][["valor"]]))
+
+    def test_incremental(self):
+        with tempfile.TemporaryDirectory() as path:
+            with A5StubServer() as stub:
+                plan = self.execute(stub, path)
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, {1, 2, 3, 4, 5, 6})
+                self.assertEqual(plan.dirty_procedures, {1, 2, 3, 4})
+                self.assertEqual(sorted(self.runs), [1, 2, 3, 4])
+                # nothing changed
+                plan = self.execute(stub, path)
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, set())
+                self.assertEqual(plan.dirty_procedures, set())
+                self.assertEqual(self.runs, [])
+                self.assertSameResults(stub, plan)
+                # revised data of node 2: only procedure 2 is affected
+                stub.series_offset = {1002: 0.5}
+                plan = self.execute(stub, path)
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, {2})
+                self.assertEqual(self.runs, [2])
+                self.assertSameResults(stub, plan)
+                # revised data of node 1: procedure 1 and procedure 3, which reads its output
+                stub.series_offset = {1002: 0.5, 1001: 0.25}
+                plan = self.execute(stub, path)
+                self.assertEqual(sorted(self.runs), [1, 3])
+                self.assertSameResults(stub, plan)
+                # full execution
+                plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), incremental = {"path": path})
+                plan.execute(upload = False, full = True)
+                self.assertEqual(plan.dirty_procedures, {1, 2, 3, 4})
+
+    def test_configuration_change(self):
+        with tempfile.TemporaryDirectory() as path:
+            with A5StubServer() as stub:
+                self.execute(stub, path)
+                plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), incremental = {"path": path})
+                plan.getProcedure(1).parameters = {"intercept": 5.0, "coefficients": [2.0]}
+                plan = self.execute(stub, path, plan)
+                self.assertEqual(sorted(self.runs), [1, 3])
+                assert plan.topology is not None
+                output = plan.getProcedure(3).output
+                assert output is not None
+                self.assertTrue((output[0]["valor"] == 3 + 2 * (5 + 2 * plan.topology.getNodeVariable(1, 2).data["valor"])).all())
+                # another forecast date with the same data: nothing is processed again
+                plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), incremental = {"path": path})
+                plan.getProcedure(1).parameters = {"intercept": 5.0, "coefficients": [2.0]}
+                plan.forecast_date = "2023-04-25T01:00:00-03:00"
+                plan = self.execute(stub, path, plan)
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, set())
+                self.assertEqual(self.runs, [])
+                # another processing configuration of node 2
+                config = stub.loadConfig(data_dir / "plans/stub_scheduler.yml")
+                config["topology"]["nodes"][1]["variables"][0]["series"][0]["lim_outliers"] = [0, 1e6]
+                plan = Plan(**config, incremental = {"path": path})
+                plan.getProcedure(1).parameters = {"intercept": 5.0, "coefficients": [2.0]}
+                plan = self.execute(stub, path, plan)
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, {2})
+                self.assertEqual(self.runs, [2])
+
+    def stepConfig(self, stub : A5StubServer, hours : int) -> dict:
+        """Plan config of the cycle hours after the one of stub_scheduler.yml: forecast date and time window moved forward"""
+        config = stub.loadConfig(data_dir / "plans/stub_scheduler.yml")
+        config["forecast_date"] = "2023-04-25T%02i:00:00-03:00" % hours
+        config["topology"]["timestart"] = "2023-04-23T%02i:00:00-03:00" % hours
+        config["topology"]["timeend"] = "2023-04-25T%02i:00:00-03:00" % hours
+        return config
+
+    def test_forecast_date_step(self):
+        with tempfile.TemporaryDirectory() as path:
+            with A5StubServer() as stub:
+                # series of nodes 2 and 3 stop reporting after the first cycle
+                stub.series_timeend = {1002: "2023-04-25T00:00:00-03:00", 1003: "2023-04-25T00:00:00-03:00"}
+                self.execute(stub, path)
+                # next cycle: only node 1 has new data
+                plan = self.execute(stub, path, Plan(**self.stepConfig(stub, 1), incremental = {"path": path}))
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, {1})
+                self.assertEqual(sorted(self.runs), [1, 3])
+                # same results as a full execution (whose procedures 2 and 4 would fail for lack of new data)
+                reference = Plan(**self.stepConfig(stub, 1))
+                assert reference.topology is not None
+                reference.topology.batchProcessInput()
+                reference.executeProcedure(reference.getProcedure(1))
+                self.assertTrue(plan.topology.getNodeVariable(1, 2).data[["valor"]].equals(reference.topology.getNodeVariable(1, 2).data[["valor"]]))
+                output = plan.getProcedure(1).output
+                reference_output = reference.getProcedure(1).output
+                assert output is not None and reference_output is not None
+                self.assertTrue(output[0][["valor"]].equals(reference_output[0][["valor"]]))
+                # restored nodes are trimmed to the new window
+                data = plan.topology.getNodeVariable(2, 2).data
+                assert data is not None
+                self.assertEqual(data.index.min(), plan.topology.timestart)
+                self.assertTrue(data[["valor"]].equals(reference.topology.getNodeVariable(2, 2).data[["valor"]].loc[:data.index.max()]))
+                # next cycle: node 2 reports again, with revised data within the overlap of the windows
+                stub.series_timeend = {1003: "2023-04-25T00:00:00-03:00"}
+                stub.series_offset = {1002: 0.5}
+                plan = self.execute(stub, path, Plan(**self.stepConfig(stub, 2), incremental = {"path": path}))
+                assert plan.topology is not None
+                self.assertEqual(plan.topology.dirty_nodes, {1, 2})
+                self.assertEqual(sorted(self.runs), [1, 2, 3])
+
+    def test_not_incremental(self):
+        with A5StubServer() as stub:
+            plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+            plan.execute(upload = False)
+            assert plan.topology is not None
+            self.assertIsNone(plan.incremental_store)
+            self.assertIsNone(plan.topology.dirty_nodes)
+            self.assertIsNone(plan.dirty_procedures)
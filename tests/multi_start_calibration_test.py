@@ -0,0 +1,61 @@
+from pydrodelta.calibration.multi_start_calibration import MultiStartCalibration
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+from pathlib import Path
+import numpy as np
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_MultiStartCalibration(TestCase):
+
+    calibration = {"method": "multi-start", "objective_function": "nse", "max_iter": 15}
+
+    def setUp(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        self.config = withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(60)), 2)
+
+    def test_latin_hypercube_starts(self):
+        procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "n_starts": 5, "seed": 1})
+        assert isinstance(procedure.calibration, MultiStartCalibration)
+        starts = np.array(procedure.calibration.makeStarts())
+        n_pars = len(procedure.parameters_for_calibration)
+        self.assertEqual(starts.shape, (5, n_pars + 1, n_pars))
+        ranges = np.array([(p.range_min, p.range_max) for p in procedure.parameters_for_calibration])
+        self.assertTrue((starts >= ranges[:,0]).all())
+        self.assertTrue((starts <= ranges[:,1]).all())
+        # one start per stratum on each parameter
+        strata = np.floor((starts[:,0,:] - ranges[:,0]) / (ranges[:,1] - ranges[:,0]) * 5)
+        for j in range(n_pars):
+            self.assertEqual(sorted(strata[:,j]), [0, 1, 2, 3, 4])
+        self.assertTrue(np.array_equal(starts, np.array(procedure.calibration.makeStarts())))
+        self.assertFalse(np.array_equal(starts, np.array(procedure.calibration.makeStarts(seed = 2))))
+
+    def test_best_chain(self):
+        for start_method in ("latin-hypercube", "random"):
+            procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "n_starts": 3, "seed": 0, "start_method": start_method, "workers": 1})
+            procedure.calibrate()
+            calibration = procedure.calibration
+            assert isinstance(calibration, MultiStartCalibration)
+            assert calibration.chains is not None and calibration.calibration_result is not None
+            self.assertEqual(len(calibration.chains), 3)
+            self.assertEqual(calibration.best_chain, int(calibration.chains.score.idxmax()))
+            best = calibration.chains.iloc[calibration.best_chain]
+            self.assertEqual(calibration.calibration_result[1], best.score)
+            self.assertEqual(calibration.calibration_result[0], [best[p.name] for p in procedure.parameters_for_calibration])
+            self.assertEqual([p.name for p in procedure.parameters_for_calibration], list(calibration.chains.columns[3:]))
+            self.assertEqual(len(calibration.toDict()["chains"]), 3)
+
+    def test_workers_same_result(self):
+        results = []
+        for workers in (1, 2):
+            procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "n_starts": 3, "seed": 0, "workers": workers})
+            procedure.calibrate()
+            assert procedure.calibration is not None
+            results.append((procedure.calibration.calibration_result, procedure.calibration.chains.to_dict(), procedure.calibration.scores.to_dict()))
+        self.assertEqual(results[0], results[1])
+
+    def test_invalid_options(self):
+        self.assertRaises(Exception, SacramentoSimplifiedProcedure, **self.config, calibration = {**self.calibration, "n_starts": 0})
+        self.assertRaises(Exception, SacramentoSimplifiedProcedure, **self.config, calibration = {**self.calibration, "start_method": "foo"})
@@ -0,0 +1,54 @@
+from pydrodelta.downhill_simplex import DownhillSimplex, make_simplex
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+from pathlib import Path
+import numpy as np
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+def rosenbrock(x) -> float:
+    return float(sum(100 * (x[1:] - x[:-1]**2)**2 + (1 - x[:-1])**2))
+
+class Test_ParallelCalibration(TestCase):
+
+    calibration = {"method": "downhill-simplex", "objective_function": "nse", "max_iter": 15}
+
+    def setUp(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        self.config = withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(60)), 2)
+
+    def test_speculative_same_path(self):
+        points = make_simplex(np.array([-1.0, 2.0, 0.5, 1.5]), 0.5)
+        sequential = DownhillSimplex(rosenbrock, points, max_iter = 300)
+        batch_calls = []
+        def f_batch(pts):
+            batch_calls.append(len(pts))
+            return [rosenbrock(p) for p in pts]
+        speculative = DownhillSimplex(rosenbrock, points, max_iter = 300, f_batch = f_batch, speculative = True)
+        result_sequential = sequential.run()
+        result_speculative = speculative.run()
+        self.assertTrue(np.array_equal(result_sequential[0], result_speculative[0]))
+        self.assertEqual(result_sequential[1], result_speculative[1])
+        self.assertEqual(sequential.iters, speculative.iters)
+        self.assertEqual(sequential.current_points_list, speculative.current_points_list)
+        # initial simplex in one batch, then one batch of 3 per iteration plus reductions
+        self.assertEqual(batch_calls[0], 5)
+        self.assertIn(3, batch_calls)
+
+    def test_workers_same_result(self):
+        results = []
+        for calibration in ({}, {"workers": 2}, {"workers": 2, "speculative": True}):
+            procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, **calibration})
+            np.random.seed(0)
+            procedure.calibrate()
+            assert procedure.calibration is not None
+            assert procedure.calibration.downhill_simplex is not None
+            self.assertIsNone(procedure.calibration.downhill_simplex.f_batch)
+            results.append((procedure.calibration.calibration_result, procedure.calibration.downhill_simplex.iters, procedure.calibration.scores.to_dict()))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
+    def test_invalid_workers(self):
+        self.assertRaises(Exception, SacramentoSimplifiedProcedure, **self.config, calibration = {**self.calibration, "workers": 0})
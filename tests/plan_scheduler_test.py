@@ -0,0 +1,65 @@
+from pydrodelta.plan import Plan
+from pydrodelta.procedure import Procedure
+from unittest import TestCase
+from unittest.mock import patch
+from tests.a5_stub_server import A5StubServer
+from threading import Lock
+from pathlib import Path
+import time
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_PlanScheduler(TestCase):
+
+    def test_dependencies(self):
+        with A5StubServer() as stub:
+            plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+        dependencies = plan.procedureDependencies()
+        self.assertEqual(set(dependencies.nodes), {1, 2, 3, 4})
+        self.assertEqual(set(dependencies.edges), {(1, 3), (1, 4), (3, 4)})
+
+    def test_same_result(self):
+        results = []
+        with A5StubServer() as stub:
+            for max_workers in (1, 4):
+                plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), max_workers = max_workers)
+                plan.execute(upload = False)
+                assert plan.topology is not None
+                results.append({node.id: node.variables[2].data[["valor"]].copy() for node in plan.topology.nodes})
+        for node_id in results[0]:
+            self.assertTrue(results[0][node_id].equals(results[1][node_id]), node_id)
+        self.assertEqual(len(results[1][6].dropna()), 49)
+        # procedure 4 overwrites node 4 after procedure 3 read it
+        self.assertTrue((results[1][6]["valor"] == 3 + 2 * (1 + 2 * results[1][1]["valor"])).all())
+
+    def test_concurrency(self):
+        running = []
+        active = {"count": 0, "max": 0}
+        lock = Lock()
+        original_run = Procedure.run
+        def run(procedure, *args, **kwargs):
+            with lock:
+                running.append(procedure.id)
+                active["count"] += 1
+                active["max"] = max(active["max"], active["count"])
+            time.sleep(0.2)
+            try:
+                return original_run(procedure, *args, **kwargs)
+            finally:
+                with lock:
+                    active["count"] -= 1
+        with A5StubServer() as stub:
+            plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), max_workers = 4)
+            with patch.object(Procedure, "run", run):
+                plan.execute(upload = False)
+        self.assertEqual(active["max"], 2)
+        self.assertLess(running.index(1), running.index(3))
+        self.assertLess(running.index(3), running.index(4))
+
+    def test_error(self):
+        with A5StubServer() as stub:
+            plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"), max_workers = 2)
+            assert plan.topology is not None
+            plan.topology.batchProcessInput()
+            with patch.object(plan.procedures[0], "run", side_effect = RuntimeError("failed")):
+                self.assertRaises(RuntimeError, plan.executeProcedures)
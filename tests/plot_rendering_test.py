@@ -0,0 +1,91 @@
+from pydrodelta.plot_rendering import PlotSpec, renderFiles, renderPdf, PlotHashes
+from pydrodelta.plan import Plan
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer
+from pathlib import Path
+import tempfile
+import logging
+import re
+
+data_dir = Path(__file__).parent / "data"
+
+def failingPlot(output_file : str) -> None:
+    raise ValueError("bad plot")
+
+def countPages(path : Path) -> int:
+    return len(re.findall(rb"/Type /Page\b", path.read_bytes()))
+
+class Test_PlotRendering(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name)
+        with A5StubServer() as stub:
+            plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+            plan.execute(upload = False)
+        assert plan.topology is not None
+        # nodes 1 to 3: a series_sim with data, for plotProno with use_series_sim
+        for node in plan.topology.nodes:
+            variable = node.variables[2]
+            assert variable.series_sim is not None and variable.data is not None
+            if node.id <= 3:
+                variable.series_sim[0].data = variable.data.copy()
+            else:
+                variable.series_sim = []
+        self.topology = plan.topology
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_plot_prono(self):
+        topology = self.topology
+        topology.plotProno(output_dir = str(self.path / "sequential"), use_series_sim = True)
+        topology.plot_rendering = {"max_workers": 3}
+        topology.plotProno(output_dir = str(self.path / "pool"), use_series_sim = True)
+        files = sorted(p.name for p in (self.path / "sequential").glob("*.png"))
+        self.assertEqual(len(files), 3)
+        self.assertEqual(sorted(p.name for p in (self.path / "pool").glob("*.png")), files)
+        for name in files:
+            self.assertEqual((self.path / "sequential" / name).read_bytes(), (self.path / "pool" / name).read_bytes())
+
+    def test_skip_unchanged(self):
+        topology = self.topology
+        specs = [spec for node in topology.nodes for spec in node.plotPronoSpecs(output_dir = str(self.path), use_series_sim = True)]
+        self.assertEqual(renderFiles(specs, max_workers = 2, skip_unchanged = True), 3)
+        self.assertEqual(renderFiles(specs, max_workers = 2, skip_unchanged = True), 0)
+        # data of node 2 changed
+        variable = topology.nodes[1].variables[2]
+        assert variable.series_sim is not None and variable.series_sim[0].data is not None
+        variable.series_sim[0].data["valor"] = variable.series_sim[0].data["valor"] + 1
+        specs = [spec for node in topology.nodes for spec in node.plotPronoSpecs(output_dir = str(self.path), use_series_sim = True)]
+        self.assertEqual(renderFiles(specs, max_workers = 2, skip_unchanged = True), 1)
+        # deleted file
+        assert specs[0].output is not None
+        specs[0].output.unlink()
+        self.assertEqual(renderFiles(specs, skip_unchanged = True), 1)
+        self.assertTrue(specs[0].output.exists())
+        self.assertTrue(PlotHashes().unchanged(specs[0].output, specs[0].hash()))
+
+    def test_plot_variable(self):
+        topology = self.topology
+        topology.plotVariable(2, output = self.path / "sequential.pdf")
+        topology.plot_rendering = {"max_workers": 3, "skip_unchanged": True}
+        topology.plotVariable(2, output = self.path / "pool.pdf")
+        self.assertEqual(countPages(self.path / "pool.pdf"), 6)
+        self.assertEqual(countPages(self.path / "sequential.pdf"), 6)
+        # unchanged
+        specs = topology.plotVariableSpecs(2)
+        self.assertEqual([spec.label for spec in specs], ["node %i variable 2" % i for i in range(1, 7)])
+        self.assertFalse(renderPdf(specs, self.path / "pool.pdf", max_workers = 3, skip_unchanged = True))
+        self.assertTrue(renderPdf(specs[:2], self.path / "pool.pdf", max_workers = 2, skip_unchanged = True))
+        self.assertEqual(countPages(self.path / "pool.pdf"), 2)
+
+    def test_errors(self):
+        specs = [PlotSpec(failingPlot, "plot %i" % i, output = self.path / ("%i.png" % i), output_file = str(self.path / ("%i.png" % i))) for i in range(3)]
+        for max_workers in (1, 2):
+            with self.assertRaises(ValueError) as cm:
+                renderFiles(specs, max_workers = max_workers)
+            self.assertIn("plot 0", str(cm.exception))
+        self.assertRaises(ValueError, renderFiles, specs, 0)
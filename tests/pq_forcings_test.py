@@ -0,0 +1,80 @@
+from pydrodelta.procedures.pq import PQForcings
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from pandas import DataFrame, date_range
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings
+from pathlib import Path
+import numpy as np
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_PQForcings(TestCase):
+
+    def setUp(self):
+        self.input = dailyForcings(10)
+        self.input["q_obs"] = np.random.default_rng(0).uniform(0, 100, 10)
+        self.input.loc[self.input.index[3], "etp"] = np.nan
+        self.input.loc[self.input.index[6], "pma"] = np.nan
+        self.input.loc[self.input.index[6], "etp"] = np.nan
+
+    def test_fill_nulls(self):
+        input = self.input
+        with self.assertLogs(level = "WARNING") as logs:
+            forcings = PQForcings(input, fill_nulls = True)
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn("Missing etp value for date: %s" % input.index[3], logs.output[0])
+        self.assertIn("Missing pma value for date: %s" % input.index[6], logs.output[1])
+        self.assertEqual(len(forcings), 10)
+        self.assertEqual(forcings.etp[3], 0)
+        self.assertEqual(forcings.pma[6], 0)
+        self.assertTrue(np.isnan(input["pma"].iloc[6]))
+        # smc_obs is not required
+        self.assertTrue(np.isnan(forcings.smc_obs).all())
+
+    def test_truncate(self):
+        input = self.input
+        with self.assertLogs(level = "WARNING") as logs:
+            forcings = PQForcings(input)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("Missing etp value for date: %s. Unable to continue" % input.index[3], logs.output[0])
+        self.assertEqual(len(forcings), 3)
+        self.assertTrue(forcings.index.equals(input.index[0:3]))
+        forcings = PQForcings(input, required = ("pma",))
+        self.assertEqual(len(forcings), 6)
+        forcings = PQForcings(input, required = ())
+        self.assertEqual(len(forcings), 10)
+
+    def test_steps_and_results(self):
+        input = self.input[:3].drop(columns = ["smc_obs"])
+        forcings = PQForcings(input)
+        outputs = forcings.outputs(["q", "k"])
+        outputs["k"] = np.arange(len(forcings))
+        for k, timestart, pma, etp, q_obs, smc_obs in forcings.steps():
+            self.assertEqual(timestart, input.index[k])
+            self.assertIsInstance(pma, float)
+            self.assertTrue(np.isnan(smc_obs))
+            outputs["q"][k] = pma + q_obs
+        results = forcings.results(outputs)
+        self.assertEqual(list(results.columns), ["pma", "etp", "q_obs", "smc_obs", "q", "k"])
+        self.assertEqual(results.index.name, "timestart")
+        self.assertEqual(results["k"].dtype, np.int64)
+        self.assertTrue(np.allclose(results["q"], input["pma"] + input["q_obs"]))
+
+    def test_from_list(self):
+        index = date_range("2000-01-01", periods = 4, freq = "D")
+        forcings = PQForcings.fromList([
+            DataFrame({"valor": [1.0, 2.0, 3.0, 4.0]}, index = index),
+            DataFrame({"valor": [5.0, 6.0, 7.0]}, index = index[[0, 1, 3]])
+        ], fill_nulls = True)
+        self.assertEqual(forcings.etp.tolist(), [5.0, 6.0, 0.0, 7.0])
+        self.assertTrue(np.isnan(forcings.q_obs).all())
+
+    def test_mock_run(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        procedure = SacramentoSimplifiedProcedure(**dict(config, extra_pars = {**config["extra_pars"], "mock_run": True}, boundaries = self.input, outputs = [[], []]))
+        procedure.exec(self.input)
+        assert procedure.results is not None
+        self.assertEqual(len(procedure.results), 10)
+        self.assertTrue((procedure.results["q4"] == 0).all())
+        self.assertTrue((procedure.results["substeps"] == 1).all())
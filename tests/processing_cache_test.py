@@ -0,0 +1,105 @@
+from pydrodelta.processing_cache import ProcessingCache, processingKey
+from pydrodelta.topology import Topology
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer
+from pandas import DataFrame
+from datetime import datetime, timedelta, timezone
+import tempfile
+import time
+import os
+from pathlib import Path
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_ProcessingCache(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_config = {"path": self.tmpdir.name}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertSameData(self, topology_a, topology_b):
+        for node_a, node_b in zip(topology_a.nodes, topology_b.nodes):
+            var_a = node_a.variables[2]
+            var_b = node_b.variables[2]
+            for serie_a, serie_b in zip(var_a.series, var_b.series):
+                self.assertTrue(serie_a.data.equals(serie_b.data))
+            self.assertTrue(var_a.data.equals(var_b.data))
+            self.assertTrue(var_a.original_data.equals(var_b.original_data))
+
+    def test_same_data_as_uncached(self):
+        with A5StubServer() as stub:
+            uncached = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4))
+            uncached.batchProcessInput()
+            cold = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), processing_cache = self.cache_config)
+            cold.batchProcessInput()
+            self.assertEqual((cold.processing_cache_store.hits, cold.processing_cache_store.misses), (0, 4))
+            warm = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), processing_cache = self.cache_config)
+            warm.batchProcessInput()
+            self.assertEqual((warm.processing_cache_store.hits, warm.processing_cache_store.misses), (4, 0))
+        self.assertSameData(uncached, cold)
+        self.assertSameData(uncached, warm)
+        report = warm.printReport()
+        self.assertEqual(report["processing_cache"]["hit_rate"], 1)
+
+    def test_changes(self):
+        with A5StubServer() as stub:
+            Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), processing_cache = self.cache_config).batchProcessInput()
+            # revised data of node 2
+            stub.series_offset = {1002: 0.5}
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), processing_cache = self.cache_config)
+            topology.batchProcessInput()
+            self.assertEqual((topology.processing_cache_store.hits, topology.processing_cache_store.misses), (3, 1))
+            reference = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4))
+            reference.batchProcessInput()
+            self.assertSameData(reference, topology)
+            # processing parameters of node 3
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), processing_cache = self.cache_config)
+            topology.nodes[2].variables[2].series[0].lim_outliers = (0, 1e6)
+            topology.batchProcessInput()
+            self.assertEqual((topology.processing_cache_store.hits, topology.processing_cache_store.misses), (3, 1))
+
+    def test_series_original_data(self):
+        # node 1: series 1 adjusted from series 0, after removing its values of the second day as outliers
+        lim_outliers = (0, 2001 + (datetime(2023, 4, 24, tzinfo = timezone(timedelta(hours = -3))) - datetime(2000, 1, 1, tzinfo = timezone(timedelta(hours = -3)))) / timedelta(hours = 1))
+        topologies = []
+        with A5StubServer() as stub:
+            for processing_cache in (None, self.cache_config, self.cache_config):
+                config = stub.loadConfig(data_dir / "topologies/stub_series.yml", 1)
+                config["nodes"][0]["variables"][0]["adjust_from"] = {"truth": 0, "sim": 1, "method": "lfit"}
+                config["nodes"][0]["variables"][0]["series"][1]["lim_outliers"] = lim_outliers
+                topology = Topology(**config, processing_cache = processing_cache)
+                topology.batchProcessInput()
+                topologies.append(topology)
+        uncached, _, warm = topologies
+        self.assertEqual(warm.processing_cache_store.hits, 1)
+        serie = warm.nodes[0].variables[2].series[1]
+        uncached_serie = uncached.nodes[0].variables[2].series[1]
+        self.assertGreater(len(serie.outliers_data), 0)
+        # original_data of the adjusted series is its data before adjustment, without the outliers, not the loaded data
+        self.assertTrue(serie.original_data.equals(uncached_serie.original_data))
+        self.assertTrue(serie.outliers_data.equals(uncached_serie.outliers_data))
+        self.assertTrue(serie.data.equals(uncached_serie.data))
+
+    def test_eviction(self):
+        cache = ProcessingCache(path = self.tmpdir.name, max_age = {"days": 1})
+        data = DataFrame({"valor": range(1000)})
+        cache.save([(processingKey(i), {"data": data}) for i in range(3)])
+        self.assertIsNotNone(cache.read([processingKey(0), processingKey(1)]))
+        self.assertIsNone(cache.read([processingKey(0), processingKey(3)]))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        # not used for 2 days
+        old = time.time() - 2 * 86400
+        os.utime(cache.entryPath(processingKey(0)), (old, old))
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.read([processingKey(0)]))
+        # least recently used beyond max_size
+        os.utime(cache.entryPath(processingKey(1)), (time.time() - 60, time.time() - 60))
+        cache.max_size = cache.size() * 0.75
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.read([processingKey(1)]))
+        self.assertIsNotNone(cache.read([processingKey(2)]))
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
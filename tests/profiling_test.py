@@ -0,0 +1,69 @@
+from pydrodelta import profiling
+from pydrodelta.plan import Plan
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import json
+import os
+from pathlib import Path
+
+data_dir = Path(__file__).parent / "data"
+
+def findChild(node : dict, name : str) -> dict:
+    for child in node.get("children", []):
+        if child["name"] == name:
+            return child
+    raise AssertionError("%s not found in %s" % (name, node["name"]))
+
+class Test_Profiler(TestCase):
+
+    def test_tree(self):
+        with profiling.profile() as profiler:
+            with profiling.timer("a"):
+                for i in range(3):
+                    with profiling.timer("b"):
+                        profiling.count("observations", 10)
+                def task():
+                    with profiling.timer("c"):
+                        pass
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    for future in [executor.submit(profiling.propagate(task)) for i in range(4)]:
+                        future.result()
+            self.assertIs(profiling.getProfiler(), profiler)
+        self.assertIsNone(profiling.getProfiler())
+        tree = profiler.toDict()
+        a = findChild(tree, "a")
+        b = findChild(a, "b")
+        self.assertEqual(b["calls"], 3)
+        self.assertEqual(b["counters"], {"observations": 30})
+        self.assertEqual(findChild(a, "c")["calls"], 4)
+        self.assertGreaterEqual(a["time"], b["time"])
+
+    def test_inactive(self):
+        @profiling.timed("f")
+        def f(x):
+            return x + 1
+        self.assertEqual(f(1), 2)
+        with profiling.timer("a"):
+            profiling.countPayload({"a": 1})
+        self.assertIsNone(profiling.getProfiler())
+
+    def test_plan(self):
+        with tempfile.TemporaryDirectory() as path:
+            output = os.path.join(path, "profile.json")
+            dump = os.path.join(path, "profile.pstats")
+            with A5StubServer() as stub:
+                plan = Plan(**stub.loadConfig(data_dir / "plans/stub_scheduler.yml"))
+                with profiling.profile(output = output, dump = dump):
+                    plan.execute(upload = False)
+            with open(output) as f:
+                tree = json.load(f)
+            self.assertTrue(os.path.exists(dump))
+        execute = findChild(tree, "execute")
+        batch = findChild(execute, "batchProcessInput")
+        load = findChild(batch, "loadData")
+        node = findChild(load, "node 1")
+        self.assertGreater(findChild(node, "series 1001")["counters"]["observations"], 0)
+        procedure = findChild(findChild(execute, "executeProcedures"), "procedure 1")
+        self.assertEqual(findChild(procedure, "exec")["calls"], 1)
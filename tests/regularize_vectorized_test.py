@@ -0,0 +1,74 @@
+from unittest import TestCase
+from pydrodelta.util import interpolate_or_copy_closest, interpolationTags, f4, f5, serieRegular, createDatetimeSequence
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from pandas import Series, Timestamp, DateOffset, date_range
+from tests.synthetic_data import tz, irregularIndex, randomData
+import numpy as np
+
+def legacyInterpolateOrCopyClosest(data : Series, td : timedelta) -> Series:
+    ffill = data.ffill()
+    bfill = data.bfill()
+    ffill_times = data.index.to_series().where(data.notna()).ffill()
+    bfill_times = data.index.to_series().where(data.notna()).bfill()
+    delta_fwd = data.index.to_series() - ffill_times
+    delta_bwd = bfill_times - data.index.to_series()
+    use_ffill = (delta_fwd <= td)
+    use_bfill = (delta_bwd <= td)
+    filled = data.copy()
+    for i in data[data.isna()].index:
+        if use_ffill[i] and use_bfill[i]:
+            filled[i] = (ffill[i] * delta_fwd[i] + bfill[i] * delta_bwd[i]) / (delta_fwd[i] + delta_bwd[i])
+        elif use_ffill[i]:
+            filled[i] = ffill[i]
+        elif use_bfill[i]:
+            filled[i] = bfill[i]
+    return filled
+
+class Test_RegularizeVectorized(TestCase):
+
+    def test_interpolate_or_copy_closest(self):
+        for seed in range(5):
+            data = randomData(irregularIndex(200, days = 4, seed = seed), seed = seed, nan_fraction = 0.3)["valor"]
+            for td in (timedelta(minutes=30), timedelta(hours=3)):
+                expected = legacyInterpolateOrCopyClosest(data, td)
+                result = interpolate_or_copy_closest(data, td)
+                self.assertTrue(result.equals(expected), "seed: %i, td: %s" % (seed, td))
+        data = randomData(irregularIndex(200, days = 4), nan_fraction = 0.3)["valor"]
+        self.assertTrue(interpolate_or_copy_closest(data, relativedelta(hours=3)).equals(legacyInterpolateOrCopyClosest(data, timedelta(hours=3))))
+
+    def test_interpolation_tags(self):
+        data = randomData(irregularIndex(200, days = 4), nan_fraction = 0.3, tag = "obs")
+        data["interpolated"] = data["valor"].interpolate(method="time", limit=2, limit_direction="both")
+        data.loc[data.index[-5:], "interpolated"] = 1.0
+        min_obs_date, max_obs_date = data["valor"].dropna().index.min(), data["valor"].dropna().index.max()
+        self.assertEqual(
+            interpolationTags(data, "valor", "tag", "interpolated", min_obs_date, max_obs_date),
+            [f5(row, "valor", "tag", min_obs_date, max_obs_date) for (i, row) in data.iterrows()])
+        data = data.rename(columns={"interpolated": "interpolated_final"})
+        self.assertEqual(
+            interpolationTags(data, "valor", "tag", "interpolated_final"),
+            [f4(row, "valor", "tag") for (i, row) in data.iterrows()])
+
+    def test_serie_regular_tags(self):
+        data = randomData(irregularIndex(200, days = 4), nan_fraction = 0.3, tag = "obs")
+        for kwargs in ({"interpolation_limit": timedelta(hours=1)}, {"interpolation_limit": 2}, {"interpolate": False}):
+            result = serieRegular(data, relativedelta(minutes=15), tag_column = "tag", **kwargs)
+            was_na = ~result.index.isin(data.dropna(subset=["valor"]).index)
+            interpolated = result["valor"].notna() & was_na
+            self.assertTrue(interpolated.any())
+            self.assertTrue((result["tag"][interpolated].isin(["interpolated", "extrapolated"])).all(), str(kwargs))
+
+    def test_fixed_duration_sequence(self):
+        timestart = Timestamp("2023-01-01T00:07", tz=tz)
+        timeend = Timestamp("2023-01-09", tz=tz)
+        for dt in (relativedelta(minutes=15), relativedelta(hours=7, minutes=5)):
+            result = createDatetimeSequence(None, dt, timestart, timeend)
+            expected = date_range(result[0], timeend, freq=DateOffset(hours=dt.hours, minutes=dt.minutes))
+            self.assertTrue(result.equals(expected))
+        # utc offset changes within range (daylight saving time): calendar offset
+        timestart = Timestamp("2008-03-10", tz=tz)
+        timeend = Timestamp("2008-03-20", tz=tz)
+        result = createDatetimeSequence(None, relativedelta(hours=7, minutes=5), timestart, timeend)
+        expected = date_range(result[0], timeend, freq=DateOffset(hours=7, minutes=5))
+        self.assertTrue(result.equals(expected))
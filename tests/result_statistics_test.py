@@ -0,0 +1,66 @@
+from pydrodelta.result_statistics import ResultStatistics, computeMetrics, resolveMetrics
+from unittest import TestCase
+import numpy as np
+import json
+
+class Test_ResultStatistics(TestCase):
+
+    obs = [1.0, 2.0, np.nan, 4.0, 5.0, 3.0]
+    sim = [1.5, 2.5, 3.0, np.nan, 4.0, 3.5]
+
+    def test_compute(self):
+        stats = ResultStatistics(self.obs, self.sim, compute = True, k = 1)
+        obs = [1.0, 2.0, 5.0, 3.0]
+        sim = [1.5, 2.5, 4.0, 3.5]
+        n = 4
+        errors = [s - o for o, s in zip(obs, sim)]
+        mean_obs = sum(obs) / n
+        mean_sim = sum(sim) / n
+        var_obs = sum([(x - mean_obs)**2 for x in obs]) / n
+        var_sim = sum([(x - mean_sim)**2 for x in sim]) / n
+        mse = sum([e**2 for e in errors]) / n
+        cov = sum([(o - mean_obs) * (s - mean_sim) for o, s in zip(obs, sim)]) / n
+        r = cov / var_obs**0.5 / var_sim**0.5
+        self.assertEqual(stats.n, n)
+        self.assertEqual(stats.obs, obs)
+        self.assertEqual(stats.sim, sim)
+        self.assertEqual(stats.errors, errors)
+        self.assertAlmostEqual(stats.mse, mse)
+        self.assertAlmostEqual(stats.rmse, mse**0.5)
+        self.assertAlmostEqual(stats.bias, sum(errors) / n)
+        self.assertAlmostEqual(stats.mean_obs, mean_obs)
+        self.assertAlmostEqual(stats.mean_sim, mean_sim)
+        self.assertAlmostEqual(stats.stdev_obs, var_obs)
+        self.assertAlmostEqual(stats.var_sim, var_sim**0.5)
+        self.assertAlmostEqual(stats.stdev_diff, var_sim - var_obs)
+        self.assertAlmostEqual(stats.nse, 1 - mse / var_obs)
+        self.assertAlmostEqual(stats.cov, cov)
+        self.assertAlmostEqual(stats.r, r)
+        self.assertAlmostEqual(stats.oneminusr, 1 - r)
+        self.assertAlmostEqual(stats.kge, 1 - ((r - 1)**2 + ((var_sim / var_obs) - 1)**2 + (mean_sim / mean_obs - 1)**2)**0.5)
+        self.assertAlmostEqual(stats.rse, (mse * n / (n - 2))**0.5)
+        self.assertIsInstance(stats.rmse, float)
+        json.dumps(stats.toShortDict())
+        json.dumps({k: v for k, v in stats.toDict().items() if not k.startswith("_")})
+
+    def test_metrics_subset(self):
+        stats = ResultStatistics(self.obs, self.sim, compute = True, metrics = ["nse"])
+        full = ResultStatistics(self.obs, self.sim, compute = True)
+        self.assertEqual(stats.nse, full.nse)
+        self.assertEqual(stats.mse, full.mse)
+        self.assertIsNone(stats.r)
+        self.assertIsNone(stats.kge)
+        self.assertEqual(resolveMetrics(["kge"]), {"kge", "r", "cov", "var_obs", "var_sim", "stdev_obs", "stdev_sim", "mean_obs", "mean_sim"})
+        self.assertRaises(ValueError, resolveMetrics, ["foo"])
+
+    def test_undefined(self):
+        stats = ResultStatistics([2.0, 2.0, 2.0], [1.0, 2.0, 3.0], compute = True)
+        self.assertIsNone(stats.nse)
+        self.assertIsNone(stats.r)
+        self.assertIsNone(stats.kge)
+        result = computeMetrics(np.array([np.nan, 1.0]), np.array([1.0, np.nan]))
+        self.assertEqual(result["n"], 0)
+        self.assertNotIn("rmse", result)
+        stats = ResultStatistics([np.nan], [1.0], compute = True)
+        self.assertEqual(stats.n, 0)
+        self.assertIsNone(stats.rmse)
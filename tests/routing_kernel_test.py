@@ -0,0 +1,94 @@
+from pydrodelta.pydrology import LinearReservoirCascade, MuskingumChannel
+from pydrodelta.routing_kernel import linearReservoirCascadeBatch, muskingumChannelBatch
+from pydrodelta import routing_kernel
+from unittest import TestCase
+from unittest.mock import patch
+import numpy as np
+import math
+
+def legacyCascade(procedure : LinearReservoirCascade) -> None:
+    """Loop implementation of LinearReservoirCascade.computeOutFlow previous to the routing kernel"""
+    dt=procedure.dt
+    k=procedure.K
+    c=math.exp(-dt/k)
+    a=k/dt*(1-c)-c
+    b=1-k/dt*(1-c)
+    end=int(1/dt+1)
+    for i in range(0,len(procedure.Inflow)):
+        last_j = 0
+        for n in range(1,end,1):
+            procedure.Cascade[1][0]=procedure.Inflow[i]+(procedure.Cascade[0][0]-procedure.Inflow[i])*c
+            if procedure.N > 1:
+                for j in range(1,procedure.N,1):
+                    procedure.Cascade[1][j]=c*procedure.Cascade[0][j]+a*procedure.Cascade[0][j-1]+b*procedure.Cascade[1][j-1]
+                    last_j = j
+            for j in range(0,procedure.N,1):
+                procedure.Cascade[0][j]=procedure.Cascade[1][j]
+                last_j = j
+        procedure.Outflow[i]=procedure.Cascade[0][last_j]
+
+def legacyMuskingum(procedure : MuskingumChannel) -> None:
+    """Loop implementation of MuskingumChannel.computeOutFlow previous to the routing kernel"""
+    K=procedure.K/procedure.N
+    X=procedure.X
+    tau=procedure.tau
+    D=(2*K*(1-X)+tau)
+    C0=(tau+2*K*X)/D
+    C1=(tau-2*K*X)/D
+    C2=(2*K*(1-X)-tau)/D
+    for i in range(0,len(procedure.Inflow)-1,1):
+        procedure.InitialConditions[0][0]=procedure.Inflow[i]
+        procedure.InitialConditions[1][0]=procedure.Inflow[i+1]
+        for j in range(1,procedure.N+1,1):
+            for t in range(0,procedure.M,1):
+                procedure.InitialConditions[1][j]=C0*procedure.InitialConditions[0][j-1]+C1*procedure.InitialConditions[1][j-1]+C2*procedure.InitialConditions[0][j]
+                procedure.InitialConditions[0][j]=procedure.InitialConditions[1][j]
+        procedure.Outflow[i+1]=max(procedure.InitialConditions[1][procedure.N],0)
+
+class Test_RoutingKernel(TestCase):
+
+    def setUp(self):
+        # 3 inflow series of 200 steps
+        self.inflows = np.maximum(np.random.default_rng(0).gamma(0.5, 20, size = (3, 200)) - 5, 0)
+
+    def test_cascade(self):
+        inflows = self.inflows
+        for K, N, dt, initial in [(3.2, 1, 1, 0), (3.2, 2, 1, 1.5), (7.5, 5, 0.25, 2.0), (0.7, 3, 0.1, 0), (2.0, 4, 2, 1.0)]:
+            for inflow in inflows:
+                procedure = LinearReservoirCascade([K, N], inflow.tolist(), [initial], dt)
+                procedure.computeOutFlow()
+                legacy = LinearReservoirCascade([K, N], inflow.tolist(), [initial], dt)
+                legacyCascade(legacy)
+                self.assertTrue(np.array_equal(procedure.Outflow, legacy.Outflow), (K, N, dt))
+                self.assertTrue(np.array_equal(procedure.Cascade, legacy.Cascade), (K, N, dt))
+            batch = linearReservoirCascadeBatch(inflows, K, N, dt, initial)
+            self.assertEqual(batch.shape, (3, 201))
+            with patch.object(routing_kernel, "min_vectorized_series", 0):
+                self.assertTrue(np.array_equal(linearReservoirCascadeBatch(inflows, K, N, dt, initial), batch))
+            for inflow, outflow in zip(inflows, batch):
+                legacy = LinearReservoirCascade([K, N], inflow.tolist(), [initial], dt)
+                legacyCascade(legacy)
+                self.assertTrue(np.array_equal(outflow, legacy.Outflow), (K, N, dt))
+
+    def test_muskingum(self):
+        inflows = self.inflows
+        for K, X, dt, initial in [(2, 0.2, 1, 0), (5, 0.45, 1, 1.5), (0.3, 0.1, 1, 0), (4, 0.5, 0.5, 2.0)]:
+            for inflow in inflows:
+                procedure = MuskingumChannel([K, X], inflow.tolist(), [initial], dt)
+                procedure.computeOutFlow()
+                legacy = MuskingumChannel([K, X], inflow.tolist(), [initial], dt)
+                legacyMuskingum(legacy)
+                self.assertTrue(np.array_equal(procedure.Outflow, legacy.Outflow), (K, X, dt))
+                self.assertTrue(np.array_equal(procedure.InitialConditions, legacy.InitialConditions), (K, X, dt))
+            batch = muskingumChannelBatch(inflows, K, X, dt, initial)
+            self.assertEqual(batch.shape, (3, 200))
+            with patch.object(routing_kernel, "min_vectorized_series", 0):
+                self.assertTrue(np.array_equal(muskingumChannelBatch(inflows, K, X, dt, initial), batch))
+            for inflow, outflow in zip(inflows, batch):
+                legacy = MuskingumChannel([K, X], inflow.tolist(), [initial], dt)
+                legacyMuskingum(legacy)
+                self.assertTrue(np.array_equal(outflow, legacy.Outflow), (K, X, dt))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, linearReservoirCascadeBatch, [[1.0, 2.0]], 0)
+        self.assertRaises(ValueError, muskingumChannelBatch, [[1.0, 2.0]], 2, 0.6)
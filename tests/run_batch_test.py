@@ -0,0 +1,148 @@
+from pydrodelta.procedure import Procedure
+from pydrodelta.procedures.gr4j import GR4JProcedure
+from pydrodelta.procedures.lag_and_route import LagAndRouteProcedure
+from pydrodelta.procedures.linear_channel import LinearChannelProcedure
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from pydrodelta import sacramento_simplified_kernel
+from pydrodelta.result_statistics import computeMetrics
+from pandas import DataFrame
+from pydrodelta.util import createDatetimeSequence
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+from pathlib import Path
+import numpy as np
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+index = createDatetimeSequence(
+    timestart = "2000-01-01",
+    timeend = "2000-04-09"
+)
+
+class Test_RunBatch(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.hydrograph = [DataFrame({"valor": 10 + np.cumsum(rng.normal(0, 1, len(index))).clip(-9, None) + 5 * np.sin(np.arange(len(index)) / 7)}, index = index)]
+
+    def assertMatchesRun(self, procedure : Procedure, parameter_matrix : np.ndarray, result_index : int = 0, rtol : float = 1e-10) -> None:
+        """run_batch output and scores must equal those of run for each parameter set"""
+        parameters = dict(procedure.parameters)
+        batch = procedure.run_batch(parameter_matrix, result_index = result_index)
+        self.assertEqual(procedure.parameters, parameters)
+        self.assertEqual(batch.output.shape, (len(parameter_matrix), len(batch.index)))
+        self.assertEqual(len(batch.scores), len(parameter_matrix))
+        for i, row in enumerate(parameter_matrix):
+            procedure.run(parameters = row.tolist())
+            assert procedure.output is not None
+            assert procedure.procedure_function_results is not None
+            output = procedure.output[result_index]["valor"].reindex(batch.index).to_numpy(dtype=float)
+            self.assertTrue(np.allclose(batch.output[i], output, rtol = rtol, atol = 1e-12, equal_nan = True))
+            if result_index == procedure.getResultIndex():
+                statistics = procedure.procedure_function_results.statistics[result_index]
+                self.assertEqual(batch.scores["n"][i], statistics.n)
+                for metric in ("rmse", "nse", "r", "kge"):
+                    value = getattr(statistics, metric)
+                    if value is None:
+                        # undefined metric
+                        self.assertTrue(np.isnan(batch.scores[metric][i]))
+                    else:
+                        self.assertAlmostEqual(batch.scores[metric][i], value, 9)
+
+    def test_sacramento(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        procedure = SacramentoSimplifiedProcedure(**withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(60)), 2))
+        base = np.array(list(config["parameters"].values()), dtype=float)
+        parameter_matrix = base * np.random.default_rng(1).uniform(0.7, 1.3, (4, len(base)))
+        self.assertMatchesRun(procedure, parameter_matrix)
+        self.assertMatchesRun(procedure, parameter_matrix, result_index = 1)
+
+    def test_sacramento_vectorized(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        procedure = SacramentoSimplifiedProcedure(**withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(60)), 2))
+        base = np.array(list(config["parameters"].values()), dtype=float)
+        parameter_matrix = base * np.random.default_rng(1).uniform(0.7, 1.3, (6, len(base)))
+        per_set = procedure.run_batch(parameter_matrix)
+        min_vectorized_sets = sacramento_simplified_kernel.min_vectorized_sets
+        sacramento_simplified_kernel.min_vectorized_sets = 0
+        try:
+            vectorized = procedure.run_batch(parameter_matrix)
+        finally:
+            sacramento_simplified_kernel.min_vectorized_sets = min_vectorized_sets
+        self.assertTrue(np.allclose(per_set.output, vectorized.output, rtol = 1e-12))
+
+    def test_gr4j(self):
+        config = yaml.load(open(data_dir / "procedures/gr4j_synthetic.yml"), yaml.CLoader)
+        procedure = GR4JProcedure(**withSimulatedObs(GR4JProcedure, dict(config, boundaries = dailyForcings(len(index))), 2))
+        parameter_matrix = np.array([
+            [300, 100, 0.5, 2.5],
+            [200, 80, 0.2, 1.5],
+            [450, 150, -0.5, 4.2]
+        ])
+        self.assertMatchesRun(procedure, parameter_matrix, rtol = 1e-9)
+
+    def test_lag_and_route(self):
+        procedure = LagAndRouteProcedure(**withSimulatedObs(LagAndRouteProcedure, dict(
+            parameters = {"lag": 1, "k": 2, "n": 3},
+            initial_states = [0],
+            extra_pars = {"dt": 1},
+            boundaries = self.hydrograph)))
+        parameter_matrix = np.array([
+            [1, 2, 3],
+            [0, 0.5, 1],
+            [3.4, 5, 2],
+            [150, 2, 3]
+        ])
+        self.assertMatchesRun(procedure, parameter_matrix)
+
+    def test_lag_and_route_fallback(self):
+        procedure = LagAndRouteProcedure(**withSimulatedObs(LagAndRouteProcedure, dict(
+            parameters = {"lag": 1, "k": 2, "n": 3},
+            initial_states = [0],
+            boundaries = self.hydrograph)))
+        # n = 0: no routing
+        self.assertMatchesRun(procedure, np.array([[1, 2, 3], [2, 2, 0]]))
+
+    def test_linear_channel(self):
+        procedure = LinearChannelProcedure(**withSimulatedObs(LinearChannelProcedure, dict(
+            parameters = {"k": 2, "n": 3},
+            boundaries = self.hydrograph)))
+        parameter_matrix = np.array([
+            [2, 3],
+            [0.5, 1],
+            [5, 4.5]
+        ])
+        self.assertMatchesRun(procedure, parameter_matrix)
+
+    def test_metrics_and_warmup(self):
+        procedure = LinearChannelProcedure(**withSimulatedObs(LinearChannelProcedure, dict(
+            parameters = {"k": 2, "n": 3},
+            boundaries = self.hydrograph,
+            warmup_steps = 10)))
+        batch = procedure.run_batch([[2, 3], [4, 2]], metrics = ["nse", "rmse"])
+        self.assertEqual(list(batch.scores.columns), ["n", "nse", "rmse"])
+        self.assertEqual(batch.scores["n"][0], len(index) - 10)
+        self.assertMatchesRun(procedure, np.array([[2, 3], [4, 2]]))
+
+    def test_rse(self):
+        procedure = LinearChannelProcedure(**withSimulatedObs(LinearChannelProcedure, dict(
+            parameters = {"k": 2, "n": 3},
+            boundaries = self.hydrograph)))
+        batch = procedure.run_batch([[2, 3], [4, 2]], metrics = ["rse"])
+        self.assertEqual(list(batch.scores.columns), ["n", "rse"])
+        obs = procedure.output_obs[0]["valor"].reindex(batch.index).to_numpy(dtype=float)
+        for i in range(2):
+            # k: the number of parameters
+            expected = computeMetrics(obs.tolist(), batch.output[i].tolist(), metrics = ["rse"], k = 2)
+            self.assertAlmostEqual(batch.scores["rse"][i], expected["rse"], 9)
+
+    def test_generic_loop(self):
+        procedure = LinearChannelProcedure(**withSimulatedObs(LinearChannelProcedure, dict(
+            parameters = {"k": 2, "n": 3},
+            boundaries = self.hydrograph)))
+        parameter_matrix = np.array([[2, 3], [0.5, 1]])
+        batch = procedure.run_batch(parameter_matrix)
+        index_, output = Procedure.execBatch(procedure, parameter_matrix, procedure.input)
+        self.assertTrue(index_.equals(batch.index))
+        self.assertTrue(np.allclose(output, batch.output, rtol = 1e-12, equal_nan = True))
@@ -0,0 +1,81 @@
+from pydrodelta.procedures.sac_enkf import SacEnkfProcedure
+from pydrodelta import sac_enkf_kernel, sacramento_simplified_kernel
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings
+from pathlib import Path
+import numpy as np
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_SacEnkfEngine(TestCase):
+
+    def setUp(self):
+        self.config = yaml.load(open(data_dir / "procedures/sac_enkf_synthetic.yml"), yaml.CLoader)
+        self.boundaries = dailyForcings(30, seed = 1)
+        self.boundaries["q_obs"] = np.linspace(0.2, 2, 30)
+        self.boundaries["smc_obs"] = 0.2
+
+    def procedure(self, engine : str, n : int = 30, **asim_pars) -> SacEnkfProcedure:
+        """The configured procedure on the first n steps, with the boundaries' observations as outputs"""
+        return SacEnkfProcedure(**dict(self.config,
+            extra_pars = {**self.config["extra_pars"], "engine": engine},
+            asim_pars = {**self.config["asim_pars"], **asim_pars},
+            boundaries = self.boundaries[:n],
+            outputs = [self.boundaries["q_obs"][:n].tolist(), self.boundaries["smc_obs"][:n].tolist()]))
+
+    def test_advance(self):
+        rng = np.random.default_rng(0)
+        members = 50
+        x = np.column_stack([rng.uniform(0, 100, members), rng.uniform(0, 300, members), rng.uniform(0, 20, members), rng.uniform(0, 20, members)])
+        x[0] = [0, 0, 0, 0]
+        pma = rng.gamma(0.5, 40, members)
+        etp = rng.uniform(0, 6, members)
+        pars_array = np.array(list(self.config["parameters"].values()), dtype=float)
+        for rk2 in (False, True):
+            advanced, npasos = sac_enkf_kernel.advance(x, pma, etp, pars_array, rk2 = rk2)
+            self.assertGreater(npasos.max(), 1)
+            for j in range(members):
+                states, substeps, _ = sacramento_simplified_kernel.run(pma[j:j+1], etp[j:j+1], x[j], pars_array, False, False, -1, rk2, False)
+                self.assertEqual(npasos[j], substeps[0])
+                np.testing.assert_allclose(advanced[j], states[-1], rtol = 1e-12, atol = 1e-12)
+
+    def test_deterministic(self):
+        """Without perturbations every member follows the deterministic model and both engines must agree"""
+        asim_pars = {"stddev_forzantes": [0, 0], "stddev_estados": 0, "xpert": False, "replicates": 5}
+        results = {}
+        for engine in ("reference", "fast"):
+            procedure = self.procedure(engine, **asim_pars)
+            procedure.run()
+            assert procedure.data is not None
+            results[engine] = procedure.data
+        np.testing.assert_allclose(results["fast"]["q_sim"].to_numpy(), results["reference"]["q_sim"].to_numpy(), rtol = 1e-10)
+        np.testing.assert_allclose(results["fast"]["smc_sim"].to_numpy(), results["reference"]["smc_sim"].to_numpy(), rtol = 1e-10)
+
+    def test_asimila(self):
+        procedure = self.procedure("reference", replicates = 10)
+        rng = np.random.default_rng(0)
+        ens = np.column_stack([rng.uniform(0, 100, 10), rng.uniform(0, 300, 10), rng.uniform(0, 20, 10), rng.uniform(0, 20, 10)])
+        KG_j = rng.normal(0, 0.5, size = (4, 1))
+        # with null observation variance both implementations are deterministic
+        R = [[0.0]]
+        procedure.ens = [tuple(x) for x in ens.tolist()]
+        procedure.ens1 = list(procedure.ens)
+        procedure.ens2 = list(procedure.ens)
+        procedure.asimila([1.5], R, KG_j.tolist())
+        updated = procedure.asimilaArray(ens, [1.5], R, KG_j, rng)
+        np.testing.assert_allclose(updated, np.array(procedure.ens), rtol = 1e-12)
+
+    def test_seed(self):
+        data = []
+        for seed in (1, 1, 2):
+            procedure = self.procedure("fast", n = 10, replicates = 100, seed = seed)
+            procedure.run()
+            results = procedure.procedure_function_results
+            assert results is not None and results.data is not None
+            data.append(results.data)
+        self.assertTrue(data[0].equals(data[1]))
+        self.assertFalse(data[0]["q4"].equals(data[2]["q4"]))
+        self.assertEqual(len(data[0]), 10)
+        self.assertTrue((data[0]["q_p10"] <= data[0]["q_p90"]).all())
+        self.assertTrue(all([KG is not None and len(KG) == 4 for KG in data[0]["KG"]]))
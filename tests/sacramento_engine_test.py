@@ -0,0 +1,82 @@
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from pydrodelta.procedures.sacramento_simplified_fixed_pars import SacramentoSimplifiedFixedParsProcedure
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings
+from pathlib import Path
+import numpy as np
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_SacramentoEngine(TestCase):
+
+    def setUp(self):
+        self.config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        self.input = dailyForcings(200)
+        self.input["q_obs"] = np.random.default_rng(0).uniform(0, 100, 200)
+
+    def runEngines(self, input, **extra_pars) -> tuple:
+        """Runs the reference and the fast engine with the same configuration and input"""
+        procedures = []
+        for engine in ("reference", "fast"):
+            procedure = SacramentoSimplifiedProcedure(**dict(self.config, extra_pars = {**self.config["extra_pars"], "engine": engine, **extra_pars}, boundaries = input, outputs = [[], []]))
+            procedure.exec(input.copy())
+            procedures.append(procedure)
+        return tuple(procedures)
+
+    def assertSameResults(self, reference, fast):
+        numeric = [c for c in reference.results.columns if c not in ("fg1", "fg2")]
+        self.assertTrue(reference.results.index.equals(fast.results.index))
+        self.assertTrue(np.allclose(reference.results[numeric].astype(float).to_numpy(), fast.results[numeric].astype(float).to_numpy(), rtol = 1e-9, atol = 1e-12, equal_nan = True))
+        self.assertTrue(np.allclose(reference.x, fast.x, rtol = 1e-9, atol = 1e-12))
+
+    def test_same_results(self):
+        input = self.input
+        for extra_pars in ({}, {"rk2": True}, {"no_check2": True}, {"max_npasos": 3}):
+            reference, fast = self.runEngines(input, **extra_pars)
+            self.assertSameResults(reference, fast)
+
+    def test_mass_balance(self):
+        input = self.input[:60]
+        for rk2 in (False, True):
+            reference, fast = self.runEngines(input, compute_mass_balance = True, rk2 = rk2)
+            self.assertSameResults(reference, fast)
+            self.assertEqual(len(reference.flows), len(fast.flows))
+            self.assertTrue((reference.flows["step"].values == fast.flows["step"].values).all())
+            mass_balance_reference = reference.massBalance()
+            mass_balance_fast = fast.massBalance()
+            for key in mass_balance_reference:
+                self.assertAlmostEqual(mass_balance_reference[key], mass_balance_fast[key], 9, key)
+
+    def test_missing_pma(self):
+        input = self.input[:30].copy()
+        input.loc[input.index[10], "pma"] = np.nan
+        for fill_nulls in (True, False):
+            reference, fast = self.runEngines(input, fill_nulls = fill_nulls)
+            self.assertEqual(len(fast.results), 30 if fill_nulls else 10)
+            self.assertSameResults(reference, fast)
+
+    def test_flood_guidance(self):
+        input = self.input[:30].copy()
+        par_fg = {"CN2": 70, "hp1dia": 10, "hp2dias": 15, "Qbanca": 80}
+        reference, fast = self.runEngines(input, par_fg = par_fg)
+        self.assertSameResults(reference, fast)
+        self.assertTrue(np.allclose(reference.results[["fg1", "fg2"]].astype(float).to_numpy(), fast.results[["fg1", "fg2"]].astype(float).to_numpy(), equal_nan = True))
+
+    def test_fixed_pars(self):
+        input = self.input[:30].copy()
+        procedures = [
+            SacramentoSimplifiedFixedParsProcedure(
+                parameters = {"c3": 0.001, "mu": 0.5, "alfa": 0.25},
+                fixed_parameters = {k: v for k, v in self.config["parameters"].items() if k not in ("c3", "mu", "alfa")},
+                initial_states = self.config["initial_states"],
+                extra_pars = {"area": 1e8, "engine": engine},
+                boundaries = input,
+                outputs = [[], []])
+            for engine in ("reference", "fast")]
+        for procedure in procedures:
+            procedure.exec(input.copy())
+        self.assertSameResults(*procedures)
+
+    def test_invalid_engine(self):
+        self.assertRaises(Exception, SacramentoSimplifiedProcedure, **dict(self.config, extra_pars = {"engine": "foo"}, boundaries = self.input, outputs = [[], []]))
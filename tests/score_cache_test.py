@@ -0,0 +1,85 @@
+from pydrodelta.calibration.score_cache import ScoreCache
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+import os
+import json
+import tempfile
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_ScoreCache(TestCase):
+
+    calibration = {"method": "downhill-simplex", "objective_function": "nse", "max_iter": 15}
+
+    def setUp(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        self.config = withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(60)), 2)
+
+    def test_lru(self):
+        cache = ScoreCache(maxsize = 2, decimals = 3)
+        a = cache.key("h", "rmse", 0, [1.0, 2.0])
+        b = cache.key("h", "rmse", 0, [1.0, 3.0])
+        c = cache.key("h", "rmse", 0, [1.0, 4.0])
+        self.assertEqual(a, cache.key("h", "rmse", 0, np.array([1.0001, 2.0])))
+        self.assertNotEqual(a, cache.key("h", "nse", 0, [1.0, 2.0]))
+        self.assertNotEqual(a, cache.key("g", "rmse", 0, [1.0, 2.0]))
+        cache.set(a, 1)
+        cache.set(b, 2)
+        self.assertEqual(cache.get(a), 1)
+        cache.set(c, 3)
+        self.assertIsNone(cache.get(b))
+        self.assertEqual(cache.get(a), 1)
+        self.assertEqual(cache.get(c), 3)
+        self.assertEqual(cache.stats, {"hits": 3, "misses": 1, "size": 2})
+
+    def test_calibration_hits(self):
+        procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "cache_size": 1000})
+        assert procedure.calibration is not None
+        procedure.loadInputDefault()
+        procedure.loadOutputObs()
+        parameters = list(procedure.parameters.values())
+        score = procedure.calibration.runReturnScore(parameters)
+        with patch.object(procedure, "run") as run:
+            self.assertEqual(procedure.calibration.runReturnScore(parameters), score)
+            run.assert_not_called()
+        self.assertEqual(procedure.calibration.result["cache"], {"hits": 1, "misses": 1, "size": 1})
+        # a change of the observations invalidates the cached values
+        procedure.output_obs[0].iloc[0, 0] = 0
+        procedure.calibration.resetConfigHash()
+        self.assertNotEqual(procedure.calibration.runReturnScore(parameters), score)
+
+    def test_same_result(self):
+        results = []
+        for cache_size in (None, 1000):
+            procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "cache_size": cache_size})
+            np.random.seed(0)
+            procedure.calibrate()
+            assert procedure.calibration is not None
+            results.append((procedure.calibration.calibration_result, procedure.calibration.scores.to_dict()))
+        self.assertEqual(results[0], results[1])
+        # disabled by default
+        self.assertIsNone(SacramentoSimplifiedProcedure(**self.config, calibration = self.calibration).calibration.cache)
+        self.assertIsNone(SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "cache_size": 0}).calibration.cache)
+        self.assertRaises(ValueError, SacramentoSimplifiedProcedure, **self.config, calibration = {**self.calibration, "cache_file": "scores.jsonl"})
+
+    def test_resume_from_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_file = os.path.join(tmpdir, "scores.jsonl")
+            procedure = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "cache_size": 1000, "cache_file": cache_file})
+            np.random.seed(0)
+            procedure.calibrate()
+            assert procedure.calibration is not None and procedure.calibration.cache is not None
+            misses = procedure.calibration.cache.misses
+            with open(cache_file) as f:
+                self.assertEqual(len([json.loads(line) for line in f]), misses)
+            resumed = SacramentoSimplifiedProcedure(**self.config, calibration = {**self.calibration, "cache_size": 1000, "cache_file": cache_file})
+            np.random.seed(0)
+            resumed.calibrate()
+            assert resumed.calibration is not None and resumed.calibration.cache is not None
+            self.assertEqual(resumed.calibration.cache.misses, 0)
+            self.assertEqual(resumed.calibration.calibration_result, procedure.calibration.calibration_result)
@@ -0,0 +1,144 @@
+from pydrodelta.serialization import isoformat, addDuration, toRecords, dumps, dump
+from pydrodelta import serialization
+from pydrodelta.util import localtz
+from unittest import TestCase
+from dateutil.relativedelta import relativedelta
+from datetime import timedelta
+from pandas import DatetimeIndex, isna
+from tests.synthetic_data import randomData
+import numpy as np
+import io
+import json
+import logging
+
+def legacyToList(data, series_id = None, include_series_id = False, timeSupport = None, remove_nulls = False, qualifiers = None, value_key = "valor", strict_properties = False):
+    """Per-record implementation of NodeSerie.toList used before columnar serialization"""
+    data = data.copy(deep=True)
+    data["timestart"] = data.index
+    data["timeend"] = [x + timeSupport for x in data["timestart"]] if timeSupport is not None else data["timestart"]
+    data["timestart"] = [x.isoformat() for x in data["timestart"]]
+    data["timeend"] = [x.isoformat() for x in data["timeend"]]
+    if include_series_id:
+        data["series_id"] = series_id
+    main_obs = []
+    qualifier_obs = []
+    for obs in data.to_dict(orient="records"):
+        obs[value_key] = None if isna(obs[value_key]) else obs[value_key]
+        obs["tag"] = None if "tag" not in obs else None if isna(obs["tag"]) else obs["tag"]
+        if qualifiers is not None:
+            for qualifier in qualifiers:
+                if qualifier in obs:
+                    if not isna(obs[qualifier]):
+                        new_obs = {"timestart": obs["timestart"], "timeend": obs["timeend"], "valor": obs[qualifier], "qualifier": qualifier}
+                        if include_series_id:
+                            new_obs["series_id"] = series_id
+                        qualifier_obs.append(new_obs)
+                elif qualifier == "main":
+                    if not isna(obs["valor"]):
+                        new_obs = {"timestart": obs["timestart"], "timeend": obs["timeend"], "valor": obs["valor"], "qualifier": "main"}
+                        if include_series_id:
+                            new_obs["series_id"] = series_id
+                        qualifier_obs.append(new_obs)
+        obs["valor"] = obs[value_key]
+        if strict_properties:
+            obs = {"timestart": obs["timestart"], "timeend": obs["timeend"], "valor": obs["valor"]}
+            if include_series_id:
+                obs["series_id"] = series_id
+        if qualifiers is not None:
+            if 'main' not in qualifiers:
+                obs["qualifier"] = "main"
+                main_obs.append(obs)
+        else:
+            main_obs.append(obs)
+    all_obs = [*main_obs, *qualifier_obs]
+    if remove_nulls:
+        all_obs = [x for x in all_obs if x["valor"] is not None]
+    return all_obs
+
+class Test_Serialization(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def assertSameRecords(self, records, expected):
+        # compared as json, so that NaN values of other columns (which are not equal to themselves) match and key order is checked
+        self.assertEqual(json.dumps(records), json.dumps(expected))
+
+    def test_isoformat(self):
+        indexes = [
+            # DST transitions of 2007-2009 in Buenos Aires
+            DatetimeIndex([localtz.localize(x) for x in DatetimeIndex(np.arange("2007-12-25", "2009-04-01", np.timedelta64(1, "h"), dtype="datetime64[s]"))]),
+            DatetimeIndex(np.arange("2000-01-01", "2000-03-01", np.timedelta64(6, "h"), dtype="datetime64[s]")),
+            DatetimeIndex(np.arange("2000-01-01", "2000-01-02", np.timedelta64(1, "h"), dtype="datetime64[s]")).tz_localize("UTC"),
+            DatetimeIndex(["2000-01-01 00:00:00.5", "2000-01-01 01:00:00"]),
+            DatetimeIndex([])
+        ]
+        for index in indexes:
+            self.assertEqual(isoformat(index), [x.isoformat() for x in index])
+
+    def test_add_duration(self):
+        index = DatetimeIndex([localtz.localize(x) for x in DatetimeIndex(np.arange("2008-10-01", "2008-11-01", np.timedelta64(1, "h"), dtype="datetime64[s]"))])
+        for duration in [relativedelta(days=1), relativedelta(hours=6, minutes=30), relativedelta(months=1), timedelta(hours=3)]:
+            self.assertEqual(isoformat(addDuration(index, duration)), [(x + duration).isoformat() for x in index])
+
+    def test_same_records(self):
+        index = DatetimeIndex([localtz.localize(x) for x in DatetimeIndex(np.arange("2008-10-10", "2008-10-25", np.timedelta64(1, "h"), dtype="datetime64[s]"))])
+        data = randomData(index, ["valor", "p05", "p95", "sim"], nan_fraction = 0.2, tag = "interpolated", tag_fraction = 0.3)
+        cases = [
+            {},
+            {"remove_nulls": True},
+            {"strict_properties": True, "remove_nulls": True},
+            {"include_series_id": True, "series_id": 7, "timeSupport": relativedelta(days=1)},
+            {"qualifiers": ["p05", "p95"], "remove_nulls": True, "strict_properties": True},
+            {"qualifiers": ["main", "p05", "missing"], "include_series_id": True, "series_id": 7},
+            {"qualifiers": ["p95", "main"], "value_key": "sim", "strict_properties": True, "remove_nulls": True},
+            {"qualifiers": ["p05"], "value_key": "sim"},
+            {"timeSupport": relativedelta(months=1), "remove_nulls": True}
+        ]
+        for case in cases:
+            with self.subTest(**{k: str(v) for k, v in case.items()}):
+                self.assertSameRecords(toRecords(data, **case), legacyToList(data, **case))
+        # without tag column, with a qualifier column
+        data = data.drop(columns=["tag"])
+        data["qualifier"] = "x"
+        for case in cases:
+            with self.subTest(**{k: str(v) for k, v in case.items()}):
+                self.assertSameRecords(toRecords(data, **case), legacyToList(data, **case))
+
+    def test_key_order(self):
+        index = DatetimeIndex(np.arange("2000-01-01", "2000-01-02", np.timedelta64(1, "h"), dtype="datetime64[s]")).tz_localize("UTC")
+        data = randomData(index, ["valor", "p05", "p95", "sim"], nan_fraction = 0.2, tag = "interpolated", tag_fraction = 0.3)[["p05", "valor"]]
+        records = toRecords(data, qualifiers=["p05"], include_series_id=True, series_id=1)
+        self.assertEqual(list(records[0].keys()), list(legacyToList(data, qualifiers=["p05"], include_series_id=True, series_id=1)[0].keys()))
+        self.assertEqual(list(records[0].keys()), ["p05", "valor", "timestart", "timeend", "series_id", "tag", "qualifier"])
+
+    def test_dumps(self):
+        index = DatetimeIndex(np.arange("2000-01-01", "2000-01-02", np.timedelta64(1, "h"), dtype="datetime64[s]")).tz_localize("UTC")
+        records = toRecords(randomData(index, ["valor", "p05", "p95", "sim"], nan_fraction = 0.2, tag = "interpolated", tag_fraction = 0.3), remove_nulls=True, strict_properties=True, qualifiers=["p05"])
+        self.assertEqual(json.loads(dumps(records)), records)
+        self.assertEqual(json.loads(dumps(records, indent=4)), records)
+        self.assertEqual(json.loads(dumps({"a": np.float64(1.5), "b": [np.int64(2)]})), {"a": 1.5, "b": [2]})
+
+    def test_dumps_nan(self):
+        index = DatetimeIndex(np.arange("2000-01-01", "2000-01-02", np.timedelta64(1, "h"), dtype="datetime64[s]")).tz_localize("UTC")
+        data = randomData(index, ["valor", "sim"], nan_fraction = 0)
+        data.loc[data.index[::3], "sim"] = np.nan
+        data.loc[data.index[1], "sim"] = np.inf
+        # the extra column sim is kept with its NaN values
+        records = toRecords(data, remove_nulls=True)
+        expected = [dict(r, sim = r["sim"] if np.isfinite(r["sim"]) else None) for r in records]
+        orjson = serialization.orjson
+        for backend in ("orjson", "json"):
+            with self.subTest(backend = backend):
+                serialization.orjson = orjson if backend == "orjson" else None
+                try:
+                    for indent in (None, 2, 4):
+                        self.assertEqual(json.loads(dumps(records, indent=indent), parse_constant=self.fail), expected)
+                        fp = io.StringIO()
+                        dump({"series": [{"pronosticos": records}]}, fp, indent=indent)
+                        self.assertEqual(json.loads(fp.getvalue(), parse_constant=self.fail), {"series": [{"pronosticos": expected}]})
+                finally:
+                    serialization.orjson = orjson
@@ -0,0 +1,147 @@
+from pydrodelta.topology import Topology
+from pydrodelta.series_cache import SeriesCache
+from unittest import TestCase
+from tests.a5_stub_server import A5StubServer
+from datetime import timedelta
+from a5client import Crud
+from a5client.util import tryParseAndLocalizeDate
+from contextlib import closing
+from pathlib import Path
+import tempfile
+
+timestart = tryParseAndLocalizeDate("2023-04-23T03:00:00.000Z")
+timeend = tryParseAndLocalizeDate("2023-04-25T02:00:00.000Z")
+data_dir = Path(__file__).parent / "data"
+
+class Test_SeriesCache(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_config = {"path": self.tmpdir.name, "revision_window": {"hours": 6}}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertSameData(self, topology_a, topology_b):
+        for node_a, node_b in zip(topology_a.nodes, topology_b.nodes):
+            var_a = node_a.variables[2]
+            var_b = node_b.variables[2]
+            for serie_a, serie_b in zip(var_a.series, var_b.series):
+                self.assertTrue(serie_a.data.equals(serie_b.data))
+            self.assertTrue(var_a.data.equals(var_b.data))
+
+    def test_same_data_as_uncached(self):
+        with A5StubServer() as stub:
+            uncached = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4))
+            uncached.loadData()
+            cold = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), cache = self.cache_config)
+            cold.loadData()
+            warm = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml", 4), cache = self.cache_config)
+            warm.loadData()
+            self.assertEqual(warm.series_cache.hits, 8)
+        self.assertSameData(uncached, cold)
+        self.assertSameData(uncached, warm)
+        self.assertEqual(uncached.nodes[0].variables[2].series[0].metadata, warm.nodes[0].variables[2].series[0].metadata)
+
+    def test_incremental_top_up(self):
+        cache = SeriesCache(path = self.tmpdir.name, revision_window = {"hours": 6})
+        with A5StubServer() as stub:
+            crud = Crud(**stub.api_config)
+            cache.readSerie(crud, 1001, timestart, timeend, no_metadata = True)
+            stub.requests.clear()
+            new_timeend = timeend + timedelta(hours=12)
+            serie = cache.readSerie(crud, 1001, timestart + timedelta(hours=12), new_timeend, no_metadata = True)
+            series_requests = [r for r in stub.requests if r[0] == "/obs/puntual/series/1001"]
+            self.assertEqual(len(series_requests), 1)
+            # only the revision window and the new tail are requested
+            self.assertEqual(tryParseAndLocalizeDate(series_requests[0][1]["timestart"]), timeend - timedelta(hours=6))
+            self.assertEqual(tryParseAndLocalizeDate(series_requests[0][1]["timeend"]), new_timeend)
+            expected = crud.readSerie(1001, timestart + timedelta(hours=12), new_timeend, no_metadata = True)
+        self.assertEqual([o["valor"] for o in serie["observaciones"]], [o["valor"] for o in expected["observaciones"]])
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_revision_window(self):
+        cache = SeriesCache(path = self.tmpdir.name, revision_window = {"hours": 6})
+        with A5StubServer() as stub:
+            crud = Crud(**stub.api_config)
+            cache.readSerie(crud, 1001, timestart, timeend, no_metadata = True)
+            stub.offset = 100
+            serie = cache.readSerie(crud, 1001, timestart, timeend, no_metadata = True)
+        revision_start = timeend - timedelta(hours=6)
+        for obs in serie["observaciones"]:
+            revised = tryParseAndLocalizeDate(obs["timestart"]) >= revision_start
+            hours = (tryParseAndLocalizeDate(obs["timestart"]) - tryParseAndLocalizeDate("2000-01-01T00:00:00-03:00")) / timedelta(hours=1)
+            self.assertEqual(obs["valor"], 1001 + hours + (100 if revised else 0))
+
+    def test_head_and_disjoint_windows(self):
+        cache = SeriesCache(path = self.tmpdir.name)
+        with A5StubServer() as stub:
+            crud = Crud(**stub.api_config)
+            cache.readSerie(crud, 1001, timestart, timeend, no_metadata = True)
+            serie = cache.readSerie(crud, 1001, timestart - timedelta(days=1), timeend, no_metadata = True)
+            self.assertEqual(len(serie["observaciones"]), 72)
+            serie = cache.readSerie(crud, 1001, timestart + timedelta(days=10), timeend + timedelta(days=10), no_metadata = True)
+            self.assertEqual(len(serie["observaciones"]), 48)
+            self.assertEqual(cache.misses, 2)
+
+    def test_eviction(self):
+        cache = SeriesCache(path = self.tmpdir.name, max_size = 0.5)
+        with A5StubServer() as stub:
+            crud = Crud(**stub.api_config)
+            for series_id in range(1, 41):
+                cache.readSerie(crud, series_id, timestart, timeend + timedelta(days=30), no_metadata = True)
+        self.assertLessEqual(cache.size(), 0.5)
+        with closing(cache.connect()) as conn:
+            cached = [r[0] for r in conn.execute("SELECT series_id FROM series")]
+        self.assertIn(40, cached)
+        self.assertNotIn(1, cached)
+
+    def test_prono(self):
+        with A5StubServer() as stub:
+            stub.corridas = [{"cor_id": 1, "forecast_date": "2023-04-24T09:00:00.000Z"}]
+            uncached = Topology(**stub.loadConfig(data_dir / "topologies/stub_prono.yml"))
+            uncached.loadData()
+            cold = Topology(**stub.loadConfig(data_dir / "topologies/stub_prono.yml"), cache = self.cache_config)
+            cold.loadData()
+            self.assertEqual(stub.prono_request_count, 2)
+            warm = Topology(**stub.loadConfig(data_dir / "topologies/stub_prono.yml"), cache = self.cache_config)
+            warm.loadData()
+            self.assertEqual(stub.prono_request_count, 2)
+            prono_uncached = uncached.nodes[0].variables[2].series_prono[0]
+            prono_warm = warm.nodes[0].variables[2].series_prono[0]
+            self.assertTrue(prono_uncached.data.equals(prono_warm.data))
+            self.assertEqual(prono_uncached.metadata["cor_id"], prono_warm.metadata["cor_id"])
+            # a new run is downloaded
+            stub.corridas.append({"cor_id": 2, "forecast_date": "2023-04-25T09:00:00.000Z"})
+            newer = Topology(**stub.loadConfig(data_dir / "topologies/stub_prono.yml"), cache = self.cache_config)
+            newer.loadData()
+            self.assertEqual(stub.prono_request_count, 3)
+            self.assertEqual(newer.nodes[0].variables[2].series_prono[0].metadata["cor_id"], 2)
+
+    def test_prono_cor_id(self):
+        cache = SeriesCache(path = self.tmpdir.name)
+        with A5StubServer() as stub:
+            stub.corridas = [{"cor_id": 1, "forecast_date": "2023-04-24T09:00:00.000Z"}, {"cor_id": 2, "forecast_date": "2023-04-25T09:00:00.000Z"}]
+            crud = Crud(**stub.api_config)
+            forecast_timestart = tryParseAndLocalizeDate("2023-04-24T00:00:00.000Z")
+            self.assertEqual(cache.readSerieProno(crud, 3001, 400, timestart, timeend, cor_id = 1)["cor_id"], 1)
+            self.assertEqual(cache.readSerieProno(crud, 3001, 400, timestart, timeend, forecast_timestart = forecast_timestart)["cor_id"], 2)
+            self.assertEqual(stub.prono_request_count, 2)
+            # an explicit cor_id is not replaced by the last run
+            self.assertEqual(cache.readSerieProno(crud, 3001, 400, timestart, timeend, cor_id = 1, forecast_timestart = forecast_timestart)["cor_id"], 1)
+            self.assertEqual(stub.prono_request_count, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_no_cache(self):
+        with A5StubServer() as stub:
+            topology = Topology(**stub.loadConfig(data_dir / "topologies/stub_series.yml"), cache = self.cache_config)
+            topology.cache = None
+            self.assertIsNone(topology.series_cache)
+            topology.loadData()
+        self.assertIsNone(topology.nodes[0].variables[2].series[0].getCache())
+
+    def test_invalid_config(self):
+        with A5StubServer() as stub:
+            self.assertRaises(Exception, Topology, **stub.loadConfig(data_dir / "topologies/stub_series.yml"), cache = {"max_size": 0})
+            self.assertRaises(Exception, Topology, **stub.loadConfig(data_dir / "topologies/stub_series.yml"), cache = {"foo": 1})
@@ -0,0 +1,107 @@
+from pydrodelta.state_checkpoints import StateCheckpointStore
+from pydrodelta.procedures.grp import GRPProcedure
+from pydrodelta.procedures.sacramento_simplified import SacramentoSimplifiedProcedure
+from unittest import TestCase
+from tests.synthetic_data import dailyForcings, withSimulatedObs
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import numpy as np
+import tempfile
+import yaml
+
+data_dir = Path(__file__).parent / "data"
+
+class Test_StateCheckpointStore(TestCase):
+
+    def test_save_and_latest(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = StateCheckpointStore(path, keep = 3)
+            t0 = datetime(2026, 1, 1, tzinfo = timezone.utc)
+            store.save(1, "abc", [(t0 + timedelta(days = i), {"x": float(i)}) for i in range(5)])
+            # older checkpoints are removed beyond keep
+            self.assertEqual([c[1]["x"] for c in store.read(1, "abc")], [2.0, 3.0, 4.0])
+            self.assertEqual(store.latest(1, "abc", t0, t0 + timedelta(days = 3)), (t0 + timedelta(days = 3), {"x": 3.0}))
+            self.assertIsNone(store.latest(1, "abc", t0, t0 + timedelta(days = 1)))
+            self.assertIsNone(store.latest(1, "other", t0, t0 + timedelta(days = 10)))
+            self.assertIsNone(store.latest(2, "abc", t0, t0 + timedelta(days = 10)))
+
+    def test_select(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = StateCheckpointStore(path, save_window = {"days": 10}, save_interval = {"days": 3})
+            t0 = datetime(2026, 1, 1, tzinfo = timezone.utc)
+            timestamps = [t0 + timedelta(days = i) for i in range(30)]
+            self.assertEqual(store.select(timestamps, timestamps[20]), [11, 14, 17, 20])
+            store.save_interval = None
+            self.assertEqual(store.select(timestamps, timestamps[20]), list(range(11, 21)))
+
+class Test_WarmStart(TestCase):
+
+    def assertWarmStart(self, procedure_class, config_file, states_columns):
+        config = yaml.load(open(data_dir / "procedures" / config_file), yaml.CLoader)
+        config = dict(config, boundaries = dailyForcings(90), outputs = [[], []])
+        with tempfile.TemporaryDirectory() as path:
+            checkpoints = {"path": path, "save_window": {"days": 60}}
+            cold = procedure_class(**config, checkpoints = checkpoints)
+            cold.run()
+            assert cold.output is not None
+            assert cold.checkpoint_store is not None
+            saved = cold.checkpoint_store.read(*cold.getCheckpointKey())
+            self.assertEqual(len(saved), 60)
+            self.assertEqual(list(saved[-1][1].keys()), states_columns)
+            # next forecast run starts at the latest checkpoint before its forecast date
+            index = cold.output[0].index
+            warm = procedure_class(**config, checkpoints = checkpoints, forecast_date = index[70])
+            warm.run()
+            assert warm.output is not None
+            self.assertEqual(warm.output[0].index[0], index[70])
+            self.assertEqual(len(warm.output[0]), len(index) - 70)
+            for i in range(2):
+                self.assertTrue(np.allclose(warm.output[i]["valor"].values, cold.output[i]["valor"].values[70:], rtol = 1e-12, atol = 0))
+            # configured initial states are kept
+            self.assertEqual(warm.initial_states, procedure_class(**config, checkpoints = checkpoints).initial_states)
+            # calibration runs (explicit parameters) don't use checkpoints
+            warm.run(parameters = warm.parameter_list)
+            self.assertEqual(len(warm.output[0]), len(index))
+            # nor other parameter sets
+            other = procedure_class(**config, checkpoints = checkpoints, forecast_date = index[70])
+            other.setParameters([p * 1.1 for p in other.parameter_list])
+            other.run(use_checkpoints = True)
+            self.assertEqual(len(other.output[0]), len(index))
+
+    def test_sacramento(self):
+        self.assertWarmStart(SacramentoSimplifiedProcedure, "sacramento_synthetic.yml", ["x1", "x2", "x3", "x4"])
+
+    def test_grp(self):
+        self.assertWarmStart(GRPProcedure, "grp_synthetic.yml", ["Sk", "Rk", "Pr"])
+
+    def test_warmup_steps(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        config = withSimulatedObs(SacramentoSimplifiedProcedure, dict(config, boundaries = dailyForcings(90)), 2)
+        with tempfile.TemporaryDirectory() as path:
+            checkpoints = {"path": path, "save_window": {"days": 60}}
+            cold = SacramentoSimplifiedProcedure(**config, checkpoints = checkpoints, warmup_steps = 30)
+            cold.run()
+            assert cold.output is not None
+            index = cold.output[0].index
+            # warmup ends before the checkpoint: all the steps of the warm run are scored
+            warm = SacramentoSimplifiedProcedure(**config, checkpoints = checkpoints, warmup_steps = 30, forecast_date = index[70])
+            warm.run()
+            assert warm.procedure_function_results is not None and warm.procedure_function_results.statistics is not None
+            self.assertEqual(warm.procedure_function_results.statistics[0].n, 20)
+            # warmup ends after the checkpoint: the same steps as the cold run are scored
+            cold = SacramentoSimplifiedProcedure(**config, warmup_steps = 80)
+            cold.run()
+            warm = SacramentoSimplifiedProcedure(**config, checkpoints = checkpoints, warmup_steps = 80, forecast_date = index[70])
+            warm.run()
+            assert cold.procedure_function_results is not None and cold.procedure_function_results.statistics is not None
+            assert warm.procedure_function_results is not None and warm.procedure_function_results.statistics is not None
+            self.assertEqual(warm.procedure_function_results.statistics[0].n, 10)
+            self.assertAlmostEqual(warm.procedure_function_results.statistics[0].nse, cold.procedure_function_results.statistics[0].nse, places = 10)
+
+    def test_no_checkpoints(self):
+        config = yaml.load(open(data_dir / "procedures/sacramento_synthetic.yml"), yaml.CLoader)
+        procedure = SacramentoSimplifiedProcedure(**config, boundaries = dailyForcings(90), outputs = [[], []])
+        self.assertIsNone(procedure.checkpoint_store)
+        procedure.run()
+        assert procedure.output is not None
+        self.assertEqual(len(procedure.output[0]), 90)
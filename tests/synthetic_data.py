@@ -0,0 +1,48 @@
+"""Synthetic inputs shared by the tests of the hydrological procedures and the time series utilities"""
+from pandas import DataFrame, DatetimeIndex, Timestamp, date_range
+from typing import Optional, Sequence
+import numpy as np
+
+tz = "America/Argentina/Buenos_Aires"
+
+def dailyForcings(n : int = 60, seed : int = 0) -> DataFrame:
+    """Daily precipitation (pma, 60% dry days) and potential evapotranspiration (etp), with empty q_obs and smc_obs columns, from 2000-01-01 UTC"""
+    rng = np.random.default_rng(seed)
+    pma = rng.gamma(0.3, 15, n)
+    pma[rng.random(n) < 0.6] = 0
+    return DataFrame({
+        "pma": pma,
+        "etp": rng.uniform(1, 5, n),
+        "q_obs": np.nan,
+        "smc_obs": np.nan
+    }, index = date_range("2000-01-01", periods = n, freq = "D", tz = "UTC").rename("timestart"))
+
+def irregularIndex(n : int, days : int, step_minutes : int = 1, seed : int = 0) -> DatetimeIndex:
+    """n distinct timestamps drawn from a grid of step_minutes over days, from 2023-01-01 local time"""
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.choice(np.arange(0, days * 24 * 60, step_minutes), n, replace=False))
+    return DatetimeIndex(Timestamp("2023-01-01", tz=tz) + minutes * np.timedelta64(1, "m"), name="timestart")
+
+def randomData(index : DatetimeIndex, columns : Sequence[str] = ("valor",), seed : int = 0, nan_fraction : float = 0.1, tag : Optional[str] = None, tag_fraction : float = 0.5) -> DataFrame:
+    """Normal(10, 5) values with a fraction of nan values for each of columns and, if tag is set, a tag column with tag on a fraction of the rows"""
+    rng = np.random.default_rng(seed)
+    n = len(index)
+    data = DataFrame(index = index)
+    for column in columns:
+        values = rng.normal(10, 5, n)
+        values[rng.random(n) < nan_fraction] = np.nan
+        data[column] = values
+    if tag is not None:
+        tags = np.array([None] * n, dtype=object)
+        tags[rng.random(n) < tag_fraction] = tag
+        data["tag"] = tags
+    return data
+
+def withSimulatedObs(procedure_class : type, config : dict, n_outputs : int = 1, seed : int = 1) -> dict:
+    """Returns config with the first of n_outputs set to the output of a run of procedure_class multiplied by a uniform(0.8, 1.2) noise, for use as observations in calibration tests"""
+    generator = procedure_class(**config, outputs = [[]] * n_outputs)
+    generator.run()
+    assert generator.output is not None
+    rng = np.random.default_rng(seed)
+    obs = generator.output[0][["valor"]] * rng.uniform(0.8, 1.2, (len(generator.output[0]), 1))
+    return dict(config, outputs = [obs] + [[]] * (n_outputs - 1))